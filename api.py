@@ -5,15 +5,31 @@ FastAPI backend for credential management operations
 
 from fastapi import FastAPI, HTTPException, Depends, Header, status, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
 from datetime import datetime
-import sqlite3
+import asyncio
 import json
 import hashlib
 import uuid
 import logging
 import time
+import os
+
+from storage import Storage, get_storage
+from search_index import SEARCH_SCOPES
+from audit_archive import AuditArchive, AuditArchiver, merge_hot_and_archived
+from audit_rollups import BUCKETS
+from export_engine import EXPORT_FORMATS, available_formats
+from query_stats import SLOW_QUERY_MS, query_stats, track_queries
+from rotation_scheduler import ANY, ROTATION_SCHEDULER_ENABLED, RotationScheduler
+from supplier_adapters import CircuitOpenError, RotationError, load_supplier_rotator
+from idempotency import (IdempotencyConflict, IdempotencyInProgress, IdempotencyStore, MAX_KEY_LENGTH,
+                         request_fingerprint)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -33,20 +49,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Database path
-DB_PATH = "credentials.db"
-
-# Setup logging to file for demo purposes
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('api_requests.log'),
-        logging.StreamHandler()
-    ]
-)
+# A process that embeds the app in-process (the Streamlit app's ASGIAdapter)
+# sets this to True: the API server then runs the background workers (audit
+# archiver, rotation scheduler, idempotency key cleanup), and the host keeps
+# its own logging setup.
+app.state.embedded = False
+# Seconds shutdown waits for the background workers to finish their current batch
+WORKER_STOP_TIMEOUT = 5.0
+
+# Storage backend: PostgreSQL when DATABASE_URL is set (or database_config
+# selects it), SQLite otherwise. Opened at startup (open_storage), not on
+# import, so importing the app never connects to a database.
+storage: Optional[Storage] = None
+
+# Audit log tiering: rows past the retention age move to compressed monthly segments
+AUDIT_ARCHIVE_ENABLED = os.environ.get("AUDIT_ARCHIVE_ENABLED", "true").lower() == "true"
+audit_archive = AuditArchive()
+audit_archiver: Optional[AuditArchiver] = None
+
+# Request log file for demo purposes, set up at startup (configure_logging)
+API_LOG_FILE = "api_requests.log"
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
 logger = logging.getLogger(__name__)
 
+def configure_logging():
+    """Log to API_LOG_FILE and the console; an embedded app only adds its request log file"""
+    if not app.state.embedded:
+        logging.basicConfig(level=logging.INFO, format=LOG_FORMAT,
+                            handlers=[logging.FileHandler(API_LOG_FILE), logging.StreamHandler()])
+    elif not logger.handlers:
+        file_handler = logging.FileHandler(API_LOG_FILE)
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        logger.addHandler(file_handler)
+        logger.setLevel(logging.INFO)
+
 # Middleware to log all requests
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -60,14 +96,18 @@ async def log_requests(request: Request, call_next):
     # Log request
     logger.info(f"➡️  {request.method} {request.url.path} | Role: {role}")
     
-    # Process request
-    response = await call_next(request)
+    # Process request, tallying the SQL it runs
+    with track_queries() as queries:
+        response = await call_next(request)
     
     # Calculate duration
     duration = time.time() - start_time
     
     # Log response
-    logger.info(f"⬅️  {request.method} {request.url.path} | Status: {response.status_code} | Duration: {duration:.3f}s")
+    logger.info(f"⬅️  {request.method} {request.url.path} | Status: {response.status_code} | Duration: {duration:.3f}s"
+                f" | Queries: {queries.count} ({queries.seconds * 1000:.1f} ms)")
+    response.headers["X-Query-Count"] = str(queries.count)
+    response.headers["X-Query-Time-Ms"] = f"{queries.seconds * 1000:.1f}"
     
     return response
 
@@ -103,6 +143,20 @@ class CredentialListResponse(BaseModel):
     total: int
     credentials: List[CredentialResponse]
 
+class CredentialChange(BaseModel):
+    seq: int
+    op: str
+    id: int
+    changed_at: str
+    credential: Optional[CredentialResponse]
+
+class CredentialChangesResponse(BaseModel):
+    since: int
+    next_since: int
+    current_seq: int
+    has_more: bool
+    changes: List[CredentialChange]
+
 class RotateResponse(BaseModel):
     id: int
     supplier: str
@@ -119,6 +173,100 @@ class AuditLogResponse(BaseModel):
     details: str
     timestamp: str
 
+class AuditStatsBucket(BaseModel):
+    bucket: str
+    total: int
+    by_action: Dict[str, int]
+
+class AuditStatsResponse(BaseModel):
+    bucket: str
+    total: int
+    by_action: Dict[str, int]
+    by_actor: Dict[str, int]
+    by_supplier: Dict[str, int]
+    by_environment: Dict[str, int]
+    series: List[AuditStatsBucket]
+
+class SearchHit(BaseModel):
+    kind: str
+    id: int
+    cred_id: Optional[int]
+    supplier: Optional[str]
+    environment: Optional[str]
+    action: Optional[str]
+    actor: Optional[str]
+    timestamp: Optional[str]
+    snippet: str
+    rank: float
+
+class SearchResponse(BaseModel):
+    query: str
+    scope: str
+    limit: int
+    offset: int
+    has_more: bool
+    results: List[SearchHit]
+
+class QueryStatement(BaseModel):
+    fingerprint: str
+    dialect: str
+    calls: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+    rows: int
+    steps: int
+    slow: int
+
+class SlowQuery(BaseModel):
+    fingerprint: str
+    dialect: str
+    ms: float
+    rows: int
+    steps: int
+    plan: List[str]
+    at: float
+
+class QueryStatsResponse(BaseModel):
+    since: float
+    slow_query_ms: float
+    statements: int
+    calls: int
+    total_ms: float
+    top: List[QueryStatement]
+    recent_slow: List[SlowQuery]
+
+class RotationPolicy(BaseModel):
+    supplier: str = Field(..., description="Supplier name, or * for any supplier", example="Sabre")
+    environment: str = Field(..., description="Environment, or * for any environment", example="production")
+    max_age_days: int = Field(..., ge=1, description="Rotate credentials older than this", example=90)
+
+class RotationPolicyResponse(RotationPolicy):
+    updated_by: str
+    updated_at: str
+
+class RotationSchedulerResponse(BaseModel):
+    running: bool
+    policies: int
+    due: int
+    overdue: int
+    oldest_due_days: Optional[float]
+    last_scan_at: Optional[str]
+    last_scan_ms: Optional[float]
+    rotated_total: int
+    failed_total: int
+    rate_per_minute: int
+    scan_interval: float
+
+class SupplierAdapterStatus(BaseModel):
+    adapter: str
+    breaker: str
+    breaker_opens: int
+    calls: int
+    rotated: int
+    retries: int
+    failed: int
+
 class ErrorResponse(BaseModel):
     error: str
     detail: str
@@ -160,23 +308,6 @@ def check_permission(user: dict, permission: str):
 
 # ==================== Database Functions ====================
 
-def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def mask_credential_data(data: dict, auth_type: str) -> dict:
-    """Mask sensitive credential data"""
-    masked_data = data.copy()
-    if auth_type == "api_key" and "api_key" in masked_data:
-        key = masked_data["api_key"]
-        masked_data["api_key"] = f"{key[:8]}...{key[-4:]}" if len(key) > 12 else "***"
-    elif auth_type == "username_password":
-        if "password" in masked_data:
-            masked_data["password"] = "********"
-    return masked_data
-
 def simulate_credential_rotation(auth_type: str, old_data: dict) -> dict:
     """Simulate credential rotation by generating new values"""
     if auth_type == "api_key":
@@ -190,17 +321,115 @@ def simulate_credential_rotation(auth_type: str, old_data: dict) -> dict:
         }
     return old_data
 
-def log_audit(conn, cred_id: int, action: str, actor: str, details: str):
-    """Log action to audit trail"""
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO audit_logs (cred_id, action, actor, details, timestamp)
-        VALUES (?, ?, ?, ?, ?)
-    """, (cred_id, action, actor, details, datetime.now().isoformat()))
-    conn.commit()
+# New secrets come from the supplier's adapter (SUPPLIER_ADAPTERS), or are
+# generated locally for suppliers without one
+supplier_rotator = load_supplier_rotator(simulate_credential_rotation)
+
+# Rotates credentials past their rotation policy's max age in the background
+rotation_scheduler: Optional[RotationScheduler] = None
+
+# Stored responses for requests sent with an Idempotency-Key
+idempotency: Optional[IdempotencyStore] = None
+
+async def run_idempotent(idempotency_key: Optional[str], user: dict, request: Request, body: Any,
+                         operation, status_code: int):
+    """
+    Run operation() once per Idempotency-Key: retries (and concurrent
+    duplicates, once the first finishes) get the first response back
+    """
+    if idempotency_key is None:
+        return await operation()
+    if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+
+    async def execute():
+        return status_code, jsonable_encoder(await operation())
+
+    try:
+        status_code, content, replayed = await idempotency.run(
+            user["email"], idempotency_key, request_fingerprint(request.method, request.url.path, body), execute
+        )
+    except IdempotencyConflict:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    except IdempotencyInProgress:
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+    
+    if replayed:
+        logger.info(f"🔁 Replayed {request.method} {request.url.path} for Idempotency-Key {idempotency_key}")
+    return JSONResponse(content, status_code=status_code,
+                        headers={"Idempotent-Replayed": "true"} if replayed else None)
+
+def build_credential_response(row: dict) -> CredentialResponse:
+    """
+    Turn a storage row into a response. Rows read with masked=True already
+    carry the stored masked projection as data.
+    """
+    return CredentialResponse(
+        id=row["id"],
+        supplier=row["supplier"],
+        environment=row["environment"],
+        auth_type=row["auth_type"],
+        data=json.loads(row["data"]),
+        created_by=row["created_by"],
+        created_at=row["created_at"],
+        updated_at=row["updated_at"],
+        allow_self_rotation=bool(row["allow_self_rotation"])
+    )
 
 # ==================== API Endpoints ====================
 
+@app.on_event("startup")
+async def open_storage():
+    """Set up logging, open the storage backend and the workers bound to it"""
+    global storage, audit_archiver, rotation_scheduler, idempotency
+    configure_logging()
+    storage = get_storage()
+    audit_archiver = AuditArchiver(storage, audit_archive)
+    rotation_scheduler = RotationScheduler(storage, supplier_rotator.rotate_threadsafe)
+    idempotency = IdempotencyStore(storage)
+    logger.info(f"🗄️  Storage backend: {type(storage).__name__}")
+
+@app.on_event("startup")
+async def init_schema():
+    """Create tables, search index, audit indexes, rollups and change feed (with their sync triggers)"""
+    storage.init_schema()
+    if storage.seed_sample_data():
+        logger.info("🌱 Seeded sample credentials into the empty database")
+
+@app.on_event("startup")
+async def start_audit_archiver():
+    """Start moving aged audit rows into the archive in the background"""
+    if AUDIT_ARCHIVE_ENABLED and not app.state.embedded:
+        audit_archiver.start()
+
+@app.on_event("startup")
+async def start_rotation_scheduler():
+    """Start rotating credentials that are due under their rotation policy"""
+    supplier_rotator.attach_loop(asyncio.get_running_loop())
+    if ROTATION_SCHEDULER_ENABLED and not app.state.embedded:
+        rotation_scheduler.start()
+
+@app.on_event("startup")
+async def start_idempotency_cleanup():
+    """Start deleting expired idempotency keys in the background"""
+    if not app.state.embedded:
+        idempotency.start()
+
+@app.on_event("shutdown")
+async def stop_audit_archiver():
+    """Let the background workers finish their current batch, then release database connections"""
+    workers = (audit_archiver, rotation_scheduler, idempotency)
+    for worker in workers:
+        worker.stop()
+    # Waited for on the event loop, not by blocking it: in-flight scheduled rotations
+    # still need it for their supplier calls. No executor either, so this also works
+    # when an embedded app is shut down at interpreter exit.
+    deadline = time.monotonic() + WORKER_STOP_TIMEOUT
+    while any(worker.is_alive() for worker in workers) and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    await supplier_rotator.close()
+    storage.close()
+
 @app.get("/", tags=["Health"])
 async def root():
     """API health check"""
@@ -221,7 +450,9 @@ async def root():
 )
 async def create_credential(
     credential: CredentialCreate,
-    user: dict = Depends(verify_api_key)
+    request: Request,
+    user: dict = Depends(verify_api_key),
+    idempotency_key: Optional[str] = Header(None, description="Send the same key when retrying to create only once")
 ):
     """
     Create a new supplier credential.
@@ -240,60 +471,31 @@ async def create_credential(
         "allow_self_rotation": false
     }
     ```
+    
+    With an Idempotency-Key header, a retry returns the first response
+    instead of creating a duplicate.
     """
     check_permission(user, "create")
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    now = datetime.now().isoformat()
-    
-    try:
-        cursor.execute("""
-            INSERT INTO credentials (supplier, environment, auth_type, data, created_by, created_at, updated_at, allow_self_rotation)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            credential.supplier,
-            credential.environment,
-            credential.auth_type,
-            json.dumps(credential.data),
-            user["email"],
-            now,
-            now,
-            credential.allow_self_rotation
-        ))
-        
-        cred_id = cursor.lastrowid
-        
-        # Log audit
-        log_audit(
-            conn,
-            cred_id,
-            "create",
-            user["email"],
-            f"Created credential for {credential.supplier} ({credential.environment}) via API"
-        )
-        
-        conn.commit()
+    async def create():
+        try:
+            row = storage.create_credential(
+                supplier=credential.supplier,
+                environment=credential.environment,
+                auth_type=credential.auth_type,
+                data=json.dumps(credential.data),
+                created_by=user["email"],
+                allow_self_rotation=credential.allow_self_rotation,
+                details=f"Created credential for {credential.supplier} ({credential.environment}) via API"
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
         
         # Return created credential
-        return CredentialResponse(
-            id=cred_id,
-            supplier=credential.supplier,
-            environment=credential.environment,
-            auth_type=credential.auth_type,
-            data=credential.data,
-            created_by=user["email"],
-            created_at=now,
-            updated_at=now,
-            allow_self_rotation=credential.allow_self_rotation
-        )
-        
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        conn.close()
+        return build_credential_response(row)
+    
+    return await run_idempotent(idempotency_key, user, request, credential.model_dump(), create,
+                                status.HTTP_201_CREATED)
 
 @app.get(
     "/api/v1/credentials",
@@ -318,50 +520,68 @@ async def list_credentials(
     - supplier: Filter by supplier name
     - environment: Filter by environment
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    # Masked roles read the stored masked projection, never the secret column
+    can_view_unmasked = "view_unmasked" in ROLE_PERMISSIONS.get(user["role"], [])
+    
+    rows = storage.list_credentials(supplier=supplier, environment=environment, masked=not can_view_unmasked)
     
-    query = "SELECT * FROM credentials WHERE 1=1"
-    params = []
+    credentials = [build_credential_response(row) for row in rows]
     
-    if supplier:
-        query += " AND supplier = ?"
-        params.append(supplier)
+    return CredentialListResponse(
+        total=len(credentials),
+        credentials=credentials
+    )
+
+@app.get(
+    "/api/v1/credentials/changes",
+    response_model=CredentialChangesResponse,
+    tags=["Credentials"],
+    summary="Credential change feed",
+    description="Credentials created, updated, rotated or deleted after a change sequence number. Data is masked for non-admin roles."
+)
+async def list_credential_changes(
+    since: int = 0,
+    limit: int = 500,
+    user: dict = Depends(verify_api_key)
+):
+    """
+    Incremental sync of the credential catalog.
     
-    if environment:
-        query += " AND environment = ?"
-        params.append(environment)
+    Every create, update, rotate and delete bumps a global change sequence.
+    The feed keeps only the latest change per credential, so each changed
+    credential is returned once; deletions are returned as tombstones
+    (`op: "delete"`, `credential: null`).
     
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    conn.close()
+    **Sync loop:** start with `since=0`, apply the changes, then call again
+    with `since=next_since` until `has_more` is false. Store `next_since`
+    for the next sync.
     
-    # Check if user can view unmasked data
+    **Query Parameters:**
+    - since: Last sequence number already applied (default: 0 = full sync)
+    - limit: Page size (default: 500, max: 5000)
+    """
+    limit = max(1, min(limit, 5000))
     can_view_unmasked = "view_unmasked" in ROLE_PERMISSIONS.get(user["role"], [])
     
-    credentials = []
-    for row in rows:
-        data = json.loads(row["data"])
-        
-        # Mask data if user doesn't have permission
-        if not can_view_unmasked:
-            data = mask_credential_data(data, row["auth_type"])
-        
-        credentials.append(CredentialResponse(
-            id=row["id"],
-            supplier=row["supplier"],
-            environment=row["environment"],
-            auth_type=row["auth_type"],
-            data=data,
-            created_by=row["created_by"],
-            created_at=row["created_at"],
-            updated_at=row["updated_at"],
-            allow_self_rotation=bool(row["allow_self_rotation"])
+    changes, has_more, current_seq = storage.get_changes(since, limit, masked=not can_view_unmasked)
+    
+    results = []
+    for change in changes:
+        row = change["credential"]
+        results.append(CredentialChange(
+            seq=change["seq"],
+            op=change["op"],
+            id=change["cred_id"],
+            changed_at=change["changed_at"],
+            credential=build_credential_response(row) if row is not None else None
         ))
     
-    return CredentialListResponse(
-        total=len(credentials),
-        credentials=credentials
+    return CredentialChangesResponse(
+        since=since,
+        next_since=results[-1].seq if results else since,
+        current_seq=current_seq,
+        has_more=has_more,
+        changes=results
     )
 
 @app.get(
@@ -382,34 +602,13 @@ async def get_credential(
     - admin/devops: View unmasked data
     - cs/partner: View masked data
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT * FROM credentials WHERE id = ?", (credential_id,))
-    row = cursor.fetchone()
-    conn.close()
+    can_view_unmasked = "view_unmasked" in ROLE_PERMISSIONS.get(user["role"], [])
+    row = storage.get_credential(credential_id, masked=not can_view_unmasked)
     
     if not row:
         raise HTTPException(status_code=404, detail="Credential not found")
     
-    # Check if user can view unmasked data
-    can_view_unmasked = "view_unmasked" in ROLE_PERMISSIONS.get(user["role"], [])
-    
-    data = json.loads(row["data"])
-    if not can_view_unmasked:
-        data = mask_credential_data(data, row["auth_type"])
-    
-    return CredentialResponse(
-        id=row["id"],
-        supplier=row["supplier"],
-        environment=row["environment"],
-        auth_type=row["auth_type"],
-        data=data,
-        created_by=row["created_by"],
-        created_at=row["created_at"],
-        updated_at=row["updated_at"],
-        allow_self_rotation=bool(row["allow_self_rotation"])
-    )
+    return build_credential_response(row)
 
 @app.put(
     "/api/v1/credentials/{credential_id}",
@@ -440,88 +639,44 @@ async def update_credential(
     """
     check_permission(user, "update")
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Check if credential exists
-    cursor.execute("SELECT * FROM credentials WHERE id = ?", (credential_id,))
-    row = cursor.fetchone()
-    
-    if not row:
-        conn.close()
-        raise HTTPException(status_code=404, detail="Credential not found")
-    
-    # Build update query
-    update_fields = []
-    params = []
+    # Collect changed fields
+    fields = {}
     
     if updates.supplier is not None:
-        update_fields.append("supplier = ?")
-        params.append(updates.supplier)
+        fields["supplier"] = updates.supplier
     
     if updates.environment is not None:
-        update_fields.append("environment = ?")
-        params.append(updates.environment)
+        fields["environment"] = updates.environment
     
     if updates.auth_type is not None:
-        update_fields.append("auth_type = ?")
-        params.append(updates.auth_type)
+        fields["auth_type"] = updates.auth_type
     
     if updates.data is not None:
-        update_fields.append("data = ?")
-        params.append(json.dumps(updates.data))
+        fields["data"] = json.dumps(updates.data)
     
     if updates.allow_self_rotation is not None:
-        update_fields.append("allow_self_rotation = ?")
-        params.append(updates.allow_self_rotation)
+        fields["allow_self_rotation"] = updates.allow_self_rotation
     
-    if not update_fields:
-        conn.close()
+    if not fields:
+        if not storage.get_credential(credential_id, masked=True):
+            raise HTTPException(status_code=404, detail="Credential not found")
         raise HTTPException(status_code=400, detail="No fields to update")
     
-    # Add updated_at
-    update_fields.append("updated_at = ?")
-    now = datetime.now().isoformat()
-    params.append(now)
-    params.append(credential_id)
-    
-    query = f"UPDATE credentials SET {', '.join(update_fields)} WHERE id = ?"
-    
     try:
-        cursor.execute(query, params)
-        
-        # Log audit
-        log_audit(
-            conn,
+        row = storage.update_credential(
             credential_id,
-            "update",
-            user["email"],
-            f"Updated credential {credential_id} via API"
-        )
-        
-        conn.commit()
-        
-        # Fetch updated credential
-        cursor.execute("SELECT * FROM credentials WHERE id = ?", (credential_id,))
-        row = cursor.fetchone()
-        
-        return CredentialResponse(
-            id=row["id"],
-            supplier=row["supplier"],
-            environment=row["environment"],
-            auth_type=row["auth_type"],
-            data=json.loads(row["data"]),
-            created_by=row["created_by"],
-            created_at=row["created_at"],
-            updated_at=row["updated_at"],
-            allow_self_rotation=bool(row["allow_self_rotation"])
+            fields,
+            actor=user["email"],
+            action="update",
+            details=f"Updated credential {credential_id} via API"
         )
-        
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        conn.close()
+    
+    if not row:
+        raise HTTPException(status_code=404, detail="Credential not found")
+    
+    return build_credential_response(row)
 
 @app.post(
     "/api/v1/credentials/{credential_id}/rotate",
@@ -532,7 +687,9 @@ async def update_credential(
 )
 async def rotate_credential(
     credential_id: int,
-    user: dict = Depends(verify_api_key)
+    request: Request,
+    user: dict = Depends(verify_api_key),
+    idempotency_key: Optional[str] = Header(None, description="Send the same key when retrying to rotate only once")
 ):
     """
     Rotate a credential by generating new authentication data.
@@ -542,53 +699,61 @@ async def rotate_credential(
     **Behavior:**
     - API keys: Generates a new API key
     - Username/Password: Generates a new password
-    """
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    - Suppliers with a rotation adapter issue the new secret themselves
+      (502 if the supplier fails, 503 while its circuit breaker is open)
+    - 409 if the credential was updated while the new secret was being
+      issued; the update is kept and the rotation can be retried
     
-    # Check if credential exists
-    cursor.execute("SELECT * FROM credentials WHERE id = ?", (credential_id,))
-    row = cursor.fetchone()
-    
-    if not row:
-        conn.close()
-        raise HTTPException(status_code=404, detail="Credential not found")
-    
-    # Check permissions
-    if user["role"] == "admin":
-        pass  # Admin can always rotate
-    elif user["role"] == "partner" and row["allow_self_rotation"]:
-        pass  # Partner can rotate if allowed
-    else:
-        conn.close()
-        raise HTTPException(
-            status_code=403,
-            detail="Insufficient permissions to rotate this credential"
-        )
-    
-    # Simulate rotation
-    old_data = json.loads(row["data"])
-    new_data = simulate_credential_rotation(row["auth_type"], old_data)
-    
-    now = datetime.now().isoformat()
-    
-    try:
-        cursor.execute("""
-            UPDATE credentials
-            SET data = ?, updated_at = ?
-            WHERE id = ?
-        """, (json.dumps(new_data), now, credential_id))
+    With an Idempotency-Key header, a retry returns the first rotation's
+    response (and its new secret) instead of rotating again.
+    """
+    async def rotate():
+        # Storage calls run in the threadpool: a SQLite write waits on the writer
+        # thread and must not hold up the event loop while supplier calls are awaited
+        row = await run_in_threadpool(storage.get_credential, credential_id)
         
-        # Log audit
-        log_audit(
-            conn,
-            credential_id,
-            "rotate",
-            user["email"],
-            f"Rotated credential {credential_id} via API"
-        )
+        if not row:
+            raise HTTPException(status_code=404, detail="Credential not found")
+        
+        # Check permissions
+        if user["role"] == "admin":
+            pass  # Admin can always rotate
+        elif user["role"] == "partner" and row["allow_self_rotation"]:
+            pass  # Partner can rotate if allowed
+        else:
+            raise HTTPException(
+                status_code=403,
+                detail="Insufficient permissions to rotate this credential"
+            )
+        
+        # Ask the supplier for the new secret (awaited, so other requests keep being served)
+        old_data = json.loads(row["data"])
+        try:
+            new_data = await supplier_rotator.rotate(row, old_data)
+        except CircuitOpenError as e:
+            raise HTTPException(status_code=503, detail=f"Supplier rotation unavailable: {str(e)}")
+        except RotationError as e:
+            raise HTTPException(status_code=502, detail=f"Supplier rotation failed: {str(e)}")
+        
+        # Compare-and-set on the updated_at read above: an update or rotation that
+        # landed during the supplier call is not overwritten
+        try:
+            updated = await run_in_threadpool(
+                storage.update_credential,
+                credential_id,
+                {"data": json.dumps(new_data)},
+                actor=user["email"],
+                action="rotate",
+                details=f"Rotated credential {credential_id} via API",
+                expected_updated_at=row["updated_at"]
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
         
-        conn.commit()
+        if not updated:
+            if await run_in_threadpool(storage.get_credential, credential_id, masked=True) is None:
+                raise HTTPException(status_code=404, detail="Credential not found")
+            raise HTTPException(status_code=409, detail="Credential was changed during rotation; retry the rotation")
         
         return RotateResponse(
             id=credential_id,
@@ -596,14 +761,10 @@ async def rotate_credential(
             environment=row["environment"],
             message="Credential rotated successfully",
             new_data=new_data,
-            rotated_at=now
+            rotated_at=updated["updated_at"]
         )
-        
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        conn.close()
+    
+    return await run_idempotent(idempotency_key, user, request, None, rotate, status.HTTP_200_OK)
 
 @app.delete(
     "/api/v1/credentials/{credential_id}",
@@ -623,37 +784,26 @@ async def delete_credential(
     """
     check_permission(user, "create")  # Using create permission as proxy for delete
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Check if credential exists
-    cursor.execute("SELECT * FROM credentials WHERE id = ?", (credential_id,))
-    row = cursor.fetchone()
+    # Check if credential exists (the secret itself is not needed)
+    row = storage.get_credential(credential_id, masked=True)
     
     if not row:
-        conn.close()
         raise HTTPException(status_code=404, detail="Credential not found")
     
     try:
-        # Log audit before deletion
-        log_audit(
-            conn,
+        # Audit entry is written in the same transaction, before deletion
+        deleted = storage.delete_credential(
             credential_id,
-            "delete",
-            user["email"],
-            f"Deleted credential {credential_id} ({row['supplier']}) via API"
+            actor=user["email"],
+            details=f"Deleted credential {credential_id} ({row['supplier']}) via API"
         )
-        
-        cursor.execute("DELETE FROM credentials WHERE id = ?", (credential_id,))
-        conn.commit()
-        
-        return None
-        
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        conn.close()
+    
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Credential not found")
+    
+    return None
 
 @app.get(
     "/api/v1/audit-logs",
@@ -665,6 +815,8 @@ async def delete_credential(
 async def get_audit_logs(
     credential_id: Optional[int] = None,
     action: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
     limit: int = 100,
     user: dict = Depends(verify_api_key)
 ):
@@ -676,30 +828,33 @@ async def get_audit_logs(
     **Query Parameters:**
     - credential_id: Filter by specific credential
     - action: Filter by action type (create, update, rotate, delete, view)
+    - since: Only logs at or after this ISO timestamp (e.g. 2024-01-01)
+    - until: Only logs before this ISO timestamp
     - limit: Maximum number of logs to return (default: 100)
+    
+    Logs older than the hot retention window live in the audit archive;
+    they are read transparently when the hot table cannot fill the page.
     """
     check_permission(user, "view_audit")
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    query = "SELECT * FROM audit_logs WHERE 1=1"
-    params = []
-    
-    if credential_id:
-        query += " AND cred_id = ?"
-        params.append(credential_id)
-    
-    if action:
-        query += " AND action = ?"
-        params.append(action)
-    
-    query += " ORDER BY timestamp DESC LIMIT ?"
-    params.append(limit)
+    rows = storage.get_audit_logs(
+        cred_id=credential_id,
+        action=action,
+        since=since,
+        until=until,
+        limit=limit
+    )
     
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    conn.close()
+    # Reach back into the archive only when the hot table ran out of rows
+    if len(rows) < limit:
+        archived = audit_archive.query(
+            since=since,
+            until=until,
+            cred_id=credential_id,
+            action=action,
+            limit=limit - len(rows)
+        )
+        rows = merge_hot_and_archived(rows, archived, limit)
     
     logs = []
     for row in rows:
@@ -714,6 +869,335 @@ async def get_audit_logs(
     
     return logs
 
+@app.get(
+    "/api/v1/audit-logs/stats",
+    response_model=AuditStatsResponse,
+    tags=["Audit"],
+    summary="Get audit statistics",
+    description="Audit activity counts by action, actor, supplier and environment, bucketed over time. Requires admin or devops role."
+)
+async def get_audit_stats(
+    bucket: str = "day",
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    action: Optional[str] = None,
+    actor: Optional[str] = None,
+    supplier: Optional[str] = None,
+    environment: Optional[str] = None,
+    top: int = 10,
+    user: dict = Depends(verify_api_key)
+):
+    """
+    Get audit statistics from the incrementally maintained daily rollups.
+    
+    **Required Role:** admin or devops
+    
+    **Query Parameters:**
+    - bucket: Time bucket for the series (day, week, month, year)
+    - since / until: ISO date range (until is exclusive)
+    - action, actor, supplier, environment: Restrict the counts
+    - top: Number of entries per breakdown (default: 10)
+    """
+    check_permission(user, "view_audit")
+    
+    if bucket not in BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Invalid bucket. Use one of: {', '.join(BUCKETS)}")
+    
+    stats = storage.get_audit_stats(
+        bucket=bucket,
+        since=since,
+        until=until,
+        action=action,
+        actor=actor,
+        supplier=supplier,
+        environment=environment,
+        top=max(1, min(top, 100))
+    )
+    
+    return AuditStatsResponse(**stats)
+
+@app.get(
+    "/api/v1/search",
+    response_model=SearchResponse,
+    tags=["Search"],
+    summary="Full-text search",
+    description="Ranked, paginated prefix search over audit history or credentials."
+)
+async def search(
+    q: str,
+    scope: str = "audit",
+    limit: int = 20,
+    offset: int = 0,
+    user: dict = Depends(verify_api_key)
+):
+    """
+    Full-text search backed by SQLite FTS5 (tsvector + GIN on PostgreSQL).
+    
+    **Permissions:**
+    - scope=audit: admin or devops (view_audit)
+    - scope=credentials: any role (secret data is never indexed)
+    
+    **Query Parameters:**
+    - q: Search text, every word is matched as a prefix (e.g. `sab rot`)
+    - scope: `audit` (details, actor, supplier, environment) or `credentials`
+    - limit: Page size (default: 20, max: 100)
+    - offset: Number of results to skip
+    """
+    if scope not in SEARCH_SCOPES:
+        raise HTTPException(status_code=400, detail=f"Invalid scope. Use one of: {', '.join(SEARCH_SCOPES)}")
+    
+    if scope == "audit":
+        check_permission(user, "view_audit")
+    
+    limit = max(1, min(limit, 100))
+    offset = max(0, offset)
+    
+    hits, has_more = storage.search(scope, q, limit, offset)
+    
+    return SearchResponse(
+        query=q,
+        scope=scope,
+        limit=limit,
+        offset=offset,
+        has_more=has_more,
+        results=[SearchHit(**hit) for hit in hits]
+    )
+
+# ==================== Exports ====================
+
+def export_file_response(path: str, rows: int, fmt: str, name: str) -> FileResponse:
+    """Serve a finished export file (with Range support) and delete it afterwards"""
+    media_type, extension = EXPORT_FORMATS[fmt]
+    return FileResponse(
+        path,
+        media_type=media_type,
+        filename=f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{extension}",
+        headers={"X-Export-Rows": str(rows)},
+        background=BackgroundTask(os.remove, path)
+    )
+
+def check_export_format(fmt: str):
+    if fmt not in available_formats():
+        raise HTTPException(status_code=400, detail=f"Invalid export format. Use one of: {', '.join(available_formats())}")
+
+@app.get(
+    "/api/v1/exports/audit-logs",
+    tags=["Exports"],
+    summary="Export audit logs",
+    description="Stream matching audit logs into a compressed CSV, Parquet, Arrow or binary file. Requires admin or devops role."
+)
+def export_audit_logs(
+    format: str = "csv.gz",
+    credential_id: Optional[int] = None,
+    action: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    user: dict = Depends(verify_api_key)
+):
+    """
+    Export audit logs (newest first) from the live audit table.
+    
+    **Required Role:** admin or devops
+    
+    **Query Parameters:**
+    - format: `csv.gz` (default), `parquet`, `arrow` (when pyarrow is installed) or `nzb`
+    - credential_id, action, since, until: Same filters as GET /api/v1/audit-logs
+    
+    Rows are read in batches and written to a temporary file, so memory use
+    does not grow with the export. The response supports Range requests.
+    """
+    check_permission(user, "view_audit")
+    check_export_format(format)
+    
+    try:
+        path, rows = storage.export_audit_logs(format, cred_id=credential_id, action=action, since=since, until=until)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    
+    return export_file_response(path, rows, format, "audit_logs")
+
+@app.get(
+    "/api/v1/exports/credentials",
+    tags=["Exports"],
+    summary="Export credentials",
+    description="Stream credentials into a compressed CSV, Parquet, Arrow or binary file. Secret data is only included for admin and devops roles."
+)
+def export_credentials(
+    format: str = "csv.gz",
+    supplier: Optional[str] = None,
+    environment: Optional[str] = None,
+    user: dict = Depends(verify_api_key)
+):
+    """
+    Export credentials.
+    
+    **Permissions:**
+    - admin/devops: includes the `data` column
+    - cs/partner: metadata only, without the `data` column
+    """
+    check_export_format(format)
+    can_view_unmasked = "view_unmasked" in ROLE_PERMISSIONS.get(user["role"], [])
+    
+    try:
+        path, rows = storage.export_credentials(format, include_data=can_view_unmasked,
+                                                supplier=supplier, environment=environment)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    
+    return export_file_response(path, rows, format, "credentials")
+
+# ==================== Admin ====================
+
+def require_admin(user: dict):
+    if user["role"] != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Role '{user['role']}' cannot access admin endpoints"
+        )
+
+@app.get(
+    "/api/v1/admin/query-stats",
+    response_model=QueryStatsResponse,
+    tags=["Admin"],
+    summary="SQL statement statistics",
+    description="Top SQL statements by time, calls or rows since the last reset, plus recent slow queries with their plans. Requires admin role."
+)
+async def get_query_stats(
+    top: int = 20,
+    sort: str = "total_ms",
+    user: dict = Depends(verify_api_key)
+):
+    """
+    Aggregated statement statistics for this API process.
+    
+    **Required Role:** admin
+    
+    **Query Parameters:**
+    - top: Number of statements to return (default: 20, max: 200)
+    - sort: total_ms (default), mean_ms, max_ms, calls, rows or steps
+    
+    Statements are grouped by fingerprint (literals replaced by ?). `steps`
+    counts SQLite VM steps, a measure of rows scanned. Statements slower
+    than SLOW_QUERY_MS are also logged with their query plan.
+    """
+    require_admin(user)
+    
+    if sort not in query_stats.SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort. Use one of: {', '.join(query_stats.SORT_KEYS)}")
+    
+    return QueryStatsResponse(
+        since=query_stats.since,
+        slow_query_ms=SLOW_QUERY_MS,
+        top=query_stats.top(max(1, min(top, 200)), sort),
+        recent_slow=query_stats.recent_slow(),
+        **query_stats.totals()
+    )
+
+@app.delete(
+    "/api/v1/admin/query-stats",
+    status_code=status.HTTP_204_NO_CONTENT,
+    tags=["Admin"],
+    summary="Reset SQL statement statistics",
+    description="Clear the statement statistics and slow-query list. Requires admin role."
+)
+async def reset_query_stats(user: dict = Depends(verify_api_key)):
+    """Start a new statistics window. **Required Role:** admin"""
+    require_admin(user)
+    query_stats.reset()
+
+@app.get(
+    "/api/v1/admin/rotation-policies",
+    response_model=List[RotationPolicyResponse],
+    tags=["Admin"],
+    summary="List rotation policies",
+    description="Maximum credential ages the rotation scheduler enforces. Requires admin role."
+)
+async def list_rotation_policies(user: dict = Depends(verify_api_key)):
+    """All rotation policies. **Required Role:** admin"""
+    require_admin(user)
+    return [RotationPolicyResponse(**policy) for policy in storage.list_rotation_policies()]
+
+@app.put(
+    "/api/v1/admin/rotation-policies",
+    response_model=RotationPolicyResponse,
+    tags=["Admin"],
+    summary="Set rotation policy",
+    description="Create or replace the rotation policy for a supplier/environment pair. Requires admin role."
+)
+async def set_rotation_policy(policy: RotationPolicy, user: dict = Depends(verify_api_key)):
+    """
+    Create or replace a rotation policy.
+    
+    **Required Role:** admin
+    
+    Use * as supplier or environment to match any value; the most specific
+    policy applies to each credential.
+    """
+    require_admin(user)
+    
+    try:
+        row = storage.set_rotation_policy(policy.supplier, policy.environment, policy.max_age_days,
+                                          actor=user["email"])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    
+    logger.info(f"🔄 Rotation policy {policy.supplier}/{policy.environment}: {policy.max_age_days} days"
+                f" (by {user['email']})")
+    return RotationPolicyResponse(**row)
+
+@app.delete(
+    "/api/v1/admin/rotation-policies",
+    status_code=status.HTTP_204_NO_CONTENT,
+    tags=["Admin"],
+    summary="Delete rotation policy",
+    description="Remove the rotation policy for a supplier/environment pair. Requires admin role."
+)
+async def delete_rotation_policy(
+    supplier: str = ANY,
+    environment: str = ANY,
+    user: dict = Depends(verify_api_key)
+):
+    """Remove a rotation policy. **Required Role:** admin"""
+    require_admin(user)
+    
+    if not storage.delete_rotation_policy(supplier, environment):
+        raise HTTPException(status_code=404, detail="Rotation policy not found")
+
+@app.get(
+    "/api/v1/admin/rotation-scheduler",
+    response_model=RotationSchedulerResponse,
+    tags=["Admin"],
+    summary="Rotation scheduler gauges",
+    description="Credentials due and overdue for rotation as of the last scan, plus rotation totals. Requires admin role."
+)
+async def get_rotation_scheduler(user: dict = Depends(verify_api_key)):
+    """
+    Rotation scheduler state.
+    
+    **Required Role:** admin
+    
+    - due: credentials past their (jittered) rotation age, waiting for a worker
+    - overdue: due credentials already past their policy's full max age
+    """
+    require_admin(user)
+    return RotationSchedulerResponse(
+        rate_per_minute=rotation_scheduler.rate_per_minute,
+        scan_interval=rotation_scheduler.scan_interval,
+        **rotation_scheduler.gauges()
+    )
+
+@app.get(
+    "/api/v1/admin/supplier-adapters",
+    response_model=Dict[str, SupplierAdapterStatus],
+    tags=["Admin"],
+    summary="Supplier rotation adapters",
+    description="Circuit breaker state and call counts per supplier. Requires admin role."
+)
+async def get_supplier_adapters(user: dict = Depends(verify_api_key)):
+    """Supplier adapter status since startup. **Required Role:** admin"""
+    require_admin(user)
+    return supplier_rotator.status()
+
 # ==================== Run Server ====================
 
 if __name__ == "__main__":
@@ -0,0 +1,187 @@
+"""
+HTTP client for the Credential Management API
+One keep-alive requests.Session per process with a sized connection pool,
+retries with exponential backoff that respect idempotency, per-call
+timeouts, latency samples per endpoint and a helper to send several
+requests concurrently.
+"""
+
+import os
+import re
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from nezasa_client.transports import ASGIAdapter, UnixSocketAdapter
+
+# Connection pool size (also the number of concurrent requests in request_many)
+API_POOL_SIZE = int(os.environ.get("API_POOL_SIZE", "10"))
+
+# Retries per call; connection failures are retried for every method, read
+# failures and retryable status codes only for idempotent methods
+API_MAX_RETRIES = int(os.environ.get("API_MAX_RETRIES", "3"))
+API_BACKOFF_FACTOR = float(os.environ.get("API_BACKOFF_FACTOR", "0.3"))
+API_RETRY_STATUSES = (429, 502, 503, 504)
+
+# (connect, read) timeout in seconds
+API_CONNECT_TIMEOUT = float(os.environ.get("API_CONNECT_TIMEOUT", "3.05"))
+API_READ_TIMEOUT = float(os.environ.get("API_READ_TIMEOUT", "10"))
+
+# How the Streamlit app reaches the API: "http", "uds" or "inprocess"
+API_TRANSPORTS = ("http", "uds", "inprocess")
+
+# Latency samples kept per endpoint
+API_LATENCY_SAMPLES = 200
+
+# Numeric path segments are folded so /credentials/1 and /credentials/2 share stats
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class APIClient:
+    """
+    Thread-safe API client; create one per process and reuse it.
+
+    request() returns (success, response_data, error_message), the shape the
+    Streamlit UI already works with. transport picks how requests reach the
+    API: "http" (TCP to base_url), "uds" (HTTP over the Unix socket at
+    socket_path) or "inprocess" (straight into asgi_app, no socket; requests
+    are served one at a time, see ASGIAdapter).
+    """
+
+    def __init__(self, base_url: str, api_keys: Dict[str, str], pool_size: int = API_POOL_SIZE,
+                 max_retries: int = API_MAX_RETRIES, backoff_factor: float = API_BACKOFF_FACTOR,
+                 timeout: Timeout = (API_CONNECT_TIMEOUT, API_READ_TIMEOUT), transport: str = "http",
+                 socket_path: Optional[str] = None, asgi_app=None):
+        if transport not in API_TRANSPORTS:
+            raise ValueError(f"Unknown API transport: {transport} (use one of: {', '.join(API_TRANSPORTS)})")
+        self.base_url = base_url.rstrip("/")
+        self.transport = transport
+        self.api_keys = api_keys
+        self.pool_size = pool_size
+        self.timeout = timeout
+
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=API_RETRY_STATUSES,
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        self.session = requests.Session()
+        if transport == "inprocess":
+            self.session.mount(f"{self.base_url}/", ASGIAdapter(asgi_app))
+        elif transport == "uds":
+            self.session.mount(f"{self.base_url}/", UnixSocketAdapter(socket_path, pool_size, max_retries=retry))
+        else:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry, pool_block=True)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=API_LATENCY_SAMPLES))
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="api-client")
+
+    def request(self, method: str, endpoint: str, role: str, data: dict = None,
+                timeout: Optional[Timeout] = None) -> tuple:
+        """Send one request and return (success, response_data, error_message)"""
+        api_key = self.api_keys.get(role)
+        if not api_key:
+            return False, None, f"No API key found for role: {role}"
+
+        method = method.upper()
+        if method not in ("GET", "POST", "PUT", "DELETE"):
+            return False, None, f"Unsupported HTTP method: {method}"
+
+        started = time.perf_counter()
+        try:
+            response = self.session.request(
+                method,
+                f"{self.base_url}{endpoint}",
+                headers={"X-API-Key": api_key},
+                json=data if method in ("POST", "PUT") else None,
+                timeout=timeout or self.timeout,
+            )
+        except requests.exceptions.ConnectionError:
+            self._record(method, endpoint, started, ok=False)
+            return False, None, "⚠️ API server is not running. Please start the API server first."
+        except requests.exceptions.Timeout:
+            self._record(method, endpoint, started, ok=False)
+            return False, None, "⏱️ API request timed out"
+        except Exception as e:
+            self._record(method, endpoint, started, ok=False)
+            return False, None, f"Error: {str(e)}"
+
+        ok = response.status_code in [200, 201, 204]
+        self._record(method, endpoint, started, ok)
+        if ok:
+            return True, response.json() if response.text else None, None
+        try:
+            error_detail = response.json().get('detail', response.text) if response.text else 'Unknown error'
+        except ValueError:
+            error_detail = response.text
+        return False, None, f"API Error ({response.status_code}): {error_detail}"
+
+    def request_many(self, calls: Sequence[tuple]) -> List[tuple]:
+        """
+        Send several requests concurrently over the shared pool.
+
+        Each call is a tuple of request() arguments, e.g. ("GET", "/", "admin");
+        results come back in the same order.
+        """
+        results = [None] * len(calls)
+        for index, result in self.iter_many(calls):
+            results[index] = result
+        return results
+
+    def iter_many(self, calls: Sequence[tuple]) -> Iterator[Tuple[int, tuple]]:
+        """
+        Like request_many(), but yields (index, result) as each call finishes.
+
+        At most pool_size calls are in flight; the rest wait in the queue.
+        """
+        futures = {self._executor.submit(self.request, *call): index for index, call in enumerate(calls)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+    def _record(self, method: str, endpoint: str, started: float, ok: bool):
+        elapsed = (time.perf_counter() - started) * 1000
+        key = f"{method} {_ID_SEGMENT.sub('/{id}', endpoint)}"
+        with self._lock:
+            self._samples[key].append((elapsed, ok))
+
+    def latency_stats(self) -> List[Dict]:
+        """Per-endpoint call count, failures and latency percentiles (ms) over recent calls"""
+        with self._lock:
+            samples = {key: list(values) for key, values in self._samples.items()}
+
+        stats = []
+        for key, calls in sorted(samples.items()):
+            values = sorted(elapsed for elapsed, _ in calls)
+            stats.append({
+                "endpoint": key,
+                "calls": len(calls),
+                "errors": sum(1 for _, ok in calls if not ok),
+                "p50_ms": round(statistics.median(values), 1),
+                "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))], 1),
+                "max_ms": round(values[-1], 1),
+            })
+        return stats
+
+    def close(self):
+        """Close pooled connections and the worker threads"""
+        self._executor.shutdown(wait=False)
+        self.session.close()
@@ -1,16 +1,30 @@
 import streamlit as st
-import sqlite3
 import json
 import datetime
-import uuid
 import hashlib
-from typing import Dict, List, Optional, Any
+from collections import defaultdict
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional, Any
 import pandas as pd
 import io
 import csv
 import os
 import base64
-import requests
+import time
+
+from search_index import search_audit_logs, build_match_query
+from audit_archive import AuditArchive, merge_hot_and_archived
+from audit_rollups import get_audit_stats
+from sqlite_lanes import get_sqlite_lanes
+from change_cache import ChangeAwareCache
+from storage import PostgresStorage, SQLiteStorage
+from log_tail import LogTail
+from api_client import APIClient
+from export_engine import EXPORT_FORMATS, available_formats, export_to_file
+from frame_loader import parse_datetimes, read_frame
+from credential_crypto import DecryptingCursor, decrypt_data, decrypt_many
+from query_runner import PostgresQueryRunner, QueryRejected, SQLiteQueryRunner
+from query_stats import track_queries
 
 # Database imports
 try:
@@ -21,7 +35,11 @@ except ImportError:
     SQLALCHEMY_AVAILABLE = False
 
 # API Configuration
-API_BASE_URL = "https://vibe-coding-project-production.up.railway.app"  # Railway production API
+API_BASE_URL = os.environ.get("API_BASE_URL", "https://vibe-coding-project-production.up.railway.app")  # Railway production API
+# How requests reach the API: "http" (API_BASE_URL), "uds" (an API on this
+# host serving API_SOCKET_PATH) or "inprocess" (api.py loaded into this process)
+API_TRANSPORT = os.environ.get("API_TRANSPORT", "http").lower()
+API_SOCKET_PATH = os.environ.get("API_SOCKET_PATH", "/tmp/nezasa-api.sock")
 API_KEY_MAP = {
     "admin": "admin_key_123",
     "devops": "devops_key_456",
@@ -29,6 +47,25 @@ API_KEY_MAP = {
     "partner": "partner_key_012"
 }
 
+# Seconds between database health checks on the cached DatabaseManager
+HEALTH_CHECK_INTERVAL = 30
+
+# Dashboard paging
+DASHBOARD_PAGE_SIZES = [10, 25, 50, 100]
+
+# Environments offered when creating or bulk-updating credentials
+CREDENTIAL_ENVIRONMENTS = ["production", "sandbox", "staging", "development"]
+
+# Audit log paging and sort orders (id breaks timestamp ties)
+AUDIT_PAGE_SIZES = [25, 50, 100, 250]
+AUDIT_SORT_ORDERS = {
+    "newest": "al.timestamp DESC, al.id DESC",
+    "oldest": "al.timestamp ASC, al.id ASC",
+}
+
+# Datetime columns of typed frames are formatted by the table, not per row
+TIMESTAMP_COLUMN = st.column_config.DatetimeColumn(format="YYYY-MM-DD HH:mm:ss")
+
 # Page configuration
 st.set_page_config(
     page_title="API Credential Management",
@@ -735,10 +772,12 @@ class DatabaseManager:
         self.use_postgres = use_postgres
         self.postgres_url = postgres_url
         self.engine = None
+        self.last_health_check = 0.0
         
         if use_postgres and SQLALCHEMY_AVAILABLE and postgres_url:
             try:
-                self.engine = create_engine(postgres_url)
+                # pool_pre_ping replaces connections the server has dropped
+                self.engine = create_engine(postgres_url, pool_pre_ping=True)
                 self.init_postgres_database()
             except Exception as e:
                 st.warning(f"Failed to connect to PostgreSQL: {e}. Falling back to SQLite.")
@@ -749,466 +788,88 @@ class DatabaseManager:
     
     def init_database(self):
         """Initialize the SQLite database with required tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Create credentials table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS credentials (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                supplier TEXT NOT NULL,
-                environment TEXT NOT NULL,
-                auth_type TEXT NOT NULL,
-                data TEXT NOT NULL,
-                created_by TEXT NOT NULL,
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL,
-                allow_self_rotation BOOLEAN DEFAULT FALSE
-            )
-        """)
-        
-        # Create audit_logs table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS audit_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                cred_id INTEGER,
-                action TEXT NOT NULL,
-                actor TEXT NOT NULL,
-                details TEXT NOT NULL,
-                timestamp TEXT NOT NULL,
-                FOREIGN KEY (cred_id) REFERENCES credentials (id)
-            )
-        """)
-        
-        conn.commit()
-        conn.close()
+        # Reads use pooled read-only connections; all writes go through the
+        # process-wide writer thread (shared with SQLiteStorage) so they never
+        # contend for the lock
+        self.storage = SQLiteStorage(self.db_path)
+        self.reads, self.writer = get_sqlite_lanes(self.db_path)
+        self._init_storage()
+    
+    def _init_storage(self):
+        """Create the schema and seed sample data if tables are empty, the same way the API does"""
+        self.storage.init_schema()
+        self.storage.seed_sample_data()
+    
+    def health_check(self) -> bool:
+        """Run a trivial query on the active backend"""
+        try:
+            if self.use_postgres:
+                with self.engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+            else:
+                if not self.writer.is_alive():
+                    return False
+                with self.reads.connection() as conn:
+                    conn.execute("SELECT 1")
+            return True
+        except Exception:
+            return False
+    
+    def reconnect(self):
+        """Drop and reopen connections without re-running schema setup"""
+        if self.use_postgres:
+            self.engine.dispose()
+        else:
+            self.storage.close()
+            self.storage = SQLiteStorage(self.db_path)
+            self.reads, self.writer = get_sqlite_lanes(self.db_path)
+    
+    def ensure_connected(self):
+        """Health-check at most every HEALTH_CHECK_INTERVAL seconds, reconnecting on failure"""
+        now = time.monotonic()
+        if now - self.last_health_check < HEALTH_CHECK_INTERVAL:
+            return
+        self.last_health_check = now
         
-        # Seed sample data if tables are empty
-        self._seed_sample_data()
+        if not self.health_check():
+            self.reconnect()
+            if not self.health_check():
+                st.error("❌ Database is unreachable. Retrying on the next interaction.")
+                self.last_health_check = 0.0
     
     def init_postgres_database(self):
         """Initialize PostgreSQL database with required tables"""
         try:
-            with self.engine.connect() as conn:
-                # Create credentials table
-                conn.execute(text("""
-                    CREATE TABLE IF NOT EXISTS credentials (
-                        id SERIAL PRIMARY KEY,
-                        supplier TEXT NOT NULL,
-                        environment TEXT NOT NULL,
-                        auth_type TEXT NOT NULL,
-                        data TEXT NOT NULL,
-                        created_by TEXT NOT NULL,
-                        created_at TIMESTAMP NOT NULL,
-                        updated_at TIMESTAMP NOT NULL,
-                        allow_self_rotation BOOLEAN DEFAULT FALSE
-                    )
-                """))
-                
-                # Create audit_logs table
-                conn.execute(text("""
-                    CREATE TABLE IF NOT EXISTS audit_logs (
-                        id SERIAL PRIMARY KEY,
-                        cred_id INTEGER,
-                        action TEXT NOT NULL,
-                        actor TEXT NOT NULL,
-                        details TEXT NOT NULL,
-                        timestamp TIMESTAMP NOT NULL,
-                        FOREIGN KEY (cred_id) REFERENCES credentials (id)
-                    )
-                """))
-                
-                conn.commit()
-            
-            # Seed sample data if tables are empty
-            self._seed_postgres_sample_data()
-            
+            self.storage = PostgresStorage(self.postgres_url)
+            self._init_storage()
         except Exception as e:
             st.error(f"Error initializing PostgreSQL database: {e}")
             raise
-    
-    def _seed_sample_data(self):
-        """Seed the database with sample credentials if empty"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Check if credentials table is empty
-        cursor.execute("SELECT COUNT(*) FROM credentials")
-        count = cursor.fetchone()[0]
-        
-        if count == 0:
-            sample_credentials = [
-                {
-                    "supplier": "Sabre",
-                    "environment": "production",
-                    "auth_type": "api_key",
-                    "data": json.dumps({"api_key": "sabre_prod_key_9x8y7z6"}),
-                    "created_by": "alice@nezasa.com",
-                    "allow_self_rotation": True
-                },
-                {
-                    "supplier": "Amadeus",
-                    "environment": "production",
-                    "auth_type": "api_key",
-                    "data": json.dumps({"api_key": "amadeus_api_a1b2c3d4e5"}),
-                    "created_by": "bob@nezasa.com",
-                    "allow_self_rotation": False
-                },
-                {
-                    "supplier": "Google Maps",
-                    "environment": "production",
-                    "auth_type": "api_key",
-                    "data": json.dumps({"api_key": "AIzaSyD_GoogleMapsKey123"}),
-                    "created_by": "alice@nezasa.com",
-                    "allow_self_rotation": False
-                },
-                {
-                    "supplier": "Stripe",
-                    "environment": "production",
-                    "auth_type": "api_key",
-                    "data": json.dumps({"api_key": "sk_live_stripe_secret_key"}),
-                    "created_by": "carol@nezasa.com",
-                    "allow_self_rotation": True
-                },
-                {
-                    "supplier": "Payyo",
-                    "environment": "sandbox",
-                    "auth_type": "username_password",
-                    "data": json.dumps({"username": "payyo_sandbox", "password": "payyo_2024_test"}),
-                    "created_by": "bob@nezasa.com",
-                    "allow_self_rotation": False
-                },
-                {
-                    "supplier": "Viator",
-                    "environment": "production",
-                    "auth_type": "api_key",
-                    "data": json.dumps({"api_key": "viator_prod_key_v1a2t3"}),
-                    "created_by": "alice@nezasa.com",
-                    "allow_self_rotation": True
-                },
-                {
-                    "supplier": "Musement",
-                    "environment": "production",
-                    "auth_type": "api_key",
-                    "data": json.dumps({"api_key": "musement_api_m9u8s7"}),
-                    "created_by": "carol@nezasa.com",
-                    "allow_self_rotation": False
-                },
-                {
-                    "supplier": "G Adventures",
-                    "environment": "production",
-                    "auth_type": "username_password",
-                    "data": json.dumps({"username": "gadventures_api", "password": "ga_secure_2024"}),
-                    "created_by": "bob@nezasa.com",
-                    "allow_self_rotation": True
-                },
-                {
-                    "supplier": "OTS Globe",
-                    "environment": "staging",
-                    "auth_type": "api_key",
-                    "data": json.dumps({"api_key": "ots_staging_key_o1t2s3"}),
-                    "created_by": "alice@nezasa.com",
-                    "allow_self_rotation": False
-                },
-                {
-                    "supplier": "TUI",
-                    "environment": "production",
-                    "auth_type": "username_password",
-                    "data": json.dumps({"username": "tui_prod_user", "password": "tui_password_2024"}),
-                    "created_by": "carol@nezasa.com",
-                    "allow_self_rotation": True
-                }
-            ]
-            
-            now = datetime.datetime.now().isoformat()
-            
-            for i, cred in enumerate(sample_credentials):
-                cursor.execute("""
-                    INSERT INTO credentials (supplier, environment, auth_type, data, created_by, created_at, updated_at, allow_self_rotation)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    cred["supplier"],
-                    cred["environment"],
-                    cred["auth_type"],
-                    cred["data"],
-                    cred["created_by"],
-                    now,
-                    now,
-                    cred["allow_self_rotation"]
-                ))
-                
-                # Log the creation
-                cred_id = cursor.lastrowid
-                cursor.execute("""
-                    INSERT INTO audit_logs (cred_id, action, actor, details, timestamp)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (
-                    cred_id,
-                    "create",
-                    cred["created_by"],
-                    f"Created credential for {cred['supplier']} ({cred['environment']})",
-                    now
-                ))
-                
-                # Add additional audit log examples for variety
-                if i == 0:  # Sabre - add update log
-                    cursor.execute("""
-                        INSERT INTO audit_logs (cred_id, action, actor, details, timestamp)
-                        VALUES (?, ?, ?, ?, ?)
-                    """, (
-                        cred_id,
-                        "update",
-                        "bob@nezasa.com",
-                        f"Updated authentication data for {cred['supplier']}",
-                        now
-                    ))
-                elif i == 1:  # Amadeus - add rotation log
-                    cursor.execute("""
-                        INSERT INTO audit_logs (cred_id, action, actor, details, timestamp)
-                        VALUES (?, ?, ?, ?, ?)
-                    """, (
-                        cred_id,
-                        "rotate",
-                        "alice@nezasa.com",
-                        f"Rotated API key for {cred['supplier']}",
-                        now
-                    ))
-                elif i == 3:  # Stripe - add view log
-                    cursor.execute("""
-                        INSERT INTO audit_logs (cred_id, action, actor, details, timestamp)
-                        VALUES (?, ?, ?, ?, ?)
-                    """, (
-                        cred_id,
-                        "view",
-                        "carol@nezasa.com",
-                        f"Viewed credential details for {cred['supplier']}",
-                        now
-                    ))
-                elif i == 5:  # Viator - add rotation log
-                    cursor.execute("""
-                        INSERT INTO audit_logs (cred_id, action, actor, details, timestamp)
-                        VALUES (?, ?, ?, ?, ?)
-                    """, (
-                        cred_id,
-                        "rotate",
-                        "bob@nezasa.com",
-                        f"Rotated API key for {cred['supplier']}",
-                        now
-                    ))
-                elif i == 7:  # G Adventures - add update log
-                    cursor.execute("""
-                        INSERT INTO audit_logs (cred_id, action, actor, details, timestamp)
-                        VALUES (?, ?, ?, ?, ?)
-                    """, (
-                        cred_id,
-                        "update",
-                        "carol@nezasa.com",
-                        f"Updated password for {cred['supplier']}",
-                        now
-                    ))
-            
-                conn.commit()
-            
-            conn.close()
-    
-    def _seed_postgres_sample_data(self):
-        """Seed PostgreSQL database with sample credentials if empty"""
-        try:
-            with self.engine.connect() as conn:
-                # Check if credentials table is empty
-                result = conn.execute(text("SELECT COUNT(*) FROM credentials"))
-                count = result.scalar()
-                
-                if count == 0:
-                    sample_credentials = [
-                        {
-                            "supplier": "Sabre",
-                            "environment": "production",
-                            "auth_type": "api_key",
-                            "data": json.dumps({"api_key": "sabre_prod_key_9x8y7z6"}),
-                            "created_by": "alice@nezasa.com",
-                            "allow_self_rotation": True
-                        },
-                        {
-                            "supplier": "Amadeus",
-                            "environment": "production",
-                            "auth_type": "api_key",
-                            "data": json.dumps({"api_key": "amadeus_api_a1b2c3d4e5"}),
-                            "created_by": "bob@nezasa.com",
-                            "allow_self_rotation": False
-                        },
-                        {
-                            "supplier": "Google Maps",
-                            "environment": "production",
-                            "auth_type": "api_key",
-                            "data": json.dumps({"api_key": "AIzaSyD_GoogleMapsKey123"}),
-                            "created_by": "alice@nezasa.com",
-                            "allow_self_rotation": False
-                        },
-                        {
-                            "supplier": "Stripe",
-                            "environment": "production",
-                            "auth_type": "api_key",
-                            "data": json.dumps({"api_key": "sk_live_stripe_secret_key"}),
-                            "created_by": "carol@nezasa.com",
-                            "allow_self_rotation": True
-                        },
-                        {
-                            "supplier": "Payyo",
-                            "environment": "sandbox",
-                            "auth_type": "username_password",
-                            "data": json.dumps({"username": "payyo_sandbox", "password": "payyo_2024_test"}),
-                            "created_by": "bob@nezasa.com",
-                            "allow_self_rotation": False
-                        },
-                        {
-                            "supplier": "Viator",
-                            "environment": "production",
-                            "auth_type": "api_key",
-                            "data": json.dumps({"api_key": "viator_prod_key_v1a2t3"}),
-                            "created_by": "alice@nezasa.com",
-                            "allow_self_rotation": True
-                        },
-                        {
-                            "supplier": "Musement",
-                            "environment": "production",
-                            "auth_type": "api_key",
-                            "data": json.dumps({"api_key": "musement_api_m9u8s7"}),
-                            "created_by": "carol@nezasa.com",
-                            "allow_self_rotation": False
-                        },
-                        {
-                            "supplier": "G Adventures",
-                            "environment": "production",
-                            "auth_type": "username_password",
-                            "data": json.dumps({"username": "gadventures_api", "password": "ga_secure_2024"}),
-                            "created_by": "bob@nezasa.com",
-                            "allow_self_rotation": True
-                        },
-                        {
-                            "supplier": "OTS Globe",
-                            "environment": "staging",
-                            "auth_type": "api_key",
-                            "data": json.dumps({"api_key": "ots_staging_key_o1t2s3"}),
-                            "created_by": "alice@nezasa.com",
-                            "allow_self_rotation": False
-                        },
-                        {
-                            "supplier": "TUI",
-                            "environment": "production",
-                            "auth_type": "username_password",
-                            "data": json.dumps({"username": "tui_prod_user", "password": "tui_password_2024"}),
-                            "created_by": "carol@nezasa.com",
-                            "allow_self_rotation": True
-                        }
-                    ]
-                    
-                    now = datetime.datetime.now()
-                    
-                    for i, cred in enumerate(sample_credentials):
-                        # Insert credential
-                        conn.execute(text("""
-                            INSERT INTO credentials (supplier, environment, auth_type, data, created_by, created_at, updated_at, allow_self_rotation)
-                            VALUES (:supplier, :environment, :auth_type, :data, :created_by, :created_at, :updated_at, :allow_self_rotation)
-                        """), {
-                            "supplier": cred["supplier"],
-                            "environment": cred["environment"],
-                            "auth_type": cred["auth_type"],
-                            "data": cred["data"],
-                            "created_by": cred["created_by"],
-                            "created_at": now,
-                            "updated_at": now,
-                            "allow_self_rotation": cred["allow_self_rotation"]
-                        })
-                        
-                        # Log the creation
-                        conn.execute(text("""
-                            INSERT INTO audit_logs (cred_id, action, actor, details, timestamp)
-                            VALUES (LASTVAL(), :action, :actor, :details, :timestamp)
-                        """), {
-                            "action": "create",
-                            "actor": cred["created_by"],
-                            "details": f"Created credential for {cred['supplier']} ({cred['environment']})",
-                            "timestamp": now
-                        })
-                        
-                        # Add additional audit log examples for variety
-                        if i == 0:  # Sabre - add update log
-                            conn.execute(text("""
-                                INSERT INTO audit_logs (cred_id, action, actor, details, timestamp)
-                                VALUES (LASTVAL(), :action, :actor, :details, :timestamp)
-                            """), {
-                                "action": "update",
-                                "actor": "bob@nezasa.com",
-                                "details": f"Updated authentication data for {cred['supplier']}",
-                                "timestamp": now
-                            })
-                        elif i == 1:  # Amadeus - add rotation log
-                            conn.execute(text("""
-                                INSERT INTO audit_logs (cred_id, action, actor, details, timestamp)
-                                VALUES (LASTVAL(), :action, :actor, :details, :timestamp)
-                            """), {
-                                "action": "rotate",
-                                "actor": "alice@nezasa.com",
-                                "details": f"Rotated API key for {cred['supplier']}",
-                                "timestamp": now
-                            })
-                        elif i == 3:  # Stripe - add view log
-                            conn.execute(text("""
-                                INSERT INTO audit_logs (cred_id, action, actor, details, timestamp)
-                                VALUES (LASTVAL(), :action, :actor, :details, :timestamp)
-                            """), {
-                                "action": "view",
-                                "actor": "carol@nezasa.com",
-                                "details": f"Viewed credential details for {cred['supplier']}",
-                                "timestamp": now
-                            })
-                        elif i == 5:  # Viator - add rotation log
-                            conn.execute(text("""
-                                INSERT INTO audit_logs (cred_id, action, actor, details, timestamp)
-                                VALUES (LASTVAL(), :action, :actor, :details, :timestamp)
-                            """), {
-                                "action": "rotate",
-                                "actor": "bob@nezasa.com",
-                                "details": f"Rotated API key for {cred['supplier']}",
-                                "timestamp": now
-                            })
-                        elif i == 7:  # G Adventures - add update log
-                            conn.execute(text("""
-                                INSERT INTO audit_logs (cred_id, action, actor, details, timestamp)
-                                VALUES (LASTVAL(), :action, :actor, :details, :timestamp)
-                            """), {
-                                "action": "update",
-                                "actor": "carol@nezasa.com",
-                                "details": f"Updated password for {cred['supplier']}",
-                                "timestamp": now
-                            })
-                    
-                    conn.commit()
-                    
-        except Exception as e:
-            st.error(f"Error seeding PostgreSQL database: {e}")
-            raise
 
-# Initialize database
-try:
-    from database_config import get_database_config
-    config = get_database_config()
-    
-    if config["use_postgres"]:
-        db = DatabaseManager(
-            use_postgres=True,
-            postgres_url=config["postgres_url"]
-        )
-        # st.success("🔗 Connected to PostgreSQL database")  # Commented out to remove banner
-    else:
-        db = DatabaseManager(db_path=config["sqlite_path"])
+# Initialize database once per server process; Streamlit reruns reuse it
+@st.cache_resource(show_spinner=False)
+def get_database_manager() -> DatabaseManager:
+    """Process-wide DatabaseManager (schema init and seeding run only here)"""
+    try:
+        from database_config import get_database_config
+        config = get_database_config()
+        
+        if config["use_postgres"]:
+            return DatabaseManager(
+                use_postgres=True,
+                postgres_url=config["postgres_url"]
+            )
+            # st.success("🔗 Connected to PostgreSQL database")  # Commented out to remove banner
+        return DatabaseManager(db_path=config["sqlite_path"])
         # st.info("💾 Using SQLite database (data will persist)")  # Commented out to remove banner
         
-except ImportError:
-    # Fallback to default SQLite if config file not found
-    db = DatabaseManager()
-    # st.info("💾 Using SQLite database (default)")  # Commented out to remove banner
+    except ImportError:
+        # Fallback to default SQLite if config file not found
+        return DatabaseManager()
+        # st.info("💾 Using SQLite database (default)")  # Commented out to remove banner
+
+db = get_database_manager()
+db.ensure_connected()
 
 # Role-based access control
 class RBACManager:
@@ -1270,54 +931,144 @@ class RBACManager:
         
         return False
 
+# Credential catalog: every credential once, indexed for the UI's lookups
+class CredentialCatalog:
+    """
+    Read-only view of all credentials with hash indexes by id, supplier,
+    environment and auth type. Built once per credentials change (cached by
+    CredentialManager.get_catalog) so tabs look things up instead of
+    scanning lists.
+    """
+    
+    INDEXED_COLUMNS = ("supplier", "environment", "auth_type")
+    
+    def __init__(self, credentials: List[Dict]):
+        self.credentials = credentials
+        self.by_id = {cred["id"]: cred for cred in credentials}
+        # cred id -> supplier, for mapping whole id columns at once
+        self.supplier_by_id = {cred["id"]: cred["supplier"] for cred in credentials}
+        self.indexes = {column: defaultdict(list) for column in self.INDEXED_COLUMNS}
+        for cred in credentials:
+            for column, index in self.indexes.items():
+                index[cred[column]].append(cred)
+    
+    def __len__(self) -> int:
+        return len(self.credentials)
+    
+    def get(self, cred_id: int) -> Optional[Dict]:
+        return self.by_id.get(cred_id)
+    
+    def where(self, column: str, value: str) -> List[Dict]:
+        """Credentials whose supplier, environment or auth_type equals value"""
+        return self.indexes[column].get(value, [])
+    
+    def values(self, column: str) -> List[str]:
+        """Distinct values of an indexed column, sorted"""
+        return sorted(self.indexes[column])
+    
+    def counts(self, column: str) -> Dict[str, int]:
+        """Credential count per value of an indexed column, sorted by value"""
+        return {value: len(self.indexes[column][value]) for value in self.values(column)}
+    
+    def suppliers_for(self, cred_ids: pd.Series) -> pd.Series:
+        """
+        Supplier for each id of a column (one hash lookup per row): ID:<id>
+        when the credential is gone, System for entries without one
+        """
+        suppliers = cred_ids.map(self.supplier_by_id).astype(object)
+        missing = suppliers.isna()
+        if missing.any():
+            ids = cred_ids[missing].astype("Int64")
+            suppliers[missing] = ("ID:" + ids.astype(str)).where(ids.notna(), "System")
+        return suppliers.astype("category")
+
 # Credential management functions
 class CredentialManager:
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
-    
-    def get_all_credentials(self) -> List[Dict]:
-        """Retrieve all credentials from the database"""
-        conn = sqlite3.connect(self.db.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, supplier, environment, auth_type, data, created_by, 
-                   created_at, updated_at, allow_self_rotation
-            FROM credentials
-            ORDER BY updated_at DESC
-        """)
+        # Shared by all sessions; reloads when the change tokens move
+        self.cache = ChangeAwareCache(self._read_change_tokens)
+        # Audit entries moved out of the hot table by the API's archiver
+        self.audit_archive = AuditArchive()
+    
+    @property
+    def reads(self):
+        """Read-only connection pool (looked up each time so it follows db.reconnect())"""
+        return get_sqlite_lanes(self.db.db_path)[0]
+    
+    @property
+    def writer(self):
+        """Process-wide writer thread for the database file"""
+        return get_sqlite_lanes(self.db.db_path)[1]
+    
+    def _read_change_tokens(self) -> Dict[str, Any]:
+        """
+        Per-table change tokens: the change feed sequence moves on every
+        credential write, the audit id range on every insert or archive run
+        """
+        with self.reads.connection() as conn:
+            row = conn.execute("""
+                SELECT (SELECT value FROM change_sequence WHERE id = 1),
+                       (SELECT MIN(id) FROM audit_logs),
+                       (SELECT MAX(id) FROM audit_logs)
+            """).fetchone()
+        return {"credentials": row[0], "audit_logs": (row[1], row[2])}
+    
+    def get_all_credentials(self, masked: bool = False) -> List[Dict]:
+        """
+        Retrieve all credentials (cached until the credentials table changes).
+        With masked=True, data is the stored masked projection and nothing is decrypted.
+        """
+        return self.cache.get(("credentials", masked), ("credentials",),
+                              lambda: self._load_all_credentials(masked))
+    
+    def get_catalog(self) -> CredentialCatalog:
+        """All credentials, indexed (rebuilt only when the credentials table changes)"""
+        # Lookups, filters and counts never need the secrets
+        return self.cache.get("credential_catalog", ("credentials",),
+                              lambda: CredentialCatalog(self.get_all_credentials(masked=True)))
+    
+    def _load_all_credentials(self, masked: bool) -> List[Dict]:
+        with self.reads.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(f"""
+                SELECT id, supplier, environment, auth_type, {"masked_data" if masked else "data"}, created_by, 
+                       created_at, updated_at, allow_self_rotation
+                FROM credentials
+                ORDER BY updated_at DESC
+            """)
+            rows = cursor.fetchall()
         
+        data = [row[4] for row in rows] if masked else decrypt_many(row[4] for row in rows)
         credentials = []
-        for row in cursor.fetchall():
+        for row, row_data in zip(rows, data):
             credentials.append({
                 "id": row[0],
                 "supplier": row[1],
                 "environment": row[2],
                 "auth_type": row[3],
-                "data": json.loads(row[4]),
+                "data": json.loads(row_data),
                 "created_by": row[5],
                 "created_at": row[6],
                 "updated_at": row[7],
                 "allow_self_rotation": bool(row[8])
             })
         
-        conn.close()
         return credentials
     
     def get_credential_by_id(self, cred_id: int) -> Optional[Dict]:
         """Retrieve a specific credential by ID"""
-        conn = sqlite3.connect(self.db.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, supplier, environment, auth_type, data, created_by, 
-                   created_at, updated_at, allow_self_rotation
-            FROM credentials
-            WHERE id = ?
-        """, (cred_id,))
-        
-        row = cursor.fetchone()
-        conn.close()
+        with self.reads.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT id, supplier, environment, auth_type, data, created_by, 
+                       created_at, updated_at, allow_self_rotation
+                FROM credentials
+                WHERE id = ?
+            """, (cred_id,))
+            row = cursor.fetchone()
         
         if row:
             return {
@@ -1325,7 +1076,7 @@ class CredentialManager:
                 "supplier": row[1],
                 "environment": row[2],
                 "auth_type": row[3],
-                "data": json.loads(row[4]),
+                "data": json.loads(decrypt_data(row[4])),
                 "created_by": row[5],
                 "created_at": row[6],
                 "updated_at": row[7],
@@ -1333,30 +1084,119 @@ class CredentialManager:
             }
         return None
     
+    def search_credentials(self, query: str = "", supplier: Optional[str] = None,
+                           environment: Optional[str] = None, auth_type: Optional[str] = None,
+                           limit: int = 25, offset: int = 0, masked: bool = False) -> tuple:
+        """
+        One page of credentials matching a search and filters, newest first.
+        
+        Returns (credentials, total). Text search uses the credentials FTS
+        index (prefix match on supplier, environment, auth type, creator).
+        With masked=True, data is the stored masked projection.
+        """
+        key = ("credential_page", query, supplier, environment, auth_type, limit, offset, masked)
+        return self.cache.get(key, ("credentials",), lambda: self._load_credential_page(
+            query, supplier, environment, auth_type, limit, offset, masked))
+    
+    def _load_credential_page(self, query: str, supplier: Optional[str], environment: Optional[str],
+                              auth_type: Optional[str], limit: int, offset: int, masked: bool) -> tuple:
+        source = "FROM credentials c"
+        where = "WHERE 1=1"
+        params = []
+        
+        match = build_match_query(query)
+        if match:
+            source += " JOIN credentials_fts f ON f.rowid = c.id"
+            where += " AND credentials_fts MATCH ?"
+            params.append(match)
+        
+        for column, value in (("supplier", supplier), ("environment", environment), ("auth_type", auth_type)):
+            if value:
+                where += f" AND c.{column} = ?"
+                params.append(value)
+        
+        with self.reads.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT COUNT(*) {source} {where}", params)
+            total = cursor.fetchone()[0]
+            
+            cursor.execute(f"""
+                SELECT c.id, c.supplier, c.environment, c.auth_type, {"c.masked_data" if masked else "c.data"},
+                       c.created_by, c.created_at, c.updated_at, c.allow_self_rotation
+                {source} {where}
+                ORDER BY c.updated_at DESC, c.id DESC
+                LIMIT ? OFFSET ?
+            """, params + [limit, offset])
+            rows = cursor.fetchall()
+        
+        # Only the page's rows are decrypted, and only for roles that see secrets
+        data = [row[4] for row in rows] if masked else decrypt_many(row[4] for row in rows)
+        credentials = []
+        for row, row_data in zip(rows, data):
+            credentials.append({
+                "id": row[0],
+                "supplier": row[1],
+                "environment": row[2],
+                "auth_type": row[3],
+                "data": json.loads(row_data),
+                "created_by": row[5],
+                "created_at": row[6],
+                "updated_at": row[7],
+                "allow_self_rotation": bool(row[8])
+            })
+        
+        return credentials, total
+    
+    def get_credential_filter_options(self) -> Dict[str, List[str]]:
+        """Distinct suppliers, environments and auth types for the dashboard filters"""
+        def load():
+            options = {}
+            with self.reads.connection() as conn:
+                cursor = conn.cursor()
+                for column in ("supplier", "environment", "auth_type"):
+                    cursor.execute(f"SELECT DISTINCT {column} FROM credentials ORDER BY {column}")
+                    options[column] = [row[0] for row in cursor.fetchall()]
+            return options
+        
+        return self.cache.get("credential_filter_options", ("credentials",), load)
+
+    def get_credentials_frame(self, masked: bool) -> pd.DataFrame:
+        """
+        All credentials as a typed DataFrame, newest first.
+
+        Masked frames select the stored masked projection as data and never
+        the secret column.
+        """
+        return self.cache.get(("credentials_frame", masked), ("credentials",),
+                              lambda: self._load_credentials_frame(masked))
+
+    def _load_credentials_frame(self, masked: bool) -> pd.DataFrame:
+        data_column = "masked_data AS data" if masked else "data"
+
+        with self.reads.connection() as conn:
+            frame = read_frame(conn, f"""
+                SELECT id, supplier, environment, auth_type, {data_column},
+                       created_by, created_at, updated_at, allow_self_rotation
+                FROM credentials
+                ORDER BY updated_at DESC, id DESC
+            """, categories=("supplier", "environment", "auth_type", "created_by"),
+                datetimes=("created_at", "updated_at"))
+
+        if not masked:
+            frame["data"] = decrypt_many(frame["data"])
+        frame["allow_self_rotation"] = frame["allow_self_rotation"].astype(bool)
+        return frame
+
     def create_credential(self, supplier: str, environment: str, auth_type: str, 
                          data: Dict, created_by: str) -> bool:
         """Create a new credential"""
         try:
-            conn = sqlite3.connect(self.db.db_path)
-            cursor = conn.cursor()
-            
-            now = datetime.datetime.now().isoformat()
-            
-            cursor.execute("""
-                INSERT INTO credentials (supplier, environment, auth_type, data, created_by, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (supplier, environment, auth_type, json.dumps(data), created_by, now, now))
-            
-            cred_id = cursor.lastrowid
-            
-            # Log the creation
-            cursor.execute("""
-                INSERT INTO audit_logs (cred_id, action, actor, details, timestamp)
-                VALUES (?, ?, ?, ?, ?)
-            """, (cred_id, "create", created_by, f"Created credential for {supplier} ({environment})", now))
-            
-            conn.commit()
-            conn.close()
+            self.db.storage.create_credential(
+                supplier, environment, auth_type, json.dumps(data), created_by,
+                allow_self_rotation=False,
+                details=f"Created credential for {supplier} ({environment})"
+            )
+            self.cache.invalidate()
             return True
         except Exception as e:
             st.error(f"Error creating credential: {str(e)}")
@@ -1365,93 +1205,92 @@ class CredentialManager:
     def update_credential(self, cred_id: int, auth_type: str, data: Dict, updated_by: str) -> bool:
         """Update an existing credential"""
         try:
-            conn = sqlite3.connect(self.db.db_path)
-            cursor = conn.cursor()
-            
-            now = datetime.datetime.now().isoformat()
-            
-            cursor.execute("""
-                UPDATE credentials 
-                SET auth_type = ?, data = ?, updated_at = ?
-                WHERE id = ?
-            """, (auth_type, json.dumps(data), now, cred_id))
-            
-            # Log the update
-            cursor.execute("""
-                INSERT INTO audit_logs (cred_id, action, actor, details, timestamp)
-                VALUES (?, ?, ?, ?, ?)
-            """, (cred_id, "update", updated_by, f"Updated credential data for ID {cred_id}", now))
-            
-            conn.commit()
-            conn.close()
-            return True
+            updated = self.db.storage.update_credential(
+                cred_id,
+                {"auth_type": auth_type, "data": json.dumps(data)},
+                actor=updated_by,
+                action="update",
+                details=f"Updated credential data for ID {cred_id}"
+            )
+            self.cache.invalidate()
         except Exception as e:
             st.error(f"Error updating credential: {str(e)}")
             return False
-    
-    def rotate_credential(self, cred_id: int, rotated_by: str) -> bool:
-        """Rotate a credential by generating new secret values"""
-        try:
-            credential = self.get_credential_by_id(cred_id)
-            if not credential:
-                return False
-            
-            # Generate new secret based on auth_type
-            new_data = {}
-            timestamp = datetime.datetime.now().strftime("%Y%m%d")
-            
-            if credential["auth_type"] == "api_key":
-                new_data["api_key"] = f"ak_{credential['environment']}_{timestamp}_{str(uuid.uuid4())[:8]}"
-            elif credential["auth_type"] == "username_password":
-                new_data["username"] = credential["data"].get("username", "user")
-                new_data["password"] = f"pass_{timestamp}_{str(uuid.uuid4())[:8]}"
-            
-            # Update the credential
-            success = self.update_credential(cred_id, credential["auth_type"], new_data, rotated_by)
-            
-            if success:
-                # Log the rotation specifically
-                conn = sqlite3.connect(self.db.db_path)
-                cursor = conn.cursor()
-                
-                cursor.execute("""
-                    INSERT INTO audit_logs (cred_id, action, actor, details, timestamp)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (cred_id, "rotate", rotated_by, f"Rotated credential secrets for {credential['supplier']}", datetime.datetime.now().isoformat()))
-                
-                conn.commit()
-                conn.close()
-            
-            return success
-        except Exception as e:
-            st.error(f"Error rotating credential: {str(e)}")
+        if not updated:
+            st.error("Error updating credential: credential not found")
             return False
-    
-    def get_audit_logs(self, cred_id: Optional[int] = None) -> List[Dict]:
-        """Retrieve audit logs, optionally filtered by credential ID"""
-        conn = sqlite3.connect(self.db.db_path)
-        cursor = conn.cursor()
+        return True
+    
+    def get_audit_logs(self, cred_id: Optional[int] = None, supplier: Optional[str] = None,
+                       action: Optional[str] = None, actor: Optional[str] = None,
+                       sort: str = "newest", limit: Optional[int] = None,
+                       offset: int = 0) -> List[Dict]:
+        """
+        Retrieve audit logs, filtered, sorted and paged in SQL (cached until audit logs change).
         
-        if cred_id:
-            cursor.execute("""
-                SELECT al.id, al.cred_id, al.action, al.actor, al.details, al.timestamp,
-                       c.supplier
-                FROM audit_logs al
-                LEFT JOIN credentials c ON al.cred_id = c.id
-                WHERE al.cred_id = ?
-                ORDER BY al.timestamp DESC
-            """, (cred_id,))
+        Pages continue into the audit archive, so entries moved there by the
+        archiver are listed too. supplier="System" matches entries whose
+        credential no longer exists.
+        """
+        if sort not in AUDIT_SORT_ORDERS:
+            raise ValueError(f"Invalid sort: {sort}")
+        
+        key = ("audit_logs", cred_id, supplier, action, actor, sort, limit, offset)
+        # Supplier names are joined in, so credential changes matter too
+        return self.cache.get(key, ("audit_logs", "credentials"),
+                              lambda: self._load_audit_logs(cred_id, supplier, action, actor, sort, limit, offset))
+    
+    def _load_audit_logs(self, cred_id: Optional[int], supplier: Optional[str], action: Optional[str],
+                         actor: Optional[str], sort: str, limit: Optional[int], offset: int) -> List[Dict]:
+        """
+        One page of the hot table and the archive segments read as one log.
+        
+        Archived entries are older than every hot one, so newest-first pages
+        continue into the archive where the hot table runs out, and
+        oldest-first pages start in the archive.
+        """
+        filters = (cred_id, supplier, action, actor)
+        if sort == "newest":
+            hot = self._load_hot_audit_logs(*filters, sort, limit, offset)
+            if limit is not None and len(hot) >= limit:
+                return hot
+            # A page past the last hot row skips the hot rows the earlier pages showed
+            skip = max(offset - self._count_hot_audit_logs(*filters), 0) if offset and not hot else 0
+            archived = list(islice(self._iter_archived_audit_logs(*filters, newest_first=True),
+                                   skip, None if limit is None else skip + limit - len(hot)))
         else:
-            cursor.execute("""
-                SELECT al.id, al.cred_id, al.action, al.actor, al.details, al.timestamp,
-                       c.supplier
-                FROM audit_logs al
-                LEFT JOIN credentials c ON al.cred_id = c.id
-                ORDER BY al.timestamp DESC
-            """)
+            archived = list(islice(self._iter_archived_audit_logs(*filters, newest_first=False), offset,
+                                   None if limit is None else offset + limit))
+            if limit is not None and len(archived) >= limit:
+                return archived
+            if offset and not archived:
+                skip = max(offset - sum(1 for _ in self._iter_archived_audit_logs(*filters, newest_first=False)), 0)
+            else:
+                skip = 0
+            hot = self._load_hot_audit_logs(*filters, sort, None if limit is None else limit - len(archived), skip)
+        
+        # Rows being archived can briefly be in both; merging drops the duplicates
+        logs = merge_hot_and_archived(hot, archived, len(hot) + len(archived))
+        return logs if sort == "newest" else logs[::-1]
+    
+    def _load_hot_audit_logs(self, cred_id: Optional[int], supplier: Optional[str], action: Optional[str],
+                             actor: Optional[str], sort: str, limit: Optional[int], offset: int) -> List[Dict]:
+        query, params = self._audit_logs_query(
+            "al.id, al.cred_id, al.action, al.actor, al.details, al.timestamp, c.supplier",
+            cred_id, supplier, action, actor, sort
+        )
+        
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params.extend([limit, offset])
+        
+        with self.reads.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
         
         logs = []
-        for row in cursor.fetchall():
+        for row in rows:
             logs.append({
                 "id": row[0],
                 "cred_id": row[1],
@@ -1462,52 +1301,180 @@ class CredentialManager:
                 "supplier": row[6] if row[6] else "System"
             })
         
-        conn.close()
         return logs
+    
+    def _count_hot_audit_logs(self, cred_id: Optional[int], supplier: Optional[str], action: Optional[str],
+                              actor: Optional[str]) -> int:
+        query, params = self._audit_logs_query("COUNT(*)", cred_id, supplier, action, actor, "newest")
+        with self.reads.connection() as conn:
+            return conn.execute(query, params).fetchone()[0]
+    
+    def _iter_archived_audit_logs(self, cred_id: Optional[int], supplier: Optional[str], action: Optional[str],
+                                  actor: Optional[str], newest_first: bool) -> Iterator[Dict]:
+        """Archived entries matching the filters, suppliers looked up in the catalog"""
+        catalog = self.get_catalog()
+        for row in self.audit_archive.iter_rows(newest_first=newest_first, cred_id=cred_id, action=action):
+            cred = catalog.get(row["cred_id"]) if row["cred_id"] else None
+            row_supplier = cred["supplier"] if cred else "System"
+            if ((cred_id and row["cred_id"] != cred_id) or (action and row["action"] != action)
+                    or (actor and row["actor"] != actor) or (supplier and row_supplier != supplier)):
+                continue
+            yield {**row, "supplier": row_supplier}
+    
+    @staticmethod
+    def _audit_logs_query(columns: str, cred_id: Optional[int], supplier: Optional[str],
+                          action: Optional[str], actor: Optional[str], sort: str) -> tuple:
+        """Filtered, sorted audit SELECT (without paging) and its parameters"""
+        query = f"""
+            SELECT {columns}
+            FROM audit_logs al
+            LEFT JOIN credentials c ON al.cred_id = c.id
+            WHERE 1=1
+        """
+        params = []
+        
+        if cred_id:
+            query += " AND al.cred_id = ?"
+            params.append(cred_id)
+        
+        if supplier == "System":
+            query += " AND c.supplier IS NULL"
+        elif supplier:
+            query += " AND c.supplier = ?"
+            params.append(supplier)
+        
+        if action:
+            query += " AND al.action = ?"
+            params.append(action)
+        
+        if actor:
+            query += " AND al.actor = ?"
+            params.append(actor)
+        
+        query += f" ORDER BY {AUDIT_SORT_ORDERS[sort]}"
+        return query, params
+    
+    def export_audit_logs(self, fmt: str, cred_id: Optional[int] = None, supplier: Optional[str] = None,
+                          action: Optional[str] = None, actor: Optional[str] = None,
+                          sort: str = "newest") -> tuple:
+        """Stream all matching audit logs from a cursor into an export file, returns (path, rows)"""
+        if sort not in AUDIT_SORT_ORDERS:
+            raise ValueError(f"Invalid sort: {sort}")
+        
+        query, params = self._audit_logs_query(
+            'al.id AS "ID", al.cred_id AS "Credential ID", COALESCE(c.supplier, \'System\') AS "Supplier", '
+            'al.action AS "Action", al.actor AS "Actor", al.details AS "Details", al.timestamp AS "Timestamp"',
+            cred_id, supplier, action, actor, sort
+        )
+        with self.reads.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return export_to_file(cursor, fmt)
+    
+    def export_credentials(self, fmt: str) -> tuple:
+        """Stream the raw credentials table (data decrypted) into an export file, returns (path, rows)"""
+        with self.reads.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id AS "ID", supplier AS "Supplier", environment AS "Environment",
+                       auth_type AS "Auth Type", data AS "Data (JSON)", created_by AS "Created By",
+                       created_at AS "Created At", updated_at AS "Updated At",
+                       allow_self_rotation AS "Allow Self Rotation"
+                FROM credentials ORDER BY id
+            """)
+            return export_to_file(DecryptingCursor(cursor, "Data (JSON)"), fmt)
+    
+    def get_audit_filter_options(self) -> Dict[str, List[str]]:
+        """
+        Dropdown values for the audit filters: suppliers from the credentials
+        table, actions and actors from the (small) daily rollup table
+        """
+        def load():
+            with self.reads.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT DISTINCT supplier FROM credentials ORDER BY supplier")
+                suppliers = [row[0] for row in cursor.fetchall()]
+                cursor.execute("SELECT DISTINCT action FROM audit_rollup_daily ORDER BY action")
+                actions = [row[0] for row in cursor.fetchall()]
+                cursor.execute("SELECT DISTINCT actor FROM audit_rollup_daily ORDER BY actor")
+                actors = [row[0] for row in cursor.fetchall()]
+            return {"suppliers": suppliers + ["System"], "actions": actions, "actors": actors}
+        
+        return self.cache.get("audit_filter_options", ("audit_logs", "credentials"), load)
+    
+    def get_audit_stats(self, **filters) -> Dict:
+        """Audit counts by action/actor/supplier/environment from the rollup table"""
+        def load():
+            with self.reads.connection() as conn:
+                return get_audit_stats(conn, **filters)
+        
+        # The rollups move with every audit insert
+        return self.cache.get(("audit_stats", tuple(sorted(filters.items()))), ("audit_logs",), load)
+    
+    def get_credential_counts(self, column: str) -> Dict[str, int]:
+        """Credential counts grouped by environment or auth_type"""
+        if column not in CredentialCatalog.INDEXED_COLUMNS:
+            raise ValueError(f"Invalid column: {column}")
+        
+        # Read off the catalog's index: no extra credentials query
+        return self.get_catalog().counts(column)
+    
+    def get_audit_logs_frame(self) -> pd.DataFrame:
+        """The live audit_logs table as a typed frame, newest first (suppliers come from the catalog)"""
+        def load():
+            with self.reads.connection() as conn:
+                return read_frame(conn, """
+                    SELECT id, cred_id, action, actor, details, timestamp
+                    FROM audit_logs
+                    ORDER BY timestamp DESC, id DESC
+                """, categories=("action", "actor"), datetimes=("timestamp",))
+        
+        return self.cache.get("audit_logs_frame", ("audit_logs",), load)
+    
+    def search_audit_logs(self, query: str, limit: int = 20, offset: int = 0) -> tuple:
+        """Ranked prefix search over audit logs, returns (hits, has_more)"""
+        with self.reads.connection() as conn:
+            return search_audit_logs(conn, query, limit, offset)
 
 # Initialize credential manager
-cred_manager = CredentialManager(db)
+@st.cache_resource(show_spinner=False)
+def get_credential_manager() -> CredentialManager:
+    """Process-wide CredentialManager bound to the cached DatabaseManager"""
+    return CredentialManager(get_database_manager())
+
+cred_manager = get_credential_manager()
 
 # API Helper Functions
+@st.cache_resource(show_spinner=False)
+def get_api_client() -> APIClient:
+    """Process-wide API client, so reruns and sessions reuse its keep-alive connections"""
+    if API_TRANSPORT == "inprocess":
+        # Same routes, validation, RBAC and audit as the HTTP API, without a socket
+        from api import app as api_app
+        # Only serve requests here; the API server runs the archiver, scheduler and key cleanup
+        api_app.state.embedded = True
+        return APIClient("http://api.inprocess", API_KEY_MAP, transport="inprocess", asgi_app=api_app)
+    if API_TRANSPORT == "uds":
+        return APIClient("http://api.uds", API_KEY_MAP, transport="uds", socket_path=API_SOCKET_PATH)
+    return APIClient(API_BASE_URL, API_KEY_MAP)
+
 def make_api_request(method: str, endpoint: str, role: str, data: dict = None) -> tuple:
     """
     Make an API request and return (success: bool, response_data: dict, error_message: str)
     """
-    api_key = API_KEY_MAP.get(role)
-    if not api_key:
-        return False, None, f"No API key found for role: {role}"
-    
-    headers = {
-        "X-API-Key": api_key,
-        "Content-Type": "application/json"
-    }
-    
-    url = f"{API_BASE_URL}{endpoint}"
-    
-    try:
-        if method == "GET":
-            response = requests.get(url, headers=headers, timeout=5)
-        elif method == "POST":
-            response = requests.post(url, headers=headers, json=data, timeout=5)
-        elif method == "PUT":
-            response = requests.put(url, headers=headers, json=data, timeout=5)
-        elif method == "DELETE":
-            response = requests.delete(url, headers=headers, timeout=5)
-        else:
-            return False, None, f"Unsupported HTTP method: {method}"
-        
-        if response.status_code in [200, 201, 204]:
-            return True, response.json() if response.text else None, None
-        else:
-            error_detail = response.json().get('detail', response.text) if response.text else 'Unknown error'
-            return False, None, f"API Error ({response.status_code}): {error_detail}"
-            
-    except requests.exceptions.ConnectionError:
-        return False, None, "⚠️ API server is not running. Please start the API server first."
-    except requests.exceptions.Timeout:
-        return False, None, "⏱️ API request timed out"
-    except Exception as e:
-        return False, None, f"Error: {str(e)}"
+    result = get_api_client().request(method, endpoint, role, data)
+    if method != "GET" and result[0]:
+        # The change is committed: make the next read see it, whatever the transport
+        cred_manager.cache.invalidate()
+    return result
+
+def make_api_requests(calls: List[tuple]) -> List[tuple]:
+    """Send several (method, endpoint, role[, data]) requests concurrently, results in order"""
+    return get_api_client().request_many(calls)
+
+def iter_api_requests(calls: List[tuple]):
+    """Send several requests concurrently, yielding (index, result) as each one finishes"""
+    return get_api_client().iter_many(calls)
 
 # Utility functions
 def load_logo_image():
@@ -1533,21 +1500,6 @@ def load_logo_image():
     
     return None
 
-def mask_secret_data(data: Dict, auth_type: str) -> Dict:
-    """Mask secret data for non-admin users"""
-    masked_data = {}
-    
-    if auth_type == "api_key":
-        api_key = data.get("api_key", "")
-        masked_data["api_key"] = "*****" + api_key[-4:] if len(api_key) > 4 else "*****"
-    elif auth_type == "username_password":
-        username = data.get("username", "")
-        password = data.get("password", "")
-        masked_data["username"] = username  # Username can be shown
-        masked_data["password"] = "*****" + password[-4:] if len(password) > 4 else "*****"
-    
-    return masked_data
-
 def format_timestamp(timestamp_str: str) -> str:
     """Format timestamp for display"""
     try:
@@ -1597,16 +1549,24 @@ def main():
     st.session_state.current_role = selected_role
     
     # Main tabs
-    tab1, tab2, tab3 = st.tabs(["📊 Dashboard", "➕ Create Credential", "📋 Audit Logs"])
+    tab_names = ["📊 Dashboard", "➕ Create Credential", "📋 Audit Logs"]
+    # Raw tables, exports and the SQL runner see every credential: admins only
+    if selected_role == "admin":
+        tab_names.append("🔍 API Monitor")
+    tabs = st.tabs(tab_names)
     
-    with tab1:
+    with tabs[0]:
         dashboard_tab()
     
-    with tab2:
+    with tabs[1]:
         create_credential_tab()
     
-    with tab3:
+    with tabs[2]:
         audit_logs_tab()
+    
+    if len(tabs) > 3:
+        with tabs[3]:
+            api_monitor_tab()
 
 def dashboard_tab():
     """Dashboard tab with credential table and management actions"""
@@ -1624,93 +1584,242 @@ def dashboard_tab():
             st.session_state[key] = False  # Clear the flag
     
     
-    # Get all credentials
-    credentials = cred_manager.get_all_credentials()
+    # Search and filters run in SQL; only one page of credentials is loaded
+    options = cred_manager.get_credential_filter_options()
     
-    if not credentials:
-        st.info("No credentials found. Create your first credential using the 'Create Credential' tab.")
+    search_col, col1, col2, col3 = st.columns([2, 1, 1, 1])
+    
+    with search_col:
+        search_query = st.text_input(
+            "Search:",
+            placeholder="e.g., sabre, staging, alice@nezasa.com",
+            help="Matches supplier, environment, auth type and creator. Words match as prefixes.",
+            key="dashboard_search"
+        )
+    
+    with col1:
+        filter_supplier = st.selectbox("Supplier:", ["All"] + options["supplier"], key="dashboard_supplier")
+    
+    with col2:
+        filter_environment = st.selectbox("Environment:", ["All"] + options["environment"], key="dashboard_environment")
+    
+    with col3:
+        filter_auth_type = st.selectbox("Auth Type:", ["All"] + options["auth_type"], key="dashboard_auth_type")
+    
+    page_col1, page_col2, _ = st.columns([1, 1, 2])
+    
+    with page_col1:
+        page_size = st.selectbox("Rows per page:", DASHBOARD_PAGE_SIZES, index=1, key="dashboard_page_size")
+    
+    with page_col2:
+        page = st.number_input("Page:", min_value=1, value=1, step=1, key="dashboard_page")
+    
+    offset = (page - 1) * page_size
+    can_view_unmasked = RBACManager.has_permission(st.session_state.current_role, "view_unmasked")
+    credentials, total = cred_manager.search_credentials(
+        search_query,
+        supplier=None if filter_supplier == "All" else filter_supplier,
+        environment=None if filter_environment == "All" else filter_environment,
+        auth_type=None if filter_auth_type == "All" else filter_auth_type,
+        limit=page_size,
+        offset=offset,
+        masked=not can_view_unmasked
+    )
+    
+    if not total:
+        if search_query or filter_supplier != "All" or filter_environment != "All" or filter_auth_type != "All":
+            st.info("No credentials match your search and filters.")
+        else:
+            st.info("No credentials found. Create your first credential using the 'Create Credential' tab.")
         return
     
     # Display credentials in a table
-    st.subheader(f"Found {len(credentials)} credentials")
-    
-    # Create a dataframe for display
-    display_data = []
-    for cred in credentials:
-        # Mask data for non-admin users
-        if RBACManager.has_permission(st.session_state.current_role, "view_unmasked"):
-            display_data_dict = cred["data"]
-        else:
-            display_data_dict = mask_secret_data(cred["data"], cred["auth_type"])
-        
-        display_data.append({
-            "ID": cred["id"],
-            "Supplier": cred["supplier"],
-            "Environment": cred["environment"],
-            "Auth Type": cred["auth_type"],
-            "Data": json.dumps(display_data_dict, indent=2),
-            "Created By": cred["created_by"],
-            "Updated At": format_timestamp(cred["updated_at"]),
-            "Actions": cred["id"]  # Store ID for action buttons
-        })
+    st.subheader(f"Found {total} credentials")
     
-    df = pd.DataFrame(display_data)
+    if not credentials:
+        st.info("No credentials on this page.")
+        return
+    
+    st.caption(f"Page {page} of {(total + page_size - 1) // page_size} · showing {offset + 1}–{offset + len(credentials)}")
+    
+    # Typed frame built from the page already loaded (no second credentials query)
+    page_frame = pd.DataFrame.from_records(
+        [{**cred, "data": json.dumps(cred["data"])} for cred in credentials],
+        columns=["id", "supplier", "environment", "auth_type", "data", "created_by", "updated_at"]
+    )
+    page_frame["updated_at"] = parse_datetimes(page_frame["updated_at"])
+    df = page_frame.rename(columns={
+        "id": "ID",
+        "supplier": "Supplier",
+        "environment": "Environment",
+        "auth_type": "Auth Type",
+        "data": "Data",
+        "created_by": "Created By",
+        "updated_at": "Updated At"
+    })
     
     # Display the table
     st.dataframe(
-        df.drop("Actions", axis=1),
+        df,
         use_container_width=True,
-        hide_index=True
+        hide_index=True,
+        column_config={"Updated At": TIMESTAMP_COLUMN}
     )
     
-    # Action buttons for each credential
+    bulk_actions_panel(credentials)
+    
+    # Action panel: widgets exist only for the selected credential
     st.subheader("🔧 Credential Actions")
     
-    cols = st.columns(min(len(credentials), 3))
-    for i, cred in enumerate(credentials):
-        with cols[i % 3]:
-            with st.expander(f"🔐 {cred['supplier']} ({cred['environment']})", expanded=False):
-                st.write(f"**ID:** {cred['id']}")
-                st.write(f"**Created:** {format_timestamp(cred['created_at'])}")
-                
-                # View button (always available)
-                if st.button(f"👁️ View Details", key=f"view_{cred['id']}"):
-                    view_credential_details(cred)
-                
-                # Update button (admin, devops)
-                if RBACManager.has_permission(st.session_state.current_role, "update"):
-                    if st.button(f"✏️ Update", key=f"update_{cred['id']}"):
-                        st.session_state[f"show_update_form_{cred['id']}"] = True
-                
-                # Rotate button (admin, partner if allowed)
-                can_rotate = RBACManager.has_permission(
-                    st.session_state.current_role, 
-                    "rotate", 
-                    cred
-                )
-                if can_rotate:
-                    if st.button(f"🔄 Rotate", key=f"rotate_{cred['id']}"):
-                        # Rotate via API
-                        success, response_data, error_msg = make_api_request(
-                            "POST",
-                            f"/api/v1/credentials/{cred['id']}/rotate",
-                            st.session_state.current_role
-                        )
-                        
-                        if success:
-                            st.session_state[f"rotate_success_{cred['id']}"] = True
-                            st.success(f"✅ Credential {cred['id']} rotated successfully via API!")
-                            import time
-                            time.sleep(1)
-                            st.rerun()
-                        else:
-                            st.error(f"❌ Failed to rotate credential: {error_msg}")
-                elif st.session_state.current_role == "partner":
+    credentials_by_id = {cred["id"]: cred for cred in credentials}
+    selected_id = st.selectbox(
+        "Select a credential:",
+        list(credentials_by_id),
+        format_func=lambda cred_id: f"#{cred_id} · {credentials_by_id[cred_id]['supplier']} ({credentials_by_id[cred_id]['environment']})",
+        key="dashboard_selected_credential"
+    )
+    
+    if selected_id is not None:
+        credential_action_panel(credentials_by_id[selected_id])
+
+def bulk_actions_panel(credentials: List[Dict]):
+    """Rotate or update several credentials of the current page at once"""
+    role = st.session_state.current_role
+    
+    # Outcome of the last bulk run, kept across its single closing rerun
+    summary = st.session_state.pop("bulk_action_summary", None)
+    if summary:
+        if summary["failed"]:
+            st.error(f"❌ {summary['action']}: {summary['succeeded']} succeeded, {len(summary['failed'])} failed")
+            for cred_id, error_msg in summary["failed"]:
+                st.write(f"- #{cred_id}: {error_msg}")
+        else:
+            st.success(f"✅ {summary['action']}: all {summary['succeeded']} credentials done via API!")
+    
+    can_update = RBACManager.has_permission(role, "update")
+    rotatable = [cred for cred in credentials if RBACManager.has_permission(role, "rotate", cred)]
+    if not can_update and not rotatable:
+        return
+    
+    with st.expander("📦 Bulk Actions", expanded=False):
+        actions = (["🔄 Rotate"] if rotatable else []) + (["✏️ Update"] if can_update else [])
+        action = st.radio("Action:", actions, horizontal=True, key="bulk_action")
+        
+        eligible = rotatable if action == "🔄 Rotate" else credentials
+        eligible_by_id = {cred["id"]: cred for cred in eligible}
+        selected_ids = st.multiselect(
+            "Credentials:",
+            list(eligible_by_id),
+            format_func=lambda cred_id: f"#{cred_id} · {eligible_by_id[cred_id]['supplier']} ({eligible_by_id[cred_id]['environment']})",
+            key="bulk_selected_credentials"
+        )
+        
+        update_data = {}
+        if action == "✏️ Update":
+            col1, col2 = st.columns(2)
+            with col1:
+                new_environment = st.selectbox("Environment:", ["(unchanged)"] + CREDENTIAL_ENVIRONMENTS, key="bulk_environment")
+            with col2:
+                self_rotation = st.selectbox("Partner self-rotation:", ["(unchanged)", "Allow", "Disallow"], key="bulk_self_rotation")
+            if new_environment != "(unchanged)":
+                update_data["environment"] = new_environment
+            if self_rotation != "(unchanged)":
+                update_data["allow_self_rotation"] = self_rotation == "Allow"
+        
+        if API_TRANSPORT == "inprocess":
+            st.caption("ℹ️ With the in-process API, bulk requests run one at a time; use API_TRANSPORT=uds or http to run them in parallel.")
+        
+        run_clicked = st.button(
+            f"🚀 Run on {len(selected_ids)} selected",
+            disabled=not selected_ids or (action == "✏️ Update" and not update_data),
+            key="bulk_run"
+        )
+        
+        if run_clicked:
+            if action == "🔄 Rotate":
+                calls = [("POST", f"/api/v1/credentials/{cred_id}/rotate", role) for cred_id in selected_ids]
+            else:
+                calls = [("PUT", f"/api/v1/credentials/{cred_id}", role, update_data) for cred_id in selected_ids]
+            
+            # Requests run concurrently on the API client's bounded pool (one at
+            # a time with API_TRANSPORT=inprocess); progress is reported in
+            # completion order
+            progress = st.progress(0.0, text=f"0 / {len(calls)}")
+            log = st.empty()
+            lines, failed = [], []
+            for done, (index, (success, _, error_msg)) in enumerate(iter_api_requests(calls), start=1):
+                cred_id = selected_ids[index]
+                if success:
+                    lines.append(f"✅ #{cred_id}")
+                else:
+                    lines.append(f"❌ #{cred_id}: {error_msg}")
+                    failed.append((cred_id, error_msg))
+                progress.progress(done / len(calls), text=f"{done} / {len(calls)}")
+                log.markdown("  \n".join(lines))
+            
+            cred_manager.cache.invalidate()
+            st.session_state["bulk_action_summary"] = {
+                "action": action,
+                "succeeded": len(calls) - len(failed),
+                "failed": failed,
+            }
+            st.rerun()
+
+def credential_action_panel(cred: Dict):
+    """View / Update / Rotate actions for one credential"""
+    with st.expander(f"🔐 {cred['supplier']} ({cred['environment']})", expanded=True):
+        st.write(f"**ID:** {cred['id']}")
+        st.write(f"**Created:** {format_timestamp(cred['created_at'])}")
+        
+        col1, col2, col3 = st.columns(3)
+        
+        # View button (always available)
+        with col1:
+            show_details = st.button(f"👁️ View Details", key=f"view_{cred['id']}")
+        
+        # Update button (admin, devops)
+        with col2:
+            if RBACManager.has_permission(st.session_state.current_role, "update"):
+                if st.button(f"✏️ Update", key=f"update_{cred['id']}"):
+                    st.session_state[f"show_update_form_{cred['id']}"] = True
+        
+        # Rotate button (admin, partner if allowed)
+        with col3:
+            can_rotate = RBACManager.has_permission(
+                st.session_state.current_role, 
+                "rotate", 
+                cred
+            )
+            if can_rotate:
+                rotate_clicked = st.button(f"🔄 Rotate", key=f"rotate_{cred['id']}")
+            else:
+                rotate_clicked = False
+                if st.session_state.current_role == "partner":
                     st.warning("🔒 Rotation not allowed for this credential")
-                
-                # Show update form if requested
-                if st.session_state.get(f"show_update_form_{cred['id']}", False):
-                    show_update_form(cred)
+        
+        if show_details:
+            view_credential_details(cred)
+        
+        if rotate_clicked:
+            # Rotate via API
+            success, response_data, error_msg = make_api_request(
+                "POST",
+                f"/api/v1/credentials/{cred['id']}/rotate",
+                st.session_state.current_role
+            )
+            
+            if success:
+                st.session_state[f"rotate_success_{cred['id']}"] = True
+                st.success(f"✅ Credential {cred['id']} rotated successfully via API!")
+                import time
+                time.sleep(1)
+                st.rerun()
+            else:
+                st.error(f"❌ Failed to rotate credential: {error_msg}")
+        
+        # Show update form if requested
+        if st.session_state.get(f"show_update_form_{cred['id']}", False):
+            show_update_form(cred)
 
 def view_credential_details(credential: Dict):
     """Display detailed credential information"""
@@ -1731,11 +1840,9 @@ def view_credential_details(credential: Dict):
         st.write(f"**Self-Rotation:** {'✅ Yes' if credential['allow_self_rotation'] else '❌ No'}")
     
     st.write("**Data:**")
-    if RBACManager.has_permission(st.session_state.current_role, "view_unmasked"):
-        st.json(credential["data"])
-    else:
-        masked_data = mask_secret_data(credential["data"], credential["auth_type"])
-        st.json(masked_data)
+    # Credentials loaded for masked roles already carry the masked projection
+    st.json(credential["data"])
+    if not RBACManager.has_permission(st.session_state.current_role, "view_unmasked"):
         st.warning("🔒 Data is masked for your role. Admin users can view unmasked data.")
 
 def show_update_form(credential: Dict):
@@ -1839,7 +1946,7 @@ def create_credential_tab():
         )
         environment = st.selectbox(
             "Environment:",
-            ["production", "sandbox", "staging", "development"],
+            CREDENTIAL_ENVIRONMENTS,
             help="Target environment for the credential",
             key="create_environment"
         )
@@ -1973,6 +2080,29 @@ def create_credential_tab():
                         st.error(f"❌ Failed to create credential: {error_msg}")
     
 
+def export_panel(key: str, file_stem: str, export: Callable[[str], tuple]):
+    """Format picker + button that streams an export to a file and offers it for download"""
+    fmt = st.selectbox("Format:", available_formats(), key=f"{key}_format",
+                       help="Parquet/Arrow keep column types and compress best; csv.gz opens anywhere")
+    
+    if st.button("📥 Export", key=f"{key}_button"):
+        path, rows = export(fmt)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        finally:
+            os.remove(path)
+        
+        media_type, extension = EXPORT_FORMATS[fmt]
+        st.download_button(
+            label=f"💾 Download {fmt}",
+            data=data,
+            file_name=f"{file_stem}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}{extension}",
+            mime=media_type,
+            key=f"{key}_download"
+        )
+        st.caption(f"{rows:,} rows · {len(data) / 1024:,.1f} KiB")
+
 def audit_logs_tab():
     """Audit logs tab"""
     st.header("📋 Audit Trail")
@@ -1983,57 +2113,127 @@ def audit_logs_tab():
         st.info("Only admin and devops roles can view audit logs.")
         return
     
+    # Full-text search
+    st.subheader("🔎 Search Audit History")
+    
+    search_col1, search_col2 = st.columns([4, 1])
+    
+    with search_col1:
+        search_query = st.text_input(
+            "Search:",
+            placeholder="e.g., sabre rotate, bob@nezasa.com, staging",
+            help="Matches details, actor, supplier and environment. Words match as prefixes.",
+            key="audit_search_query"
+        )
+    
+    with search_col2:
+        search_page = st.number_input("Page:", min_value=1, value=1, step=1, key="audit_search_page")
+    
+    if search_query:
+        page_size = 25
+        hits, has_more = cred_manager.search_audit_logs(
+            search_query,
+            limit=page_size,
+            offset=(search_page - 1) * page_size
+        )
+        
+        if hits:
+            st.caption(f"Page {search_page} · {len(hits)} results{' · more available' if has_more else ''}")
+            st.dataframe(
+                pd.DataFrame([{
+                    "ID": hit["id"],
+                    "Credential ID": hit["cred_id"] if hit["cred_id"] else "N/A",
+                    "Supplier": hit["supplier"] or "System",
+                    "Environment": hit["environment"] or "",
+                    "Action": hit["action"].title(),
+                    "Actor": hit["actor"],
+                    "Match": hit["snippet"],
+                    "Timestamp": format_timestamp(hit["timestamp"])
+                } for hit in hits]),
+                use_container_width=True,
+                hide_index=True
+            )
+        else:
+            st.info("No audit logs match your search.")
+    
     # Filter options
     st.subheader("🔍 Filter Options")
     
-    col1, col2, col3 = st.columns(3)
+    # Option lists come from DISTINCT queries on credentials and the rollups
+    options = cred_manager.get_audit_filter_options()
+    
+    col1, col2, col3, col4 = st.columns(4)
     
     with col1:
         filter_supplier = st.selectbox(
             "Filter by Supplier:",
-            ["All"] + list(set([cred["supplier"] for cred in cred_manager.get_all_credentials()])),
+            ["All"] + options["suppliers"],
             help="Filter logs by supplier"
         )
     
     with col2:
         filter_action = st.selectbox(
             "Filter by Action:",
-            ["All", "create", "update", "rotate"],
+            ["All"] + options["actions"],
             help="Filter logs by action type"
         )
     
     with col3:
         filter_actor = st.selectbox(
             "Filter by Actor:",
-            ["All"] + list(set([log["actor"] for log in cred_manager.get_audit_logs()])),
+            ["All"] + options["actors"],
             help="Filter logs by actor (user who performed the action)"
         )
     
-    # Get audit logs
-    all_logs = cred_manager.get_audit_logs()
+    with col4:
+        sort_order = st.selectbox(
+            "Sort:",
+            list(AUDIT_SORT_ORDERS),
+            format_func=lambda order: "Newest first" if order == "newest" else "Oldest first",
+            help="Order by timestamp"
+        )
     
-    # Apply filters
-    filtered_logs = all_logs
+    filters = {
+        "supplier": None if filter_supplier == "All" else filter_supplier,
+        "action": None if filter_action == "All" else filter_action,
+        "actor": None if filter_actor == "All" else filter_actor,
+    }
+    
+    page_col1, page_col2, _ = st.columns([1, 1, 2])
+    
+    with page_col1:
+        page_size = st.selectbox("Rows per page:", AUDIT_PAGE_SIZES, key="audit_page_size")
     
-    if filter_supplier != "All":
-        filtered_logs = [log for log in filtered_logs if log["supplier"] == filter_supplier]
+    with page_col2:
+        page = st.number_input("Page:", min_value=1, value=1, step=1, key="audit_page")
     
-    if filter_action != "All":
-        filtered_logs = [log for log in filtered_logs if log["action"] == filter_action]
+    # Filters, sort and paging run in SQL, continuing into the audit archive;
+    # one extra row tells us if there is a next page
+    offset = (page - 1) * page_size
+    page_logs = cred_manager.get_audit_logs(
+        **filters,
+        sort=sort_order,
+        limit=page_size + 1,
+        offset=offset
+    )
+    has_more = len(page_logs) > page_size
+    page_logs = page_logs[:page_size]
     
-    if filter_actor != "All":
-        filtered_logs = [log for log in filtered_logs if log["actor"] == filter_actor]
+    # Matching total from the rollups (includes archived entries)
+    matching_total = cred_manager.get_audit_stats(bucket="month", **filters)["total"]
     
     # Display results
-    st.subheader(f"📊 Found {len(filtered_logs)} audit log entries")
+    st.subheader(f"📊 Found {matching_total} audit log entries")
     
-    if not filtered_logs:
-        st.info("No audit logs found matching your filters.")
+    if not page_logs:
+        st.info("No audit logs found matching your filters." if page == 1 else "No audit logs on this page.")
         return
     
+    st.caption(f"Page {page} · showing {offset + 1}–{offset + len(page_logs)}{' · more available' if has_more else ''}")
+    
     # Create dataframe for display
     log_data = []
-    for log in filtered_logs:
+    for log in page_logs:
         log_data.append({
             "ID": log["id"],
             "Credential ID": log["cred_id"] if log["cred_id"] else "N/A",
@@ -2059,54 +2259,28 @@ def audit_logs_tab():
     col1, col2 = st.columns(2)
     
     with col1:
-        if st.button("📄 Export as CSV"):
-            csv_buffer = io.StringIO()
-            df_logs.to_csv(csv_buffer, index=False)
-            csv_data = csv_buffer.getvalue()
-            
-            st.download_button(
-                label="💾 Download CSV",
-                data=csv_data,
-                file_name=f"audit_logs_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                mime="text/csv"
-            )
+        # Every matching entry, streamed from the cursor in batches
+        export_panel("audit_export", "audit_logs",
+                     lambda fmt: cred_manager.export_audit_logs(fmt, **filters, sort=sort_order))
     
     with col2:
         if st.button("📊 Export Summary"):
-            # Create summary statistics
+            # Summary statistics from the audit rollups
+            stats = cred_manager.get_audit_stats(bucket="month", **filters)
             summary_data = {
-                "Total Actions": len(filtered_logs),
-                "Actions by Type": df_logs["Action"].value_counts().to_dict(),
-                "Actions by Actor": df_logs["Actor"].value_counts().to_dict(),
-                "Actions by Supplier": df_logs["Supplier"].value_counts().to_dict()
+                "Total Actions": stats["total"],
+                "Actions by Type": stats["by_action"],
+                "Actions by Actor": stats["by_actor"],
+                "Actions by Supplier": stats["by_supplier"],
+                "Actions by Month": {b["bucket"]: b["total"] for b in stats["series"]}
             }
             
             st.json(summary_data)
 
-def api_monitor_tab():
-    """API Monitor tab showing live API requests and database view"""
-    st.header("🔍 API Monitor & Database View")
-    
-    st.info("💡 **Demo Tip:** Run API requests in another terminal and watch them appear here in real-time!")
-    
-    # Add auto-refresh toggle
-    col1, col2, col3 = st.columns([2, 1, 1])
-    with col1:
-        st.markdown("### 📡 Live API Request Log")
-    with col2:
-        auto_refresh = st.checkbox("Auto-refresh", value=False, help="Automatically refresh every 2 seconds")
-    with col3:
-        if st.button("🔄 Refresh Now"):
-            st.rerun()
-    
-    # Auto-refresh logic
-    if auto_refresh:
-        import time
-        time.sleep(2)
-        st.rerun()
-    
-    # Read API request log file
-    log_file_path = "api_requests.log"
+def api_log_panel(log_file_path: str = "api_requests.log"):
+    """Last API log lines, read incrementally (runs as a Streamlit fragment)"""
+    # Clicking a button inside the fragment re-runs just the fragment
+    st.button("🔄 Refresh Now")
     
     # Check if file exists and show appropriate message
     if not os.path.exists(log_file_path):
@@ -2145,34 +2319,65 @@ def api_monitor_tab():
         **Or open interactive docs:**
         http://localhost:8000/api/docs
         """)
-    else:
-        try:
-            with open(log_file_path, "r") as f:
-                log_lines = f.readlines()
-                
-            # Get last 50 lines
-            recent_logs = log_lines[-50:] if len(log_lines) > 50 else log_lines
-            
-            if recent_logs:
-                # Display in a nice format with line count
-                st.success(f"✅ API server is active! Showing last {len(recent_logs)} log entries.")
-                log_text = "".join(recent_logs)
-                st.code(log_text, language="log")
-            else:
-                st.info("📭 Log file exists but is empty. Make some API requests to see them here!")
-                st.markdown("""
-                **Quick test request:**
-                ```bash
-                curl -X GET http://localhost:8000/api/v1/credentials \\
-                  -H "X-API-Key: admin_key_123"
-                ```
-                """)
-        except Exception as e:
-            st.error(f"❌ Error reading log file: {str(e)}")
-            st.code(f"File path: {os.path.abspath(log_file_path)}")
+        return
+    
+    # The tail remembers inode and byte offset between refreshes
+    tail = st.session_state.get("api_log_tail")
+    if tail is None or tail.path != log_file_path:
+        tail = LogTail(log_file_path, max_lines=50)
+        st.session_state.api_log_tail = tail
+    
+    try:
+        recent_logs = tail.refresh()
+        
+        if tail.last_event:
+            st.caption(f"↩️ Log file was {tail.last_event}; showing the new file from its end.")
+        
+        if recent_logs:
+            # Display in a nice format with line count
+            st.success(f"✅ API server is active! Showing last {len(recent_logs)} log entries.")
+            log_text = "".join(recent_logs)
+            st.code(log_text, language="log")
+        else:
+            st.info("📭 Log file exists but is empty. Make some API requests to see them here!")
+            st.markdown("""
+            **Quick test request:**
+            ```bash
+            curl -X GET http://localhost:8000/api/v1/credentials \\
+              -H "X-API-Key: admin_key_123"
+            ```
+            """)
+    except Exception as e:
+        st.error(f"❌ Error reading log file: {str(e)}")
+        st.code(f"File path: {os.path.abspath(log_file_path)}")
+
+def api_monitor_tab():
+    """API Monitor tab showing live API requests and database view"""
+    st.header("🔍 API Monitor & Database View")
+    
+    st.info("💡 **Demo Tip:** Run API requests in another terminal and watch them appear here in real-time!")
+    
+    # Add auto-refresh toggle
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.markdown("### 📡 Live API Request Log")
+    with col2:
+        auto_refresh = st.checkbox("Auto-refresh", value=False, help="Automatically refresh every 2 seconds")
+    
+    # Only the log panel re-runs on its timer; the rest of the page is untouched
+    st.fragment(api_log_panel, run_every=2 if auto_refresh else None)()
+
+    # Latency of this app's own calls to the API (pooled client, recent samples)
+    latency_stats = get_api_client().latency_stats()
+    if latency_stats:
+        with st.expander("⏱️ API Client Latency", expanded=False):
+            st.dataframe(pd.DataFrame(latency_stats), use_container_width=True, hide_index=True)
     
     st.markdown("---")
     
+    # Unmasked rows, raw exports and ad-hoc SQL need the view_unmasked permission
+    can_view_unmasked = RBACManager.has_permission(st.session_state.current_role, "view_unmasked")
+    
     # Database View Section
     st.markdown("### 🗄️ Database View")
     
@@ -2182,81 +2387,56 @@ def api_monitor_tab():
     with db_tab1:
         st.subheader("Credentials Table (Raw Data)")
         
-        # Get all credentials directly from database
-        credentials = cred_manager.get_all_credentials()
-        
-        if credentials:
-            # Create dataframe with all fields
-            db_data = []
-            for cred in credentials:
-                # cred["data"] is already a dict, just format it nicely
-                data_str = json.dumps(cred["data"], indent=2) if isinstance(cred["data"], dict) else str(cred["data"])
-                
-                db_data.append({
-                    "ID": cred["id"],
-                    "Supplier": cred["supplier"],
-                    "Environment": cred["environment"],
-                    "Auth Type": cred["auth_type"],
-                    "Data (JSON)": data_str,
-                    "Created By": cred["created_by"],
-                    "Created At": cred["created_at"],
-                    "Updated At": cred["updated_at"],
-                    "Allow Self Rotation": cred["allow_self_rotation"]
-                })
-            
-            df = pd.DataFrame(db_data)
+        # Get all credentials directly from database, as a typed frame
+        catalog = cred_manager.get_catalog()
+        
+        if len(catalog):
+            df = cred_manager.get_credentials_frame(masked=not can_view_unmasked).rename(columns={
+                "id": "ID",
+                "supplier": "Supplier",
+                "environment": "Environment",
+                "auth_type": "Auth Type",
+                "data": "Data (JSON)",
+                "created_by": "Created By",
+                "created_at": "Created At",
+                "updated_at": "Updated At",
+                "allow_self_rotation": "Allow Self Rotation"
+            })
             
             # Display row count
-            st.metric("Total Credentials", len(credentials))
+            st.metric("Total Credentials", len(df))
             
             # Display table
             st.dataframe(
                 df,
                 use_container_width=True,
                 hide_index=True,
-                height=400
+                height=400,
+                column_config={"Created At": TIMESTAMP_COLUMN, "Updated At": TIMESTAMP_COLUMN}
             )
             
-            # Export option
-            if st.button("📥 Export Credentials to CSV"):
-                csv_buffer = io.StringIO()
-                df.to_csv(csv_buffer, index=False)
-                csv_data = csv_buffer.getvalue()
-                
-                st.download_button(
-                    label="💾 Download CSV",
-                    data=csv_data,
-                    file_name=f"credentials_export_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv"
-                )
+            # Export option (the export holds decrypted data)
+            if can_view_unmasked:
+                export_panel("raw_credentials_export", "credentials_export", cred_manager.export_credentials)
         else:
             st.info("No credentials in database yet.")
     
     with db_tab2:
         st.subheader("Audit Logs Table (Raw Data)")
         
-        # Get all audit logs
-        logs = cred_manager.get_audit_logs()
-        
-        if logs:
-            # Create dataframe
-            log_data = []
-            for log in logs:
-                # Get supplier name from credential
-                cred = next((c for c in credentials if c["id"] == log["cred_id"]), None)
-                supplier = cred["supplier"] if cred else f"ID:{log['cred_id']}"
-                
-                log_data.append({
-                    "Log ID": log["id"],
-                    "Credential ID": log["cred_id"],
-                    "Supplier": supplier,
-                    "Action": log["action"],
-                    "Actor": log["actor"],
-                    "Details": log["details"],
-                    "Timestamp": log["timestamp"]
-                })
-            
-            df_logs = pd.DataFrame(log_data)
+        # Get all audit logs; suppliers are mapped from the catalog's id index in one pass
+        logs = cred_manager.get_audit_logs_frame()
+        
+        if len(logs):
+            df_logs = pd.DataFrame({
+                "Log ID": logs["id"],
+                "Credential ID": logs["cred_id"],
+                "Supplier": catalog.suppliers_for(logs["cred_id"]),
+                "Action": logs["action"],
+                "Actor": logs["actor"],
+                "Details": logs["details"],
+                "Timestamp": logs["timestamp"]
+            })
             
             # Display row count
             st.metric("Total Audit Entries", len(logs))
@@ -2266,125 +2446,168 @@ def api_monitor_tab():
                 df_logs,
                 use_container_width=True,
                 hide_index=True,
-                height=400
+                height=400,
+                column_config={"Timestamp": TIMESTAMP_COLUMN}
             )
             
             # Export option
-            if st.button("📥 Export Audit Logs to CSV"):
-                csv_buffer = io.StringIO()
-                df_logs.to_csv(csv_buffer, index=False)
-                csv_data = csv_buffer.getvalue()
-                
-                st.download_button(
-                    label="💾 Download CSV",
-                    data=csv_data,
-                    file_name=f"audit_logs_export_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv"
-                )
+            export_panel("raw_audit_export", "audit_logs_export", cred_manager.export_audit_logs)
         else:
             st.info("No audit logs in database yet.")
     
     with db_tab3:
         st.subheader("Database Statistics")
         
+        # Audit counts come from the daily rollups, not a scan of audit_logs
+        audit_stats = cred_manager.get_audit_stats(bucket="month", top=5)
+        
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            st.metric("Total Credentials", len(credentials))
-            st.metric("Total Audit Logs", len(logs) if logs else 0)
+            st.metric("Total Credentials", len(catalog))
+            st.metric("Total Audit Logs", audit_stats["total"])
         
         with col2:
-            if credentials:
-                # Count by environment
-                env_counts = {}
-                for cred in credentials:
-                    env = cred["environment"]
-                    env_counts[env] = env_counts.get(env, 0) + 1
-                
+            env_counts = cred_manager.get_credential_counts("environment")
+            if env_counts:
                 st.markdown("**By Environment:**")
                 for env, count in env_counts.items():
                     st.write(f"- {env}: {count}")
         
         with col3:
-            if credentials:
-                # Count by auth type
-                auth_counts = {}
-                for cred in credentials:
-                    auth = cred["auth_type"]
-                    auth_counts[auth] = auth_counts.get(auth, 0) + 1
-                
+            auth_counts = cred_manager.get_credential_counts("auth_type")
+            if auth_counts:
                 st.markdown("**By Auth Type:**")
                 for auth, count in auth_counts.items():
                     st.write(f"- {auth}: {count}")
         
         # Action statistics
-        if logs:
+        if audit_stats["total"]:
             st.markdown("---")
             st.markdown("**Actions Over Time:**")
             
-            action_counts = {}
-            for log in logs:
-                action = log["action"]
-                action_counts[action] = action_counts.get(action, 0) + 1
-            
             col1, col2 = st.columns(2)
             
             with col1:
                 st.markdown("**Action Types:**")
-                for action, count in sorted(action_counts.items(), key=lambda x: x[1], reverse=True):
+                for action, count in audit_stats["by_action"].items():
                     st.write(f"- {action}: {count}")
             
             with col2:
-                # Most active actors
-                actor_counts = {}
-                for log in logs:
-                    actor = log["actor"]
-                    actor_counts[actor] = actor_counts.get(actor, 0) + 1
-                
                 st.markdown("**Most Active Users:**")
-                for actor, count in sorted(actor_counts.items(), key=lambda x: x[1], reverse=True)[:5]:
+                for actor, count in audit_stats["by_actor"].items():
                     st.write(f"- {actor}: {count} actions")
+            
+            st.bar_chart(
+                pd.DataFrame(
+                    [{"Month": b["bucket"], "Actions": b["total"]} for b in audit_stats["series"]]
+                ).set_index("Month")
+            )
     
-    # SQL Query Runner (for advanced demo)
-    st.markdown("---")
-    st.markdown("### 🔧 Advanced: SQL Query Runner")
+    # SQL Query Runner (for advanced demo); reads any column, so never for masked roles
+    if can_view_unmasked:
+        st.markdown("---")
+        st.markdown("### 🔧 Advanced: SQL Query Runner")
+        
+        sql_query_runner_panel()
+
+def get_query_runner():
+    """Query runner for the configured database (PostgreSQL engine or the SQLite file)"""
+    if db.use_postgres and db.engine is not None:
+        return PostgresQueryRunner(db.engine)
+    return SQLiteQueryRunner(db.db_path)
+
+def sql_query_runner_panel():
+    """Read-only ad-hoc SQL with time/step limits, a row cap, cancel and the query plan"""
+    runner = get_query_runner()
     
     with st.expander("Run Custom SQL Query (Read-Only)"):
-        st.warning("⚠️ This is for demo purposes only. Only SELECT queries are allowed.")
+        limits = f"{runner.time_limit:g}s wall clock, first {runner.row_cap:,} rows"
+        if runner.backend == "sqlite":
+            limits += f", {runner.step_limit:,} VM steps"
+        st.caption(f"🛡️ Runs on a read-only {runner.backend} connection · limits: {limits}")
         
         query = st.text_area(
             "SQL Query:",
             value="SELECT * FROM credentials LIMIT 10;",
-            help="Enter a SELECT query to run against the database"
+            help="Enter a single SELECT (or WITH ... SELECT) query",
+            key="sql_query_text"
         )
         
-        if st.button("▶️ Run Query"):
-            if query.strip().upper().startswith("SELECT"):
-                try:
-                    import sqlite3
-                    conn = sqlite3.connect("credentials.db")
-                    conn.row_factory = sqlite3.Row
-                    cursor = conn.cursor()
-                    
-                    cursor.execute(query)
-                    results = cursor.fetchall()
-                    conn.close()
-                    
-                    if results:
-                        # Convert to dataframe
-                        result_data = [dict(row) for row in results]
-                        df_results = pd.DataFrame(result_data)
-                        
-                        st.success(f"✅ Query executed successfully. {len(results)} rows returned.")
-                        st.dataframe(df_results, use_container_width=True, hide_index=True)
-                    else:
-                        st.info("Query executed successfully but returned no results.")
-                        
-                except Exception as e:
-                    st.error(f"❌ Error executing query: {str(e)}")
-            else:
-                st.error("❌ Only SELECT queries are allowed for safety reasons.")
+        job = st.session_state.get("sql_query_job")
+        if st.button("▶️ Run Query", disabled=job is not None and job.running, key="sql_query_run"):
+            if job is not None:
+                job.cancel()
+            try:
+                st.session_state["sql_query_job"] = runner.start(query)
+                st.session_state["sql_query_page"] = 1
+            except QueryRejected as e:
+                st.session_state.pop("sql_query_job", None)
+                st.error(f"❌ {e}")
+            job = st.session_state.get("sql_query_job")
+        
+        if job is not None:
+            # Polls every half second while the query runs, then stops
+            st.fragment(sql_query_job_panel, run_every=0.5 if job.running else None)(job)
+
+def sql_query_job_panel(job):
+    """Progress, cancel button, plan and paged results of the current query (a fragment)"""
+    if job.running:
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.info(f"⏳ Running for {job.elapsed:.1f}s · {len(job.rows):,} rows so far")
+        with col2:
+            if st.button("⏹️ Cancel", key="sql_query_cancel"):
+                job.cancel()
+                job.wait(5)
+        if job.running:
+            return
+        # Finished: one full rerun turns the polling off
+        st.rerun(scope="app")
+    
+    elapsed_ms = job.elapsed * 1000
+    stats = f"{len(job.rows):,} rows in {elapsed_ms:.1f} ms"
+    if job.steps:
+        stats += f" · ~{job.steps:,} VM steps"
+    
+    if job.status == "done":
+        st.success(f"✅ Query executed successfully. {stats}")
+    elif job.status == "cancelled":
+        st.warning(f"⏹️ Query cancelled after {stats}.")
+    elif job.status == "timeout":
+        st.warning(f"⏱️ Query stopped at the {job.time_limit:g}s time limit after {stats}.")
+    elif job.status == "step_limit":
+        st.warning(f"🛑 Query stopped at the VM step limit after {stats}.")
+    else:
+        st.error(f"❌ Error executing query: {job.error}")
+    
+    if job.truncated:
+        st.warning(f"✂️ Result capped at the first {job.row_cap:,} rows.")
+    
+    if job.plan:
+        with st.expander("🧭 Query Plan", expanded=False):
+            st.code("\n".join(job.plan), language="text")
+    
+    if not job.rows:
+        if job.status == "done":
+            st.info("Query executed successfully but returned no results.")
+        return
+    
+    page_size = 100
+    pages = (len(job.rows) + page_size - 1) // page_size
+    page = st.number_input("Result page:", min_value=1, max_value=pages, step=1, key="sql_query_page")
+    start = (page - 1) * page_size
+    st.caption(f"Page {page} of {pages} · rows {start + 1}–{min(start + page_size, len(job.rows))}")
+    st.dataframe(
+        pd.DataFrame.from_records(job.rows[start:start + page_size], columns=job.columns),
+        use_container_width=True,
+        hide_index=True
+    )
 
 # Run the app
 if __name__ == "__main__":
-    main()
+    # SQL run by this rerun (cache hits run none)
+    with track_queries() as queries:
+        main()
+    st.sidebar.caption(f"🗄️ {queries.count} SQL queries · {queries.seconds * 1000:.1f} ms this run"
+                       + (f" · 🐢 {queries.slow} slow" if queries.slow else ""))
@@ -0,0 +1,347 @@
+"""
+Audit log tiering - hot SQLite table plus compressed monthly archive segments
+
+Rows older than the retention age are moved out of ``audit_logs`` by a
+background thread in small batches. Each month gets an append-only segment
+file made of zlib-compressed blocks, plus a sparse index with one JSON line
+per block (offset, length, time and id range, and the credential ids and
+actions it holds) so time-range and filtered reads only decompress the
+blocks that can match.
+
+    audit_archive/
+        audit_2024-10.seg   <len><zlib block><len><zlib block>...
+        audit_2024-10.idx   {"offset": 0, "length": 812, "min_ts": ..., ...}
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tiering configuration (override with environment variables)
+ARCHIVE_DIR = os.environ.get("AUDIT_ARCHIVE_DIR", "audit_archive")
+HOT_RETENTION_DAYS = int(os.environ.get("AUDIT_HOT_RETENTION_DAYS", "90"))
+ARCHIVE_BATCH_SIZE = int(os.environ.get("AUDIT_ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_BATCH_PAUSE = float(os.environ.get("AUDIT_ARCHIVE_BATCH_PAUSE", "0.5"))
+ARCHIVE_IDLE_INTERVAL = float(os.environ.get("AUDIT_ARCHIVE_IDLE_INTERVAL", "3600"))
+
+_BLOCK_HEADER = struct.Struct(">I")
+
+ARCHIVE_COLUMNS = ("id", "cred_id", "action", "actor", "details", "timestamp", "supplier")
+
+
+def ensure_archive_schema(conn: sqlite3.Connection):
+    """Index used by both the archiver's age scan and time-range audit queries"""
+    conn.cursor().execute("CREATE INDEX IF NOT EXISTS idx_audit_logs_timestamp ON audit_logs (timestamp)")
+    conn.commit()
+
+
+class AuditArchive:
+    """Append-only, month-partitioned archive of audit log rows"""
+
+    def __init__(self, archive_dir: str = ARCHIVE_DIR):
+        self.archive_dir = archive_dir
+        self._lock = threading.Lock()
+
+    # ---------- layout ----------
+
+    def _segment_path(self, month: str) -> str:
+        return os.path.join(self.archive_dir, f"audit_{month}.seg")
+
+    def _index_path(self, month: str) -> str:
+        return os.path.join(self.archive_dir, f"audit_{month}.idx")
+
+    def months(self) -> List[str]:
+        """Archived months, oldest first (YYYY-MM)"""
+        if not os.path.isdir(self.archive_dir):
+            return []
+        months = [
+            name[len("audit_"):-len(".idx")]
+            for name in os.listdir(self.archive_dir)
+            if name.startswith("audit_") and name.endswith(".idx")
+        ]
+        return sorted(months)
+
+    def read_index(self, month: str) -> List[Dict]:
+        """Sparse index entries for a month, one per compressed block"""
+        path = self._index_path(month)
+        if not os.path.exists(path):
+            return []
+        entries = []
+        with open(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entries.append(json.loads(line))
+        return entries
+
+    # ---------- writes ----------
+
+    def append_block(self, month: str, rows: List[Dict], batch_id: str = ""):
+        """Compress rows into one block and append it to the month's segment"""
+        if not rows:
+            return
+        os.makedirs(self.archive_dir, exist_ok=True)
+
+        payload = zlib.compress(
+            "\n".join(json.dumps([row[col] for col in ARCHIVE_COLUMNS]) for row in rows).encode("utf-8")
+        )
+
+        with self._lock:
+            with open(self._segment_path(month), "ab") as seg:
+                offset = seg.tell()
+                seg.write(_BLOCK_HEADER.pack(len(payload)))
+                seg.write(payload)
+                seg.flush()
+                os.fsync(seg.fileno())
+
+            entry = {
+                "offset": offset,
+                "length": len(payload),
+                "count": len(rows),
+                "min_ts": min(row["timestamp"] for row in rows),
+                "max_ts": max(row["timestamp"] for row in rows),
+                "min_id": min(row["id"] for row in rows),
+                "max_id": max(row["id"] for row in rows),
+                "cred_ids": sorted({row["cred_id"] for row in rows if row["cred_id"] is not None}),
+                "actions": sorted({row["action"] for row in rows}),
+                "batch": batch_id,
+            }
+            # The index is written after the block is durable, so a crash can
+            # only leave an unindexed tail that readers never see
+            with open(self._index_path(month), "a") as idx:
+                idx.write(json.dumps(entry) + "\n")
+                idx.flush()
+                os.fsync(idx.fileno())
+
+    def has_batch(self, month: str, batch_id: str) -> bool:
+        """Whether a block from the given archiver batch was indexed for a month"""
+        return any(entry.get("batch") == batch_id for entry in self.read_index(month))
+
+    # ---------- reads ----------
+
+    def _read_block(self, month: str, entry: Dict) -> List[Dict]:
+        with open(self._segment_path(month), "rb") as seg:
+            seg.seek(entry["offset"] + _BLOCK_HEADER.size)
+            payload = seg.read(entry["length"])
+        rows = []
+        for line in zlib.decompress(payload).decode("utf-8").split("\n"):
+            rows.append(dict(zip(ARCHIVE_COLUMNS, json.loads(line))))
+        return rows
+
+    @staticmethod
+    def _may_match(entry: Dict, cred_id: Optional[int], action: Optional[str]) -> bool:
+        # Blocks indexed before the summaries were added must be read
+        if cred_id and "cred_ids" in entry and cred_id not in entry["cred_ids"]:
+            return False
+        if action and "actions" in entry and action not in entry["actions"]:
+            return False
+        return True
+
+    def iter_rows(self, since: Optional[str] = None, until: Optional[str] = None,
+                  newest_first: bool = True, cred_id: Optional[int] = None,
+                  action: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Yield archived rows with since <= timestamp < until.
+
+        Months outside the range are skipped by name and blocks by their
+        index entry (time range, and the cred_ids/actions summaries when
+        filtering), so only blocks that can match are decompressed. The
+        cred_id/action filters only skip blocks; rows are not filtered.
+        """
+        months = self.months()
+        if since:
+            months = [m for m in months if m >= since[:7]]
+        if until:
+            months = [m for m in months if m <= until[:7]]
+        if newest_first:
+            months.reverse()
+
+        for month in months:
+            entries = [
+                entry for entry in self.read_index(month)
+                if (not since or entry["max_ts"] >= since) and (not until or entry["min_ts"] < until)
+                and self._may_match(entry, cred_id, action)
+            ]
+            if newest_first:
+                entries.sort(key=lambda e: e["max_ts"], reverse=True)
+
+            for entry in entries:
+                rows = self._read_block(month, entry)
+                rows.sort(key=lambda r: r["timestamp"], reverse=newest_first)
+                for row in rows:
+                    if since and row["timestamp"] < since:
+                        continue
+                    if until and row["timestamp"] >= until:
+                        continue
+                    yield row
+
+    def query(self, since: Optional[str] = None, until: Optional[str] = None,
+              cred_id: Optional[int] = None, action: Optional[str] = None,
+              limit: int = 100) -> List[Dict]:
+        """Filtered, newest-first read across archive segments"""
+        results = []
+        for row in self.iter_rows(since, until, newest_first=True, cred_id=cred_id, action=action):
+            if cred_id and row["cred_id"] != cred_id:
+                continue
+            if action and row["action"] != action:
+                continue
+            results.append(row)
+            if len(results) >= limit:
+                break
+        return results
+
+    def stats(self) -> Dict:
+        """Archived row counts and on-disk size per month"""
+        months = {}
+        for month in self.months():
+            entries = self.read_index(month)
+            seg_path = self._segment_path(month)
+            months[month] = {
+                "rows": sum(entry["count"] for entry in entries),
+                "blocks": len(entries),
+                "bytes": os.path.getsize(seg_path) if os.path.exists(seg_path) else 0,
+            }
+        return months
+
+
+class AuditArchiver:
+    """
+    Background thread that moves aged audit rows into the archive.
+
+    Each batch is read, appended to the archive, then deleted from the hot
+    table in its own short transaction, with a pause between batches so
+    request writers only ever wait for one small DELETE.
+    """
+
+    def __init__(self, storage, archive: Optional[AuditArchive] = None,
+                 retention_days: int = HOT_RETENTION_DAYS,
+                 batch_size: int = ARCHIVE_BATCH_SIZE,
+                 batch_pause: float = ARCHIVE_BATCH_PAUSE,
+                 idle_interval: float = ARCHIVE_IDLE_INTERVAL):
+        self.storage = storage
+        self.archive = archive or AuditArchive()
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.idle_interval = idle_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def cutoff(self) -> str:
+        """Rows with a timestamp before this ISO string are archived"""
+        return (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+
+    @property
+    def _journal_path(self) -> str:
+        return os.path.join(self.archive.archive_dir, "pending_batch.json")
+
+    def _recover(self):
+        """
+        Finish a batch interrupted by a crash.
+
+        Rows whose block made it into the index are deleted from the hot
+        table; rows whose block did not are left hot and archived again.
+        """
+        if not os.path.exists(self._journal_path):
+            return
+        with open(self._journal_path, "r") as f:
+            journal = json.load(f)
+        for month, ids in journal["months"].items():
+            if ids and self.archive.has_batch(month, journal["batch"]):
+                self.storage.delete_audit_rows(ids)
+        os.remove(self._journal_path)
+
+    def archive_batch(self) -> int:
+        """Move one batch of aged rows; returns the number of rows moved"""
+        self._recover()
+
+        rows = self.storage.fetch_aged_audit_rows(self.cutoff(), self.batch_size)
+        if not rows:
+            return 0
+
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(row["timestamp"][:7], []).append(row)
+
+        # Journal the batch before touching the archive so a crash between
+        # the append and the DELETE never archives a row twice
+        batch_id = uuid.uuid4().hex
+        os.makedirs(self.archive.archive_dir, exist_ok=True)
+        with open(self._journal_path, "w") as f:
+            json.dump({
+                "batch": batch_id,
+                "months": {month: [r["id"] for r in month_rows] for month, month_rows in by_month.items()}
+            }, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        for month, month_rows in by_month.items():
+            self.archive.append_block(month, month_rows, batch_id)
+
+        self.storage.delete_audit_rows([row["id"] for row in rows])
+        os.remove(self._journal_path)
+        return len(rows)
+
+    def run_once(self) -> int:
+        """Archive everything currently past the cutoff, throttled between batches"""
+        total = 0
+        while not self._stop.is_set():
+            moved = self.archive_batch()
+            total += moved
+            if moved < self.batch_size:
+                break
+            self._stop.wait(self.batch_pause)
+        return total
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                moved = self.run_once()
+                if moved:
+                    logger.info(f"🗄️  Archived {moved} audit log rows older than {self.retention_days} days")
+            except Exception as e:
+                logger.error(f"Audit archiver error: {e}")
+            self._stop.wait(self.idle_interval)
+
+    def start(self):
+        """Start the background archiver thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Signal the archiver to stop after its current batch"""
+        self._stop.set()
+
+    def join(self, timeout: float = 5.0):
+        """Wait for the thread to exit after stop()"""
+        if self._thread:
+            self._thread.join(timeout)
+
+    def is_alive(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+
+def merge_hot_and_archived(hot_rows: List[Dict], archived_rows: List[Dict], limit: int) -> List[Dict]:
+    """Merge two newest-first row lists, dropping duplicates by id"""
+    seen = set()
+    merged = []
+    for row in sorted(hot_rows + archived_rows, key=lambda r: r["timestamp"], reverse=True):
+        if row["id"] in seen:
+            continue
+        seen.add(row["id"])
+        merged.append(row)
+        if len(merged) >= limit:
+            break
+    return merged
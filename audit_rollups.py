@@ -0,0 +1,202 @@
+"""
+Incrementally maintained audit rollups
+Daily counts per action x actor x supplier x environment, updated by a trigger
+on every audit log insert so stats queries cost O(buckets) instead of O(rows)
+"""
+
+import sqlite3
+from typing import Dict, Optional
+
+ROLLUP_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS audit_rollup_daily (
+        day TEXT NOT NULL,
+        action TEXT NOT NULL,
+        actor TEXT NOT NULL,
+        supplier TEXT NOT NULL,
+        environment TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, action, actor, supplier, environment)
+    ) WITHOUT ROWID
+    """,
+    # Rollups count every audit event ever written; rows moved to the audit
+    # archive keep their counts, so there is deliberately no delete trigger
+    """
+    CREATE TRIGGER IF NOT EXISTS audit_rollup_daily_ai AFTER INSERT ON audit_logs BEGIN
+        INSERT INTO audit_rollup_daily (day, action, actor, supplier, environment, count)
+        SELECT substr(new.timestamp, 1, 10), new.action, new.actor,
+               COALESCE(c.supplier, 'System'), COALESCE(c.environment, ''), 1
+        FROM (SELECT 1) LEFT JOIN credentials c ON c.id = new.cred_id
+        WHERE true
+        ON CONFLICT (day, action, actor, supplier, environment)
+        DO UPDATE SET count = count + 1;
+    END
+    """,
+]
+
+PG_ROLLUP_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS audit_rollup_daily (
+        day TEXT NOT NULL,
+        action TEXT NOT NULL,
+        actor TEXT NOT NULL,
+        supplier TEXT NOT NULL,
+        environment TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, action, actor, supplier, environment)
+    )
+    """,
+    """
+    CREATE OR REPLACE FUNCTION audit_rollup_daily_sync() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO audit_rollup_daily (day, action, actor, supplier, environment, count)
+        SELECT substr(NEW.timestamp::text, 1, 10), NEW.action, NEW.actor,
+               COALESCE(c.supplier, 'System'), COALESCE(c.environment, ''), 1
+        FROM (SELECT 1) AS one LEFT JOIN credentials c ON c.id = NEW.cred_id
+        ON CONFLICT (day, action, actor, supplier, environment)
+        DO UPDATE SET count = audit_rollup_daily.count + 1;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS audit_rollup_daily_sync ON audit_logs",
+    """
+    CREATE TRIGGER audit_rollup_daily_sync AFTER INSERT ON audit_logs
+    FOR EACH ROW EXECUTE FUNCTION audit_rollup_daily_sync()
+    """,
+]
+
+# ISO 8601 year and week (YYYY-Www, as PostgreSQL's IYYY-"W"IW): the week
+# belongs to the year of its Thursday, and is numbered by that Thursday's
+# day of year (SQLite before 3.46 has no %G/%V)
+_SQLITE_ISO_WEEK = (
+    "strftime('%Y', date(day, '-3 days', 'weekday 4')) || '-W' || "
+    "printf('%02d', (strftime('%j', date(day, '-3 days', 'weekday 4')) - 1) / 7 + 1)"
+)
+
+# SQL expressions turning a rollup day (YYYY-MM-DD) into a time bucket
+BUCKETS = {
+    "day": "day",
+    "week": _SQLITE_ISO_WEEK,
+    "month": "substr(day, 1, 7)",
+    "year": "substr(day, 1, 4)",
+}
+
+PG_BUCKETS = {
+    "day": "day",
+    "week": "to_char(day::date, 'IYYY-\"W\"IW')",
+    "month": "substr(day, 1, 7)",
+    "year": "substr(day, 1, 4)",
+}
+
+DIMENSIONS = ("action", "actor", "supplier", "environment")
+
+
+def _table_exists(cursor, name: str, dialect: str = "sqlite") -> bool:
+    if dialect == "postgresql":
+        cursor.execute("SELECT 1 FROM information_schema.tables WHERE table_name = ?", (name,))
+    else:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,))
+    return cursor.fetchone() is not None
+
+
+def ensure_rollup_schema(conn: sqlite3.Connection, dialect: str = "sqlite"):
+    """Create the rollup table and trigger, backfilling from audit_logs on first run"""
+    cursor = conn.cursor()
+    is_new = not _table_exists(cursor, "audit_rollup_daily", dialect)
+
+    for statement in PG_ROLLUP_SCHEMA if dialect == "postgresql" else ROLLUP_SCHEMA:
+        cursor.execute(statement)
+
+    if is_new:
+        cursor.execute("""
+            INSERT INTO audit_rollup_daily (day, action, actor, supplier, environment, count)
+            SELECT substr(CAST(al.timestamp AS TEXT), 1, 10), al.action, al.actor,
+                   COALESCE(c.supplier, 'System'), COALESCE(c.environment, ''), COUNT(*)
+            FROM audit_logs al
+            LEFT JOIN credentials c ON c.id = al.cred_id
+            GROUP BY 1, 2, 3, 4, 5
+        """)
+
+    conn.commit()
+
+
+def _where(since: Optional[str], until: Optional[str], filters: Dict[str, Optional[str]]):
+    clauses = ["1=1"]
+    params = []
+    if since:
+        clauses.append("day >= ?")
+        params.append(since[:10])
+    if until:
+        clauses.append("day < ?")
+        params.append(until[:10])
+    for column, value in filters.items():
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    return " AND ".join(clauses), params
+
+
+def get_audit_stats(conn: sqlite3.Connection, bucket: str = "day",
+                    since: Optional[str] = None, until: Optional[str] = None,
+                    action: Optional[str] = None, actor: Optional[str] = None,
+                    supplier: Optional[str] = None, environment: Optional[str] = None,
+                    top: int = 10, dialect: str = "sqlite") -> Dict:
+    """
+    Audit activity summary read from the rollup table.
+
+    Returns the overall total, per-dimension breakdowns (top N each) and a
+    time series of counts per bucket broken down by action.
+    """
+    buckets = PG_BUCKETS if dialect == "postgresql" else BUCKETS
+    if bucket not in buckets:
+        raise ValueError(f"Invalid bucket '{bucket}'. Use one of: {', '.join(buckets)}")
+
+    where, params = _where(since, until, {
+        "action": action,
+        "actor": actor,
+        "supplier": supplier,
+        "environment": environment,
+    })
+    cursor = conn.cursor()
+
+    cursor.execute(f"SELECT COALESCE(SUM(count), 0) FROM audit_rollup_daily WHERE {where}", params)
+    total = cursor.fetchone()[0]
+
+    breakdowns = {}
+    for dimension in DIMENSIONS:
+        cursor.execute(f"""
+            SELECT {dimension}, SUM(count) AS n
+            FROM audit_rollup_daily
+            WHERE {where}
+            GROUP BY {dimension}
+            ORDER BY n DESC
+            LIMIT ?
+        """, params + [top])
+        breakdowns[dimension] = {row[0]: row[1] for row in cursor.fetchall()}
+
+    cursor.execute(f"""
+        SELECT {buckets[bucket]} AS bucket, action, SUM(count)
+        FROM audit_rollup_daily
+        WHERE {where}
+        GROUP BY bucket, action
+        ORDER BY bucket
+    """, params)
+
+    series = []
+    for bucket_key, bucket_action, count in cursor.fetchall():
+        if not series or series[-1]["bucket"] != bucket_key:
+            series.append({"bucket": bucket_key, "total": 0, "by_action": {}})
+        series[-1]["total"] += count
+        series[-1]["by_action"][bucket_action] = count
+
+    return {
+        "bucket": bucket,
+        "total": total,
+        "by_action": breakdowns["action"],
+        "by_actor": breakdowns["actor"],
+        "by_supplier": breakdowns["supplier"],
+        "by_environment": breakdowns["environment"],
+        "series": series,
+    }
+
@@ -0,0 +1,173 @@
+"""
+DataFrame build benchmark for the dashboard and raw credentials tables
+
+Fills a temporary SQLite database with credentials and builds the display
+frame two ways:
+
+  rows   the old per-row loop: json.loads, mask_secret_data, json.dumps and
+         fromisoformat/strftime for every row, then DataFrame(list of dicts)
+  frame  frame_loader: rows straight into a typed DataFrame (categoricals,
+         one to_datetime call), masked data read from the stored masked_data
+         column
+
+Reports build time, peak traced memory and the size of the finished frame.
+
+    python benchmarks/dataframe_build.py --rows 100000
+"""
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frame_loader import read_frame  # noqa: E402
+from masking import masked_json  # noqa: E402
+
+SUPPLIERS = ["Sabre", "Amadeus", "Google Maps", "Stripe", "Payyo", "Viator", "Musement", "G Adventures",
+             "OTS Globe", "TUI"]
+ENVIRONMENTS = ["production", "sandbox", "staging", "development"]
+ACTORS = ["admin@demo.com", "alice@nezasa.com", "bob@nezasa.com", "carol@nezasa.com"]
+
+
+def fill(path: str, rows: int):
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE credentials (
+            id INTEGER PRIMARY KEY, supplier TEXT, environment TEXT, auth_type TEXT, data TEXT,
+            created_by TEXT, created_at TEXT, updated_at TEXT, allow_self_rotation BOOLEAN, masked_data TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX idx_credentials_updated_at ON credentials (updated_at)")
+    start = datetime.datetime(2024, 1, 1)
+    records = []
+    for i in range(rows):
+        if i % 3:
+            auth_type, data = "api_key", {"api_key": f"sk_live_{random.getrandbits(64):016x}"}
+        else:
+            auth_type, data = "username_password", {"username": f"user_{i}", "password": f"pw_{random.getrandbits(48):x}"}
+        stamp = (start + datetime.timedelta(seconds=i * 37)).isoformat()
+        records.append((random.choice(SUPPLIERS), random.choice(ENVIRONMENTS), auth_type, json.dumps(data),
+                        masked_json(json.dumps(data), auth_type), random.choice(ACTORS), stamp, stamp, i % 2))
+    conn.executemany("""
+        INSERT INTO credentials (supplier, environment, auth_type, data, masked_data, created_by, created_at,
+                                 updated_at, allow_self_rotation)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, records)
+    conn.commit()
+    conn.close()
+
+
+# ---------- the old per-row path (as app.py did it) ----------
+
+def mask_secret_data(data, auth_type):
+    masked_data = {}
+    if auth_type == "api_key":
+        api_key = data.get("api_key", "")
+        masked_data["api_key"] = "*****" + api_key[-4:] if len(api_key) > 4 else "*****"
+    elif auth_type == "username_password":
+        username = data.get("username", "")
+        password = data.get("password", "")
+        masked_data["username"] = username
+        masked_data["password"] = "*****" + password[-4:] if len(password) > 4 else "*****"
+    return masked_data
+
+
+def format_timestamp(timestamp_str):
+    try:
+        return datetime.datetime.fromisoformat(timestamp_str).strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return timestamp_str
+
+
+def build_rows(conn, masked: bool) -> pd.DataFrame:
+    rows = conn.execute("""
+        SELECT id, supplier, environment, auth_type, data, created_by, created_at, updated_at,
+               allow_self_rotation
+        FROM credentials ORDER BY updated_at DESC
+    """).fetchall()
+    credentials = [{
+        "id": row[0], "supplier": row[1], "environment": row[2], "auth_type": row[3],
+        "data": json.loads(row[4]), "created_by": row[5], "created_at": row[6], "updated_at": row[7],
+        "allow_self_rotation": bool(row[8]),
+    } for row in rows]
+
+    display_data = []
+    for cred in credentials:
+        data = mask_secret_data(cred["data"], cred["auth_type"]) if masked else cred["data"]
+        display_data.append({
+            "ID": cred["id"],
+            "Supplier": cred["supplier"],
+            "Environment": cred["environment"],
+            "Auth Type": cred["auth_type"],
+            "Data": json.dumps(data, indent=2),
+            "Created By": cred["created_by"],
+            "Created At": format_timestamp(cred["created_at"]),
+            "Updated At": format_timestamp(cred["updated_at"]),
+        })
+    return pd.DataFrame(display_data)
+
+
+# ---------- frame_loader ----------
+
+def build_frame(conn, masked: bool) -> pd.DataFrame:
+    data_column = "masked_data AS data" if masked else "data"
+    return read_frame(conn, f"""
+        SELECT id, supplier, environment, auth_type, {data_column}, created_by, created_at, updated_at,
+               allow_self_rotation
+        FROM credentials ORDER BY updated_at DESC
+    """, categories=("supplier", "environment", "auth_type", "created_by"), datetimes=("created_at", "updated_at"))
+
+
+def measure(build, conn, masked: bool):
+    """(seconds, peak traced bytes, frame bytes); timed without tracemalloc, which slows allocations"""
+    gc.collect()
+    started = time.perf_counter()
+    build(conn, masked)
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    frame = build(conn, masked)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    size = frame.memory_usage(deep=True).sum()
+    return elapsed, peak, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        fill(path, args.rows)
+        conn = sqlite3.connect(path)
+
+        print(f"📊 {args.rows} credentials")
+        for masked in (True, False):
+            label = "masked" if masked else "unmasked"
+            results = {name: measure(build, conn, masked) for name, build in (("rows", build_rows),
+                                                                               ("frame", build_frame))}
+            for name, (elapsed, peak, size) in results.items():
+                print(f"⏱️  {label:8s} {name:5s}: {elapsed * 1000:8.1f} ms  "
+                      f"peak {peak / 2**20:7.1f} MiB  frame {size / 2**20:6.1f} MiB")
+            rows, frame = results["rows"], results["frame"]
+            print(f"   {label}: {rows[0] / frame[0]:.1f}x faster, {rows[1] / frame[1]:.1f}x less peak memory, "
+                  f"{rows[2] / frame[2]:.1f}x smaller frame")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
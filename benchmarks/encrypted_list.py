@@ -0,0 +1,130 @@
+"""
+List latency with credentials.data encrypted at rest
+
+Builds two temporary databases with the same credentials, one with data
+stored as plaintext JSON and one envelope-encrypted (credential_crypto), and
+times GET /api/v1/credentials against each over HTTP (uvicorn on localhost):
+
+  admin  unmasked list: every row is decrypted, as one batch per request
+  cs     masked list: reads the masked projection, nothing is decrypted
+
+Reports the median request time per database and the encryption overhead.
+
+    python benchmarks/encrypted_list.py --rows 10000 --repeat 15
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+KEY_DIRECTORY = tempfile.mkdtemp(prefix="bench_keys_")
+os.environ["CREDENTIAL_KEY_FILE"] = os.path.join(KEY_DIRECTORY, "credential_keys.json")
+
+import requests  # noqa: E402
+import uvicorn  # noqa: E402
+
+import api  # noqa: E402
+from credential_crypto import get_cipher  # noqa: E402
+from masking import mask_credential_data  # noqa: E402
+from storage import SQLiteStorage  # noqa: E402
+
+SUPPLIERS = ["Sabre", "Amadeus", "Google Maps", "Stripe", "Payyo", "Viator", "Musement", "TUI"]
+ENVIRONMENTS = ["production", "sandbox", "staging", "development"]
+API_KEYS = {"admin": "admin_key_123", "cs": "cs_key_789"}
+
+
+def credentials(rows: int):
+    random.seed(7)
+    for i in range(rows):
+        if i % 3:
+            auth_type, data = "api_key", {"api_key": f"sk_live_{random.getrandbits(64):016x}"}
+        else:
+            auth_type, data = "username_password", {"username": f"user_{i}",
+                                                    "password": f"pw_{random.getrandbits(48):x}"}
+        yield random.choice(SUPPLIERS), random.choice(ENVIRONMENTS), auth_type, data
+
+
+def fill(storage: SQLiteStorage, rows: int, encrypt):
+    def insert(conn):
+        stamp = "2024-01-01T00:00:00"
+        for supplier, environment, auth_type, data in credentials(rows):
+            conn.execute("""
+                INSERT INTO credentials (supplier, environment, auth_type, data, masked_data, created_by,
+                                         created_at, updated_at, allow_self_rotation)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (supplier, environment, auth_type, encrypt(json.dumps(data)),
+                  json.dumps(mask_credential_data(data, auth_type)), "bench@nezasa.com", stamp, stamp, False))
+        conn.commit()
+
+    storage.write(insert)
+
+
+def time_lists(base_url: str, storages, role: str, repeat: int):
+    """
+    Median seconds per GET /api/v1/credentials for each storage; requests
+    alternate between the databases so machine noise hits both alike
+    """
+    session = requests.Session()
+    timings = {name: [] for name in storages}
+    for run in range(repeat + 1):
+        for name, storage in storages.items():
+            api.storage = storage
+            gc.collect()
+            started = time.perf_counter()
+            response = session.get(f"{base_url}/api/v1/credentials", headers={"X-API-Key": API_KEYS[role]})
+            response.json()
+            elapsed = time.perf_counter() - started
+            assert response.status_code == 200, response.text
+            if run:  # the first round is a warm-up
+                timings[name].append(elapsed)
+    return {name: statistics.median(values) for name, values in timings.items()}
+
+
+def main():
+    # Request logging and slow-query warnings would dominate the output
+    logging.disable(logging.WARNING)
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=15)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    cipher = get_cipher()
+    server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=args.port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    base_url = f"http://127.0.0.1:{args.port}"
+    with tempfile.TemporaryDirectory() as directory:
+        storages = {}
+        for name, encrypt in (("plaintext", lambda value: value), ("encrypted", cipher.encrypt)):
+            storage = storages[name] = SQLiteStorage(os.path.join(directory, f"{name}.db"))
+            storage.init_schema()
+            fill(storage, args.rows, encrypt)
+        results = {role: time_lists(base_url, storages, role, args.repeat) for role in API_KEYS}
+        for storage in storages.values():
+            storage.close()
+    server.should_exit = True
+
+    print(f"📊 {args.rows} credentials, median of {args.repeat} list requests")
+    for role in API_KEYS:
+        plain, encrypted = results[role]["plaintext"], results[role]["encrypted"]
+        overhead = (encrypted - plain) / plain * 100
+        print(f"⏱️  {role:5s}: plaintext {plain * 1000:8.1f} ms  encrypted {encrypted * 1000:8.1f} ms  "
+              f"overhead {overhead:+5.1f}%")
+    print(f"🔑 KMS calls: {cipher.kms.calls}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Masked credential list benchmark (the cs/partner GET /api/v1/credentials path)
+
+Fills a temporary database through SQLiteStorage and lists every credential
+the way a masked role is served, two ways:
+
+  decode  the old path: read the secret data column, json.loads it and mask
+          every row at request time
+  stored  list_credentials(masked=True): read the masked_data projection
+          written with the row; the secret column is never selected
+
+Reports list time, peak traced memory and how many secret strings each path
+held in memory.
+
+    python benchmarks/masked_list.py --rows 50000
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from masking import mask_credential_data  # noqa: E402
+from storage import SQLiteStorage  # noqa: E402
+
+SUPPLIERS = ["Sabre", "Amadeus", "Google Maps", "Stripe", "Payyo", "Viator", "Musement", "TUI"]
+ENVIRONMENTS = ["production", "sandbox", "staging", "development"]
+
+
+def fill(storage: SQLiteStorage, rows: int):
+    def insert(conn):
+        for i in range(rows):
+            if i % 3:
+                auth_type, data = "api_key", {"api_key": f"sk_live_{random.getrandbits(64):016x}"}
+            else:
+                auth_type, data = "username_password", {"username": f"user_{i}",
+                                                        "password": f"pw_{random.getrandbits(48):x}"}
+            stamp = f"2024-01-01T00:00:{i % 60:02d}"
+            conn.execute("""
+                INSERT INTO credentials (supplier, environment, auth_type, data, masked_data, created_by,
+                                         created_at, updated_at, allow_self_rotation)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (random.choice(SUPPLIERS), random.choice(ENVIRONMENTS), auth_type, json.dumps(data),
+                  json.dumps(mask_credential_data(data, auth_type)), "bench@nezasa.com", stamp, stamp, False))
+        conn.commit()
+
+    storage.write(insert)
+
+
+def list_decode(storage: SQLiteStorage):
+    rows = storage.list_credentials()
+    secrets = sum(1 for row in rows if row["data"])
+    return [dict(row, data=mask_credential_data(json.loads(row["data"]), row["auth_type"])) for row in rows], secrets
+
+
+def list_stored(storage: SQLiteStorage):
+    rows = storage.list_credentials(masked=True)
+    return [dict(row, data=json.loads(row["data"])) for row in rows], 0
+
+
+def measure(list_masked, storage: SQLiteStorage, repeat: int = 3):
+    """(best seconds, peak traced bytes, secrets loaded); timed without tracemalloc"""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        list_masked(storage)
+        best = min(best, time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    _, secrets = list_masked(storage)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, secrets
+
+
+def main():
+    # Full-table lists cross the slow-query threshold; keep the output to the results
+    logging.getLogger("query_stats").setLevel(logging.ERROR)
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage = SQLiteStorage(os.path.join(directory, "bench.db"))
+        storage.init_schema()
+        fill(storage, args.rows)
+
+        print(f"📊 {args.rows} credentials, masked list")
+        results = {name: measure(list_masked, storage) for name, list_masked in (("decode", list_decode),
+                                                                                 ("stored", list_stored))}
+        for name, (elapsed, peak, secrets) in results.items():
+            print(f"⏱️  {name:6s}: {elapsed * 1000:8.1f} ms  peak {peak / 2**20:7.1f} MiB  secrets loaded {secrets}")
+        decode, stored = results["decode"], results["stored"]
+        print(f"   {decode[0] / stored[0]:.1f}x faster, {decode[1] / stored[1]:.1f}x less peak memory")
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Rotation scheduler due-scan benchmark
+
+Fills a temporary database through SQLiteStorage with credentials whose
+updated_at is spread over the last --days days, sets a '*' rotation policy
+and finds the credentials due for rotation two ways:
+
+  full     list every credential (masked, no secrets) and check each age
+  indexed  RotationScheduler.find_due: keyset-paged range scan on
+           idx_credentials_updated_at, reading only rows old enough to be due
+
+    python benchmarks/rotation_scan.py --rows 100000 --max-age 365
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rotation_scheduler import RotationScheduler, due_age, resolve_policy  # noqa: E402
+from storage import SQLiteStorage  # noqa: E402
+
+SUPPLIERS = ["Sabre", "Amadeus", "Google Maps", "Stripe", "Payyo", "Viator", "Musement", "TUI"]
+ENVIRONMENTS = ["production", "sandbox", "staging", "development"]
+
+
+def fill(storage: SQLiteStorage, rows: int, days: int):
+    now = datetime.now()
+
+    def insert(conn):
+        for _ in range(rows):
+            stamp = (now - timedelta(seconds=random.uniform(0, days * 86400))).isoformat()
+            conn.execute("""
+                INSERT INTO credentials (supplier, environment, auth_type, data, masked_data, created_by,
+                                         created_at, updated_at, allow_self_rotation)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (random.choice(SUPPLIERS), random.choice(ENVIRONMENTS), "api_key",
+                  json.dumps({"api_key": "sk_bench"}), json.dumps({"api_key": "*****ench"}),
+                  "bench@nezasa.com", stamp, stamp, False))
+        conn.commit()
+
+    storage.write(insert)
+
+
+def find_due_full(storage: SQLiteStorage, scheduler: RotationScheduler, now: datetime):
+    policies = {(p["supplier"], p["environment"]): p for p in storage.list_rotation_policies()}
+    due = []
+    for row in storage.list_credentials(masked=True):
+        policy = resolve_policy(policies, row["supplier"], row["environment"])
+        age = now - datetime.fromisoformat(row["updated_at"])
+        if policy and age >= due_age(row["id"], policy["max_age_days"], scheduler.jitter):
+            due.append(row)
+    return due
+
+
+def best_of(find, repeat: int = 5):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        result = find()
+        best = min(best, time.perf_counter() - started)
+    return best, len(result)
+
+
+def main():
+    logging.getLogger("query_stats").setLevel(logging.ERROR)
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=400, help="updated_at spread")
+    parser.add_argument("--max-age", type=int, default=365, help="policy max age in days")
+    args = parser.parse_args()
+
+    random.seed(7)
+    with tempfile.TemporaryDirectory() as directory:
+        storage = SQLiteStorage(os.path.join(directory, "bench.db"))
+        storage.init_schema()
+        fill(storage, args.rows, args.days)
+        storage.set_rotation_policy("*", "*", args.max_age, actor="bench@nezasa.com")
+        scheduler = RotationScheduler(storage, rotate_data=lambda credential, data: data)
+        now = datetime.now()
+
+        results = {
+            "full": best_of(lambda: find_due_full(storage, scheduler, now)),
+            "indexed": best_of(lambda: scheduler.find_due(now)[0]),
+        }
+        storage.close()
+
+    print(f"📊 {args.rows} credentials over {args.days} days, policy */* {args.max_age} days")
+    for name, (elapsed, due) in results.items():
+        print(f"⏱️  {name:7s}: {elapsed * 1000:8.1f} ms  due {due}")
+    print(f"   {results['full'][0] / results['indexed'][0]:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Mixed read/write stress benchmark for the SQLite storage lanes
+
+Runs the same workload twice against fresh temporary databases:
+
+  direct  one sqlite3.connect() per operation, rollback journal (the old
+          api.py / CredentialManager pattern)
+  lanes   SQLiteStorage: pooled read-only connections + single writer thread, WAL
+
+Reader threads list credentials, fetch single credentials and read audit
+logs; writer threads create, update and rotate credentials (each with its
+audit entry). Reports throughput, latency percentiles and errors.
+
+    python benchmarks/sqlite_rw_stress.py --readers 8 --writers 4 --duration 5
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import SQLiteStorage  # noqa: E402
+
+SUPPLIERS = ["Sabre", "Amadeus", "Hotelbeds", "Expedia", "Booking.com", "GetYourGuide"]
+ENVIRONMENTS = ["production", "staging", "test"]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def new_database(directory: str, name: str, seed: int) -> str:
+    """Schema (with all triggers) plus `seed` credentials"""
+    path = os.path.join(directory, name)
+    storage = SQLiteStorage(path)
+    storage.init_schema()
+    for i in range(seed):
+        storage.create_credential(
+            supplier=SUPPLIERS[i % len(SUPPLIERS)],
+            environment=ENVIRONMENTS[i % len(ENVIRONMENTS)],
+            auth_type="api_key",
+            data=json.dumps({"api_key": f"seed_key_{i}"}),
+            created_by="bench@nezasa.com",
+            allow_self_rotation=False,
+            details="Seeded by benchmark"
+        )
+    storage.close()
+    return path
+
+
+# ==================== direct (old pattern) ====================
+
+class DirectBackend:
+    """A fresh connection per operation, like the pre-lanes code"""
+
+    def __init__(self, path: str, busy_timeout: float):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def list_credentials(self):
+        conn = self._connect()
+        try:
+            return [dict(row) for row in conn.execute("SELECT * FROM credentials")]
+        finally:
+            conn.close()
+
+    def get_credential(self, cred_id):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM credentials WHERE id = ?", (cred_id,)).fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+
+    def get_audit_logs(self, limit):
+        conn = self._connect()
+        try:
+            return [dict(row) for row in conn.execute(
+                "SELECT * FROM audit_logs ORDER BY timestamp DESC LIMIT ?", (limit,))]
+        finally:
+            conn.close()
+
+    def create_credential(self, supplier, environment, data, actor):
+        conn = self._connect()
+        try:
+            now = datetime.now().isoformat()
+            cursor = conn.execute("""
+                INSERT INTO credentials (supplier, environment, auth_type, data, created_by, created_at, updated_at, allow_self_rotation)
+                VALUES (?, ?, 'api_key', ?, ?, ?, ?, 0)
+            """, (supplier, environment, data, actor, now, now))
+            conn.execute("""
+                INSERT INTO audit_logs (cred_id, action, actor, details, timestamp)
+                VALUES (?, 'create', ?, 'bench create', ?)
+            """, (cursor.lastrowid, actor, now))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def update_credential(self, cred_id, data, actor, action):
+        conn = self._connect()
+        try:
+            now = datetime.now().isoformat()
+            conn.execute("UPDATE credentials SET data = ?, updated_at = ? WHERE id = ?", (data, now, cred_id))
+            conn.execute("""
+                INSERT INTO audit_logs (cred_id, action, actor, details, timestamp)
+                VALUES (?, ?, ?, 'bench update', ?)
+            """, (cred_id, action, actor, now))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+# ==================== lanes ====================
+
+class LanesBackend:
+    """SQLiteStorage adapter exposing the same calls as DirectBackend"""
+
+    def __init__(self, path: str):
+        self.storage = SQLiteStorage(path)
+
+    def list_credentials(self):
+        return self.storage.list_credentials()
+
+    def get_credential(self, cred_id):
+        return self.storage.get_credential(cred_id)
+
+    def get_audit_logs(self, limit):
+        return self.storage.get_audit_logs(limit=limit)
+
+    def create_credential(self, supplier, environment, data, actor):
+        self.storage.create_credential(supplier, environment, "api_key", data, actor, False, "bench create")
+
+    def update_credential(self, cred_id, data, actor, action):
+        self.storage.update_credential(cred_id, {"data": data}, actor=actor, action=action, details="bench update")
+
+
+# ==================== workload ====================
+
+def run(backend, readers: int, writers: int, duration: float, seed: int) -> dict:
+    stop = threading.Event()
+    lock = threading.Lock()
+    read_latencies, write_latencies = [], []
+    errors = Counter()
+
+    def record(latencies, started):
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            latencies.append(elapsed)
+
+    def fail(e):
+        with lock:
+            errors[f"{type(e).__name__}: {e}"] += 1
+
+    def reader(rng):
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                choice = rng.random()
+                if choice < 0.2:
+                    backend.list_credentials()
+                elif choice < 0.7:
+                    backend.get_credential(rng.randint(1, seed))
+                else:
+                    backend.get_audit_logs(50)
+                record(read_latencies, started)
+            except Exception as e:
+                fail(e)
+
+    def writer(rng):
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                data = json.dumps({"api_key": f"bench_{rng.random()}"})
+                if rng.random() < 0.2:
+                    backend.create_credential(rng.choice(SUPPLIERS), rng.choice(ENVIRONMENTS), data, "writer@nezasa.com")
+                else:
+                    backend.update_credential(rng.randint(1, seed), data, "writer@nezasa.com",
+                                              rng.choice(["update", "rotate"]))
+                record(write_latencies, started)
+            except Exception as e:
+                fail(e)
+
+    threads = [threading.Thread(target=reader, args=(random.Random(i),)) for i in range(readers)]
+    threads += [threading.Thread(target=writer, args=(random.Random(1000 + i),)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    return {
+        "reads": len(read_latencies),
+        "writes": len(write_latencies),
+        "reads_per_s": len(read_latencies) / duration,
+        "writes_per_s": len(write_latencies) / duration,
+        "read_p50_ms": statistics.median(read_latencies) if read_latencies else 0.0,
+        "read_p99_ms": percentile(read_latencies, 99),
+        "read_max_ms": max(read_latencies, default=0.0),
+        "write_p50_ms": statistics.median(write_latencies) if write_latencies else 0.0,
+        "write_p99_ms": percentile(write_latencies, 99),
+        "errors": errors,
+    }
+
+
+def report(name: str, result: dict):
+    print(f"\n📊 {name}")
+    print(f"   reads : {result['reads']:>7} ({result['reads_per_s']:.0f}/s)  "
+          f"p50 {result['read_p50_ms']:.2f} ms  p99 {result['read_p99_ms']:.2f} ms  max {result['read_max_ms']:.1f} ms")
+    print(f"   writes: {result['writes']:>7} ({result['writes_per_s']:.0f}/s)  "
+          f"p50 {result['write_p50_ms']:.2f} ms  p99 {result['write_p99_ms']:.2f} ms")
+    total_errors = sum(result["errors"].values())
+    print(f"   errors: {total_errors}")
+    for message, count in result["errors"].most_common(5):
+        print(f"      {count:>6} × {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per mode")
+    parser.add_argument("--seed", type=int, default=500, help="Credentials created before the run")
+    parser.add_argument("--busy-timeout", type=float, default=5.0,
+                        help="sqlite3.connect timeout for the direct mode (Python's default is 5s)")
+    args = parser.parse_args()
+
+    print(f"🔧 {args.readers} readers, {args.writers} writers, {args.duration:.0f}s per mode, {args.seed} seeded credentials")
+
+    with tempfile.TemporaryDirectory() as directory:
+        direct = DirectBackend(new_database(directory, "direct.db", args.seed), args.busy_timeout)
+        report("direct (connection per operation, rollback journal)",
+               run(direct, args.readers, args.writers, args.duration, args.seed))
+
+        lanes = LanesBackend(new_database(directory, "lanes.db", args.seed))
+        report("lanes (read-only pool + single writer, WAL)",
+               run(lanes, args.readers, args.writers, args.duration, args.seed))
+        lanes.storage.close()
+
+
+if __name__ == "__main__":
+    main()
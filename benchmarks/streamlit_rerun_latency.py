@@ -0,0 +1,61 @@
+"""
+Streamlit rerun latency benchmark
+
+Runs app.py headlessly with streamlit.testing's AppTest against a fresh
+credentials.db (seeded with the sample credentials on the first run) and
+times full script reruns (what every widget interaction costs). The first
+run is reported separately since it includes one-time initialization.
+
+    python benchmarks/streamlit_rerun_latency.py --reruns 30
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from streamlit.testing.v1 import AppTest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reruns", type=int, default=30)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds allowed per run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # The app resolves credentials.db and the logo relative to the cwd
+        shutil.copy(os.path.join(REPO_DIR, "nezasa_logo.png"), directory)
+        os.chdir(directory)
+        sys.path.insert(0, REPO_DIR)
+
+        app = AppTest.from_file(os.path.join(REPO_DIR, "app.py"), default_timeout=args.timeout)
+
+        started = time.perf_counter()
+        app.run()
+        first_run = (time.perf_counter() - started) * 1000
+        if app.exception:
+            print(f"❌ App raised: {app.exception[0].value}")
+            sys.exit(1)
+
+        timings = []
+        for _ in range(args.reruns):
+            started = time.perf_counter()
+            app.run()
+            timings.append((time.perf_counter() - started) * 1000)
+
+    timings.sort()
+    print(f"⏱️  first run : {first_run:.1f} ms")
+    print(f"⏱️  reruns    : {len(timings)}  "
+          f"mean {statistics.mean(timings):.1f} ms  "
+          f"p50 {statistics.median(timings):.1f} ms  "
+          f"p95 {timings[min(len(timings) - 1, int(len(timings) * 0.95))]:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
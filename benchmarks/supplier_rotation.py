@@ -0,0 +1,119 @@
+"""
+Supplier rotation benchmark: 1,000 credentials across 10 simulated suppliers
+
+Starts supplier_stub in a separate process on localhost and rotates every credential through
+SupplierRotator with HTTP adapters, all rotations submitted at once, at
+two per-supplier concurrency limits. The stub adds latency and random 503s;
+one supplier throttles (429 over 4 concurrent requests) and one is down,
+so its circuit breaker opens and the rest of its credentials fail fast
+instead of waiting out timeouts and retries.
+
+    python benchmarks/supplier_rotation.py --credentials 1000 --suppliers 10
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+from supplier_adapters import (  # noqa: E402
+    CircuitOpenError, HTTPSupplierAdapter, LocalAdapter, RotationError, SupplierLimits, SupplierRotator,
+)
+from supplier_stub import Faults  # noqa: E402
+
+STUB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "supplier_stub.py")
+
+
+def credentials(count: int, suppliers: int):
+    for i in range(count):
+        auth_type = "username_password" if i % 3 == 0 else "api_key"
+        data = {"username": f"user_{i}", "password": "old"} if auth_type == "username_password" else {"api_key": "old"}
+        yield {"id": i + 1, "supplier": f"supplier{i % suppliers}", "environment": "production",
+               "auth_type": auth_type}, data
+
+
+async def rotate_all(base_url: str, args, concurrency: int):
+    rotator = SupplierRotator(LocalAdapter(lambda auth_type, data: data))
+    for n in range(args.suppliers):
+        supplier = f"supplier{n}"
+        rotator.register(supplier, HTTPSupplierAdapter(supplier, f"{base_url}/{supplier}"),
+                         SupplierLimits(concurrency=concurrency, timeout=args.timeout, retries=3, backoff=0.05,
+                                        breaker_threshold=5, breaker_reset=30))
+
+    outcomes = {"rotated": 0, "failed": 0, "circuit_open": 0}
+
+    async def rotate(credential, data):
+        try:
+            await rotator.rotate(credential, data)
+            outcomes["rotated"] += 1
+        except CircuitOpenError:
+            outcomes["circuit_open"] += 1
+        except RotationError:
+            outcomes["failed"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(rotate(credential, data) for credential, data in credentials(args.credentials,
+                                                                                       args.suppliers)))
+    elapsed = time.perf_counter() - started
+    status = rotator.status()
+    await rotator.close()
+    return elapsed, outcomes, status
+
+
+async def configure_stub(base_url: str, args):
+    async with httpx.AsyncClient() as client:
+        for _ in range(100):
+            try:
+                await client.get(f"{base_url}/stats")
+                break
+            except httpx.ConnectError:
+                await asyncio.sleep(0.1)
+        await client.put(f"{base_url}/*/faults", json=Faults(
+            latency=args.latency, latency_jitter=args.latency, error_rate=args.error_rate).model_dump())
+        await client.put(f"{base_url}/supplier1/faults", json=Faults(
+            latency=args.latency, latency_jitter=args.latency, error_rate=args.error_rate,
+            max_concurrency=4).model_dump())
+        await client.put(f"{base_url}/supplier2/faults", json=Faults(down=True).model_dump())
+
+
+def main():
+    logging.disable(logging.WARNING)
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--credentials", type=int, default=1000)
+    parser.add_argument("--suppliers", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub latency, plus up to as much jitter")
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=2.0)
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    # The stub runs in its own process so it does not compete with the rotator for the GIL
+    stub = subprocess.Popen([sys.executable, STUB, "--port", str(args.port)], stdout=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{args.port}"
+    asyncio.run(configure_stub(base_url, args))
+
+    print(f"📊 {args.credentials} credentials across {args.suppliers} suppliers, stub latency "
+          f"{args.latency * 1000:.0f}-{args.latency * 2000:.0f} ms, {args.error_rate:.0%} errors, "
+          f"supplier1 throttled at 4, supplier2 down")
+    for concurrency in (1, 8):
+        elapsed, outcomes, status = asyncio.run(rotate_all(base_url, args, concurrency))
+        retries = sum(s["retries"] for s in status.values())
+        opens = sum(s["breaker_opens"] for s in status.values())
+        print(f"⏱️  concurrency {concurrency} per supplier: {elapsed:6.2f} s  "
+              f"{outcomes['rotated'] / elapsed:6.1f} rotations/s  rotated {outcomes['rotated']}  "
+              f"failed {outcomes['failed']}  circuit open {outcomes['circuit_open']}  "
+              f"retries {retries}  breaker opens {opens}")
+    stub.terminate()
+    stub.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Change-aware read cache for the Streamlit app
+Cached query results are tagged with per-table change tokens (cheap reads
+such as the change feed sequence or the audit id range). A result is served
+until its tables' tokens move; after that the stale value is still served
+once while a background thread reloads it (stale-while-revalidate).
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Change tokens are re-read at most this often (seconds), so every cached
+# read in one Streamlit rerun shares a single token query
+CACHE_TOKEN_TTL = float(os.environ.get("CACHE_TOKEN_TTL", "1.0"))
+
+# Least recently used keys are dropped beyond this many entries
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "256"))
+
+
+class ChangeAwareCache:
+    """
+    Process-wide cache of loader results keyed by name.
+
+    read_tokens() returns {table: token}; get() names the tables a key
+    depends on. invalidate() is for the process's own writes: the next get()
+    of every key reloads synchronously, so a user sees their change on the
+    very next rerun instead of one rerun later.
+    """
+
+    def __init__(self, read_tokens: Callable[[], Dict[str, Any]],
+                 token_ttl: float = CACHE_TOKEN_TTL, max_entries: int = CACHE_MAX_ENTRIES,
+                 workers: int = 2):
+        self._read_tokens = read_tokens
+        self.token_ttl = token_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._refreshing = set()
+        self._tokens: Dict[str, Any] = {}
+        self._tokens_read_at = 0.0
+        self._generation = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cache-refresh")
+
+    def tokens(self) -> Dict[str, Any]:
+        """Current change tokens, re-read at most every token_ttl seconds"""
+        with self._lock:
+            if time.monotonic() - self._tokens_read_at < self.token_ttl:
+                return self._tokens
+        tokens = self._read_tokens()
+        with self._lock:
+            self._tokens = tokens
+            self._tokens_read_at = time.monotonic()
+        return tokens
+
+    def get(self, key: Hashable, tables: Tuple[str, ...], loader: Callable[[], Any]) -> Any:
+        """
+        Cached loader() result for key.
+
+        Values are shared between sessions and must be treated as read-only.
+        """
+        tokens = self.tokens()
+        token = tuple(tokens.get(table) for table in tables)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            generation = self._generation
+
+        if entry is None or entry["generation"] != generation:
+            value = loader()
+            self._store(key, value, token, generation)
+            return value
+
+        if entry["token"] != token:
+            # Serve what we have and reload in the background, once per key
+            with self._lock:
+                start = key not in self._refreshing
+                self._refreshing.add(key)
+            if start:
+                self._executor.submit(self._refresh, key, tables, loader)
+
+        return entry["value"]
+
+    def _store(self, key: Hashable, value: Any, token: Tuple, generation: int):
+        with self._lock:
+            # A write invalidated the cache while this value was loading:
+            # keep it out so the next get() reloads synchronously
+            if generation != self._generation:
+                return
+            self._entries[key] = {"value": value, "token": token, "generation": generation}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _refresh(self, key: Hashable, tables: Tuple[str, ...], loader: Callable[[], Any]):
+        try:
+            with self._lock:
+                generation = self._generation
+            # Tokens are read before the data, so a change landing mid-load
+            # leaves the entry one token behind and triggers another refresh
+            tokens = self._read_tokens()
+            token = tuple(tokens.get(table) for table in tables)
+            self._store(key, loader(), token, generation)
+        except Exception as e:
+            logger.error(f"Cache refresh for {key!r} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def invalidate(self):
+        """Force every key to reload on its next get() (call after a local write)"""
+        with self._lock:
+            self._generation += 1
+            self._tokens_read_at = 0.0
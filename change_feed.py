@@ -0,0 +1,193 @@
+"""
+Credential change feed
+A monotonically increasing change sequence recorded by triggers on every
+credential insert, update (including rotation) and delete, compacted to one
+row per credential so a sync transfers each changed row at most once
+"""
+
+import sqlite3
+from typing import Dict, List, Tuple
+
+CHANGE_FEED_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS change_sequence (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        value INTEGER NOT NULL
+    )
+    """,
+    "INSERT OR IGNORE INTO change_sequence (id, value) VALUES (1, 0)",
+    # One row per credential holding the sequence of its latest change.
+    # Deleted credentials keep a row with op = 'delete' (tombstone).
+    """
+    CREATE TABLE IF NOT EXISTS credential_changes (
+        cred_id INTEGER PRIMARY KEY,
+        seq INTEGER NOT NULL,
+        op TEXT NOT NULL,
+        changed_at TEXT NOT NULL
+    )
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_credential_changes_seq ON credential_changes (seq)",
+    """
+    CREATE TRIGGER IF NOT EXISTS credential_changes_ai AFTER INSERT ON credentials BEGIN
+        UPDATE change_sequence SET value = value + 1 WHERE id = 1;
+        INSERT OR REPLACE INTO credential_changes (cred_id, seq, op, changed_at)
+        VALUES (new.id, (SELECT value FROM change_sequence WHERE id = 1), 'upsert', new.updated_at);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS credential_changes_au AFTER UPDATE ON credentials BEGIN
+        UPDATE change_sequence SET value = value + 1 WHERE id = 1;
+        INSERT OR REPLACE INTO credential_changes (cred_id, seq, op, changed_at)
+        VALUES (new.id, (SELECT value FROM change_sequence WHERE id = 1), 'upsert', new.updated_at);
+    END
+    """,
+    # Tombstones are stamped like Python's isoformat(): six fractional digits
+    # (SQLite's clock only has milliseconds, so the last three are zeros).
+    # Dropped first so databases with the older millisecond trigger get this one.
+    "DROP TRIGGER IF EXISTS credential_changes_ad",
+    """
+    CREATE TRIGGER credential_changes_ad AFTER DELETE ON credentials BEGIN
+        UPDATE change_sequence SET value = value + 1 WHERE id = 1;
+        INSERT OR REPLACE INTO credential_changes (cred_id, seq, op, changed_at)
+        VALUES (old.id, (SELECT value FROM change_sequence WHERE id = 1), 'delete',
+                strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime') || '000');
+    END
+    """,
+    # Tombstones written by the millisecond trigger
+    "UPDATE credential_changes SET changed_at = changed_at || '000' WHERE op = 'delete' AND length(changed_at) = 23",
+]
+
+
+# PostgreSQL: the counter row is updated inside the writing transaction, so
+# sequence numbers are assigned in commit order (unlike a SEQUENCE, whose
+# values can become visible out of order)
+PG_CHANGE_FEED_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS change_sequence (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        value BIGINT NOT NULL
+    )
+    """,
+    "INSERT INTO change_sequence (id, value) VALUES (1, 0) ON CONFLICT (id) DO NOTHING",
+    """
+    CREATE TABLE IF NOT EXISTS credential_changes (
+        cred_id INTEGER PRIMARY KEY,
+        seq BIGINT NOT NULL,
+        op TEXT NOT NULL,
+        changed_at TEXT NOT NULL
+    )
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_credential_changes_seq ON credential_changes (seq)",
+    """
+    CREATE OR REPLACE FUNCTION credential_changes_sync() RETURNS trigger AS $$
+    DECLARE
+        next_seq BIGINT;
+    BEGIN
+        UPDATE change_sequence SET value = value + 1 WHERE id = 1 RETURNING value INTO next_seq;
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO credential_changes (cred_id, seq, op, changed_at)
+            VALUES (OLD.id, next_seq, 'delete', to_char(now(), 'YYYY-MM-DD"T"HH24:MI:SS.US'))
+            ON CONFLICT (cred_id) DO UPDATE
+            SET seq = EXCLUDED.seq, op = EXCLUDED.op, changed_at = EXCLUDED.changed_at;
+            RETURN OLD;
+        END IF;
+        INSERT INTO credential_changes (cred_id, seq, op, changed_at)
+        VALUES (NEW.id, next_seq, 'upsert', to_char(NEW.updated_at, 'YYYY-MM-DD"T"HH24:MI:SS.US'))
+        ON CONFLICT (cred_id) DO UPDATE
+        SET seq = EXCLUDED.seq, op = EXCLUDED.op, changed_at = EXCLUDED.changed_at;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS credential_changes_sync ON credentials",
+    """
+    CREATE TRIGGER credential_changes_sync AFTER INSERT OR UPDATE OR DELETE ON credentials
+    FOR EACH ROW EXECUTE FUNCTION credential_changes_sync()
+    """,
+]
+
+
+def _table_exists(cursor, name: str, dialect: str = "sqlite") -> bool:
+    if dialect == "postgresql":
+        cursor.execute("SELECT 1 FROM information_schema.tables WHERE table_name = ?", (name,))
+    else:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,))
+    return cursor.fetchone() is not None
+
+
+def ensure_change_feed_schema(conn: sqlite3.Connection, dialect: str = "sqlite"):
+    """Create the change feed tables and triggers, seeding existing credentials on first run"""
+    cursor = conn.cursor()
+    is_new = not _table_exists(cursor, "credential_changes", dialect)
+
+    for statement in PG_CHANGE_FEED_SCHEMA if dialect == "postgresql" else CHANGE_FEED_SCHEMA:
+        cursor.execute(statement)
+
+    if is_new:
+        # Existing credentials get sequence numbers in id order
+        cursor.execute("""
+            INSERT INTO credential_changes (cred_id, seq, op, changed_at)
+            SELECT id, ROW_NUMBER() OVER (ORDER BY id), 'upsert', CAST(updated_at AS TEXT)
+            FROM credentials
+        """)
+        cursor.execute("""
+            UPDATE change_sequence
+            SET value = (SELECT COALESCE(MAX(seq), 0) FROM credential_changes)
+            WHERE id = 1
+        """)
+
+    conn.commit()
+
+
+def current_sequence(conn: sqlite3.Connection) -> int:
+    """Latest change sequence number (0 before any change)"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT value FROM change_sequence WHERE id = 1")
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def get_changes(conn: sqlite3.Connection, since: int = 0,
+                limit: int = 500, masked: bool = False) -> Tuple[List[Dict], bool]:
+    """
+    Changes with seq > since, oldest first.
+
+    Returns (changes, has_more). Each change carries the credential columns
+    as a dict (data still JSON-encoded, or the stored masked projection when
+    masked) for upserts, or None for tombstones. Clients resume with
+    since = the last seq they received.
+    """
+    data_column = "c.masked_data" if masked else "c.data"
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT ch.seq, ch.op, ch.cred_id, ch.changed_at,
+               c.id, c.supplier, c.environment, c.auth_type, {data_column}, c.created_by,
+               c.created_at, c.updated_at, c.allow_self_rotation
+        FROM credential_changes ch
+        LEFT JOIN credentials c ON c.id = ch.cred_id
+        WHERE ch.seq > ?
+        ORDER BY ch.seq
+        LIMIT ?
+    """, (since, limit + 1))
+    rows = cursor.fetchall()
+
+    changes = []
+    for row in rows[:limit]:
+        changes.append({
+            "seq": row[0],
+            "op": row[1],
+            "cred_id": row[2],
+            "changed_at": row[3],
+            "credential": {
+                "id": row[4],
+                "supplier": row[5],
+                "environment": row[6],
+                "auth_type": row[7],
+                "data": row[8],
+                "created_by": row[9],
+                "created_at": row[10],
+                "updated_at": row[11],
+                "allow_self_rotation": row[12],
+            } if row[1] != "delete" and row[4] is not None else None,
+        })
+    return changes, len(rows) > limit
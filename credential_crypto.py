@@ -0,0 +1,390 @@
+"""
+Envelope encryption for credentials.data
+Each value is encrypted (AES-256-GCM) with a data key; the data key is
+wrapped by a master key that only the KMS holds and is stored, wrapped,
+in front of every value it encrypted:
+
+    enc:v1:<master key id>:<wrapped data key>:<nonce + ciphertext>
+
+LocalKeyFileKMS stands in for a cloud KMS. Its master keys come from the
+CREDENTIAL_KEYS environment variable (a deploy secret) or else a local JSON
+key file (CREDENTIAL_KEY_FILE, never committed). The key file is created
+on first use, exclusively, so concurrent processes agree on one key; no
+key is ever created while encrypted values exist, since a new key could
+not read them.
+
+Data keys are cached. One data key encrypts new values until it is
+DATA_KEY_TTL seconds old or has encrypted DATA_KEY_MAX_USES values, then a
+new one is generated. Unwrapped data keys stay in an LRU cache for
+DATA_KEY_TTL, so a list read costs one KMS call per distinct data key
+instead of one per row; decrypt_many() decrypts a whole batch that way.
+
+Values without the enc: prefix were written before encryption was turned
+on; they read back unchanged and ensure_encrypted_data() encrypts them.
+"""
+
+import base64
+import binascii
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    CRYPTOGRAPHY_AVAILABLE = True
+except ImportError:
+    CRYPTOGRAPHY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+ENCRYPTION_ENABLED = os.environ.get("CREDENTIAL_ENCRYPTION", "true").lower() == "true"
+KEY_FILE = os.environ.get("CREDENTIAL_KEY_FILE", "credential_keys.json")
+# Master keys as a secret, in the key file's JSON format; takes precedence over the file
+KEYS_ENV = "CREDENTIAL_KEYS"
+DATA_KEY_TTL = float(os.environ.get("DATA_KEY_TTL", "3600"))
+DATA_KEY_MAX_USES = int(os.environ.get("DATA_KEY_MAX_USES", "100000"))
+DATA_KEY_CACHE_SIZE = 256
+
+# New values are encrypted only when enabled and cryptography is installed
+ENCRYPTION_ACTIVE = ENCRYPTION_ENABLED and CRYPTOGRAPHY_AVAILABLE
+if ENCRYPTION_ENABLED and not CRYPTOGRAPHY_AVAILABLE:
+    logger.warning("⚠️ CREDENTIAL_ENCRYPTION is on but cryptography is not installed; storing plaintext")
+
+# Plaintext rows encrypted per step by ensure_encrypted_data
+ENCRYPT_BATCH_SIZE = 500
+
+# How long to wait for a key file another process is creating
+KEY_FILE_WAIT = 5.0
+
+PREFIX = "enc:v1:"
+NONCE_SIZE = 12
+_WRAP_AAD = b"credentials.data key"
+
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode("ascii")
+
+
+def _new_master_key() -> Tuple[str, str]:
+    """(key id, base64 key) for a fresh 256-bit master key"""
+    return f"mk-{time.strftime('%Y%m%d')}-{secrets.token_hex(4)}", _b64(AESGCM.generate_key(bit_length=256))
+
+
+def new_keys_json() -> str:
+    """A fresh CREDENTIAL_KEYS value holding one active master key"""
+    key_id, key = _new_master_key()
+    return json.dumps({"active": key_id, "keys": {key_id: key}})
+
+
+# ==================== KMS ====================
+
+class LocalKeyFileKMS:
+    """
+    KMS stand-in backed by a JSON key file:
+    {"active": "<master key id>", "keys": {"<master key id>": "<base64 key>"}}
+
+    Master keys never leave this object; callers only see wrapped data keys.
+    Rotating the master key wraps new data keys with a new master key and
+    keeps the old ones for decryption.
+
+    keys (the CREDENTIAL_KEYS JSON) replaces the file and is never written
+    anywhere. Without it, a missing key file is created only if create is
+    true; otherwise this raises.
+    """
+
+    def __init__(self, path: str = KEY_FILE, keys: Optional[str] = None, create: bool = True):
+        self.path = path
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._keys: Dict[str, str] = {}
+        self._active: Optional[str] = None
+        self._inline = keys is not None
+        if self._inline:
+            state = json.loads(keys)
+            self._keys, self._active = state["keys"], state["active"]
+            return
+        self._load()
+        if self._active is None:
+            if not create:
+                raise RuntimeError(f"No master key: {KEYS_ENV} is not set and {path} does not exist")
+            self._create()
+
+    def _load(self):
+        deadline = time.monotonic() + KEY_FILE_WAIT
+        while os.path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    state = json.load(f)
+            except json.JSONDecodeError:
+                # Another process created the file and is still writing it
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+                continue
+            self._keys, self._active = state["keys"], state["active"]
+            return
+
+    def _create(self):
+        """Write the first master key with O_EXCL; if another process won the race, use its key"""
+        key_id, key = _new_master_key()
+        try:
+            handle = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            self._load()
+            return
+        with os.fdopen(handle, "w") as f:
+            json.dump({"active": key_id, "keys": {key_id: key}}, f, indent=2)
+        self._keys, self._active = {key_id: key}, key_id
+        logger.info(f"🔑 Created master key {key_id} in {self.path}")
+
+    def _save(self):
+        temp = f"{self.path}.{os.getpid()}.tmp"
+        handle = os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(handle, "w") as f:
+            json.dump({"active": self._active, "keys": self._keys}, f, indent=2)
+        os.replace(temp, self.path)
+
+    def _master(self, key_id: str) -> "AESGCM":
+        if key_id not in self._keys:
+            # Another process may have rotated the master key since we loaded the file
+            self._load()
+        if key_id not in self._keys:
+            raise KeyError(f"Unknown master key {key_id}")
+        return AESGCM(base64.b64decode(self._keys[key_id]))
+
+    def rotate_master_key(self) -> str:
+        """Make a new master key the active one; returns its id"""
+        if self._inline:
+            raise RuntimeError(f"Master keys come from {KEYS_ENV}; add the new key there")
+        with self._lock:
+            # Keep keys another process added since we loaded the file
+            self._load()
+            key_id, key = _new_master_key()
+            self._keys[key_id] = key
+            self._active = key_id
+            self._save()
+            logger.info(f"🔑 Master key {key_id} is now active")
+            return key_id
+
+    def generate_data_key(self) -> Tuple[str, bytes, bytes]:
+        """(master key id, data key, data key wrapped by that master key)"""
+        with self._lock:
+            self.calls += 1
+            key_id = self._active
+            master = self._master(key_id)
+        data_key = AESGCM.generate_key(bit_length=256)
+        nonce = os.urandom(NONCE_SIZE)
+        return key_id, data_key, nonce + master.encrypt(nonce, data_key, _WRAP_AAD)
+
+    def decrypt_data_key(self, key_id: str, wrapped: bytes) -> bytes:
+        with self._lock:
+            self.calls += 1
+            master = self._master(key_id)
+        return master.decrypt(wrapped[:NONCE_SIZE], wrapped[NONCE_SIZE:], _WRAP_AAD)
+
+
+# ==================== Cipher ====================
+
+class _DataKey:
+    __slots__ = ("header", "aead", "created", "uses")
+
+    def __init__(self, header: str, aead: "AESGCM", created: float):
+        self.header = header
+        self.aead = aead
+        self.created = created
+        self.uses = 0
+
+
+class CredentialCipher:
+    """Encrypts and decrypts data column values with cached data keys"""
+
+    def __init__(self, kms: LocalKeyFileKMS, ttl: float = DATA_KEY_TTL,
+                 max_uses: int = DATA_KEY_MAX_USES, cache_size: int = DATA_KEY_CACHE_SIZE):
+        self.kms = kms
+        self.ttl = ttl
+        self.max_uses = max_uses
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._active: Optional[_DataKey] = None
+        # value header (everything before the ciphertext) -> (AESGCM, expires)
+        self._keys: "OrderedDict[str, Tuple[AESGCM, float]]" = OrderedDict()
+
+    def _remember(self, header: str, aead: "AESGCM", now: float):
+        # Caller holds self._lock
+        self._keys[header] = (aead, now + self.ttl)
+        self._keys.move_to_end(header)
+        while len(self._keys) > self.cache_size:
+            self._keys.popitem(last=False)
+
+    def _encryption_key(self) -> _DataKey:
+        now = time.monotonic()
+        with self._lock:
+            active = self._active
+            if active is None or now - active.created > self.ttl or active.uses >= self.max_uses:
+                key_id, data_key, wrapped = self.kms.generate_data_key()
+                active = self._active = _DataKey(f"{PREFIX}{key_id}:{_b64(wrapped)}:", AESGCM(data_key), now)
+                self._remember(active.header, active.aead, now)
+            active.uses += 1
+            return active
+
+    def _decryption_key(self, header: str) -> "AESGCM":
+        now = time.monotonic()
+        with self._lock:
+            cached = self._keys.get(header)
+            if cached is not None and cached[1] > now:
+                self._keys.move_to_end(header)
+                return cached[0]
+
+        key_id, wrapped = header[len(PREFIX):-1].split(":")
+        aead = AESGCM(self.kms.decrypt_data_key(key_id, base64.b64decode(wrapped)))
+        with self._lock:
+            self._remember(header, aead, now)
+        return aead
+
+    def rotate_data_key(self):
+        """Encrypt new values with a fresh data key from now on"""
+        with self._lock:
+            self._active = None
+
+    def encrypt(self, plaintext: str) -> str:
+        key = self._encryption_key()
+        nonce = os.urandom(NONCE_SIZE)
+        return key.header + _b64(nonce + key.aead.encrypt(nonce, plaintext.encode(), None))
+
+    def decrypt(self, value: Optional[str]) -> Optional[str]:
+        return self.decrypt_many([value])[0]
+
+    def decrypt_many(self, values: Iterable[Optional[str]]) -> List[Optional[str]]:
+        """Decrypt a batch; each distinct data key is looked up (and unwrapped) once"""
+        keys: Dict[str, AESGCM] = {}
+        header, aead = None, None
+        decrypted = []
+        for value in values:
+            if value is None:
+                decrypted.append(value)
+                continue
+            # Rows written together share a data key: reuse the previous row's before any lookup
+            if header is None or not value.startswith(header):
+                if not value.startswith(PREFIX):
+                    decrypted.append(value)
+                    continue
+                header = value[:value.rindex(":") + 1]
+                aead = keys.get(header)
+                if aead is None:
+                    aead = keys[header] = self._decryption_key(header)
+            blob = binascii.a2b_base64(value[len(header):])
+            decrypted.append(aead.decrypt(blob[:NONCE_SIZE], blob[NONCE_SIZE:], None).decode())
+        return decrypted
+
+
+_cipher: Optional[CredentialCipher] = None
+_cipher_lock = threading.Lock()
+
+
+def get_cipher(create_key: bool = True) -> CredentialCipher:
+    """Process-wide cipher over CREDENTIAL_KEYS or the key file (creating it only if create_key)"""
+    global _cipher
+    if not CRYPTOGRAPHY_AVAILABLE:
+        raise RuntimeError("Credential encryption needs the cryptography package (pip install cryptography)")
+    with _cipher_lock:
+        if _cipher is None:
+            _cipher = CredentialCipher(LocalKeyFileKMS(KEY_FILE, keys=os.environ.get(KEYS_ENV),
+                                                       create=create_key))
+        return _cipher
+
+
+# ==================== Column helpers ====================
+
+def encrypt_data(value: str) -> str:
+    """Stored form of a data column value"""
+    return get_cipher().encrypt(value) if ENCRYPTION_ACTIVE else value
+
+
+def decrypt_many(values: Iterable[Optional[str]]) -> List[Optional[str]]:
+    """Plaintext data column values; only builds the cipher if some value is encrypted"""
+    values = list(values)
+    if _cipher is None and not any(value is not None and value.startswith(PREFIX) for value in values):
+        return values
+    # A new master key could not decrypt these: never create one here
+    return get_cipher(create_key=False).decrypt_many(values)
+
+
+def decrypt_data(value: Optional[str]) -> Optional[str]:
+    return decrypt_many([value])[0]
+
+
+def decrypt_rows(rows: List[Dict], column: str = "data") -> List[Dict]:
+    """Decrypt one column of a list of row dicts in place, as one batch"""
+    for row, value in zip(rows, decrypt_many(row[column] for row in rows)):
+        row[column] = value
+    return rows
+
+
+class DecryptingCursor:
+    """Executed cursor whose fetchmany() decrypts one column, batch by batch (for streamed exports)"""
+
+    def __init__(self, cursor, column: str = "data"):
+        self._cursor = cursor
+        self._column = column
+        self._index: Optional[int] = None
+
+    def fetchmany(self, size: int):
+        rows = self._cursor.fetchmany(size)
+        if not rows:
+            return rows
+        if self._index is None:
+            # Server-side cursors only describe their columns after the first fetch
+            self._index = [description[0] for description in self._cursor.description].index(self._column)
+        i = self._index
+        values = decrypt_many(row[i] for row in rows)
+        return [tuple(row[:i]) + (value,) + tuple(row[i + 1:]) for row, value in zip(rows, values)]
+
+    def __getattr__(self, name: str):
+        return getattr(self._cursor, name)
+
+
+def ensure_encrypted_data(conn):
+    """Encrypt data values still stored as plaintext (nothing to do while encryption is off)"""
+    if not ENCRYPTION_ACTIVE:
+        return
+
+    cursor = conn.cursor()
+    # A lost key file must fail loudly, not be replaced by a key that cannot read these rows
+    cursor.execute("SELECT 1 FROM credentials WHERE data LIKE ? LIMIT 1", (PREFIX + "%",))
+    if cursor.fetchone() is not None and _cipher is None:
+        try:
+            get_cipher(create_key=False)
+        except RuntimeError as e:
+            raise RuntimeError(f"Encrypted credentials exist but their master key is missing ({e}). "
+                               f"Restore the key file or set {KEYS_ENV}; no new key was created.") from None
+    cipher = get_cipher()
+    last_id = 0
+    encrypted = 0
+    while True:
+        cursor.execute("""
+            SELECT id, data FROM credentials
+            WHERE data NOT LIKE ? AND id > ?
+            ORDER BY id
+            LIMIT ?
+        """, (PREFIX + "%", last_id, ENCRYPT_BATCH_SIZE))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        for cred_id, data in rows:
+            cursor.execute("UPDATE credentials SET data = ? WHERE id = ?", (cipher.encrypt(data), cred_id))
+        encrypted += len(rows)
+        last_id = rows[-1][0]
+
+    conn.commit()
+    if encrypted:
+        logger.info(f"🔐 Encrypted {encrypted} plaintext credentials")
+
+
+if __name__ == "__main__":
+    # Value for the CREDENTIAL_KEYS secret of a new deploy
+    print(new_keys_json())
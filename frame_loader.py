@@ -0,0 +1,62 @@
+"""
+Typed DataFrames straight from SQL
+Rows go from the cursor into a DataFrame in one call; low-cardinality text
+columns become categoricals and timestamps are parsed in one vectorized
+to_datetime call, so nothing runs Python code per row.
+"""
+
+from typing import Iterable, Sequence
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Rows fetched and typed per step
+FRAME_BATCH_SIZE = 10000
+
+
+def read_frame(conn, sql: str, params: Sequence = (), categories: Iterable[str] = (),
+               datetimes: Iterable[str] = (), batch_size: int = FRAME_BATCH_SIZE) -> pd.DataFrame:
+    """
+    Run a query and return its rows as a typed DataFrame.
+
+    Rows are fetched and typed batch by batch, so only one batch of Python
+    row tuples is alive at a time.
+    """
+    categories, datetimes = list(categories), list(datetimes)
+    cursor = conn.execute(sql, params)
+    columns = [description[0] for description in cursor.description]
+
+    frames = []
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        frame = pd.DataFrame.from_records(rows, columns=columns)
+        del rows
+        for column in datetimes:
+            frame[column] = parse_datetimes(frame[column])
+        for column in categories:
+            frame[column] = frame[column].astype("category")
+        frames.append(frame)
+
+    if not frames:
+        frame = pd.DataFrame(columns=columns)
+        for column in datetimes:
+            frame[column] = parse_datetimes(frame[column])
+        for column in categories:
+            frame[column] = frame[column].astype("category")
+        return frame
+    if len(frames) == 1:
+        return frames[0]
+
+    # Batches have their own category sets; merge them instead of falling back to object
+    merged = {column: union_categoricals([frame[column] for frame in frames]) for column in categories}
+    frame = pd.concat([frame.drop(columns=categories) for frame in frames], ignore_index=True)
+    for column in categories:
+        frame[column] = merged[column]
+    return frame[columns]
+
+
+def parse_datetimes(values: pd.Series) -> pd.Series:
+    """ISO 8601 strings (with or without microseconds) to datetime64; bad values become NaT"""
+    return pd.to_datetime(values, format="ISO8601", errors="coerce")
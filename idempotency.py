@@ -0,0 +1,198 @@
+"""
+Idempotency keys for unsafe API requests (create, rotate)
+A client that retries with the same Idempotency-Key gets the first
+response back instead of a second credential or a second rotation:
+
+  first request   claims the key (status in_progress), runs, then stores
+                  its status code and response body (status completed)
+  replay          same key and request fingerprint: the stored response,
+                  nothing is run again
+  concurrent      same key while the first is still in progress: waits for
+                  it (in-process event, polling across processes), then
+                  replays its response
+  other request   same key, different method, path or body: rejected
+
+Keys are scoped per API user and kept for IDEMPOTENCY_TTL seconds; a
+background thread deletes expired keys in batches. Only successful
+responses are stored: if the request fails, the key is released so the
+retry runs it again. A request that outlives its lock may be taken over
+by a retry; its late completion or release then leaves the new claim
+alone (both match on the claim's created_at). Stored responses may contain secrets and are
+encrypted like credentials.data.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from credential_crypto import decrypt_data, encrypt_data
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL = float(os.environ.get("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_LOCK_TIMEOUT = float(os.environ.get("IDEMPOTENCY_LOCK_TIMEOUT", "60"))
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.environ.get("IDEMPOTENCY_WAIT_TIMEOUT", "30"))
+IDEMPOTENCY_CLEANUP_INTERVAL = float(os.environ.get("IDEMPOTENCY_CLEANUP_INTERVAL", "300"))
+IDEMPOTENCY_CLEANUP_BATCH = 500
+IDEMPOTENCY_POLL_INTERVAL = 0.05
+
+MAX_KEY_LENGTH = 255
+
+
+def ensure_idempotency_schema(conn: sqlite3.Connection):
+    """Key table plus the expiry index the cleanup scans (same DDL on both backends)"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            scope TEXT NOT NULL,
+            key TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            status TEXT NOT NULL,
+            status_code INTEGER,
+            response TEXT,
+            created_at TEXT NOT NULL,
+            locked_until TEXT,
+            expires_at TEXT NOT NULL,
+            PRIMARY KEY (scope, key)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys (expires_at)")
+    conn.commit()
+
+
+def request_fingerprint(method: str, path: str, body: Any = None) -> str:
+    """sha256 of the method, path and canonical JSON body"""
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{method} {path}\n{canonical}".encode()).hexdigest()
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used for a different request"""
+
+
+class IdempotencyInProgress(Exception):
+    """The first request with this key did not finish within the wait timeout"""
+
+
+class IdempotencyStore:
+    """Runs requests at most once per (scope, key) and expires keys in the background"""
+
+    def __init__(self, storage, ttl: float = IDEMPOTENCY_TTL,
+                 lock_timeout: float = IDEMPOTENCY_LOCK_TIMEOUT,
+                 wait_timeout: float = IDEMPOTENCY_WAIT_TIMEOUT,
+                 cleanup_interval: float = IDEMPOTENCY_CLEANUP_INTERVAL,
+                 cleanup_batch: int = IDEMPOTENCY_CLEANUP_BATCH):
+        self.storage = storage
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.cleanup_interval = cleanup_interval
+        self.cleanup_batch = cleanup_batch
+        # (scope, key) -> set when the in-flight request in this process finishes
+        self._events: Dict[Tuple[str, str], asyncio.Event] = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    async def run(self, scope: str, key: str, fingerprint: str,
+                  operation: Callable[[], Awaitable[Tuple[int, Any]]]) -> Tuple[int, Any, bool]:
+        """
+        (status code, response body, replayed). operation() returns the
+        status code and JSON-serializable body to store.
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            now = datetime.now()
+            # The claim's created_at: complete/release only touch the row while it is still this claim
+            claimed_at = now.isoformat()
+            existing = self.storage.claim_idempotency_key(
+                scope, key, fingerprint,
+                now=claimed_at,
+                locked_until=(now + timedelta(seconds=self.lock_timeout)).isoformat(),
+                expires_at=(now + timedelta(seconds=self.ttl)).isoformat()
+            )
+            if existing is None:
+                break  # Claimed: this request runs
+            if existing["fingerprint"] != fingerprint:
+                raise IdempotencyConflict(key)
+            if existing["status"] == "completed":
+                return existing["status_code"], json.loads(decrypt_data(existing["response"])), True
+            await self._wait(scope, key, deadline)
+
+        event = self._events[(scope, key)] = asyncio.Event()
+        try:
+            status_code, body = await operation()
+        except BaseException:
+            self.storage.release_idempotency_key(scope, key, claimed_at)
+            raise
+        else:
+            if not self.storage.complete_idempotency_key(scope, key, claimed_at, status_code,
+                                                         encrypt_data(json.dumps(body))):
+                logger.warning(f"Idempotency key {key} was taken over after its lock expired; response not stored")
+            return status_code, body, False
+        finally:
+            self._events.pop((scope, key), None)
+            event.set()
+
+    async def _wait(self, scope: str, key: str, deadline: float):
+        """Until the in-flight request may have finished: its event here, or one poll interval"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise IdempotencyInProgress(key)
+        event = self._events.get((scope, key))
+        if event is None:
+            # In flight in another process (or just finishing here): poll the table
+            await asyncio.sleep(min(IDEMPOTENCY_POLL_INTERVAL, remaining))
+            return
+        try:
+            await asyncio.wait_for(event.wait(), remaining)
+        except asyncio.TimeoutError:
+            raise IdempotencyInProgress(key)
+
+    # ---------- cleanup ----------
+
+    def delete_expired(self) -> int:
+        """Delete every expired key, one batch per write transaction"""
+        total = 0
+        while not self._stop.is_set():
+            deleted = self.storage.delete_expired_idempotency_keys(datetime.now().isoformat(), self.cleanup_batch)
+            total += deleted
+            if deleted < self.cleanup_batch:
+                break
+        return total
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                deleted = self.delete_expired()
+                if deleted:
+                    logger.info(f"🧹 Deleted {deleted} expired idempotency keys")
+            except Exception as e:
+                logger.error(f"Idempotency key cleanup error: {e}")
+            self._stop.wait(self.cleanup_interval)
+
+    def start(self):
+        """Start the background cleanup thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="idempotency-cleanup", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Signal the cleanup thread to stop after its current batch"""
+        self._stop.set()
+
+    def join(self, timeout: float = 5.0):
+        """Wait for the thread to exit after stop()"""
+        if self._thread:
+            self._thread.join(timeout)
+
+    def is_alive(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
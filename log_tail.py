@@ -0,0 +1,100 @@
+"""
+Incremental log tailing
+Finds the last N lines by seeking backward from the end of the file, then
+follows it by byte offset, so each refresh reads only the bytes appended
+since the previous one. Rotation (new inode) and truncation (file shorter
+than the saved offset) restart the tail from the end of the current file.
+"""
+
+import os
+from collections import deque
+from typing import List, Optional, Tuple
+
+TAIL_CHUNK_SIZE = 64 * 1024
+
+
+def read_last_lines(path: str, count: int, chunk_size: int = TAIL_CHUNK_SIZE) -> Tuple[List[str], int]:
+    """
+    Last `count` complete lines of a file and the byte offset they end at.
+
+    Reads fixed-size blocks backward from the end until enough newlines are
+    seen, so the cost depends on line length, not file size. A trailing line
+    without a newline (still being written) is left for the next read.
+    """
+    with open(path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        data = b""
+        while position > 0 and data.count(b"\n") <= count:
+            step = min(chunk_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+
+    # Drop the unfinished last line, if any
+    complete_end = data.rfind(b"\n") + 1
+    offset = position + complete_end
+    lines = data[:complete_end].splitlines(keepends=True)
+    if position > 0 and lines:
+        # The first line is probably cut off by where the scan stopped
+        lines = lines[1:]
+    return [line.decode("utf-8", errors="replace") for line in lines[-count:]], offset
+
+
+class LogTail:
+    """
+    Keeps the last `max_lines` lines of a growing log file.
+
+    Call refresh() as often as you like: it stats the file, reads only new
+    bytes (or re-tails after rotation/truncation) and returns the lines.
+    """
+
+    def __init__(self, path: str, max_lines: int = 50, chunk_size: int = TAIL_CHUNK_SIZE):
+        self.path = path
+        self.max_lines = max_lines
+        self.chunk_size = chunk_size
+        self.lines = deque(maxlen=max_lines)
+        self.offset = 0
+        self.file_id: Optional[Tuple[int, int]] = None
+        self.last_event = ""
+
+    def _reset(self, reason: str):
+        lines, self.offset = read_last_lines(self.path, self.max_lines, self.chunk_size)
+        self.lines.clear()
+        self.lines.extend(lines)
+        self.last_event = reason
+
+    def refresh(self) -> List[str]:
+        """Current last lines; raises FileNotFoundError if the log is missing"""
+        stat = os.stat(self.path)
+        file_id = (stat.st_dev, stat.st_ino)
+
+        if self.file_id is None:
+            self.file_id = file_id
+            self._reset("")
+        elif file_id != self.file_id:
+            self.file_id = file_id
+            self._reset("rotated")
+        elif stat.st_size < self.offset:
+            self._reset("truncated")
+        elif stat.st_size > self.offset:
+            if stat.st_size - self.offset > self.chunk_size * 4:
+                # Far behind: only the end matters, skip the middle
+                self._reset("")
+            else:
+                self._read_new_bytes(stat.st_size)
+
+        return list(self.lines)
+
+    def _read_new_bytes(self, size: int):
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+
+        # Only consume complete lines; a partial line is re-read next time
+        complete_end = data.rfind(b"\n") + 1
+        if not complete_end:
+            return
+        self.offset += complete_end
+        for line in data[:complete_end].splitlines(keepends=True):
+            self.lines.append(line.decode("utf-8", errors="replace"))
@@ -0,0 +1,85 @@
+"""
+Masked credential projections
+One masking rule for the API and the Streamlit app. The masked form of a
+credential is computed when its data is written and stored next to it in
+credentials.masked_data, so reads for roles without view_unmasked select
+that column alone and never load or decode the secret payload.
+"""
+
+import json
+import sqlite3
+from typing import Dict, Optional
+
+from credential_crypto import decrypt_data
+
+MASK_PREFIX = "*****"
+
+# Rows masked per step when filling masked_data for existing credentials
+BACKFILL_BATCH_SIZE = 500
+
+
+def mask_secret(value: Optional[str]) -> str:
+    """*****<last 4 characters>, or just ***** for short or missing secrets"""
+    value = str(value or "")
+    return MASK_PREFIX + value[-4:] if len(value) > 4 else MASK_PREFIX
+
+
+def mask_credential_data(data: Dict, auth_type: str) -> Dict:
+    """
+    The masked form of a credential's data: secrets keep only their last 4
+    characters, usernames are shown, and fields of unknown auth types are
+    left out rather than guessed at.
+    """
+    if auth_type == "api_key":
+        return {"api_key": mask_secret(data.get("api_key"))}
+    if auth_type == "username_password":
+        return {
+            "username": data.get("username", ""),
+            "password": mask_secret(data.get("password")),
+        }
+    return {}
+
+
+def masked_json(data: str, auth_type: str) -> str:
+    """masked_data column value for a JSON-encoded data column value"""
+    return json.dumps(mask_credential_data(json.loads(data), auth_type))
+
+
+def _has_column(cursor, table: str, column: str, dialect: str) -> bool:
+    if dialect == "postgresql":
+        cursor.execute(
+            "SELECT 1 FROM information_schema.columns WHERE table_name = ? AND column_name = ?",
+            (table, column)
+        )
+        return cursor.fetchone() is not None
+    cursor.execute(f"PRAGMA table_info({table})")
+    return any(row[1] == column for row in cursor.fetchall())
+
+
+def ensure_masked_data_column(conn: sqlite3.Connection, dialect: str = "sqlite"):
+    """
+    Add credentials.masked_data if missing and fill it for rows that lack it
+    (credentials written before the column existed)
+    """
+    cursor = conn.cursor()
+    if not _has_column(cursor, "credentials", "masked_data", dialect):
+        cursor.execute("ALTER TABLE credentials ADD COLUMN masked_data TEXT")
+
+    last_id = 0
+    while True:
+        cursor.execute("""
+            SELECT id, auth_type, data FROM credentials
+            WHERE masked_data IS NULL AND id > ?
+            ORDER BY id
+            LIMIT ?
+        """, (last_id, BACKFILL_BATCH_SIZE))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        for cred_id, auth_type, data in rows:
+            # Only masked_data changes; updated_at is left alone
+            cursor.execute("UPDATE credentials SET masked_data = ? WHERE id = ?",
+                           (masked_json(decrypt_data(data), auth_type), cred_id))
+        last_id = rows[-1][0]
+
+    conn.commit()
@@ -0,0 +1,50 @@
+"""
+Python client SDK for the Nezasa Connect Credential Management API
+
+    from nezasa_client import Client
+
+    with Client(api_key="admin_key_123", base_url="http://localhost:8000") as client:
+        for change in client.iter_changes():
+            ...
+        client.rotate_credentials([1, 2, 3])
+
+AsyncClient offers the same methods as coroutines (requires httpx).
+"""
+
+from .async_client import AsyncClient
+from .client import Client
+from .errors import APIError, AuthenticationError, NotFoundError, PermissionDeniedError, TransportError
+from .models import (
+    AuditLog, AuditStats, AuditStatsBucket, BatchItem, BatchResult, Credential, CredentialChange,
+    CredentialChanges, ExportFile, Health, QueryStatement, QueryStats, RotateResult, RotationPolicy,
+    RotationSchedulerStatus, SearchHit, SearchPage, SlowQuery, SupplierAdapterStatus,
+)
+
+__all__ = [
+    "AsyncClient",
+    "Client",
+    "APIError",
+    "AuthenticationError",
+    "NotFoundError",
+    "PermissionDeniedError",
+    "TransportError",
+    "AuditLog",
+    "AuditStats",
+    "AuditStatsBucket",
+    "BatchItem",
+    "BatchResult",
+    "Credential",
+    "CredentialChange",
+    "CredentialChanges",
+    "ExportFile",
+    "Health",
+    "QueryStatement",
+    "QueryStats",
+    "RotateResult",
+    "RotationPolicy",
+    "RotationSchedulerStatus",
+    "SearchHit",
+    "SearchPage",
+    "SlowQuery",
+    "SupplierAdapterStatus",
+]
@@ -0,0 +1,167 @@
+"""
+Transport-independent pieces shared by the sync and async clients:
+retry policy, response cache and request/response helpers.
+"""
+
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from .errors import error_for_status
+
+DEFAULT_BASE_URL = os.environ.get("NEZASA_API_URL", "https://vibe-coding-project-production.up.railway.app")
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONCURRENCY = 8
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 30.0
+
+# Largest pages the API accepts, so iterators make as few round trips as possible
+CHANGES_PAGE_SIZE = 5000
+SEARCH_PAGE_SIZE = 100
+AUDIT_PAGE_SIZE = 1000
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS"})
+
+# Sent with an Idempotency-Key, the same on every retry, so the API runs them
+# once however often they are retried
+KEYED_METHODS = frozenset({"POST"})
+
+# Export downloads are written to disk in chunks of this many bytes
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# 429 means the request was refused before it ran, so any method may retry it;
+# gateway errors may have reached the app and are retried only when idempotent
+RETRY_ANY_METHOD_STATUSES = frozenset({429})
+RETRY_IDEMPOTENT_STATUSES = frozenset({502, 503, 504})
+
+_MISSING = object()
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, honouring Retry-After"""
+
+    def __init__(self, max_retries: int = 3, backoff: float = 0.2, max_backoff: float = 5.0):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def retry_status(self, method: str, status_code: int, attempt: int, keyed: bool = False) -> bool:
+        if attempt >= self.max_retries:
+            return False
+        if status_code in RETRY_ANY_METHOD_STATUSES:
+            return True
+        return status_code in RETRY_IDEMPOTENT_STATUSES and (keyed or method in IDEMPOTENT_METHODS)
+
+    def retry_error(self, method: str, request_sent: bool, attempt: int, keyed: bool = False) -> bool:
+        """
+        A connection failure before the request was sent is safe to retry for
+        any method; after it, only idempotent or Idempotency-Key requests are
+        """
+        if attempt >= self.max_retries:
+            return False
+        return not request_sent or keyed or method in IDEMPOTENT_METHODS
+
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+
+class ResponseCache:
+    """
+    Small TTL + LRU cache of decoded GET responses.
+
+    The owning client clears it after each of its own writes; changes made
+    by other clients show up once the TTL expires.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def clean_params(params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Query parameters without the ones left at None"""
+    return {key: value for key, value in (params or {}).items() if value is not None}
+
+
+def cache_key(path: str, params: Dict[str, Any]) -> Hashable:
+    return path, tuple(sorted(params.items()))
+
+
+def idempotency_headers(method: str, idempotency_key: Optional[str] = None) -> Dict[str, str]:
+    """Idempotency-Key header for a POST (a new key per call unless one is given), else none"""
+    if method not in KEYED_METHODS:
+        return {}
+    return {"Idempotency-Key": idempotency_key or uuid.uuid4().hex}
+
+
+
+def raise_for_error(status_code: int, body: Any, text: str):
+    """Raise the matching APIError for a non-2xx response"""
+    if 200 <= status_code < 300:
+        return
+    detail = body.get("detail", text) if isinstance(body, dict) else (text or "Unknown error")
+    raise error_for_status(status_code, str(detail))
+
+
+def update_body(supplier: Optional[str], environment: Optional[str], auth_type: Optional[str],
+                data: Optional[Dict[str, Any]], allow_self_rotation: Optional[bool]) -> Dict[str, Any]:
+    """PUT body with only the fields being changed"""
+    return clean_params({
+        "supplier": supplier,
+        "environment": environment,
+        "auth_type": auth_type,
+        "data": data,
+        "allow_self_rotation": allow_self_rotation,
+    })
+
+
+def next_audit_until(page: list, seen_ids: set) -> Optional[str]:
+    """
+    `until` for the next newest-first audit page, or None when done.
+
+    `until` is exclusive, so the next page starts just after the oldest
+    timestamp seen; rows sharing that timestamp come back again and are
+    skipped by id (seen_ids holds the ids at that timestamp).
+    """
+    if not page:
+        return None
+    oldest = page[-1]["timestamp"]
+    seen_ids.clear()
+    seen_ids.update(row["id"] for row in page if row["timestamp"] == oldest)
+    return (datetime.fromisoformat(oldest) + timedelta(microseconds=1)).isoformat()
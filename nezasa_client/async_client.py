@@ -0,0 +1,348 @@
+"""
+Asynchronous client for the Credential Management API (httpx)
+Same methods as Client, as coroutines; iterators are async generators.
+"""
+
+import asyncio
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional dependency
+    httpx = None
+
+from ._core import (
+    AUDIT_PAGE_SIZE, CHANGES_PAGE_SIZE, DEFAULT_BASE_URL, DEFAULT_CONCURRENCY, DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_POOL_SIZE, DEFAULT_READ_TIMEOUT, DOWNLOAD_CHUNK_SIZE, SEARCH_PAGE_SIZE, _MISSING, ResponseCache,
+    RetryPolicy, cache_key, clean_params, idempotency_headers, next_audit_until, raise_for_error, update_body,
+)
+from .errors import TransportError
+from .models import (
+    AuditLog, AuditStats, BatchItem, BatchResult, Credential, CredentialChange, CredentialChanges, ExportFile,
+    Health, QueryStats, RotateResult, RotationPolicy, RotationSchedulerStatus, SearchHit, SearchPage,
+    SupplierAdapterStatus,
+)
+
+
+class AsyncClient:
+    """
+    asyncio client; create one per event loop and share it.
+
+    Requires httpx (pip install httpx). Options match Client, including
+    unix_socket and app; here app is called on the running event loop
+    (httpx.ASGITransport) and, as under an ASGI server, whoever owns the
+    app runs its startup and shutdown.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, base_url: str = DEFAULT_BASE_URL, *,
+                 pool_size: int = DEFAULT_POOL_SIZE, concurrency: int = DEFAULT_CONCURRENCY,
+                 timeout: Tuple[float, float] = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT),
+                 max_retries: int = 3, backoff: float = 0.2, cache_ttl: Optional[float] = None,
+                 unix_socket: Optional[str] = None, app=None):
+        if httpx is None:
+            raise ImportError("AsyncClient requires httpx: pip install httpx")
+        api_key = api_key or os.environ.get("NEZASA_API_KEY")
+        if not api_key:
+            raise ValueError("api_key is required (or set NEZASA_API_KEY)")
+
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.retry = RetryPolicy(max_retries, backoff)
+        self.cache = ResponseCache(cache_ttl) if cache_ttl else None
+
+        connect_timeout, read_timeout = timeout
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        if app is not None:
+            transport = httpx.ASGITransport(app=app)
+        elif unix_socket:
+            transport = httpx.AsyncHTTPTransport(uds=unix_socket, limits=limits)
+        else:
+            transport = None
+        self.http = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"X-API-Key": api_key, "Accept": "application/json"},
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=limits,
+            transport=transport,
+        )
+
+    # ==================== Transport ====================
+
+    async def _send(self, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+                    json: Optional[Dict[str, Any]] = None, idempotency_key: Optional[str] = None,
+                    stream: bool = False) -> "httpx.Response":
+        """Send with retries; a POST keeps one Idempotency-Key across its attempts"""
+        headers = idempotency_headers(method, idempotency_key)
+        attempt = 0
+        while True:
+            try:
+                request = self.http.build_request(method, path, params=params, json=json, headers=headers)
+                response = await self.http.send(request, stream=stream)
+            except httpx.TransportError as e:
+                request_sent = not isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                if self.retry.retry_error(method, request_sent, attempt, bool(headers)):
+                    await asyncio.sleep(self.retry.delay(attempt))
+                    attempt += 1
+                    continue
+                raise TransportError(f"{method} {path} failed: {e}", e) from e
+
+            if self.retry.retry_status(method, response.status_code, attempt, bool(headers)):
+                await response.aclose()
+                await asyncio.sleep(self.retry.delay(attempt, response.headers.get("Retry-After")))
+                attempt += 1
+                continue
+            return response
+
+    @staticmethod
+    def _body(response: "httpx.Response") -> Any:
+        try:
+            return response.json() if response.content else None
+        except ValueError:
+            return None
+
+    async def _request(self, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+                       json: Optional[Dict[str, Any]] = None, idempotency_key: Optional[str] = None) -> Any:
+        params = clean_params(params)
+        key = cache_key(path, params) if self.cache and method == "GET" else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not _MISSING:
+                return cached
+
+        response = await self._send(method, path, params, json, idempotency_key)
+        body = self._body(response)
+        raise_for_error(response.status_code, body, response.text)
+
+        if key is not None:
+            self.cache.put(key, body)
+        elif method != "GET" and self.cache:
+            self.cache.clear()
+        return body
+
+    async def _download(self, path: str, params: Dict[str, Any], dest: str) -> ExportFile:
+        """Stream a GET response body into the file dest"""
+        response = await self._send("GET", path, clean_params(params), stream=True)
+        try:
+            if response.status_code >= 300:
+                await response.aread()
+                raise_for_error(response.status_code, self._body(response), response.text)
+            with open(dest, "wb") as f:
+                async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+        finally:
+            await response.aclose()
+        return ExportFile(dest, int(response.headers.get("X-Export-Rows", 0)),
+                          response.headers.get("Content-Type", ""))
+
+    async def _batch(self, fn: Callable[[Any], Awaitable], inputs: List[Any],
+                     concurrency: Optional[int]) -> BatchResult:
+        items = [BatchItem(input=value) for value in inputs]
+        semaphore = asyncio.Semaphore(max(1, concurrency or self.concurrency))
+
+        async def run(item: BatchItem):
+            async with semaphore:
+                try:
+                    item.result = await fn(item.input)
+                except Exception as e:
+                    item.error = e
+
+        await asyncio.gather(*(run(item) for item in items))
+        return BatchResult(items)
+
+    async def aclose(self):
+        await self.http.aclose()
+
+    async def __aenter__(self) -> "AsyncClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    # ==================== Health ====================
+
+    async def health(self) -> Health:
+        return Health.from_dict(await self._request("GET", "/"))
+
+    # ==================== Credentials ====================
+
+    async def create_credential(self, supplier: str, environment: str, auth_type: str, data: Dict[str, Any],
+                                allow_self_rotation: bool = False,
+                                idempotency_key: Optional[str] = None) -> Credential:
+        """Create a credential; pass idempotency_key to make a later retry of this call safe too"""
+        body = {
+            "supplier": supplier,
+            "environment": environment,
+            "auth_type": auth_type,
+            "data": data,
+            "allow_self_rotation": allow_self_rotation,
+        }
+        return Credential.from_dict(await self._request("POST", "/api/v1/credentials", json=body,
+                                                        idempotency_key=idempotency_key))
+
+    async def list_credentials(self, supplier: Optional[str] = None,
+                               environment: Optional[str] = None) -> List[Credential]:
+        body = await self._request("GET", "/api/v1/credentials", {"supplier": supplier, "environment": environment})
+        return [Credential.from_dict(credential) for credential in body["credentials"]]
+
+    async def get_credential(self, credential_id: int) -> Credential:
+        return Credential.from_dict(await self._request("GET", f"/api/v1/credentials/{credential_id}"))
+
+    async def update_credential(self, credential_id: int, *, supplier: Optional[str] = None,
+                                environment: Optional[str] = None, auth_type: Optional[str] = None,
+                                data: Optional[Dict[str, Any]] = None,
+                                allow_self_rotation: Optional[bool] = None) -> Credential:
+        body = update_body(supplier, environment, auth_type, data, allow_self_rotation)
+        return Credential.from_dict(await self._request("PUT", f"/api/v1/credentials/{credential_id}", json=body))
+
+    async def rotate_credential(self, credential_id: int, idempotency_key: Optional[str] = None) -> RotateResult:
+        """Rotate a credential; pass idempotency_key to make a later retry of this call safe too"""
+        return RotateResult.from_dict(await self._request("POST", f"/api/v1/credentials/{credential_id}/rotate",
+                                                          idempotency_key=idempotency_key))
+
+    async def delete_credential(self, credential_id: int) -> None:
+        await self._request("DELETE", f"/api/v1/credentials/{credential_id}")
+
+    async def get_changes(self, since: int = 0, limit: int = CHANGES_PAGE_SIZE) -> CredentialChanges:
+        return CredentialChanges.from_dict(
+            await self._request("GET", "/api/v1/credentials/changes", {"since": since, "limit": limit}))
+
+    async def iter_changes(self, since: int = 0,
+                           page_size: int = CHANGES_PAGE_SIZE) -> AsyncIterator[CredentialChange]:
+        """Every change after `since`; store the last change's seq to resume from"""
+        while True:
+            page = await self.get_changes(since, page_size)
+            for change in page.changes:
+                yield change
+            if not page.has_more:
+                return
+            since = page.next_since
+
+    # ==================== Batches ====================
+
+    async def create_credentials(self, credentials: Iterable[Dict[str, Any]],
+                                 concurrency: Optional[int] = None) -> BatchResult[Credential]:
+        """Create several credentials (dicts of create_credential arguments) concurrently"""
+        return await self._batch(lambda values: self.create_credential(**values), list(credentials), concurrency)
+
+    async def rotate_credentials(self, credential_ids: Iterable[int],
+                                 concurrency: Optional[int] = None) -> BatchResult[RotateResult]:
+        """Rotate several credentials concurrently"""
+        return await self._batch(self.rotate_credential, list(credential_ids), concurrency)
+
+    # ==================== Audit ====================
+
+    async def get_audit_logs(self, credential_id: Optional[int] = None, action: Optional[str] = None,
+                             since: Optional[str] = None, until: Optional[str] = None,
+                             limit: int = 100) -> List[AuditLog]:
+        rows = await self._audit_page(credential_id, action, since, until, limit)
+        return [AuditLog.from_dict(row) for row in rows]
+
+    async def _audit_page(self, credential_id, action, since, until, limit) -> List[Dict[str, Any]]:
+        return await self._request("GET", "/api/v1/audit-logs", {
+            "credential_id": credential_id,
+            "action": action,
+            "since": since,
+            "until": until,
+            "limit": limit,
+        })
+
+    async def iter_audit_logs(self, credential_id: Optional[int] = None, action: Optional[str] = None,
+                              since: Optional[str] = None, until: Optional[str] = None,
+                              page_size: int = AUDIT_PAGE_SIZE) -> AsyncIterator[AuditLog]:
+        """All matching audit logs, newest first, paged by timestamp"""
+        seen_ids = set()
+        while True:
+            limit = page_size + len(seen_ids)
+            page = await self._audit_page(credential_id, action, since, until, limit)
+            new_rows = [row for row in page if row["id"] not in seen_ids]
+            for row in new_rows:
+                yield AuditLog.from_dict(row)
+            if len(page) < limit or not new_rows:
+                return
+            until = next_audit_until(page, seen_ids)
+
+    async def get_audit_stats(self, bucket: str = "day", since: Optional[str] = None,
+                              until: Optional[str] = None, action: Optional[str] = None,
+                              actor: Optional[str] = None, supplier: Optional[str] = None,
+                              environment: Optional[str] = None, top: int = 10) -> AuditStats:
+        return AuditStats.from_dict(await self._request("GET", "/api/v1/audit-logs/stats", {
+            "bucket": bucket,
+            "since": since,
+            "until": until,
+            "action": action,
+            "actor": actor,
+            "supplier": supplier,
+            "environment": environment,
+            "top": top,
+        }))
+
+    # ==================== Search ====================
+
+    async def search(self, q: str, scope: str = "audit", limit: int = 20, offset: int = 0) -> SearchPage:
+        return SearchPage.from_dict(await self._request("GET", "/api/v1/search", {
+            "q": q, "scope": scope, "limit": limit, "offset": offset,
+        }))
+
+    async def iter_search(self, q: str, scope: str = "audit",
+                          page_size: int = SEARCH_PAGE_SIZE) -> AsyncIterator[SearchHit]:
+        """Every hit for q, best first"""
+        offset = 0
+        while True:
+            page = await self.search(q, scope, page_size, offset)
+            for hit in page.results:
+                yield hit
+            if not page.has_more or not page.results:
+                return
+            offset += len(page.results)
+
+    # ==================== Exports ====================
+
+    async def export_audit_logs(self, dest: str, format: str = "csv.gz", credential_id: Optional[int] = None,
+                                action: Optional[str] = None, since: Optional[str] = None,
+                                until: Optional[str] = None) -> ExportFile:
+        """Download matching audit logs (newest first) to the file dest"""
+        return await self._download("/api/v1/exports/audit-logs", {
+            "format": format,
+            "credential_id": credential_id,
+            "action": action,
+            "since": since,
+            "until": until,
+        }, dest)
+
+    async def export_credentials(self, dest: str, format: str = "csv.gz", supplier: Optional[str] = None,
+                                 environment: Optional[str] = None) -> ExportFile:
+        """Download credentials to the file dest (data column only for roles that see secrets)"""
+        return await self._download("/api/v1/exports/credentials", {
+            "format": format, "supplier": supplier, "environment": environment,
+        }, dest)
+
+    # ==================== Admin ====================
+
+    async def get_query_stats(self, top: int = 20, sort: str = "total_ms") -> QueryStats:
+        return QueryStats.from_dict(
+            await self._request("GET", "/api/v1/admin/query-stats", {"top": top, "sort": sort}))
+
+    async def reset_query_stats(self) -> None:
+        await self._request("DELETE", "/api/v1/admin/query-stats")
+
+    async def list_rotation_policies(self) -> List[RotationPolicy]:
+        policies = await self._request("GET", "/api/v1/admin/rotation-policies")
+        return [RotationPolicy.from_dict(policy) for policy in policies]
+
+    async def set_rotation_policy(self, supplier: str, environment: str, max_age_days: int) -> RotationPolicy:
+        """Create or replace a policy; * as supplier or environment matches any value"""
+        return RotationPolicy.from_dict(await self._request("PUT", "/api/v1/admin/rotation-policies", json={
+            "supplier": supplier, "environment": environment, "max_age_days": max_age_days,
+        }))
+
+    async def delete_rotation_policy(self, supplier: str = "*", environment: str = "*") -> None:
+        await self._request("DELETE", "/api/v1/admin/rotation-policies",
+                            {"supplier": supplier, "environment": environment})
+
+    async def get_rotation_scheduler(self) -> RotationSchedulerStatus:
+        return RotationSchedulerStatus.from_dict(await self._request("GET", "/api/v1/admin/rotation-scheduler"))
+
+    async def get_supplier_adapters(self) -> Dict[str, SupplierAdapterStatus]:
+        body = await self._request("GET", "/api/v1/admin/supplier-adapters")
+        return {supplier: SupplierAdapterStatus.from_dict(status) for supplier, status in body.items()}
@@ -0,0 +1,340 @@
+"""
+Synchronous client for the Credential Management API (requests)
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from ._core import (
+    AUDIT_PAGE_SIZE, CHANGES_PAGE_SIZE, DEFAULT_BASE_URL, DEFAULT_CONCURRENCY, DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_POOL_SIZE, DEFAULT_READ_TIMEOUT, DOWNLOAD_CHUNK_SIZE, SEARCH_PAGE_SIZE, _MISSING, ResponseCache,
+    RetryPolicy, cache_key, clean_params, idempotency_headers, next_audit_until, raise_for_error, update_body,
+)
+from .errors import TransportError
+from .transports import ASGIAdapter, UnixSocketAdapter
+from .models import (
+    AuditLog, AuditStats, BatchItem, BatchResult, Credential, CredentialChange, CredentialChanges, ExportFile,
+    Health, QueryStats, RotateResult, RotationPolicy, RotationSchedulerStatus, SearchHit, SearchPage,
+    SupplierAdapterStatus,
+)
+
+
+def _request_sent(error: requests.exceptions.RequestException) -> bool:
+    """False when the connection failed before any byte of the request went out"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return False
+    if isinstance(error, requests.exceptions.ConnectionError):
+        reason = getattr(error.args[0], "reason", None) if error.args else None
+        return not isinstance(reason, NewConnectionError)
+    return True
+
+
+class Client:
+    """
+    Thread-safe client; create one per process and share it.
+
+    Connections are kept alive in a pool of pool_size, idempotent calls are
+    retried with jittered backoff, and cache_ttl (seconds) turns on a local
+    cache of GET responses. POSTs carry an Idempotency-Key, the same on each
+    retry, so they are retried too without running twice. unix_socket sends
+    requests over a Unix domain socket instead of TCP (an API on the same
+    host started with --uds); app calls an ASGI app in this process instead
+    (ASGIAdapter: its startup runs now, its shutdown on close()).
+    """
+
+    def __init__(self, api_key: Optional[str] = None, base_url: str = DEFAULT_BASE_URL, *,
+                 pool_size: int = DEFAULT_POOL_SIZE, concurrency: int = DEFAULT_CONCURRENCY,
+                 timeout: Tuple[float, float] = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT),
+                 max_retries: int = 3, backoff: float = 0.2, cache_ttl: Optional[float] = None,
+                 unix_socket: Optional[str] = None, app=None):
+        api_key = api_key or os.environ.get("NEZASA_API_KEY")
+        if not api_key:
+            raise ValueError("api_key is required (or set NEZASA_API_KEY)")
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.retry = RetryPolicy(max_retries, backoff)
+        self.cache = ResponseCache(cache_ttl) if cache_ttl else None
+
+        # Retries are handled here (with jitter), not by urllib3
+        self.session = requests.Session()
+        if app is not None:
+            self.session.mount(f"{self.base_url}/", ASGIAdapter(app))
+        elif unix_socket:
+            self.session.mount(f"{self.base_url}/", UnixSocketAdapter(unix_socket, pool_size))
+        else:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+        self.session.headers.update({"X-API-Key": api_key, "Accept": "application/json"})
+
+    # ==================== Transport ====================
+
+    def _send(self, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+              json: Optional[Dict[str, Any]] = None, idempotency_key: Optional[str] = None,
+              stream: bool = False) -> requests.Response:
+        """Send with retries; a POST keeps one Idempotency-Key across its attempts"""
+        headers = idempotency_headers(method, idempotency_key)
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(method, f"{self.base_url}{path}", params=params, json=json,
+                                                headers=headers, timeout=self.timeout, stream=stream)
+            except requests.exceptions.RequestException as e:
+                if self.retry.retry_error(method, _request_sent(e), attempt, bool(headers)):
+                    time.sleep(self.retry.delay(attempt))
+                    attempt += 1
+                    continue
+                raise TransportError(f"{method} {path} failed: {e}", e) from e
+
+            if self.retry.retry_status(method, response.status_code, attempt, bool(headers)):
+                response.close()
+                time.sleep(self.retry.delay(attempt, response.headers.get("Retry-After")))
+                attempt += 1
+                continue
+            return response
+
+    @staticmethod
+    def _body(response: requests.Response) -> Any:
+        try:
+            return response.json() if response.content else None
+        except ValueError:
+            return None
+
+    def _request(self, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+                 json: Optional[Dict[str, Any]] = None, idempotency_key: Optional[str] = None) -> Any:
+        params = clean_params(params)
+        key = cache_key(path, params) if self.cache and method == "GET" else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not _MISSING:
+                return cached
+
+        response = self._send(method, path, params, json, idempotency_key)
+        body = self._body(response)
+        raise_for_error(response.status_code, body, response.text)
+
+        if key is not None:
+            self.cache.put(key, body)
+        elif method != "GET" and self.cache:
+            self.cache.clear()
+        return body
+
+    def _download(self, path: str, params: Dict[str, Any], dest: str) -> ExportFile:
+        """Stream a GET response body into the file dest"""
+        with self._send("GET", path, clean_params(params), stream=True) as response:
+            if response.status_code >= 300:
+                raise_for_error(response.status_code, self._body(response), response.text)
+            with open(dest, "wb") as f:
+                for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+        return ExportFile(dest, int(response.headers.get("X-Export-Rows", 0)),
+                          response.headers.get("Content-Type", ""))
+
+    def _batch(self, fn: Callable, inputs: List[Any], concurrency: Optional[int]) -> BatchResult:
+        items = [BatchItem(input=value) for value in inputs]
+
+        def run(item: BatchItem):
+            try:
+                item.result = fn(item.input)
+            except Exception as e:
+                item.error = e
+
+        workers = max(1, min(concurrency or self.concurrency, len(items) or 1))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nezasa-batch") as executor:
+            list(executor.map(run, items))
+        return BatchResult(items)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self) -> "Client":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # ==================== Health ====================
+
+    def health(self) -> Health:
+        return Health.from_dict(self._request("GET", "/"))
+
+    # ==================== Credentials ====================
+
+    def create_credential(self, supplier: str, environment: str, auth_type: str, data: Dict[str, Any],
+                          allow_self_rotation: bool = False, idempotency_key: Optional[str] = None) -> Credential:
+        """Create a credential; pass idempotency_key to make a later retry of this call safe too"""
+        body = {
+            "supplier": supplier,
+            "environment": environment,
+            "auth_type": auth_type,
+            "data": data,
+            "allow_self_rotation": allow_self_rotation,
+        }
+        return Credential.from_dict(self._request("POST", "/api/v1/credentials", json=body,
+                                                  idempotency_key=idempotency_key))
+
+    def list_credentials(self, supplier: Optional[str] = None, environment: Optional[str] = None) -> List[Credential]:
+        body = self._request("GET", "/api/v1/credentials", {"supplier": supplier, "environment": environment})
+        return [Credential.from_dict(credential) for credential in body["credentials"]]
+
+    def get_credential(self, credential_id: int) -> Credential:
+        return Credential.from_dict(self._request("GET", f"/api/v1/credentials/{credential_id}"))
+
+    def update_credential(self, credential_id: int, *, supplier: Optional[str] = None,
+                          environment: Optional[str] = None, auth_type: Optional[str] = None,
+                          data: Optional[Dict[str, Any]] = None,
+                          allow_self_rotation: Optional[bool] = None) -> Credential:
+        body = update_body(supplier, environment, auth_type, data, allow_self_rotation)
+        return Credential.from_dict(self._request("PUT", f"/api/v1/credentials/{credential_id}", json=body))
+
+    def rotate_credential(self, credential_id: int, idempotency_key: Optional[str] = None) -> RotateResult:
+        """Rotate a credential; pass idempotency_key to make a later retry of this call safe too"""
+        return RotateResult.from_dict(self._request("POST", f"/api/v1/credentials/{credential_id}/rotate",
+                                                    idempotency_key=idempotency_key))
+
+    def delete_credential(self, credential_id: int) -> None:
+        self._request("DELETE", f"/api/v1/credentials/{credential_id}")
+
+    def get_changes(self, since: int = 0, limit: int = CHANGES_PAGE_SIZE) -> CredentialChanges:
+        return CredentialChanges.from_dict(
+            self._request("GET", "/api/v1/credentials/changes", {"since": since, "limit": limit}))
+
+    def iter_changes(self, since: int = 0, page_size: int = CHANGES_PAGE_SIZE) -> Iterator[CredentialChange]:
+        """Every change after `since`; store the last change's seq to resume from"""
+        while True:
+            page = self.get_changes(since, page_size)
+            yield from page.changes
+            if not page.has_more:
+                return
+            since = page.next_since
+
+    # ==================== Batches ====================
+
+    def create_credentials(self, credentials: Iterable[Dict[str, Any]],
+                           concurrency: Optional[int] = None) -> BatchResult[Credential]:
+        """Create several credentials (dicts of create_credential arguments) concurrently"""
+        return self._batch(lambda values: self.create_credential(**values), list(credentials), concurrency)
+
+    def rotate_credentials(self, credential_ids: Iterable[int],
+                           concurrency: Optional[int] = None) -> BatchResult[RotateResult]:
+        """Rotate several credentials concurrently"""
+        return self._batch(self.rotate_credential, list(credential_ids), concurrency)
+
+    # ==================== Audit ====================
+
+    def get_audit_logs(self, credential_id: Optional[int] = None, action: Optional[str] = None,
+                       since: Optional[str] = None, until: Optional[str] = None,
+                       limit: int = 100) -> List[AuditLog]:
+        return [AuditLog.from_dict(row) for row in self._audit_page(credential_id, action, since, until, limit)]
+
+    def _audit_page(self, credential_id, action, since, until, limit) -> List[Dict[str, Any]]:
+        return self._request("GET", "/api/v1/audit-logs", {
+            "credential_id": credential_id,
+            "action": action,
+            "since": since,
+            "until": until,
+            "limit": limit,
+        })
+
+    def iter_audit_logs(self, credential_id: Optional[int] = None, action: Optional[str] = None,
+                        since: Optional[str] = None, until: Optional[str] = None,
+                        page_size: int = AUDIT_PAGE_SIZE) -> Iterator[AuditLog]:
+        """All matching audit logs, newest first, paged by timestamp"""
+        seen_ids = set()
+        while True:
+            limit = page_size + len(seen_ids)
+            page = self._audit_page(credential_id, action, since, until, limit)
+            new_rows = [row for row in page if row["id"] not in seen_ids]
+            for row in new_rows:
+                yield AuditLog.from_dict(row)
+            if len(page) < limit or not new_rows:
+                return
+            until = next_audit_until(page, seen_ids)
+
+    def get_audit_stats(self, bucket: str = "day", since: Optional[str] = None, until: Optional[str] = None,
+                        action: Optional[str] = None, actor: Optional[str] = None,
+                        supplier: Optional[str] = None, environment: Optional[str] = None,
+                        top: int = 10) -> AuditStats:
+        return AuditStats.from_dict(self._request("GET", "/api/v1/audit-logs/stats", {
+            "bucket": bucket,
+            "since": since,
+            "until": until,
+            "action": action,
+            "actor": actor,
+            "supplier": supplier,
+            "environment": environment,
+            "top": top,
+        }))
+
+    # ==================== Search ====================
+
+    def search(self, q: str, scope: str = "audit", limit: int = 20, offset: int = 0) -> SearchPage:
+        return SearchPage.from_dict(self._request("GET", "/api/v1/search", {
+            "q": q, "scope": scope, "limit": limit, "offset": offset,
+        }))
+
+    def iter_search(self, q: str, scope: str = "audit", page_size: int = SEARCH_PAGE_SIZE) -> Iterator[SearchHit]:
+        """Every hit for q, best first"""
+        offset = 0
+        while True:
+            page = self.search(q, scope, page_size, offset)
+            yield from page.results
+            if not page.has_more or not page.results:
+                return
+            offset += len(page.results)
+
+    # ==================== Exports ====================
+
+    def export_audit_logs(self, dest: str, format: str = "csv.gz", credential_id: Optional[int] = None,
+                          action: Optional[str] = None, since: Optional[str] = None,
+                          until: Optional[str] = None) -> ExportFile:
+        """Download matching audit logs (newest first) to the file dest"""
+        return self._download("/api/v1/exports/audit-logs", {
+            "format": format,
+            "credential_id": credential_id,
+            "action": action,
+            "since": since,
+            "until": until,
+        }, dest)
+
+    def export_credentials(self, dest: str, format: str = "csv.gz", supplier: Optional[str] = None,
+                           environment: Optional[str] = None) -> ExportFile:
+        """Download credentials to the file dest (data column only for roles that see secrets)"""
+        return self._download("/api/v1/exports/credentials", {
+            "format": format, "supplier": supplier, "environment": environment,
+        }, dest)
+
+    # ==================== Admin ====================
+
+    def get_query_stats(self, top: int = 20, sort: str = "total_ms") -> QueryStats:
+        return QueryStats.from_dict(self._request("GET", "/api/v1/admin/query-stats", {"top": top, "sort": sort}))
+
+    def reset_query_stats(self) -> None:
+        self._request("DELETE", "/api/v1/admin/query-stats")
+
+    def list_rotation_policies(self) -> List[RotationPolicy]:
+        return [RotationPolicy.from_dict(policy) for policy in self._request("GET", "/api/v1/admin/rotation-policies")]
+
+    def set_rotation_policy(self, supplier: str, environment: str, max_age_days: int) -> RotationPolicy:
+        """Create or replace a policy; * as supplier or environment matches any value"""
+        return RotationPolicy.from_dict(self._request("PUT", "/api/v1/admin/rotation-policies", json={
+            "supplier": supplier, "environment": environment, "max_age_days": max_age_days,
+        }))
+
+    def delete_rotation_policy(self, supplier: str = "*", environment: str = "*") -> None:
+        self._request("DELETE", "/api/v1/admin/rotation-policies", {"supplier": supplier, "environment": environment})
+
+    def get_rotation_scheduler(self) -> RotationSchedulerStatus:
+        return RotationSchedulerStatus.from_dict(self._request("GET", "/api/v1/admin/rotation-scheduler"))
+
+    def get_supplier_adapters(self) -> Dict[str, SupplierAdapterStatus]:
+        body = self._request("GET", "/api/v1/admin/supplier-adapters")
+        return {supplier: SupplierAdapterStatus.from_dict(status) for supplier, status in body.items()}
@@ -0,0 +1,45 @@
+"""
+Exceptions raised by the API clients
+"""
+
+from typing import Optional
+
+
+class APIError(Exception):
+    """The API answered with an error status"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(f"API Error ({status_code}): {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+class AuthenticationError(APIError):
+    """401: missing or invalid API key"""
+
+
+class PermissionDeniedError(APIError):
+    """403: the key's role may not perform this operation"""
+
+
+class NotFoundError(APIError):
+    """404: no such credential"""
+
+
+class TransportError(Exception):
+    """The request could not be completed (connection, timeout) after all retries"""
+
+    def __init__(self, message: str, cause: Optional[BaseException] = None):
+        super().__init__(message)
+        self.cause = cause
+
+
+def error_for_status(status_code: int, detail: str) -> APIError:
+    """The most specific APIError subclass for a status code"""
+    if status_code == 401:
+        return AuthenticationError(status_code, detail)
+    if status_code == 403:
+        return PermissionDeniedError(status_code, detail)
+    if status_code == 404:
+        return NotFoundError(status_code, detail)
+    return APIError(status_code, detail)
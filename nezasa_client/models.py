@@ -0,0 +1,379 @@
+"""
+Typed response models for the Credential Management API
+Plain dataclasses mirroring the pydantic response models in api.py, so the
+client has no dependency on the server code.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Health:
+    status: str
+    service: str
+    version: str
+    docs: str
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Health":
+        return cls(data["status"], data["service"], data["version"], data["docs"])
+
+
+@dataclass(frozen=True)
+class Credential:
+    id: int
+    supplier: str
+    environment: str
+    auth_type: str
+    data: Dict[str, Any]
+    created_by: str
+    created_at: str
+    updated_at: str
+    allow_self_rotation: bool
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Credential":
+        return cls(
+            id=data["id"],
+            supplier=data["supplier"],
+            environment=data["environment"],
+            auth_type=data["auth_type"],
+            data=data["data"],
+            created_by=data["created_by"],
+            created_at=data["created_at"],
+            updated_at=data["updated_at"],
+            allow_self_rotation=data["allow_self_rotation"],
+        )
+
+
+@dataclass(frozen=True)
+class CredentialChange:
+    seq: int
+    op: str
+    id: int
+    changed_at: str
+    credential: Optional[Credential]
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CredentialChange":
+        credential = data.get("credential")
+        return cls(
+            seq=data["seq"],
+            op=data["op"],
+            id=data["id"],
+            changed_at=data["changed_at"],
+            credential=Credential.from_dict(credential) if credential is not None else None,
+        )
+
+
+@dataclass(frozen=True)
+class CredentialChanges:
+    since: int
+    next_since: int
+    current_seq: int
+    has_more: bool
+    changes: List[CredentialChange]
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CredentialChanges":
+        return cls(
+            since=data["since"],
+            next_since=data["next_since"],
+            current_seq=data["current_seq"],
+            has_more=data["has_more"],
+            changes=[CredentialChange.from_dict(change) for change in data["changes"]],
+        )
+
+
+@dataclass(frozen=True)
+class RotateResult:
+    id: int
+    supplier: str
+    environment: str
+    message: str
+    new_data: Dict[str, Any]
+    rotated_at: str
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RotateResult":
+        return cls(
+            id=data["id"],
+            supplier=data["supplier"],
+            environment=data["environment"],
+            message=data["message"],
+            new_data=data["new_data"],
+            rotated_at=data["rotated_at"],
+        )
+
+
+@dataclass(frozen=True)
+class AuditLog:
+    id: int
+    cred_id: int
+    action: str
+    actor: str
+    details: str
+    timestamp: str
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AuditLog":
+        return cls(data["id"], data["cred_id"], data["action"], data["actor"], data["details"], data["timestamp"])
+
+
+@dataclass(frozen=True)
+class AuditStatsBucket:
+    bucket: str
+    total: int
+    by_action: Dict[str, int]
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AuditStatsBucket":
+        return cls(data["bucket"], data["total"], data["by_action"])
+
+
+@dataclass(frozen=True)
+class AuditStats:
+    bucket: str
+    total: int
+    by_action: Dict[str, int]
+    by_actor: Dict[str, int]
+    by_supplier: Dict[str, int]
+    by_environment: Dict[str, int]
+    series: List[AuditStatsBucket]
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AuditStats":
+        return cls(
+            bucket=data["bucket"],
+            total=data["total"],
+            by_action=data["by_action"],
+            by_actor=data["by_actor"],
+            by_supplier=data["by_supplier"],
+            by_environment=data["by_environment"],
+            series=[AuditStatsBucket.from_dict(bucket) for bucket in data["series"]],
+        )
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    kind: str
+    id: int
+    cred_id: Optional[int]
+    supplier: Optional[str]
+    environment: Optional[str]
+    action: Optional[str]
+    actor: Optional[str]
+    timestamp: Optional[str]
+    snippet: str
+    rank: float
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SearchHit":
+        return cls(
+            kind=data["kind"],
+            id=data["id"],
+            cred_id=data.get("cred_id"),
+            supplier=data.get("supplier"),
+            environment=data.get("environment"),
+            action=data.get("action"),
+            actor=data.get("actor"),
+            timestamp=data.get("timestamp"),
+            snippet=data["snippet"],
+            rank=data["rank"],
+        )
+
+
+@dataclass(frozen=True)
+class SearchPage:
+    query: str
+    scope: str
+    limit: int
+    offset: int
+    has_more: bool
+    results: List[SearchHit]
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SearchPage":
+        return cls(
+            query=data["query"],
+            scope=data["scope"],
+            limit=data["limit"],
+            offset=data["offset"],
+            has_more=data["has_more"],
+            results=[SearchHit.from_dict(hit) for hit in data["results"]],
+        )
+
+
+@dataclass(frozen=True)
+class ExportFile:
+    """An export downloaded to path"""
+    path: str
+    rows: int
+    media_type: str
+
+
+@dataclass(frozen=True)
+class QueryStatement:
+    fingerprint: str
+    dialect: str
+    calls: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+    rows: int
+    steps: int
+    slow: int
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QueryStatement":
+        return cls(
+            fingerprint=data["fingerprint"],
+            dialect=data["dialect"],
+            calls=data["calls"],
+            total_ms=data["total_ms"],
+            mean_ms=data["mean_ms"],
+            max_ms=data["max_ms"],
+            rows=data["rows"],
+            steps=data["steps"],
+            slow=data["slow"],
+        )
+
+
+@dataclass(frozen=True)
+class SlowQuery:
+    fingerprint: str
+    dialect: str
+    ms: float
+    rows: int
+    steps: int
+    plan: List[str]
+    at: float
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SlowQuery":
+        return cls(data["fingerprint"], data["dialect"], data["ms"], data["rows"], data["steps"],
+                   data["plan"], data["at"])
+
+
+@dataclass(frozen=True)
+class QueryStats:
+    since: float
+    slow_query_ms: float
+    statements: int
+    calls: int
+    total_ms: float
+    top: List[QueryStatement]
+    recent_slow: List[SlowQuery]
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QueryStats":
+        return cls(
+            since=data["since"],
+            slow_query_ms=data["slow_query_ms"],
+            statements=data["statements"],
+            calls=data["calls"],
+            total_ms=data["total_ms"],
+            top=[QueryStatement.from_dict(statement) for statement in data["top"]],
+            recent_slow=[SlowQuery.from_dict(query) for query in data["recent_slow"]],
+        )
+
+
+@dataclass(frozen=True)
+class RotationPolicy:
+    supplier: str
+    environment: str
+    max_age_days: int
+    updated_by: str
+    updated_at: str
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RotationPolicy":
+        return cls(data["supplier"], data["environment"], data["max_age_days"], data["updated_by"],
+                   data["updated_at"])
+
+
+@dataclass(frozen=True)
+class RotationSchedulerStatus:
+    running: bool
+    policies: int
+    due: int
+    overdue: int
+    oldest_due_days: Optional[float]
+    last_scan_at: Optional[str]
+    last_scan_ms: Optional[float]
+    rotated_total: int
+    failed_total: int
+    rate_per_minute: int
+    scan_interval: float
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RotationSchedulerStatus":
+        return cls(
+            running=data["running"],
+            policies=data["policies"],
+            due=data["due"],
+            overdue=data["overdue"],
+            oldest_due_days=data.get("oldest_due_days"),
+            last_scan_at=data.get("last_scan_at"),
+            last_scan_ms=data.get("last_scan_ms"),
+            rotated_total=data["rotated_total"],
+            failed_total=data["failed_total"],
+            rate_per_minute=data["rate_per_minute"],
+            scan_interval=data["scan_interval"],
+        )
+
+
+@dataclass(frozen=True)
+class SupplierAdapterStatus:
+    adapter: str
+    breaker: str
+    breaker_opens: int
+    calls: int
+    rotated: int
+    retries: int
+    failed: int
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SupplierAdapterStatus":
+        return cls(
+            adapter=data["adapter"],
+            breaker=data["breaker"],
+            breaker_opens=data["breaker_opens"],
+            calls=data["calls"],
+            rotated=data["rotated"],
+            retries=data["retries"],
+            failed=data["failed"],
+        )
+
+
+@dataclass
+class BatchItem(Generic[T]):
+    """One input of a batch call with its result or error"""
+    input: Any
+    result: Optional[T] = None
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class BatchResult(Generic[T]):
+    """Outcome of a batch call, items in input order"""
+    items: List[BatchItem] = field(default_factory=list)
+
+    @property
+    def succeeded(self) -> List[T]:
+        return [item.result for item in self.items if item.ok]
+
+    @property
+    def failed(self) -> List[BatchItem]:
+        return [item for item in self.items if not item.ok]
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
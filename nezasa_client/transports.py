@@ -0,0 +1,212 @@
+"""
+requests transport adapters for co-located deployments
+
+UnixSocketAdapter  HTTP over a Unix domain socket (API in another process
+                   on the same host, e.g. uvicorn --uds)
+ASGIAdapter        calls an ASGI app (the FastAPI app from api.py) in this
+                   process: no socket at all, but the request still runs
+                   through the app's middleware, validation, auth and RBAC
+
+Mount either on a base URL prefix of a requests.Session.
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import http.client
+import socket
+import threading
+from typing import Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+
+
+# ==================== Unix domain socket ====================
+
+class _UnixSocketConnection(HTTPConnection):
+    def __init__(self, *args, socket_path: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.socket_path = socket_path
+
+    def _new_conn(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if isinstance(self.timeout, (int, float)):
+            sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+
+class _UnixSocketConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _UnixSocketConnection
+
+
+class UnixSocketAdapter(HTTPAdapter):
+    """Keep-alive pool of HTTP connections over one Unix domain socket"""
+
+    def __init__(self, socket_path: str, pool_size: int = 10, max_retries=0):
+        self.socket_path = socket_path
+        self._pool = _UnixSocketConnectionPool("localhost", maxsize=pool_size, block=True,
+                                               socket_path=socket_path)
+        super().__init__(pool_connections=1, pool_maxsize=pool_size, max_retries=max_retries)
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        return self._pool
+
+    def get_connection(self, url, proxies=None):
+        return self._pool
+
+    def close(self):
+        super().close()
+        self._pool.close()
+
+
+# ==================== In-process ASGI ====================
+
+class ASGIAdapter(BaseAdapter):
+    """
+    Dispatch requests straight into an ASGI app.
+
+    The app runs on a private event loop thread; its startup handlers run
+    once when the adapter is created, its shutdown handlers on close() or
+    at exit. Whatever the app starts in its startup handlers (background
+    threads included) runs in this process; turn off what the embedding
+    process should not run before creating the adapter.
+
+    Requests are not dispatched through a threadpool: every request from
+    every thread runs on that one loop, because the app's loop-bound state
+    (asyncio events, async HTTP clients) must stay on one loop. Handlers that
+    block the loop, such as api.py's async endpoints calling storage, are
+    therefore served one at a time, like a single uvicorn worker; concurrent
+    callers (APIClient.request_many) queue rather than run in parallel.
+    """
+
+    def __init__(self, app, startup_timeout: float = 30.0):
+        super().__init__()
+        self.app = app
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="asgi-inprocess", daemon=True)
+        self._thread.start()
+        self._lifespan_queue: Optional[asyncio.Queue] = None
+        self._shutdown_done: Optional[asyncio.Future] = None
+        self._run(self._startup(), startup_timeout)
+        # Give the app its shutdown handlers when the process exits
+        atexit.register(self.close)
+
+    def _run(self, coro, timeout: Optional[float] = None):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    async def _startup(self):
+        self._lifespan_queue = asyncio.Queue()
+        started = self._loop.create_future()
+        self._shutdown_done = self._loop.create_future()
+
+        async def receive():
+            return await self._lifespan_queue.get()
+
+        async def send(message):
+            if message["type"] == "lifespan.startup.complete":
+                started.set_result(None)
+            elif message["type"] == "lifespan.startup.failed":
+                started.set_exception(RuntimeError(message.get("message", "ASGI startup failed")))
+            elif message["type"].startswith("lifespan.shutdown") and not self._shutdown_done.done():
+                self._shutdown_done.set_result(None)
+
+        scope = {"type": "lifespan", "asgi": {"version": "3.0", "spec_version": "2.0"}, "state": {}}
+        self._loop.create_task(self.app(scope, receive, send))
+        await self._lifespan_queue.put({"type": "lifespan.startup"})
+        await started
+
+    async def _call(self, request: requests.PreparedRequest):
+        url = urlsplit(request.url)
+        body = request.body or b""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        headers = [(name.lower().encode("latin-1"), value.encode("latin-1"))
+                   for name, value in request.headers.items()]
+        headers.append((b"host", (url.netloc or "inprocess").encode("latin-1")))
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": request.method,
+            "scheme": url.scheme or "http",
+            "path": url.path or "/",
+            "raw_path": (url.path or "/").encode("latin-1"),
+            "query_string": url.query.encode("latin-1"),
+            "root_path": "",
+            "headers": headers,
+            "client": ("127.0.0.1", 0),
+            "server": ("inprocess", 80),
+            "state": {},
+        }
+
+        received = False
+        response_done = asyncio.Event()
+        status, response_headers, chunks = 500, [], []
+
+        async def receive():
+            nonlocal received
+            if received:
+                # Like a server, report the disconnect only once the response is sent:
+                # streaming responses (FileResponse) stop when they see it
+                await response_done.wait()
+                return {"type": "http.disconnect"}
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            nonlocal status, response_headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = message.get("headers", [])
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    response_done.set()
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            response_done.set()
+        return status, response_headers, b"".join(chunks)
+
+    def send(self, request: requests.PreparedRequest, stream=False, timeout=None, verify=True,
+             cert=None, proxies=None) -> requests.Response:
+        if isinstance(timeout, tuple):
+            timeout = sum(part for part in timeout if part is not None) or None
+        try:
+            status, headers, content = self._run(self._call(request), timeout)
+        except concurrent.futures.TimeoutError:
+            raise requests.exceptions.ReadTimeout(f"In-process request timed out after {timeout}s", request=request)
+
+        response = requests.Response()
+        response.status_code = status
+        response.reason = http.client.responses.get(status, "")
+        response.headers = CaseInsensitiveDict(
+            (name.decode("latin-1"), value.decode("latin-1")) for name, value in headers)
+        # Fully buffered: iter_content() slices it instead of reading a raw stream
+        response._content = content
+        response._content_consumed = True
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        """Run the app's shutdown handlers and stop the loop thread"""
+        if self._loop.is_closed():
+            return
+        atexit.unregister(self.close)
+        if self._lifespan_queue is not None:
+            async def shutdown():
+                await self._lifespan_queue.put({"type": "lifespan.shutdown"})
+                await self._shutdown_done
+            self._run(shutdown(), 30)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
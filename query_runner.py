@@ -0,0 +1,255 @@
+"""
+Bounded, read-only ad-hoc SQL
+Backs the SQL Query Runner in the Streamlit app. Each query:
+
+  - runs on its own read-only connection (SQLite mode=ro + query_only,
+    PostgreSQL READ ONLY transaction), never the app's pooled ones
+  - must be a single SELECT / WITH / VALUES statement
+  - is stopped after a wall-clock limit and, on SQLite, a VM-step limit
+    (both checked by the progress handler), or when cancelled
+  - streams rows with fetchmany() and keeps at most row_cap of them
+  - reports its EXPLAIN QUERY PLAN, elapsed time and row count
+
+Queries run on a background thread as a QueryJob, so the UI can poll it
+and offer a cancel button.
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Any, List, Optional
+
+from sqlite_lanes import open_read_only
+
+QUERY_TIME_LIMIT = float(os.environ.get("QUERY_RUNNER_TIME_LIMIT", "10"))
+QUERY_STEP_LIMIT = int(os.environ.get("QUERY_RUNNER_STEP_LIMIT", "50000000"))
+QUERY_ROW_CAP = int(os.environ.get("QUERY_RUNNER_ROW_CAP", "10000"))
+
+# SQLite VM instructions between progress handler calls
+PROGRESS_INTERVAL = 1000
+FETCH_BATCH_SIZE = 500
+
+READ_ONLY_PREFIXES = ("select", "with", "values")
+
+# Strings, quoted identifiers and comments, blanked out before looking for ';'
+_SQL_NOISE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/", re.S)
+
+
+class QueryRejected(ValueError):
+    """The statement is not a single read-only query"""
+
+
+def check_query(sql: str) -> str:
+    """The statement without its trailing semicolon; raises QueryRejected otherwise"""
+    statement = sql.strip().rstrip(";").strip()
+    code = _SQL_NOISE.sub(" ", statement).strip()
+    if not code:
+        raise QueryRejected("Enter a query")
+    if ";" in code:
+        raise QueryRejected("Only one statement can be run at a time")
+    if not code.lower().startswith(READ_ONLY_PREFIXES):
+        raise QueryRejected("Only SELECT queries (including WITH ... SELECT) are allowed")
+    return statement
+
+
+class QueryJob:
+    """
+    One query running on a background thread.
+
+    status is running, done, cancelled, timeout, step_limit or error. rows
+    fills up while the query streams, so partial results are readable at
+    any time; truncated is set when rows were left behind at row_cap.
+    """
+
+    def __init__(self, sql: str, row_cap: int, time_limit: float):
+        self.sql = sql
+        self.row_cap = row_cap
+        self.time_limit = time_limit
+        self.status = "running"
+        self.error: Optional[str] = None
+        self.columns: List[str] = []
+        self.rows: List[tuple] = []
+        self.truncated = False
+        self.plan: List[str] = []
+        self.steps = 0
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self._stop_reason: Optional[str] = None
+        self._cancel_hook = None
+        self._done = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return not self._done.is_set()
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    def cancel(self):
+        """Ask the query to stop; it ends with status cancelled"""
+        self._stop("cancelled")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def _stop(self, reason: str):
+        if self._stop_reason is None:
+            self._stop_reason = reason
+        if self._cancel_hook is not None:
+            self._cancel_hook()
+
+    def _finish(self, error: Optional[Exception] = None):
+        if self._stop_reason is not None:
+            self.status = self._stop_reason
+        elif error is not None:
+            self.status = "error"
+            self.error = str(error)
+        else:
+            self.status = "done"
+        self.finished = time.monotonic()
+        self._done.set()
+
+    def _fetch(self, cursor):
+        self.columns = [description[0] for description in cursor.description]
+        while self._stop_reason is None:
+            batch = cursor.fetchmany(min(FETCH_BATCH_SIZE, self.row_cap + 1 - len(self.rows)))
+            if not batch:
+                return
+            self.rows.extend(tuple(row) for row in batch)
+            if len(self.rows) > self.row_cap:
+                # One row past the cap tells us there was more
+                del self.rows[self.row_cap:]
+                self.truncated = True
+                return
+
+
+class SQLiteQueryRunner:
+    """Runs queries on a standalone read-only connection to the SQLite file"""
+
+    backend = "sqlite"
+
+    def __init__(self, db_path: str, time_limit: float = QUERY_TIME_LIMIT,
+                 step_limit: int = QUERY_STEP_LIMIT, row_cap: int = QUERY_ROW_CAP):
+        self.db_path = db_path
+        self.time_limit = time_limit
+        self.step_limit = step_limit
+        self.row_cap = row_cap
+
+    def start(self, sql: str) -> QueryJob:
+        """Validate sql and start running it; raises QueryRejected for anything but one SELECT"""
+        job = QueryJob(check_query(sql), self.row_cap, self.time_limit)
+        threading.Thread(target=self._run, args=(job,), name="query-runner", daemon=True).start()
+        return job
+
+    def _run(self, job: QueryJob):
+        try:
+            conn = open_read_only(self.db_path)
+        except Exception as e:
+            job._finish(e)
+            return
+
+        deadline = job.started + self.time_limit
+
+        def progress() -> int:
+            # A non-zero return makes SQLite abort the statement ("interrupted")
+            job.steps += PROGRESS_INTERVAL
+            if job.steps > self.step_limit:
+                job._stop("step_limit")
+            elif time.monotonic() > deadline:
+                job._stop("timeout")
+            return 1 if job._stop_reason else 0
+
+        conn.set_progress_handler(progress, PROGRESS_INTERVAL)
+        job._cancel_hook = conn.interrupt
+        try:
+            job.plan = _sqlite_plan(conn.execute(f"EXPLAIN QUERY PLAN {job.sql}").fetchall())
+            job._fetch(conn.execute(job.sql))
+            job._finish()
+        except Exception as e:
+            job._finish(e)
+        finally:
+            job._cancel_hook = None
+            conn.close()
+
+
+def _sqlite_plan(rows: List[Any]) -> List[str]:
+    """EXPLAIN QUERY PLAN rows (id, parent, notused, detail) as indented lines"""
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+class PostgresQueryRunner:
+    """
+    Runs queries in a READ ONLY transaction with statement_timeout, through
+    a server-side cursor; cancel sends a cancel request to the backend.
+    PostgreSQL has no VM-step counter, so only the time limit applies.
+    """
+
+    backend = "postgresql"
+
+    def __init__(self, engine, time_limit: float = QUERY_TIME_LIMIT, row_cap: int = QUERY_ROW_CAP):
+        self.engine = engine
+        self.time_limit = time_limit
+        self.row_cap = row_cap
+
+    def start(self, sql: str) -> QueryJob:
+        job = QueryJob(check_query(sql), self.row_cap, self.time_limit)
+        threading.Thread(target=self._run, args=(job,), name="query-runner", daemon=True).start()
+        return job
+
+    def _run(self, job: QueryJob):
+        try:
+            raw = self.engine.raw_connection()
+        except Exception as e:
+            job._finish(e)
+            return
+
+        # The DBAPI (psycopg2) connection behind SQLAlchemy's pool proxy
+        conn = getattr(raw, "dbapi_connection", None) or raw.connection
+        timer = threading.Timer(self.time_limit, job._stop, args=("timeout",))
+        job._cancel_hook = conn.cancel
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SET TRANSACTION READ ONLY")
+            cursor.execute(f"SET LOCAL statement_timeout = {int(self.time_limit * 1000)}")
+            cursor.execute(f"EXPLAIN {job.sql}")
+            job.plan = [row[0] for row in cursor.fetchall()]
+
+            timer.start()
+            stream = conn.cursor(name=f"query_runner_{id(job):x}")
+            stream.execute(job.sql)
+            job._fetch(_FirstFetchDescribes(stream))
+            job._finish()
+        except Exception as e:
+            job._finish(e)
+        finally:
+            timer.cancel()
+            job._cancel_hook = None
+            try:
+                conn.rollback()
+            finally:
+                raw.close()
+
+
+class _FirstFetchDescribes:
+    """Named psycopg2 cursors only have a description after the first fetch"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._first = cursor.fetchmany(1)
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def fetchmany(self, size: int):
+        if self._first is not None:
+            first, self._first = self._first, None
+            return first + (self._cursor.fetchmany(size - 1) if size > 1 else [])
+        return self._cursor.fetchmany(size)
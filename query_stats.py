@@ -0,0 +1,364 @@
+"""
+SQL statement accounting and slow-query log
+Connections from the SQLite lanes and the PostgreSQL storage are wrapped so
+every statement is timed. Per statement fingerprint (literals replaced by ?)
+the process keeps calls, time, rows returned and, on SQLite, VM steps (work
+done, counted by a progress handler - the closest thing to rows scanned
+that Python's sqlite3 exposes).
+
+track_queries() tallies the statements of one unit of work (an HTTP request,
+a Streamlit rerun); the tally follows the work into the SQLite writer thread.
+Statements slower than SLOW_QUERY_MS are logged with their query plan.
+"""
+
+import contextvars
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "100"))
+QUERY_STATS_ENABLED = os.environ.get("QUERY_STATS_ENABLED", "true").lower() == "true"
+
+# SQLite VM instructions per progress handler call (the step counter's resolution)
+STEP_INTERVAL = 1000
+RECENT_SLOW_QUERIES = 50
+EXPLAINABLE = ("select", "insert", "update", "delete", "with")
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql: str) -> str:
+    """Statement shape: literals become ?, IN lists (?, ?, ...) collapse, whitespace is normalized"""
+    shape = _STRING_RE.sub("?", sql)
+    shape = _NUMBER_RE.sub("?", shape)
+    shape = _SPACE_RE.sub(" ", shape).strip()
+    return _IN_LIST_RE.sub("(?...)", shape)
+
+
+# ==================== Aggregates ====================
+
+@dataclass
+class StatementStats:
+    fingerprint: str
+    dialect: str
+    calls: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    rows: int = 0
+    steps: int = 0
+    slow: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "fingerprint": self.fingerprint,
+            "dialect": self.dialect,
+            "calls": self.calls,
+            "total_ms": round(self.seconds * 1000, 3),
+            "mean_ms": round(self.seconds * 1000 / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 3),
+            "rows": self.rows,
+            "steps": self.steps,
+            "slow": self.slow,
+        }
+
+
+class QueryStats:
+    """Process-wide per-fingerprint totals plus the most recent slow statements"""
+
+    SORT_KEYS = {
+        "total_ms": lambda s: s.seconds,
+        "mean_ms": lambda s: s.seconds / s.calls if s.calls else 0.0,
+        "max_ms": lambda s: s.max_seconds,
+        "calls": lambda s: s.calls,
+        "rows": lambda s: s.rows,
+        "steps": lambda s: s.steps,
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._statements: Dict[tuple, StatementStats] = {}
+        self._slow = deque(maxlen=RECENT_SLOW_QUERIES)
+        self.since = time.time()
+
+    def add(self, sql: str, dialect: str, seconds: float, rows: int, steps: int, call: bool):
+        key = (dialect, fingerprint(sql))
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                stats = self._statements[key] = StatementStats(key[1], dialect)
+            stats.calls += call
+            stats.seconds += seconds
+            stats.rows += rows
+            stats.steps += steps
+
+    def finish(self, sql: str, dialect: str, seconds: float, rows: int, steps: int, plan: Optional[List[str]]):
+        """Close out one statement: its max time, and the slow log if it crossed the threshold"""
+        key = (dialect, fingerprint(sql))
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is not None:
+                stats.max_seconds = max(stats.max_seconds, seconds)
+                if plan is not None:
+                    stats.slow += 1
+            if plan is not None:
+                self._slow.append({
+                    "fingerprint": key[1],
+                    "dialect": dialect,
+                    "ms": round(seconds * 1000, 3),
+                    "rows": rows,
+                    "steps": steps,
+                    "plan": plan,
+                    "at": time.time(),
+                })
+
+    def top(self, n: int = 20, sort: str = "total_ms") -> List[Dict[str, Any]]:
+        if sort not in self.SORT_KEYS:
+            raise ValueError(f"Invalid sort. Use one of: {', '.join(self.SORT_KEYS)}")
+        with self._lock:
+            statements = sorted(self._statements.values(), key=self.SORT_KEYS[sort], reverse=True)[:n]
+            return [stats.as_dict() for stats in statements]
+
+    def recent_slow(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(reversed(self._slow))
+
+    def totals(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "statements": len(self._statements),
+                "calls": sum(stats.calls for stats in self._statements.values()),
+                "total_ms": round(sum(stats.seconds for stats in self._statements.values()) * 1000, 3),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._slow.clear()
+            self.since = time.time()
+
+
+query_stats = QueryStats()
+
+
+# ==================== Per unit of work ====================
+
+@dataclass
+class QueryTally:
+    """Statements run by one HTTP request or Streamlit rerun"""
+    count: int = 0
+    seconds: float = 0.0
+    rows: int = 0
+    slow: int = 0
+
+
+_current_tally: contextvars.ContextVar[Optional[QueryTally]] = contextvars.ContextVar("query_tally", default=None)
+
+
+@contextmanager
+def track_queries():
+    """Tally the statements run inside the block (and in work it hands to the SQLite writer)"""
+    tally = QueryTally()
+    token = _current_tally.set(tally)
+    try:
+        yield tally
+    finally:
+        _current_tally.reset(token)
+
+
+# ==================== Instrumented cursors ====================
+
+class InstrumentedCursor:
+    """
+    DB-API cursor wrapper. A statement's time and rows accumulate over
+    execute() and the fetches that follow; it is closed out when its rows
+    are exhausted, at the next execute() or at close().
+    """
+
+    def __init__(self, cursor, dialect: str, explain: Callable[[str, Any], List[str]],
+                 step_counter: Optional[Callable[[], int]] = None):
+        self._cursor = cursor
+        self._dialect = dialect
+        self._explain = explain
+        self._step_counter = step_counter
+        self._sql: Optional[str] = None
+        self._params: Any = ()
+        self._seconds = 0.0
+        self._rows = 0
+        self._steps = 0
+
+    def _phase(self, seconds: float, rows: int, steps: int, first: bool):
+        self._seconds += seconds
+        self._rows += rows
+        self._steps += steps
+        query_stats.add(self._sql, self._dialect, seconds, rows, steps, call=first)
+        tally = _current_tally.get()
+        if tally is not None:
+            tally.count += first
+            tally.seconds += seconds
+            tally.rows += rows
+
+    def _run(self, call: Callable[[], Any], first: bool, rows_of: Callable[[Any], int]) -> Any:
+        steps_before = self._step_counter() if self._step_counter else 0
+        started = time.perf_counter()
+        result = call()
+        seconds = time.perf_counter() - started
+        steps = (self._step_counter() - steps_before) if self._step_counter else 0
+        self._phase(seconds, rows_of(result), steps, first)
+        return result
+
+    def _finish(self):
+        if self._sql is None:
+            return
+        sql, params, seconds = self._sql, self._params, self._seconds
+        self._sql = None
+
+        plan = None
+        if seconds * 1000 >= SLOW_QUERY_MS:
+            plan = self._plan(sql, params)
+            tally = _current_tally.get()
+            if tally is not None:
+                tally.slow += 1
+            logger.warning(f"🐢 Slow query {seconds * 1000:.1f} ms · {self._rows} rows · {self._steps} steps · "
+                           f"{fingerprint(sql)}" + "".join(f"\n    {line}" for line in plan))
+        query_stats.finish(sql, self._dialect, seconds, self._rows, self._steps, plan)
+
+    def _plan(self, sql: str, params: Any) -> List[str]:
+        if not sql.lstrip().lower().startswith(EXPLAINABLE):
+            return []
+        try:
+            return self._explain(sql, params)
+        except Exception as e:
+            return [f"(no plan: {e})"]
+
+    def execute(self, sql: str, params=()):
+        self._finish()
+        self._sql, self._params = sql, params
+        self._seconds, self._rows, self._steps = 0.0, 0, 0
+        try:
+            self._run(lambda: self._cursor.execute(sql, params), True, lambda _: 0)
+        except Exception:
+            self._sql = None
+            raise
+        if self._cursor.description is None:
+            # No result set (DDL/DML): done already
+            self._finish()
+        return self
+
+    def executemany(self, sql: str, seq_of_params):
+        self._finish()
+        self._sql, self._params = sql, ()
+        self._seconds, self._rows, self._steps = 0.0, 0, 0
+        try:
+            self._run(lambda: self._cursor.executemany(sql, seq_of_params), True, lambda _: 0)
+        finally:
+            self._finish()
+        return self
+
+    def fetchone(self):
+        if self._sql is None:
+            return self._cursor.fetchone()
+        row = self._run(self._cursor.fetchone, False, lambda row: 0 if row is None else 1)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size: int = 1):
+        if self._sql is None:
+            return self._cursor.fetchmany(size)
+        rows = self._run(lambda: self._cursor.fetchmany(size), False, len)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        if self._sql is None:
+            return self._cursor.fetchall()
+        rows = self._run(self._cursor.fetchall, False, len)
+        self._finish()
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def finish_statements(self):
+        self._finish()
+
+    def close(self):
+        self._finish()
+        self._cursor.close()
+
+    def __getattr__(self, name: str):
+        # description, rowcount, lastrowid, ...
+        return getattr(self._cursor, name)
+
+
+class InstrumentedSQLiteConnection:
+    """sqlite3 connection wrapper whose cursors are instrumented and whose VM steps are counted"""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._steps = 0
+        self._cursors: List[InstrumentedCursor] = []
+        conn.set_progress_handler(self._count_steps, STEP_INTERVAL)
+
+    def _count_steps(self) -> int:
+        self._steps += STEP_INTERVAL
+        return 0
+
+    def _explain(self, sql: str, params: Any) -> List[str]:
+        rows = self._conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        return [row[3] for row in rows]
+
+    def cursor(self) -> InstrumentedCursor:
+        cursor = InstrumentedCursor(self._conn.cursor(), "sqlite", self._explain, lambda: self._steps)
+        self._cursors.append(cursor)
+        return cursor
+
+    def finish_statements(self):
+        """Close out statements whose rows were not read to the end (e.g. a single fetchone())"""
+        cursors, self._cursors = self._cursors, []
+        for cursor in cursors:
+            cursor.finish_statements()
+
+    def execute(self, sql: str, params=()) -> InstrumentedCursor:
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql: str, seq_of_params) -> InstrumentedCursor:
+        return self.cursor().executemany(sql, seq_of_params)
+
+    def __getattr__(self, name: str):
+        return getattr(self._conn, name)
+
+
+def instrument_sqlite(conn):
+    """Wrap a sqlite3 connection for accounting (unchanged when QUERY_STATS_ENABLED is off)"""
+    return InstrumentedSQLiteConnection(conn) if QUERY_STATS_ENABLED else conn
+
+
+def finish_statements(conn):
+    """Close out a wrapped connection's open statements when its unit of work ends"""
+    finish = getattr(conn, "finish_statements", None)
+    if finish is not None:
+        finish()
+
+
+def instrument_cursor(cursor, dialect: str, explain: Callable[[str, Any], List[str]]):
+    """Wrap a DB-API cursor for accounting (unchanged when QUERY_STATS_ENABLED is off)"""
+    return InstrumentedCursor(cursor, dialect, explain) if QUERY_STATS_ENABLED else cursor
@@ -0,0 +1,257 @@
+"""
+Policy-driven automatic credential rotation
+
+Rotation policies give a maximum credential age per supplier and
+environment; either may be '*' to match any value, and the most specific
+policy wins:
+
+    (supplier, environment) > (supplier, '*') > ('*', environment) > ('*', '*')
+
+A background thread in the API process scans for credentials past their
+policy's age with a range scan on idx_credentials_updated_at (oldest
+first, keyset-paged), then rotates them in rate-limited batches through a
+small worker pool, through the same supplier adapters as the rotate
+endpoint (rotate_data receives the credential row and its current data).
+
+Each credential comes due somewhere in the last ROTATION_JITTER fraction
+of its max age, at a point fixed by its id, so credentials created
+together are spread out instead of all coming due at the same moment.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Scheduler configuration (override with environment variables)
+ROTATION_SCHEDULER_ENABLED = os.environ.get("ROTATION_SCHEDULER_ENABLED", "true").lower() == "true"
+ROTATION_SCAN_INTERVAL = float(os.environ.get("ROTATION_SCAN_INTERVAL", "300"))
+ROTATION_RATE_PER_MINUTE = int(os.environ.get("ROTATION_RATE_PER_MINUTE", "60"))
+ROTATION_BATCH_SIZE = int(os.environ.get("ROTATION_BATCH_SIZE", "10"))
+ROTATION_WORKERS = int(os.environ.get("ROTATION_WORKERS", "4"))
+ROTATION_JITTER = float(os.environ.get("ROTATION_JITTER", "0.1"))
+
+# Candidate rows read per page of the updated_at scan
+SCAN_PAGE_SIZE = 1000
+
+ROTATION_ACTOR = "rotation-scheduler"
+ANY = "*"
+
+
+def ensure_rotation_schema(conn: sqlite3.Connection):
+    """Policy table (same DDL on both backends)"""
+    conn.cursor().execute("""
+        CREATE TABLE IF NOT EXISTS rotation_policies (
+            supplier TEXT NOT NULL,
+            environment TEXT NOT NULL,
+            max_age_days INTEGER NOT NULL,
+            updated_by TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (supplier, environment)
+        )
+    """)
+    conn.commit()
+
+
+def resolve_policy(policies: Dict[Tuple[str, str], Dict], supplier: str, environment: str) -> Optional[Dict]:
+    """Most specific policy for a credential, or None"""
+    for key in ((supplier, environment), (supplier, ANY), (ANY, environment), (ANY, ANY)):
+        policy = policies.get(key)
+        if policy is not None:
+            return policy
+    return None
+
+
+def jitter_fraction(cred_id: int) -> float:
+    """Stable value in [0, 1) spread evenly over consecutive ids (Knuth multiplicative hash)"""
+    return (cred_id * 2654435761 % 2**32) / 2**32
+
+
+def due_age(cred_id: int, max_age_days: int, jitter: float = ROTATION_JITTER) -> timedelta:
+    """Age at which a credential is rotated: within the last `jitter` fraction of the max age"""
+    return timedelta(days=max_age_days * (1 - jitter * jitter_fraction(cred_id)))
+
+
+def _parse_timestamp(value: str) -> datetime:
+    # SQLite stores ISO strings; PostgreSQL rows are normalized to them by storage
+    return datetime.fromisoformat(value)
+
+
+class RotationScheduler:
+    """
+    Background thread that rotates credentials past their policy's max age.
+
+    Every scan refreshes the gauges (due, overdue) and rotates at most what
+    the rate limit allows until the next scan; the rest stays due and is
+    picked up, oldest first, by the following scans.
+    """
+
+    def __init__(self, storage, rotate_data: Callable[[Dict, dict], dict],
+                 scan_interval: float = ROTATION_SCAN_INTERVAL,
+                 rate_per_minute: int = ROTATION_RATE_PER_MINUTE,
+                 batch_size: int = ROTATION_BATCH_SIZE,
+                 workers: int = ROTATION_WORKERS,
+                 jitter: float = ROTATION_JITTER):
+        self.storage = storage
+        self.rotate_data = rotate_data
+        self.scan_interval = scan_interval
+        self.rate_per_minute = rate_per_minute
+        self.batch_size = batch_size
+        self.workers = workers
+        self.jitter = jitter
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._gauges = {
+            "policies": 0,
+            "due": 0,
+            "overdue": 0,
+            "oldest_due_days": None,
+            "last_scan_at": None,
+            "last_scan_ms": None,
+            "rotated_total": 0,
+            "failed_total": 0,
+        }
+
+    # ---------- scanning ----------
+
+    def find_due(self, now: Optional[datetime] = None) -> Tuple[List[Dict], int, int]:
+        """
+        (due credentials oldest first, overdue count, policy count).
+
+        Overdue credentials are past their policy's full max age, i.e. past
+        the point jitter may push their rotation to.
+        """
+        now = now or datetime.now()
+        policies = {(p["supplier"], p["environment"]): p for p in self.storage.list_rotation_policies()}
+        if not policies:
+            return [], 0, 0
+
+        # Nothing younger than the shortest jittered max age can be due
+        shortest = min(p["max_age_days"] for p in policies.values())
+        cutoff = (now - timedelta(days=shortest * (1 - self.jitter))).isoformat()
+
+        due, overdue = [], 0
+        after = None
+        while True:
+            rows = self.storage.fetch_rotation_candidates(cutoff, after, SCAN_PAGE_SIZE)
+            for row in rows:
+                policy = resolve_policy(policies, row["supplier"], row["environment"])
+                if policy is None:
+                    continue
+                age = now - _parse_timestamp(row["updated_at"])
+                if age >= due_age(row["id"], policy["max_age_days"], self.jitter):
+                    late = age >= timedelta(days=policy["max_age_days"])
+                    due.append(dict(row, policy=policy, age=age, overdue=late))
+                    overdue += late
+            if len(rows) < SCAN_PAGE_SIZE:
+                break
+            after = (rows[-1]["updated_at"], rows[-1]["id"])
+        return due, overdue, len(policies)
+
+    # ---------- rotating ----------
+
+    def rotate_one(self, candidate: Dict) -> bool:
+        """Rotate one due credential unless it changed since the scan"""
+        row = self.storage.get_credential(candidate["id"])
+        if row is None or row["updated_at"] != candidate["updated_at"]:
+            return False  # Deleted, or rotated/updated by someone else meanwhile
+        policy = candidate["policy"]
+        new_data = self.rotate_data(row, json.loads(row["data"]))
+        # Conditional on updated_at: a manual rotation during rotate_data is not overwritten
+        updated = self.storage.update_credential(
+            row["id"],
+            {"data": json.dumps(new_data)},
+            actor=ROTATION_ACTOR,
+            action="rotate",
+            details=(f"Rotated credential {row['id']} by policy {policy['supplier']}/{policy['environment']}"
+                     f" (max age {policy['max_age_days']} days, age {candidate['age'].days} days)"),
+            expected_updated_at=row["updated_at"]
+        )
+        return updated is not None
+
+    def rotate_due(self, due: List[Dict], limit: int) -> int:
+        """Rotate up to `limit` due credentials, batch by batch within the rate limit"""
+        rotated = 0
+        batch_seconds = self.batch_size * 60.0 / self.rate_per_minute
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="rotation-worker") as pool:
+            for start in range(0, min(len(due), limit), self.batch_size):
+                if self._stop.is_set():
+                    break
+                started = time.monotonic()
+                batch = due[start:min(start + self.batch_size, limit)]
+                for candidate, future in [(c, pool.submit(self.rotate_one, c)) for c in batch]:
+                    try:
+                        done = future.result()
+                    except Exception as e:
+                        logger.error(f"Rotation of credential {candidate['id']} failed: {e}")
+                        with self._lock:
+                            self._gauges["failed_total"] += 1
+                        continue
+                    with self._lock:
+                        # Rotated here or changed by someone else: no longer due either way
+                        self._gauges["due"] -= 1
+                        self._gauges["overdue"] -= candidate["overdue"]
+                        self._gauges["rotated_total"] += done
+                    rotated += done
+                self._stop.wait(max(0.0, batch_seconds - (time.monotonic() - started)))
+        return rotated
+
+    def run_once(self) -> int:
+        """Scan, refresh the gauges and rotate what the rate limit allows until the next scan"""
+        started = time.perf_counter()
+        due, overdue, policies = self.find_due()
+        with self._lock:
+            self._gauges.update(
+                policies=policies,
+                due=len(due),
+                overdue=overdue,
+                oldest_due_days=round(due[0]["age"].total_seconds() / 86400, 1) if due else None,
+                last_scan_at=datetime.now().isoformat(),
+                last_scan_ms=round((time.perf_counter() - started) * 1000, 1),
+            )
+
+        limit = max(self.batch_size, int(self.rate_per_minute * self.scan_interval / 60))
+        return self.rotate_due(due, limit)
+
+    def gauges(self) -> Dict:
+        """Due/overdue counts from the last scan, plus running totals"""
+        with self._lock:
+            return dict(self._gauges, running=self.is_alive())
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                rotated = self.run_once()
+                if rotated:
+                    logger.info(f"🔄 Rotation scheduler rotated {rotated} credentials")
+            except Exception as e:
+                logger.error(f"Rotation scheduler error: {e}")
+            self._stop.wait(self.scan_interval)
+
+    def start(self):
+        """Start the background scheduler thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="rotation-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Signal the scheduler to stop after its current batch"""
+        self._stop.set()
+
+    def join(self, timeout: float = 5.0):
+        """Wait for the thread to exit after stop()"""
+        if self._thread:
+            self._thread.join(timeout)
+
+    def is_alive(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
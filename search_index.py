@@ -0,0 +1,310 @@
+"""
+Full-text search index for credentials and audit history
+SQLite FTS5 tables (tsvector + GIN on PostgreSQL) kept in sync with the base
+tables by triggers
+"""
+
+import re
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+# Audit search index: one row per audit log (rowid = audit_logs.id).
+# Supplier and environment are denormalized from credentials at insert time
+# so matches survive credential deletion and never need a join to rank. The
+# columns a hit shows are stored too (unindexed) and rows are never deleted
+# with their audit row, so logs moved to the audit archive stay searchable.
+AUDIT_FTS_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS audit_logs_fts USING fts5(
+        details, actor, supplier, environment,
+        cred_id UNINDEXED, action UNINDEXED, timestamp UNINDEXED,
+        tokenize = 'unicode61'
+    )
+    """,
+    "DROP TRIGGER IF EXISTS audit_logs_fts_ai",
+    "DROP TRIGGER IF EXISTS audit_logs_fts_ad",
+    "DROP TRIGGER IF EXISTS audit_logs_fts_au",
+    """
+    CREATE TRIGGER audit_logs_fts_ai AFTER INSERT ON audit_logs BEGIN
+        INSERT INTO audit_logs_fts (rowid, details, actor, supplier, environment, cred_id, action, timestamp)
+        SELECT new.id, new.details, new.actor,
+               COALESCE(c.supplier, ''), COALESCE(c.environment, ''),
+               new.cred_id, new.action, new.timestamp
+        FROM (SELECT 1) LEFT JOIN credentials c ON c.id = new.cred_id;
+    END
+    """,
+    """
+    CREATE TRIGGER audit_logs_fts_au AFTER UPDATE OF details, actor, cred_id, action, timestamp ON audit_logs BEGIN
+        DELETE FROM audit_logs_fts WHERE rowid = old.id;
+        INSERT INTO audit_logs_fts (rowid, details, actor, supplier, environment, cred_id, action, timestamp)
+        SELECT new.id, new.details, new.actor,
+               COALESCE(c.supplier, ''), COALESCE(c.environment, ''),
+               new.cred_id, new.action, new.timestamp
+        FROM (SELECT 1) LEFT JOIN credentials c ON c.id = new.cred_id;
+    END
+    """,
+]
+
+# Credential search index: external-content table over the non-secret columns
+# (the data column is never indexed)
+CREDENTIALS_FTS_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS credentials_fts USING fts5(
+        supplier, environment, auth_type, created_by,
+        content = 'credentials', content_rowid = 'id',
+        tokenize = 'unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS credentials_fts_ai AFTER INSERT ON credentials BEGIN
+        INSERT INTO credentials_fts (rowid, supplier, environment, auth_type, created_by)
+        VALUES (new.id, new.supplier, new.environment, new.auth_type, new.created_by);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS credentials_fts_ad AFTER DELETE ON credentials BEGIN
+        INSERT INTO credentials_fts (credentials_fts, rowid, supplier, environment, auth_type, created_by)
+        VALUES ('delete', old.id, old.supplier, old.environment, old.auth_type, old.created_by);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS credentials_fts_au AFTER UPDATE OF supplier, environment, auth_type, created_by ON credentials BEGIN
+        INSERT INTO credentials_fts (credentials_fts, rowid, supplier, environment, auth_type, created_by)
+        VALUES ('delete', old.id, old.supplier, old.environment, old.auth_type, old.created_by);
+        INSERT INTO credentials_fts (rowid, supplier, environment, auth_type, created_by)
+        VALUES (new.id, new.supplier, new.environment, new.auth_type, new.created_by);
+    END
+    """,
+]
+
+# PostgreSQL equivalent: a tsvector side table for audit logs, filled by a
+# trigger (no foreign key: rows outlive archived audit logs, as in SQLite),
+# and an expression GIN index over the credential columns
+PG_SEARCH_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS audit_logs_search (
+        audit_id INTEGER PRIMARY KEY,
+        cred_id INTEGER,
+        action TEXT,
+        actor TEXT,
+        details TEXT,
+        timestamp TIMESTAMP,
+        supplier TEXT,
+        environment TEXT,
+        document tsvector NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_audit_logs_search_document ON audit_logs_search USING GIN (document)",
+    """
+    CREATE OR REPLACE FUNCTION audit_logs_search_sync() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO audit_logs_search (audit_id, cred_id, action, actor, details, timestamp,
+                                       supplier, environment, document)
+        SELECT NEW.id, NEW.cred_id, NEW.action, NEW.actor, NEW.details, NEW.timestamp,
+               c.supplier, c.environment,
+               to_tsvector('simple', NEW.details || ' ' || NEW.actor || ' ' ||
+                                     COALESCE(c.supplier, '') || ' ' || COALESCE(c.environment, ''))
+        FROM (SELECT 1) AS one LEFT JOIN credentials c ON c.id = NEW.cred_id
+        ON CONFLICT (audit_id) DO UPDATE
+        SET cred_id = EXCLUDED.cred_id, action = EXCLUDED.action, actor = EXCLUDED.actor,
+            details = EXCLUDED.details, timestamp = EXCLUDED.timestamp,
+            supplier = EXCLUDED.supplier, environment = EXCLUDED.environment, document = EXCLUDED.document;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS audit_logs_search_sync ON audit_logs",
+    """
+    CREATE TRIGGER audit_logs_search_sync AFTER INSERT OR UPDATE OF details, actor, cred_id, action, timestamp ON audit_logs
+    FOR EACH ROW EXECUTE FUNCTION audit_logs_search_sync()
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_credentials_search ON credentials USING GIN (
+        to_tsvector('simple', supplier || ' ' || environment || ' ' || auth_type || ' ' || created_by)
+    )
+    """,
+]
+
+SEARCH_SCOPES = ("audit", "credentials")
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _table_exists(cursor, name: str, dialect: str = "sqlite") -> bool:
+    if dialect == "postgresql":
+        cursor.execute("SELECT 1 FROM information_schema.tables WHERE table_name = ?", (name,))
+    else:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (name,))
+    return cursor.fetchone() is not None
+
+
+def _column_exists(cursor, table: str, column: str, dialect: str = "sqlite") -> bool:
+    if dialect == "postgresql":
+        cursor.execute("SELECT 1 FROM information_schema.columns WHERE table_name = ? AND column_name = ?",
+                       (table, column))
+        return cursor.fetchone() is not None
+    cursor.execute(f"PRAGMA table_info({table})")
+    return any(row[1] == column for row in cursor.fetchall())
+
+
+def ensure_search_index(conn: sqlite3.Connection, dialect: str = "sqlite"):
+    """Create the search tables and sync triggers, backfilling existing rows on first run"""
+    cursor = conn.cursor()
+
+    if dialect == "postgresql":
+        is_new = not _table_exists(cursor, "audit_logs_search", dialect)
+        if not is_new and not _column_exists(cursor, "audit_logs_search", "action", dialect):
+            # Earlier layout: hit columns were joined from audit_logs, which cascaded deletes
+            cursor.execute("ALTER TABLE audit_logs_search DROP CONSTRAINT IF EXISTS audit_logs_search_audit_id_fkey")
+            cursor.execute("""
+                ALTER TABLE audit_logs_search
+                    ADD COLUMN cred_id INTEGER, ADD COLUMN action TEXT, ADD COLUMN actor TEXT,
+                    ADD COLUMN details TEXT, ADD COLUMN timestamp TIMESTAMP
+            """)
+            cursor.execute("""
+                UPDATE audit_logs_search s
+                SET cred_id = al.cred_id, action = al.action, actor = al.actor,
+                    details = al.details, timestamp = al.timestamp
+                FROM audit_logs al
+                WHERE al.id = s.audit_id
+            """)
+        for statement in PG_SEARCH_SCHEMA:
+            cursor.execute(statement)
+        if is_new:
+            cursor.execute("""
+                INSERT INTO audit_logs_search (audit_id, cred_id, action, actor, details, timestamp,
+                                               supplier, environment, document)
+                SELECT al.id, al.cred_id, al.action, al.actor, al.details, al.timestamp,
+                       c.supplier, c.environment,
+                       to_tsvector('simple', al.details || ' ' || al.actor || ' ' ||
+                                             COALESCE(c.supplier, '') || ' ' || COALESCE(c.environment, ''))
+                FROM audit_logs al
+                LEFT JOIN credentials c ON c.id = al.cred_id
+            """)
+        conn.commit()
+        return
+
+    audit_is_new = not _table_exists(cursor, "audit_logs_fts")
+    if not audit_is_new and not _column_exists(cursor, "audit_logs_fts", "action"):
+        # Earlier layout without the hit columns: rebuild from the hot table
+        cursor.execute("DROP TABLE audit_logs_fts")
+        audit_is_new = True
+    credentials_is_new = not _table_exists(cursor, "credentials_fts")
+
+    for statement in AUDIT_FTS_SCHEMA + CREDENTIALS_FTS_SCHEMA:
+        cursor.execute(statement)
+
+    if audit_is_new:
+        cursor.execute("""
+            INSERT INTO audit_logs_fts (rowid, details, actor, supplier, environment, cred_id, action, timestamp)
+            SELECT al.id, al.details, al.actor,
+                   COALESCE(c.supplier, ''), COALESCE(c.environment, ''),
+                   al.cred_id, al.action, al.timestamp
+            FROM audit_logs al
+            LEFT JOIN credentials c ON c.id = al.cred_id
+        """)
+
+    if credentials_is_new:
+        cursor.execute("INSERT INTO credentials_fts (credentials_fts) VALUES ('rebuild')")
+
+    conn.commit()
+
+
+def build_match_query(q: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term ("sab"*), so user input can never
+    inject FTS operators and partially typed words still match.
+    """
+    tokens = _TOKEN_RE.findall(q or "")
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def build_tsquery(q: str) -> Optional[str]:
+    """PostgreSQL counterpart of build_match_query: every word as a prefix (sab:* & rot:*)"""
+    tokens = _TOKEN_RE.findall(q or "")
+    if not tokens:
+        return None
+    return " & ".join(f"{token}:*" for token in tokens)
+
+
+def search_audit_logs(conn: sqlite3.Connection, q: str, limit: int = 20,
+                      offset: int = 0) -> Tuple[List[Dict], bool]:
+    """
+    Ranked prefix search over audit details, actor, supplier and environment.
+
+    Returns (hits, has_more). Only limit + 1 rows are ranked and fetched; no
+    COUNT(*) over the match set is run so latency does not grow with the
+    total number of hits.
+    """
+    match = build_match_query(q)
+    if match is None:
+        return [], False
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT f.rowid, f.cred_id, f.action, f.actor, f.timestamp,
+               f.supplier, f.environment,
+               snippet(audit_logs_fts, 0, '[', ']', '…', 12) AS snippet,
+               f.rank
+        FROM audit_logs_fts f
+        WHERE audit_logs_fts MATCH ?
+        ORDER BY f.rank
+        LIMIT ? OFFSET ?
+    """, (match, limit + 1, offset))
+    rows = cursor.fetchall()
+
+    hits = []
+    for row in rows[:limit]:
+        hits.append({
+            "kind": "audit",
+            "id": row[0],
+            "cred_id": row[1],
+            "action": row[2],
+            "actor": row[3],
+            "timestamp": row[4],
+            "supplier": row[5] or None,
+            "environment": row[6] or None,
+            "snippet": row[7],
+            "rank": row[8],
+        })
+    return hits, len(rows) > limit
+
+
+def search_credentials(conn: sqlite3.Connection, q: str, limit: int = 20,
+                       offset: int = 0) -> Tuple[List[Dict], bool]:
+    """Ranked prefix search over credential supplier, environment, auth type and creator"""
+    match = build_match_query(q)
+    if match is None:
+        return [], False
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT c.id, c.supplier, c.environment, c.auth_type, c.created_by, c.updated_at,
+               f.rank
+        FROM credentials_fts f
+        JOIN credentials c ON c.id = f.rowid
+        WHERE credentials_fts MATCH ?
+        ORDER BY f.rank
+        LIMIT ? OFFSET ?
+    """, (match, limit + 1, offset))
+    rows = cursor.fetchall()
+
+    hits = []
+    for row in rows[:limit]:
+        hits.append({
+            "kind": "credential",
+            "id": row[0],
+            "cred_id": row[0],
+            "supplier": row[1],
+            "environment": row[2],
+            "action": None,
+            "actor": row[4],
+            "timestamp": row[5],
+            "snippet": f"{row[1]} ({row[2]}) · {row[3]}",
+            "rank": row[6],
+        })
+    return hits, len(rows) > limit
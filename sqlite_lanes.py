@@ -0,0 +1,235 @@
+"""
+Read/write split for SQLite
+Reads go to a small pool of read-only connections (mode=ro URI plus
+PRAGMA query_only); every write is funnelled through one writer connection
+owned by a dedicated thread. Under WAL, readers never wait for the writer,
+and because there is only ever one writer per process, writers never fight
+each other for the database lock.
+"""
+
+import contextvars
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+from query_stats import finish_statements, instrument_sqlite
+
+logger = logging.getLogger(__name__)
+
+# Lane configuration (override with environment variables)
+SQLITE_READ_POOL_SIZE = int(os.environ.get("SQLITE_READ_POOL_SIZE", "4"))
+SQLITE_BUSY_TIMEOUT = float(os.environ.get("SQLITE_BUSY_TIMEOUT", "30"))
+SQLITE_WRITE_QUEUE_SIZE = int(os.environ.get("SQLITE_WRITE_QUEUE_SIZE", "1000"))
+
+
+def _connect(db_path: str, read_only: bool) -> sqlite3.Connection:
+    if read_only:
+        uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        # Autocommit mode: read transactions are opened explicitly with BEGIN
+        conn = sqlite3.connect(uri, uri=True, timeout=SQLITE_BUSY_TIMEOUT,
+                               isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+    else:
+        conn = sqlite3.connect(db_path, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def open_read_only(db_path: str) -> sqlite3.Connection:
+    """A standalone read-only connection outside the pool (caller closes it)"""
+    return _connect(db_path, read_only=True)
+
+
+class SQLiteReadPool:
+    """
+    Bounded pool of read-only connections.
+
+    When all connections are busy, callers queue up and each released
+    connection is handed to the longest-waiting caller, so a busy thread
+    cannot starve the others by re-acquiring in a tight loop.
+    """
+
+    def __init__(self, db_path: str, size: int = SQLITE_READ_POOL_SIZE):
+        self.db_path = db_path
+        self.size = size
+        self._lock = threading.Lock()
+        self._idle = []
+        self._waiters = deque()
+        self._opened = 0
+        self._closed = False
+
+    def _acquire(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+            if self._opened < self.size:
+                self._opened += 1
+                waiter = None
+            else:
+                waiter = {"ready": threading.Event(), "conn": None}
+                self._waiters.append(waiter)
+
+        if waiter is not None:
+            waiter["ready"].wait()
+            return waiter["conn"]
+
+        try:
+            return _connect(self.db_path, read_only=True)
+        except Exception:
+            with self._lock:
+                self._opened -= 1
+            raise
+
+    def _release(self, conn: sqlite3.Connection):
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter["conn"] = conn
+                waiter["ready"].set()
+                return
+            if not self._closed:
+                self._idle.append(conn)
+                return
+            self._opened -= 1
+        conn.close()
+
+    @contextmanager
+    def connection(self):
+        """
+        Yield a read-only connection inside one read transaction, so several
+        SELECTs in the block see the same snapshot.
+        """
+        conn = self._acquire()
+        try:
+            conn.execute("BEGIN")
+            instrumented = instrument_sqlite(conn)
+            try:
+                yield instrumented
+            finally:
+                finish_statements(instrumented)
+                conn.execute("ROLLBACK")
+        finally:
+            self._release(conn)
+
+    def close(self):
+        """Close idle connections; busy ones are closed when released"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._opened -= len(idle)
+        for conn in idle:
+            conn.close()
+
+
+class SQLiteWriter:
+    """
+    Single writer thread with its own connection.
+
+    submit() queues a callable taking the connection and returns a Future;
+    each callable runs in its own transaction, committed when it returns and
+    rolled back if it raises.
+    """
+
+    def __init__(self, db_path: str, queue_size: int = SQLITE_WRITE_QUEUE_SIZE):
+        self.db_path = db_path
+        # Opened here so the database file (and its WAL) exist before any
+        # read-only connection tries to open it
+        self._conn = _connect(db_path, read_only=False)
+        # Operations get the instrumented connection (see query_stats)
+        self._instrumented = instrument_sqlite(self._conn)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+
+    def is_alive(self) -> bool:
+        """Whether the writer thread is still accepting work"""
+        return self._thread.is_alive()
+
+    def submit(self, operation: Callable[[sqlite3.Connection], Any]) -> Future:
+        """Queue a write; the Future resolves to the operation's return value"""
+        if not self.is_alive():
+            raise RuntimeError("SQLite writer is closed")
+        future = Future()
+        # Runs in the caller's context, so per-request query tallies include the write
+        self._queue.put((operation, future, contextvars.copy_context()))
+        return future
+
+    def execute(self, operation: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Queue a write and wait for its result"""
+        if threading.current_thread() is self._thread:
+            # Nested write from inside an operation: already in the writer
+            return operation(self._instrumented)
+        return self.submit(operation).result()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            operation, future, context = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = context.run(self._apply, operation)
+                self._conn.commit()
+            except Exception as e:
+                try:
+                    self._conn.rollback()
+                except sqlite3.Error as rollback_error:
+                    logger.error(f"SQLite writer rollback failed: {rollback_error}")
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+        self._conn.close()
+
+    def _apply(self, operation: Callable[[sqlite3.Connection], Any]) -> Any:
+        try:
+            return operation(self._instrumented)
+        finally:
+            finish_statements(self._instrumented)
+
+    def close(self, timeout: float = 5.0):
+        """Finish queued writes, then close the writer connection"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+
+_lanes: Dict[str, Tuple[SQLiteReadPool, SQLiteWriter]] = {}
+_lanes_lock = threading.Lock()
+
+
+def get_sqlite_lanes(db_path: str) -> Tuple[SQLiteReadPool, SQLiteWriter]:
+    """
+    The process-wide (read pool, writer) pair for a database file.
+
+    Everything in the process that writes to the same file shares the one
+    writer thread, whichever module opened it first.
+    """
+    key = str(Path(db_path).resolve())
+    with _lanes_lock:
+        lanes = _lanes.get(key)
+        if lanes is None or not lanes[1].is_alive():
+            writer = SQLiteWriter(db_path)
+            lanes = (SQLiteReadPool(db_path), writer)
+            _lanes[key] = lanes
+        return lanes
+
+
+def close_sqlite_lanes(db_path: str):
+    """Drain and close the lanes for a database file, if open"""
+    key = str(Path(db_path).resolve())
+    with _lanes_lock:
+        lanes = _lanes.pop(key, None)
+    if lanes:
+        lanes[1].close()
+        lanes[0].close()
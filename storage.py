@@ -0,0 +1,954 @@
+"""
+Storage layer for the credential API
+Every api.py handler goes through a Storage object. SQLiteStorage and
+PostgresStorage share the query code (written with ? placeholders) and differ
+only in connection handling, schema DDL and search.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from search_index import ensure_search_index, search_audit_logs, search_credentials, build_tsquery
+from audit_archive import ensure_archive_schema
+from audit_rollups import ensure_rollup_schema, get_audit_stats
+from change_feed import ensure_change_feed_schema, get_changes, current_sequence
+from sqlite_lanes import get_sqlite_lanes, close_sqlite_lanes
+from export_engine import export_to_file
+from query_stats import finish_statements, instrument_cursor
+from masking import ensure_masked_data_column, masked_json
+from credential_crypto import DecryptingCursor, decrypt_data, decrypt_rows, encrypt_data, ensure_encrypted_data
+from rotation_scheduler import ensure_rotation_schema
+from idempotency import ensure_idempotency_schema
+
+# Connection pool settings for PostgreSQL
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+
+# Columns a caller may change through update_credential
+UPDATABLE_COLUMNS = ("supplier", "environment", "auth_type", "data", "allow_self_rotation")
+
+# Credential columns other than the secret; masked reads add masked_data AS data
+CREDENTIAL_COLUMNS = "id, supplier, environment, auth_type, created_by, created_at, updated_at, allow_self_rotation"
+
+# Demo credentials written into an empty database on startup (API and app);
+# history holds extra audit entries after the create: (action, actor, details)
+SAMPLE_CREDENTIALS = [
+    {"supplier": "Sabre", "environment": "production", "auth_type": "api_key",
+     "data": {"api_key": "sabre_prod_key_9x8y7z6"}, "created_by": "alice@nezasa.com", "allow_self_rotation": True,
+     "history": [("update", "bob@nezasa.com", "Updated authentication data for Sabre")]},
+    {"supplier": "Amadeus", "environment": "production", "auth_type": "api_key",
+     "data": {"api_key": "amadeus_api_a1b2c3d4e5"}, "created_by": "bob@nezasa.com", "allow_self_rotation": False,
+     "history": [("rotate", "alice@nezasa.com", "Rotated API key for Amadeus")]},
+    {"supplier": "Google Maps", "environment": "production", "auth_type": "api_key",
+     "data": {"api_key": "AIzaSyD_GoogleMapsKey123"}, "created_by": "alice@nezasa.com", "allow_self_rotation": False,
+     "history": []},
+    {"supplier": "Stripe", "environment": "production", "auth_type": "api_key",
+     "data": {"api_key": "sk_live_stripe_secret_key"}, "created_by": "carol@nezasa.com", "allow_self_rotation": True,
+     "history": [("view", "carol@nezasa.com", "Viewed credential details for Stripe")]},
+    {"supplier": "Payyo", "environment": "sandbox", "auth_type": "username_password",
+     "data": {"username": "payyo_sandbox", "password": "payyo_2024_test"}, "created_by": "bob@nezasa.com",
+     "allow_self_rotation": False, "history": []},
+    {"supplier": "Viator", "environment": "production", "auth_type": "api_key",
+     "data": {"api_key": "viator_prod_key_v1a2t3"}, "created_by": "alice@nezasa.com", "allow_self_rotation": True,
+     "history": [("rotate", "bob@nezasa.com", "Rotated API key for Viator")]},
+    {"supplier": "Musement", "environment": "production", "auth_type": "api_key",
+     "data": {"api_key": "musement_api_m9u8s7"}, "created_by": "carol@nezasa.com", "allow_self_rotation": False,
+     "history": []},
+    {"supplier": "G Adventures", "environment": "production", "auth_type": "username_password",
+     "data": {"username": "gadventures_api", "password": "ga_secure_2024"}, "created_by": "bob@nezasa.com",
+     "allow_self_rotation": True, "history": [("update", "carol@nezasa.com", "Updated password for G Adventures")]},
+    {"supplier": "OTS Globe", "environment": "staging", "auth_type": "api_key",
+     "data": {"api_key": "ots_staging_key_o1t2s3"}, "created_by": "alice@nezasa.com", "allow_self_rotation": False,
+     "history": []},
+    {"supplier": "TUI", "environment": "production", "auth_type": "username_password",
+     "data": {"username": "tui_prod_user", "password": "tui_password_2024"}, "created_by": "carol@nezasa.com",
+     "allow_self_rotation": True, "history": []},
+]
+
+SQLITE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS credentials (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        supplier TEXT NOT NULL,
+        environment TEXT NOT NULL,
+        auth_type TEXT NOT NULL,
+        data TEXT NOT NULL,
+        created_by TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        allow_self_rotation BOOLEAN DEFAULT FALSE,
+        masked_data TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS audit_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        cred_id INTEGER,
+        action TEXT NOT NULL,
+        actor TEXT NOT NULL,
+        details TEXT NOT NULL,
+        timestamp TEXT NOT NULL,
+        FOREIGN KEY (cred_id) REFERENCES credentials (id)
+    )
+    """,
+]
+
+# Secondary indexes for filtered, time-ordered audit reads and credential
+# filters (same syntax on both backends)
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_audit_logs_cred_id ON audit_logs (cred_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_audit_logs_action ON audit_logs (action, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_audit_logs_actor ON audit_logs (actor, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_credentials_supplier ON credentials (supplier, environment)",
+    "CREATE INDEX IF NOT EXISTS idx_credentials_updated_at ON credentials (updated_at)",
+]
+
+# Same tables as DatabaseManager.init_postgres_database in app.py. The audit
+# trail must outlive deleted credentials, so audit_logs.cred_id carries no
+# foreign key (SQLite never enforced it; PostgreSQL would reject deletes).
+POSTGRES_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS credentials (
+        id SERIAL PRIMARY KEY,
+        supplier TEXT NOT NULL,
+        environment TEXT NOT NULL,
+        auth_type TEXT NOT NULL,
+        data TEXT NOT NULL,
+        created_by TEXT NOT NULL,
+        created_at TIMESTAMP NOT NULL,
+        updated_at TIMESTAMP NOT NULL,
+        allow_self_rotation BOOLEAN DEFAULT FALSE,
+        masked_data TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS audit_logs (
+        id SERIAL PRIMARY KEY,
+        cred_id INTEGER,
+        action TEXT NOT NULL,
+        actor TEXT NOT NULL,
+        details TEXT NOT NULL,
+        timestamp TIMESTAMP NOT NULL
+    )
+    """,
+    "ALTER TABLE audit_logs DROP CONSTRAINT IF EXISTS audit_logs_cred_id_fkey",
+]
+
+
+class Storage:
+    """
+    Backend-neutral data access for credentials and audit logs.
+
+    Subclasses provide connection() - a context manager yielding a DB-API
+    connection whose cursors accept ? placeholders and return rows that
+    support both row["column"] and row[index] - plus init_schema() and search().
+    Reads go through reading() and writes through write(); both default to
+    connection() and may be routed elsewhere by a backend.
+    """
+
+    dialect = ""
+
+    @contextmanager
+    def connection(self):
+        raise NotImplementedError
+
+    def reading(self):
+        """Context manager yielding a connection for SELECTs only"""
+        return self.connection()
+
+    def write(self, operation: Callable[[Any], Any]) -> Any:
+        """Run operation(conn) in one write transaction and return its result"""
+        with self.connection() as conn:
+            return operation(conn)
+
+    @contextmanager
+    def stream(self, sql: str, params=()):
+        """
+        Executed cursor for a large SELECT, to be read with fetchmany().
+
+        Backends that would otherwise buffer the whole result client-side
+        use a server-side cursor here.
+        """
+        with self.reading() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            yield cursor
+
+    def init_schema(self):
+        raise NotImplementedError
+
+    def search(self, scope: str, q: str, limit: int, offset: int) -> Tuple[List[Dict], bool]:
+        raise NotImplementedError
+
+    def close(self):
+        """Release any pooled resources"""
+
+    # ---------- helpers ----------
+
+    @staticmethod
+    def _log_audit(cursor, cred_id: int, action: str, actor: str, details: str):
+        cursor.execute("""
+            INSERT INTO audit_logs (cred_id, action, actor, details, timestamp)
+            VALUES (?, ?, ?, ?, ?)
+        """, (cred_id, action, actor, details, datetime.now().isoformat()))
+
+    # ---------- credentials ----------
+
+    @staticmethod
+    def _credential_select(masked: bool) -> str:
+        """SELECT list for credential rows; masked rows carry the stored projection as data"""
+        return f"{CREDENTIAL_COLUMNS}, {'masked_data AS data' if masked else 'data'}"
+
+    def list_credentials(self, supplier: Optional[str] = None,
+                         environment: Optional[str] = None, masked: bool = False) -> List[Dict]:
+        """
+        All credentials, optionally filtered by supplier and environment.
+
+        With masked=True, data holds the masked projection and the secret
+        column is never read; otherwise data is decrypted, as one batch.
+        """
+        query = f"SELECT {self._credential_select(masked)} FROM credentials WHERE 1=1"
+        params = []
+
+        if supplier:
+            query += " AND supplier = ?"
+            params.append(supplier)
+
+        if environment:
+            query += " AND environment = ?"
+            params.append(environment)
+
+        with self.reading() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            rows = [dict(row) for row in cursor.fetchall()]
+        return rows if masked else decrypt_rows(rows)
+
+    def get_credential(self, cred_id: int, masked: bool = False) -> Optional[Dict]:
+        """A single credential row, or None (data masked or decrypted as in list_credentials)"""
+        with self.reading() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT {self._credential_select(masked)} FROM credentials WHERE id = ?", (cred_id,))
+            row = cursor.fetchone()
+        if not row:
+            return None
+        row = dict(row)
+        if not masked:
+            row["data"] = decrypt_data(row["data"])
+        return row
+
+    def create_credential(self, supplier: str, environment: str, auth_type: str,
+                          data: str, created_by: str, allow_self_rotation: bool,
+                          details: str) -> Dict:
+        """Insert a credential and its 'create' audit entry in one transaction"""
+        now = datetime.now().isoformat()
+
+        def insert(conn):
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO credentials (supplier, environment, auth_type, data, masked_data, created_by, created_at, updated_at, allow_self_rotation)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                RETURNING *
+            """, (supplier, environment, auth_type, encrypt_data(data), masked_json(data, auth_type), created_by,
+                  now, now, allow_self_rotation))
+            row = dict(cursor.fetchone(), data=data)
+
+            self._log_audit(cursor, row["id"], "create", created_by, details)
+            return row
+
+        return self.write(insert)
+
+    def seed_sample_data(self) -> int:
+        """Write SAMPLE_CREDENTIALS and their audit history if there are no credentials yet"""
+        now = datetime.now().isoformat()
+
+        def seed(conn):
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM credentials")
+            if cursor.fetchone()[0]:
+                return 0
+            for cred in SAMPLE_CREDENTIALS:
+                data = json.dumps(cred["data"])
+                cursor.execute("""
+                    INSERT INTO credentials (supplier, environment, auth_type, data, masked_data, created_by, created_at, updated_at, allow_self_rotation)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    RETURNING id
+                """, (cred["supplier"], cred["environment"], cred["auth_type"], encrypt_data(data),
+                      masked_json(data, cred["auth_type"]), cred["created_by"], now, now,
+                      cred["allow_self_rotation"]))
+                cred_id = cursor.fetchone()[0]
+                self._log_audit(cursor, cred_id, "create", cred["created_by"],
+                                f"Created credential for {cred['supplier']} ({cred['environment']})")
+                for action, actor, details in cred["history"]:
+                    self._log_audit(cursor, cred_id, action, actor, details)
+            return len(SAMPLE_CREDENTIALS)
+
+        return self.write(seed)
+
+    def update_credential(self, cred_id: int, fields: Dict[str, Any], actor: str,
+                          action: str, details: str,
+                          expected_updated_at: Optional[str] = None) -> Optional[Dict]:
+        """
+        Update columns of a credential and write an audit entry.
+
+        With expected_updated_at, the update only applies if the row still
+        has that updated_at (nobody changed it meanwhile). Returns the
+        updated row, or None if the credential does not exist or changed.
+        """
+        unknown = set(fields) - set(UPDATABLE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Cannot update columns: {', '.join(sorted(unknown))}")
+
+        columns = [column for column in UPDATABLE_COLUMNS if column in fields]
+        remask = "data" in fields or "auth_type" in fields
+
+        def update(conn):
+            cursor = conn.cursor()
+            values = dict(fields)
+            plaintext = None
+            if remask:
+                # The masked projection follows the data and auth type it was made from
+                if "data" not in values or "auth_type" not in values:
+                    cursor.execute("SELECT data, auth_type FROM credentials WHERE id = ?", (cred_id,))
+                    current = cursor.fetchone()
+                    if not current:
+                        return None
+                    values.setdefault("data", decrypt_data(current[0]))
+                    values.setdefault("auth_type", current[1])
+                plaintext = values["data"]
+                values["masked_data"] = masked_json(plaintext, values["auth_type"])
+                if "data" in fields:
+                    values["data"] = encrypt_data(plaintext)
+
+            assigned = columns + (["masked_data"] if remask else []) + ["updated_at"]
+            values["updated_at"] = datetime.now().isoformat()
+            assignments = ", ".join(f"{column} = ?" for column in assigned)
+            params = [values[column] for column in assigned] + [cred_id]
+            where = "id = ?"
+            if expected_updated_at is not None:
+                where += " AND updated_at = ?"
+                params.append(expected_updated_at)
+            cursor.execute(f"UPDATE credentials SET {assignments} WHERE {where} RETURNING *", params)
+            row = cursor.fetchone()
+            if not row:
+                return None
+            row = dict(row)
+            row["data"] = plaintext if plaintext is not None else decrypt_data(row["data"])
+
+            self._log_audit(cursor, cred_id, action, actor, details)
+            return row
+
+        return self.write(update)
+
+    def delete_credential(self, cred_id: int, actor: str, details: str) -> bool:
+        """Write the 'delete' audit entry, then remove the credential"""
+        def delete(conn):
+            cursor = conn.cursor()
+            self._log_audit(cursor, cred_id, "delete", actor, details)
+            cursor.execute("DELETE FROM credentials WHERE id = ?", (cred_id,))
+            if cursor.rowcount == 0:
+                conn.rollback()
+                return False
+            return True
+
+        return self.write(delete)
+
+    # ---------- audit ----------
+
+    def get_audit_logs(self, cred_id: Optional[int] = None, action: Optional[str] = None,
+                       since: Optional[str] = None, until: Optional[str] = None,
+                       limit: int = 100) -> List[Dict]:
+        """Newest-first audit rows from the hot table"""
+        where, params = self._audit_filters(cred_id, action, since, until)
+        query = f"SELECT * FROM audit_logs WHERE {where} ORDER BY timestamp DESC LIMIT ?"
+        params.append(limit)
+
+        with self.reading() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def _audit_filters(cred_id: Optional[int], action: Optional[str],
+                       since: Optional[str], until: Optional[str]) -> Tuple[str, List]:
+        """WHERE clause and parameters shared by audit listing and export"""
+        conditions = ["1=1"]
+        params = []
+
+        if cred_id:
+            conditions.append("cred_id = ?")
+            params.append(cred_id)
+
+        if action:
+            conditions.append("action = ?")
+            params.append(action)
+
+        if since:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+
+        if until:
+            conditions.append("timestamp < ?")
+            params.append(until)
+
+        return " AND ".join(conditions), params
+
+    def get_audit_stats(self, **filters) -> Dict:
+        """Audit counts from the daily rollups (see audit_rollups.get_audit_stats)"""
+        with self.reading() as conn:
+            return get_audit_stats(conn, dialect=self.dialect, **filters)
+
+    def fetch_aged_audit_rows(self, cutoff: str, limit: int) -> List[Dict]:
+        """Oldest audit rows before cutoff, with the supplier resolved, for archiving"""
+        with self.reading() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT al.id, al.cred_id, al.action, al.actor, al.details, al.timestamp,
+                       c.supplier
+                FROM audit_logs al
+                LEFT JOIN credentials c ON al.cred_id = c.id
+                WHERE al.timestamp < ?
+                ORDER BY al.timestamp
+                LIMIT ?
+            """, (cutoff, limit))
+            return [dict(row) for row in cursor.fetchall()]
+
+    def delete_audit_rows(self, ids: List[int]):
+        """Remove archived rows from the hot table"""
+        if not ids:
+            return
+        self.write(lambda conn: conn.cursor().execute(
+            f"DELETE FROM audit_logs WHERE id IN ({', '.join('?' * len(ids))})",
+            ids
+        ))
+
+    # ---------- rotation policies ----------
+
+    def list_rotation_policies(self) -> List[Dict]:
+        with self.reading() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM rotation_policies ORDER BY supplier, environment")
+            return [dict(row) for row in cursor.fetchall()]
+
+    def set_rotation_policy(self, supplier: str, environment: str, max_age_days: int, actor: str) -> Dict:
+        """Create or replace the policy for a supplier/environment pair ('*' matches any)"""
+        now = datetime.now().isoformat()
+
+        def upsert(conn):
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO rotation_policies (supplier, environment, max_age_days, updated_by, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (supplier, environment) DO UPDATE SET
+                    max_age_days = excluded.max_age_days,
+                    updated_by = excluded.updated_by,
+                    updated_at = excluded.updated_at
+                RETURNING *
+            """, (supplier, environment, max_age_days, actor, now))
+            return dict(cursor.fetchone())
+
+        return self.write(upsert)
+
+    def delete_rotation_policy(self, supplier: str, environment: str) -> bool:
+        def delete(conn):
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM rotation_policies WHERE supplier = ? AND environment = ?",
+                           (supplier, environment))
+            return cursor.rowcount > 0
+
+        return self.write(delete)
+
+    def fetch_rotation_candidates(self, cutoff: str, after: Optional[Tuple[str, int]],
+                                  limit: int) -> List[Dict]:
+        """
+        Credentials last updated before cutoff, oldest first, after the
+        (updated_at, id) keyset of the previous page: a range scan on
+        idx_credentials_updated_at that never reads the secret column
+        """
+        query = "SELECT id, supplier, environment, updated_at FROM credentials WHERE updated_at < ?"
+        params = [cutoff]
+        if after is not None:
+            query += " AND (updated_at, id) > (?, ?)"
+            params += list(after)
+        query += " ORDER BY updated_at, id LIMIT ?"
+        params.append(limit)
+
+        with self.reading() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
+
+    # ---------- idempotency keys ----------
+
+    def claim_idempotency_key(self, scope: str, key: str, fingerprint: str, now: str,
+                              locked_until: str, expires_at: str) -> Optional[Dict]:
+        """
+        Claim a key for a new request: None if claimed (new, expired, or
+        abandoned by a request that never finished), else the existing row
+        """
+        def claim(conn):
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO idempotency_keys (scope, key, fingerprint, status, created_at, locked_until, expires_at)
+                VALUES (?, ?, ?, 'in_progress', ?, ?, ?)
+                ON CONFLICT (scope, key) DO NOTHING
+            """, (scope, key, fingerprint, now, locked_until, expires_at))
+            if cursor.rowcount == 1:
+                return None
+            cursor.execute("""
+                UPDATE idempotency_keys
+                SET fingerprint = ?, status = 'in_progress', status_code = NULL, response = NULL,
+                    created_at = ?, locked_until = ?, expires_at = ?
+                WHERE scope = ? AND key = ?
+                  AND (expires_at < ? OR (status = 'in_progress' AND locked_until < ?))
+            """, (fingerprint, now, locked_until, expires_at, scope, key, now, now))
+            if cursor.rowcount == 1:
+                return None
+            cursor.execute("SELECT * FROM idempotency_keys WHERE scope = ? AND key = ?", (scope, key))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+        return self.write(claim)
+
+    def complete_idempotency_key(self, scope: str, key: str, claimed_at: str, status_code: int,
+                                 response: str) -> bool:
+        """
+        Store the response of the claim made at claimed_at (its created_at);
+        False if that claim was taken over after its lock expired
+        """
+        def complete(conn):
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE idempotency_keys SET status = 'completed', status_code = ?, response = ?, locked_until = NULL
+                WHERE scope = ? AND key = ? AND created_at = ? AND status = 'in_progress'
+            """, (status_code, response, scope, key, claimed_at))
+            return cursor.rowcount == 1
+
+        return self.write(complete)
+
+    def release_idempotency_key(self, scope: str, key: str, claimed_at: str) -> bool:
+        """Forget the in-progress claim made at claimed_at whose request failed, so a retry runs again"""
+        def release(conn):
+            cursor = conn.cursor()
+            cursor.execute("""
+                DELETE FROM idempotency_keys
+                WHERE scope = ? AND key = ? AND created_at = ? AND status = 'in_progress'
+            """, (scope, key, claimed_at))
+            return cursor.rowcount == 1
+
+        return self.write(release)
+
+    def delete_expired_idempotency_keys(self, now: str, limit: int) -> int:
+        """Delete up to limit expired keys (oldest expiry first); returns how many"""
+        def delete(conn):
+            cursor = conn.cursor()
+            cursor.execute("""
+                DELETE FROM idempotency_keys WHERE (scope, key) IN (
+                    SELECT scope, key FROM idempotency_keys WHERE expires_at < ? ORDER BY expires_at LIMIT ?
+                )
+            """, (now, limit))
+            return cursor.rowcount
+
+        return self.write(delete)
+
+    # ---------- change feed ----------
+
+    def get_changes(self, since: int, limit: int, masked: bool = False) -> Tuple[List[Dict], bool, int]:
+        """(changes, has_more, current_seq) read in one transaction"""
+        with self.reading() as conn:
+            changes, has_more = get_changes(conn, since, limit, masked=masked)
+            seq = current_sequence(conn)
+        if not masked:
+            decrypt_rows([change["credential"] for change in changes if change["credential"] is not None])
+        return changes, has_more, seq
+
+    # ---------- exports ----------
+
+    def export_audit_logs(self, fmt: str, cred_id: Optional[int] = None, action: Optional[str] = None,
+                          since: Optional[str] = None, until: Optional[str] = None) -> Tuple[str, int]:
+        """Newest-first hot audit rows streamed into an export file; returns (path, rows)"""
+        where, params = self._audit_filters(cred_id, action, since, until)
+        query = f"""
+            SELECT id, cred_id, action, actor, details, timestamp
+            FROM audit_logs WHERE {where}
+            ORDER BY timestamp DESC, id DESC
+        """
+        with self.stream(query, params) as cursor:
+            return export_to_file(cursor, fmt)
+
+    def export_credentials(self, fmt: str, include_data: bool, supplier: Optional[str] = None,
+                           environment: Optional[str] = None) -> Tuple[str, int]:
+        """Credentials streamed into an export file; secret data (decrypted) only if include_data"""
+        columns = "id, supplier, environment, auth_type, created_by, created_at, updated_at, allow_self_rotation"
+        if include_data:
+            columns += ", data"
+        query = f"SELECT {columns} FROM credentials WHERE 1=1"
+        params = []
+
+        if supplier:
+            query += " AND supplier = ?"
+            params.append(supplier)
+
+        if environment:
+            query += " AND environment = ?"
+            params.append(environment)
+
+        with self.stream(query + " ORDER BY id", params) as cursor:
+            return export_to_file(DecryptingCursor(cursor) if include_data else cursor, fmt)
+
+
+# ==================== SQLite ====================
+
+class SQLiteStorage(Storage):
+    """
+    SQLite file database split into two lanes (see sqlite_lanes): reads use
+    pooled read-only connections, writes are queued to the process-wide
+    writer thread. The database runs in WAL mode so reads never wait.
+    """
+
+    dialect = "sqlite"
+
+    def __init__(self, db_path: str = "credentials.db"):
+        self.db_path = db_path
+        self._reads, self._writer = get_sqlite_lanes(db_path)
+
+    @contextmanager
+    def connection(self):
+        # Ad-hoc access is read-only; writes must go through write()
+        with self._reads.connection() as conn:
+            yield conn
+
+    def reading(self):
+        return self._reads.connection()
+
+    def write(self, operation: Callable[[Any], Any]) -> Any:
+        return self._writer.execute(operation)
+
+    def init_schema(self):
+        def create(conn):
+            cursor = conn.cursor()
+            for statement in SQLITE_SCHEMA + INDEXES:
+                cursor.execute(statement)
+            conn.commit()
+
+            ensure_masked_data_column(conn)
+            ensure_encrypted_data(conn)
+            ensure_search_index(conn)
+            ensure_archive_schema(conn)
+            ensure_rollup_schema(conn)
+            ensure_change_feed_schema(conn)
+            ensure_rotation_schema(conn)
+            ensure_idempotency_schema(conn)
+
+        self.write(create)
+
+    def search(self, scope: str, q: str, limit: int, offset: int) -> Tuple[List[Dict], bool]:
+        with self.reading() as conn:
+            if scope == "audit":
+                return search_audit_logs(conn, q, limit, offset)
+            return search_credentials(conn, q, limit, offset)
+
+    def close(self):
+        close_sqlite_lanes(self.db_path)
+
+
+# ==================== PostgreSQL ====================
+
+_PLACEHOLDER_RE = re.compile(r"\?")
+_PREPARABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+MAX_PREPARED_PER_CONNECTION = 200
+
+
+def _to_postgres(sql: str) -> Tuple[str, int]:
+    """Rewrite ? placeholders as $1..$n for PREPARE; returns (sql, n)"""
+    counter = 0
+
+    def replace(_match):
+        nonlocal counter
+        counter += 1
+        return f"${counter}"
+
+    return _PLACEHOLDER_RE.sub(replace, sql), counter
+
+
+def _normalize_value(value):
+    # API models carry timestamps as ISO strings, as SQLite stores them
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class _PostgresCursor:
+    """
+    DB-API cursor facade: ? placeholders, server-side prepared statements,
+    rows addressable by name and index, timestamps as ISO strings.
+    """
+
+    def __init__(self, conn, prepared: Dict[str, str], name: Optional[str] = None):
+        from psycopg2.extras import DictCursor
+        # A named cursor is server-side: rows arrive as they are fetched
+        self._cursor = conn.cursor(name=name, cursor_factory=DictCursor)
+        self._prepared = prepared
+        self._server_side = name is not None
+
+    def execute(self, sql: str, params=()):
+        params = tuple(params)
+        statement = sql.strip()
+
+        if self._server_side:
+            # DECLARE ... CURSOR cannot wrap EXECUTE of a prepared statement
+            self._cursor.execute(statement.replace("%", "%%").replace("?", "%s"), params)
+            return self
+
+        if not statement.upper().startswith(_PREPARABLE):
+            # DDL and utility statements run as-is
+            self._cursor.execute(statement, params or None)
+            return self
+
+        name = self._prepared.get(statement)
+        pg_sql, count = _to_postgres(statement)
+        if name is None and len(self._prepared) < MAX_PREPARED_PER_CONNECTION:
+            name = f"stmt_{len(self._prepared) + 1}"
+            self._cursor.execute(f"PREPARE {name} AS {pg_sql}")
+            self._prepared[statement] = name
+
+        if name is None:
+            # Prepared statement budget exhausted: plain parameterized query
+            self._cursor.execute(statement.replace("%", "%%").replace("?", "%s"), params)
+        elif count:
+            self._cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * count)})", params)
+        else:
+            self._cursor.execute(f"EXECUTE {name}")
+        return self
+
+    def _row(self, row):
+        if row is None:
+            return None
+        for i, value in enumerate(row):
+            row[i] = _normalize_value(value)
+        return row
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def fetchmany(self, size: int):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+
+class _PostgresConnection:
+    """Pooled psycopg2 connection wrapped to hand out (instrumented) _PostgresCursor objects"""
+
+    dialect = "postgresql"
+
+    def __init__(self, conn, prepared: Dict[str, str]):
+        self._conn = conn
+        self._prepared = prepared
+        self._cursors = []
+
+    def cursor(self, name: Optional[str] = None):
+        cursor = instrument_cursor(_PostgresCursor(self._conn, self._prepared, name), self.dialect, self._explain)
+        self._cursors.append(cursor)
+        return cursor
+
+    def _explain(self, sql: str, params) -> List[str]:
+        """Plan of a slow statement, for the slow-query log"""
+        cursor = self._conn.cursor()
+        try:
+            cursor.execute("EXPLAIN " + sql.replace("%", "%%").replace("?", "%s"), tuple(params))
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def finish_statements(self):
+        cursors, self._cursors = self._cursors, []
+        for cursor in cursors:
+            finish_statements(cursor)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+
+class PostgresStorage(Storage):
+    """
+    PostgreSQL backend with a bounded connection pool.
+
+    At most DB_POOL_MAX connections are open; further callers wait up to
+    DB_POOL_TIMEOUT seconds for a free one instead of failing. Each pooled
+    connection keeps its own cache of server-side prepared statements.
+    """
+
+    dialect = "postgresql"
+
+    def __init__(self, dsn: str, minconn: int = DB_POOL_MIN, maxconn: int = DB_POOL_MAX,
+                 pool_timeout: float = DB_POOL_TIMEOUT):
+        from psycopg2.pool import ThreadedConnectionPool
+
+        self.dsn = dsn
+        self.pool_timeout = pool_timeout
+        self._pool = ThreadedConnectionPool(minconn, maxconn, dsn)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._prepared: Dict[int, Dict[str, str]] = {}
+
+    @contextmanager
+    def connection(self):
+        if not self._slots.acquire(timeout=self.pool_timeout):
+            raise TimeoutError(f"No database connection available after {self.pool_timeout}s")
+
+        conn = self._pool.getconn()
+        prepared = self._prepared.setdefault(id(conn), {})
+        broken = False
+        try:
+            wrapped = _PostgresConnection(conn, prepared)
+            try:
+                yield wrapped
+            finally:
+                finish_statements(wrapped)
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+                # Statements prepared inside the failed transaction may be gone
+                prepared.clear()
+                conn.cursor().execute("DEALLOCATE ALL")
+                conn.commit()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            if broken or conn.closed:
+                self._prepared.pop(id(conn), None)
+            self._pool.putconn(conn, close=broken or bool(conn.closed))
+            self._slots.release()
+
+    @contextmanager
+    def stream(self, sql: str, params=()):
+        with self.reading() as conn:
+            cursor = conn.cursor(name=f"stream_{uuid.uuid4().hex}")
+            try:
+                cursor.execute(sql, params)
+                yield cursor
+            finally:
+                cursor.close()
+
+    def init_schema(self):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            for statement in POSTGRES_SCHEMA + INDEXES:
+                cursor.execute(statement)
+            conn.commit()
+
+            ensure_masked_data_column(conn, dialect=self.dialect)
+            ensure_encrypted_data(conn)
+            ensure_search_index(conn, dialect=self.dialect)
+            ensure_archive_schema(conn)
+            ensure_rollup_schema(conn, dialect=self.dialect)
+            ensure_change_feed_schema(conn, dialect=self.dialect)
+            ensure_rotation_schema(conn)
+            ensure_idempotency_schema(conn)
+
+    def search(self, scope: str, q: str, limit: int, offset: int) -> Tuple[List[Dict], bool]:
+        tsquery = build_tsquery(q)
+        if tsquery is None:
+            return [], False
+
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            if scope == "audit":
+                cursor.execute("""
+                    SELECT s.audit_id AS id, s.cred_id, s.action, s.actor, s.timestamp,
+                           s.supplier, s.environment,
+                           ts_headline('simple', s.details, q, 'StartSel=[, StopSel=], MaxWords=12, MinWords=3') AS snippet,
+                           -ts_rank(s.document, q) AS rank
+                    FROM to_tsquery('simple', ?) AS q, audit_logs_search s
+                    WHERE s.document @@ q
+                    ORDER BY rank
+                    LIMIT ? OFFSET ?
+                """, (tsquery, limit + 1, offset))
+                rows = cursor.fetchall()
+                hits = [{
+                    "kind": "audit",
+                    "id": row["id"],
+                    "cred_id": row["cred_id"],
+                    "action": row["action"],
+                    "actor": row["actor"],
+                    "timestamp": row["timestamp"],
+                    "supplier": row["supplier"],
+                    "environment": row["environment"],
+                    "snippet": row["snippet"],
+                    "rank": row["rank"],
+                } for row in rows[:limit]]
+            else:
+                cursor.execute("""
+                    SELECT c.id, c.supplier, c.environment, c.auth_type, c.created_by, c.updated_at,
+                           -ts_rank(to_tsvector('simple', c.supplier || ' ' || c.environment || ' ' || c.auth_type || ' ' || c.created_by), q) AS rank
+                    FROM to_tsquery('simple', ?) AS q, credentials c
+                    WHERE to_tsvector('simple', c.supplier || ' ' || c.environment || ' ' || c.auth_type || ' ' || c.created_by) @@ q
+                    ORDER BY rank
+                    LIMIT ? OFFSET ?
+                """, (tsquery, limit + 1, offset))
+                rows = cursor.fetchall()
+                hits = [{
+                    "kind": "credential",
+                    "id": row["id"],
+                    "cred_id": row["id"],
+                    "supplier": row["supplier"],
+                    "environment": row["environment"],
+                    "action": None,
+                    "actor": row["created_by"],
+                    "timestamp": row["updated_at"],
+                    "snippet": f"{row['supplier']} ({row['environment']}) · {row['auth_type']}",
+                    "rank": row["rank"],
+                } for row in rows[:limit]]
+            return hits, len(rows) > limit
+
+    def close(self):
+        self._pool.closeall()
+
+
+# ==================== Backend selection ====================
+
+def get_storage() -> Storage:
+    """
+    Storage backend for this process.
+
+    DATABASE_URL (set by Railway/Render/Heroku) wins; otherwise the backend
+    comes from database_config.get_database_config().
+    """
+    database_url = os.environ.get("DATABASE_URL")
+    if database_url:
+        return PostgresStorage(database_url)
+
+    try:
+        from database_config import get_database_config
+        config = get_database_config()
+    except ImportError:
+        config = {"use_postgres": False, "sqlite_path": "credentials.db"}
+
+    if config["use_postgres"]:
+        return PostgresStorage(config["postgres_url"])
+    return SQLiteStorage(config["sqlite_path"])
@@ -0,0 +1,351 @@
+"""
+Supplier rotation adapters
+Rotating a credential means asking its supplier for a new secret. Each
+supplier gets an asyncio adapter, and SupplierRotator wraps every call
+with that supplier's limits:
+
+  concurrency  at most N calls in flight per supplier (asyncio.Semaphore)
+  timeout      per attempt, not counting time spent waiting for a slot
+  retries      timeouts, connection errors, 429 and 5xx are retried with
+               exponential backoff and full jitter, honouring Retry-After
+  breaker      after `breaker_threshold` consecutive failures (429s
+               excluded: throttling is handled by backing off) the supplier
+               is skipped for `breaker_reset` seconds, then one trial call
+               decides whether it is back
+
+Every attempt of one rotation carries the same Idempotency-Key, so a
+supplier that honours it never rotates twice when a response is lost.
+
+Suppliers without an adapter keep the local behaviour: the new secret is
+generated in-process (LocalAdapter). HTTP suppliers are configured with
+SUPPLIER_ADAPTERS, a JSON object keyed by supplier name:
+
+    {"Sabre": {"url": "https://rotation.sabre.example", "concurrency": 4, "timeout": 10}}
+
+HTTP adapters need httpx (pip install httpx).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional dependency
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+SUPPLIER_ADAPTERS = os.environ.get("SUPPLIER_ADAPTERS", "")
+SUPPLIER_CONCURRENCY = int(os.environ.get("SUPPLIER_CONCURRENCY", "4"))
+SUPPLIER_TIMEOUT = float(os.environ.get("SUPPLIER_TIMEOUT", "10"))
+SUPPLIER_RETRIES = int(os.environ.get("SUPPLIER_RETRIES", "3"))
+SUPPLIER_BACKOFF = float(os.environ.get("SUPPLIER_BACKOFF", "0.2"))
+SUPPLIER_BREAKER_THRESHOLD = int(os.environ.get("SUPPLIER_BREAKER_THRESHOLD", "5"))
+SUPPLIER_BREAKER_RESET = float(os.environ.get("SUPPLIER_BREAKER_RESET", "30"))
+MAX_BACKOFF = 5.0
+
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class RotationError(Exception):
+    """A supplier did not rotate a credential"""
+
+    def __init__(self, supplier: str, message: str, retryable: bool = False,
+                 retry_after: Optional[float] = None, throttled: bool = False):
+        super().__init__(f"{supplier}: {message}")
+        self.supplier = supplier
+        self.retryable = retryable
+        self.retry_after = retry_after
+        self.throttled = throttled
+
+
+class CircuitOpenError(RotationError):
+    """The supplier's circuit breaker is open; no call was made"""
+
+
+class SupplierLimits:
+    """Concurrency, timeout, retry and circuit breaker settings for one supplier"""
+
+    def __init__(self, concurrency: int = SUPPLIER_CONCURRENCY, timeout: float = SUPPLIER_TIMEOUT,
+                 retries: int = SUPPLIER_RETRIES, backoff: float = SUPPLIER_BACKOFF,
+                 breaker_threshold: int = SUPPLIER_BREAKER_THRESHOLD,
+                 breaker_reset: float = SUPPLIER_BREAKER_RESET):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return min(retry_after, MAX_BACKOFF)
+        return random.uniform(0, min(MAX_BACKOFF, self.backoff * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    closed: calls go through; `threshold` consecutive failures open it
+    open: calls are refused until `reset` seconds have passed
+    half-open: one trial call; any answer closes the breaker (a rotation, or a
+               rejected or throttled request), a failure reopens it
+    """
+
+    def __init__(self, threshold: int, reset: float):
+        self.threshold = threshold
+        self.reset = reset
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.opens = 0
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self._trial or time.monotonic() - self.opened_at >= self.reset:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial:
+            self._trial = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def end_trial(self):
+        """The trial call ended without an outcome (cancelled): the next call is the trial"""
+        self._trial = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial or self.failures >= self.threshold:
+            if self.opened_at is None or self._trial:
+                self.opens += 1
+            self.opened_at = time.monotonic()
+            self._trial = False
+
+
+# ==================== Adapters ====================
+
+class SupplierAdapter:
+    """Rotates credentials at one supplier; returns the new data to store"""
+
+    async def rotate(self, credential: Dict, data: Dict, idempotency_key: str) -> Dict:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class LocalAdapter(SupplierAdapter):
+    """No supplier call: the new secret is generated in-process"""
+
+    def __init__(self, generate: Callable[[str, dict], dict]):
+        self.generate = generate
+
+    async def rotate(self, credential: Dict, data: Dict, idempotency_key: str) -> Dict:
+        return self.generate(credential["auth_type"], data)
+
+
+class HTTPSupplierAdapter(SupplierAdapter):
+    """
+    POST {url}/rotate with the credential's current data; the JSON response
+    body is the new data. 429 and 5xx responses are retryable, other
+    errors are not.
+    """
+
+    def __init__(self, supplier: str, url: str, headers: Optional[Dict[str, str]] = None):
+        if httpx is None:
+            raise ImportError("HTTP supplier adapters require httpx: pip install httpx")
+        self.supplier = supplier
+        self.url = url.rstrip("/")
+        self.headers = headers or {}
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    def _http(self) -> "httpx.AsyncClient":
+        # Created on first use, inside the event loop that runs the rotations
+        if self._client is None:
+            self._client = httpx.AsyncClient(headers=self.headers, timeout=None)
+        return self._client
+
+    async def rotate(self, credential: Dict, data: Dict, idempotency_key: str) -> Dict:
+        try:
+            response = await self._http().post(
+                f"{self.url}/rotate",
+                json={
+                    "credential_id": credential["id"],
+                    "environment": credential["environment"],
+                    "auth_type": credential["auth_type"],
+                    "current": data,
+                },
+                headers={"Idempotency-Key": idempotency_key},
+            )
+        except httpx.TransportError as e:
+            raise RotationError(self.supplier, f"{type(e).__name__}: {e}", retryable=True)
+
+        if response.status_code >= 400:
+            retry_after = response.headers.get("Retry-After")
+            try:
+                retry_after = float(retry_after) if retry_after else None
+            except ValueError:
+                retry_after = None
+            raise RotationError(self.supplier, f"HTTP {response.status_code}: {response.text[:200]}",
+                                retryable=response.status_code in RETRYABLE_STATUSES,
+                                retry_after=retry_after, throttled=response.status_code == 429)
+        try:
+            new_data = response.json()
+        except ValueError:
+            new_data = None
+        if not isinstance(new_data, dict):
+            raise RotationError(self.supplier, "response body is not a JSON object")
+        return new_data
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# ==================== Rotator ====================
+
+class SupplierRotator:
+    """
+    Routes rotations to supplier adapters under per-supplier limits.
+
+    All rotations run on one event loop: the API's, attached on startup.
+    Threads (the rotation scheduler's workers) use rotate_threadsafe(), so
+    concurrency limits and breakers are shared with the rotate endpoint.
+    """
+
+    def __init__(self, default: SupplierAdapter, default_limits: Optional[SupplierLimits] = None):
+        self.default = default
+        self.default_limits = default_limits or SupplierLimits()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._adapters: Dict[str, SupplierAdapter] = {}
+        self._limits: Dict[str, SupplierLimits] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def register(self, supplier: str, adapter: SupplierAdapter, limits: Optional[SupplierLimits] = None):
+        self._adapters[supplier] = adapter
+        if limits is not None:
+            self._limits[supplier] = limits
+
+    def attach_loop(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+
+    def _limits_for(self, supplier: str) -> SupplierLimits:
+        return self._limits.get(supplier, self.default_limits)
+
+    def _breaker(self, supplier: str) -> CircuitBreaker:
+        breaker = self._breakers.get(supplier)
+        if breaker is None:
+            limits = self._limits_for(supplier)
+            breaker = self._breakers[supplier] = CircuitBreaker(limits.breaker_threshold, limits.breaker_reset)
+        return breaker
+
+    def _semaphore(self, supplier: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(supplier)
+        if semaphore is None:
+            semaphore = self._semaphores[supplier] = asyncio.Semaphore(self._limits_for(supplier).concurrency)
+        return semaphore
+
+    def _count(self, supplier: str, name: str):
+        stats = self._stats.setdefault(supplier, {"calls": 0, "rotated": 0, "retries": 0, "failed": 0})
+        stats[name] += 1
+
+    async def rotate(self, credential: Dict, data: Dict) -> Dict:
+        """New data for a credential from its supplier; raises RotationError"""
+        supplier = credential["supplier"]
+        adapter = self._adapters.get(supplier, self.default)
+        limits = self._limits_for(supplier)
+        breaker = self._breaker(supplier)
+        idempotency_key = uuid.uuid4().hex
+
+        attempt = 0
+        while True:
+            trial = breaker.state == "half-open"
+            if not breaker.allow():
+                self._count(supplier, "failed")
+                raise CircuitOpenError(supplier, "circuit open, supplier skipped", retryable=True)
+            try:
+                async with self._semaphore(supplier):
+                    self._count(supplier, "calls")
+                    try:
+                        new_data = await asyncio.wait_for(adapter.rotate(credential, data, idempotency_key),
+                                                          limits.timeout)
+                    except asyncio.TimeoutError:
+                        error = RotationError(supplier, f"timed out after {limits.timeout}s", retryable=True)
+                    except RotationError as e:
+                        error = e
+                    else:
+                        breaker.record_success()
+                        self._count(supplier, "rotated")
+                        return new_data
+
+                # Only an unhealthy supplier trips the breaker: a rejected or throttled
+                # request still got an answer, so it counts as the supplier being up
+                if error.retryable and not error.throttled:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            finally:
+                if trial:
+                    breaker.end_trial()
+            if not error.retryable or attempt >= limits.retries:
+                self._count(supplier, "failed")
+                raise error
+            self._count(supplier, "retries")
+            await asyncio.sleep(limits.delay(attempt, error.retry_after))
+            attempt += 1
+
+    def rotate_threadsafe(self, credential: Dict, data: Dict) -> Dict:
+        """rotate() from a thread other than the loop's, blocking until done"""
+        if self.loop is None:
+            raise RuntimeError("SupplierRotator has no event loop attached")
+        return asyncio.run_coroutine_threadsafe(self.rotate(credential, data), self.loop).result()
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Per-supplier breaker state and call counts"""
+        suppliers = set(self._adapters) | set(self._stats)
+        return {
+            supplier: {
+                "adapter": type(self._adapters.get(supplier, self.default)).__name__,
+                "breaker": self._breaker(supplier).state,
+                "breaker_opens": self._breaker(supplier).opens,
+                **self._stats.get(supplier, {"calls": 0, "rotated": 0, "retries": 0, "failed": 0}),
+            }
+            for supplier in sorted(suppliers)
+        }
+
+    async def close(self):
+        for adapter in set(self._adapters.values()) | {self.default}:
+            await adapter.close()
+
+
+def load_supplier_rotator(generate: Callable[[str, dict], dict], config: str = SUPPLIER_ADAPTERS) -> SupplierRotator:
+    """Rotator with LocalAdapter as default and the HTTP suppliers of SUPPLIER_ADAPTERS"""
+    rotator = SupplierRotator(LocalAdapter(generate))
+    for supplier, options in (json.loads(config) if config else {}).items():
+        options = dict(options)
+        url = options.pop("url")
+        headers = options.pop("headers", None)
+        rotator.register(supplier, HTTPSupplierAdapter(supplier, url, headers), SupplierLimits(**options))
+        logger.info(f"🔌 {supplier} credentials rotate through {url}")
+    return rotator
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Local HTTP stub of supplier rotation APIs, for tests and benchmarks
+Serves any number of suppliers under one server, speaking the protocol of
+supplier_adapters.HTTPSupplierAdapter:
+
+    POST /{supplier}/rotate         new secret for the credential in the body
+    PUT  /{supplier}/faults         inject latency / errors ('*' = every supplier)
+    GET  /stats                     requests, errors and rotations per supplier
+
+Faults: latency (seconds) plus up to latency_jitter more, error_rate (share
+of requests answered 503), max_concurrency (requests over it get 429 with
+Retry-After) and down (every request fails with 503). A repeated
+Idempotency-Key gets the first response back without rotating again.
+
+    python supplier_stub.py --port 9100 --latency 0.05 --error-rate 0.05
+    SUPPLIER_ADAPTERS='{"Sabre": {"url": "http://localhost:9100/Sabre"}}' python api.py
+"""
+
+import argparse
+import asyncio
+import random
+import secrets
+from typing import Dict, Optional
+
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+ANY = "*"
+
+
+class Faults(BaseModel):
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    error_rate: float = 0.0
+    max_concurrency: int = 0
+    down: bool = False
+
+
+class RotateRequest(BaseModel):
+    credential_id: int
+    environment: str
+    auth_type: str
+    current: Dict
+
+
+def create_app(faults: Optional[Faults] = None) -> FastAPI:
+    app = FastAPI(title="Supplier rotation stub")
+    app.state.faults = {ANY: faults or Faults()}
+    app.state.in_flight = {}
+    app.state.stats = {}
+    app.state.responses = {}
+
+    def faults_for(supplier: str) -> Faults:
+        return app.state.faults.get(supplier, app.state.faults[ANY])
+
+    def count(supplier: str, name: str):
+        stats = app.state.stats.setdefault(supplier, {"requests": 0, "rotated": 0, "errors": 0, "throttled": 0})
+        stats[name] += 1
+
+    @app.post("/{supplier}/rotate")
+    async def rotate(supplier: str, body: RotateRequest, idempotency_key: Optional[str] = Header(None)):
+        count(supplier, "requests")
+        if idempotency_key and (supplier, idempotency_key) in app.state.responses:
+            return app.state.responses[(supplier, idempotency_key)]
+
+        faults = faults_for(supplier)
+        in_flight = app.state.in_flight.get(supplier, 0)
+        if faults.max_concurrency and in_flight >= faults.max_concurrency:
+            count(supplier, "throttled")
+            return JSONResponse({"detail": "Too many concurrent rotations"}, status_code=429,
+                                headers={"Retry-After": "0.1"})
+
+        app.state.in_flight[supplier] = in_flight + 1
+        try:
+            await asyncio.sleep(faults.latency + random.uniform(0, faults.latency_jitter))
+            if faults.down or random.random() < faults.error_rate:
+                count(supplier, "errors")
+                raise HTTPException(status_code=503, detail=f"{supplier} rotation temporarily unavailable")
+        finally:
+            app.state.in_flight[supplier] -= 1
+
+        if body.auth_type == "username_password":
+            new_data = {"username": body.current.get("username", "rotated_user"),
+                        "password": f"{supplier.lower()}_{secrets.token_hex(8)}"}
+        else:
+            new_data = {"api_key": f"sk_{supplier.lower()}_{secrets.token_hex(16)}"}
+        if idempotency_key:
+            app.state.responses[(supplier, idempotency_key)] = new_data
+        count(supplier, "rotated")
+        return new_data
+
+    @app.put("/{supplier}/faults")
+    async def set_faults(supplier: str, faults: Faults):
+        app.state.faults[supplier] = faults
+        return faults
+
+    @app.get("/stats")
+    async def get_stats():
+        return app.state.stats
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-concurrency", type=int, default=0)
+    args = parser.parse_args()
+
+    faults = Faults(latency=args.latency, latency_jitter=args.latency_jitter,
+                    error_rate=args.error_rate, max_concurrency=args.max_concurrency)
+    print(f"🧪 Supplier stub on http://localhost:{args.port}/<supplier>/rotate")
+    uvicorn.run(create_app(faults), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
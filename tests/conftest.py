@@ -0,0 +1,42 @@
+import logging
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keys and archive segments go to a scratch directory, never the working tree
+_SCRATCH = tempfile.mkdtemp(prefix="credential-tests-")
+os.environ.setdefault("CREDENTIAL_KEY_FILE", os.path.join(_SCRATCH, "credential_keys.json"))
+os.environ.setdefault("AUDIT_ARCHIVE_DIR", os.path.join(_SCRATCH, "audit_archive"))
+
+logging.getLogger("query_stats").setLevel(logging.ERROR)
+
+from storage import PostgresStorage, SQLiteStorage  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def postgres_server(tmp_path_factory):
+    """One throwaway PostgreSQL server per test run (skipped without pgserver)"""
+    pgserver = pytest.importorskip("pgserver")
+    server = pgserver.get_server(tmp_path_factory.mktemp("pgdata"), cleanup_mode="stop")
+    yield server
+    server.cleanup()
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def storage(request, tmp_path):
+    """An empty, initialized Storage per test on each backend"""
+    if request.param == "sqlite":
+        backend = SQLiteStorage(str(tmp_path / "credentials.db"))
+    else:
+        server = request.getfixturevalue("postgres_server")
+        database = f"test_{uuid.uuid4().hex[:12]}"
+        server.psql(f"CREATE DATABASE {database};")
+        backend = PostgresStorage(server.get_uri(database))
+    backend.init_schema()
+    yield backend
+    backend.close()
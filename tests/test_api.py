@@ -0,0 +1,69 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+
+ADMIN_KEY = "admin_key_123"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """The API embedded as the Streamlit app runs it, on a seeded SQLite database in tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    monkeypatch.setattr(api.app.state, "embedded", True)
+    with TestClient(api.app, headers={"X-API-Key": ADMIN_KEY}) as client:
+        yield client
+
+
+def test_import_opens_no_storage_and_leaves_logging_alone(tmp_path):
+    check = ("import logging, api; "
+             "assert api.storage is None and api.idempotency is None; "
+             "assert not logging.getLogger().handlers")
+    env = dict(os.environ, PYTHONPATH=ROOT, DATABASE_URL="postgresql://nobody@127.0.0.1:1/missing")
+    result = subprocess.run([sys.executable, "-c", check], cwd=tmp_path, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert not (tmp_path / api.API_LOG_FILE).exists()
+
+
+def test_embedded_startup_keeps_host_logging(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    monkeypatch.setattr(api.app.state, "embedded", True)
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    with TestClient(api.app) as client:
+        response = client.get("/api/v1/credentials", headers={"X-API-Key": ADMIN_KEY})
+        assert response.status_code == 200
+        assert root.handlers == handlers
+    assert any(isinstance(handler, logging.FileHandler) for handler in api.logger.handlers)
+
+
+def test_rotate_replaces_data(client):
+    response = client.post("/api/v1/credentials/1/rotate")
+    assert response.status_code == 200
+    assert api.storage.get_credential(1)["data"] == json.dumps(response.json()["new_data"])
+
+
+def test_rotate_conflicts_with_update_during_supplier_call(client, monkeypatch):
+    async def slow_supplier(row, old_data):
+        # Someone edits the credential while the supplier issues the new secret
+        api.storage.update_credential(row["id"], {"data": json.dumps({"api_key": "edited"})},
+                                      actor="ops@demo.com", action="update", details="manual edit")
+        return {"api_key": "rotated"}
+
+    monkeypatch.setattr(api.supplier_rotator, "rotate", slow_supplier)
+    response = client.post("/api/v1/credentials/1/rotate")
+    assert response.status_code == 409
+    assert json.loads(api.storage.get_credential(1)["data"]) == {"api_key": "edited"}
+
+
+def test_rotate_missing_credential(client):
+    assert client.post("/api/v1/credentials/999999/rotate").status_code == 404
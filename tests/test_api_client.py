@@ -0,0 +1,185 @@
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import api
+from api_client import APIClient
+
+KEYS = {"admin": "admin-key", "viewer": "viewer-key"}
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """
+    Answers from server.script: path -> list of (status, body) served in
+    order, the last one repeating. /slow/<ms> answers after a delay.
+    """
+
+    def _answer(self):
+        self.server.seen.append((self.command, self.path, self.headers.get("X-API-Key")))
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        if self.path.startswith("/slow/"):
+            time.sleep(int(self.path.rsplit("/", 1)[1]) / 1000)
+            status, body = 200, {"path": self.path}
+        else:
+            answers = self.server.script.get(self.path, [(404, {"detail": "Not found"})])
+            status, body = answers.pop(0) if len(answers) > 1 else answers[0]
+        payload = b"" if body is None else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _answer
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ScriptedHandler)
+    httpd.script = {}
+    httpd.seen = []
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def client(server):
+    client = APIClient(f"http://127.0.0.1:{server.server_port}", KEYS, pool_size=4, backoff_factor=0)
+    yield client
+    client.close()
+
+
+def test_returns_data_and_sends_the_role_key(client, server):
+    server.script["/api/v1/credentials"] = [(200, [{"id": 1}])]
+    assert client.request("GET", "/api/v1/credentials", "viewer") == (True, [{"id": 1}], None)
+    assert server.seen == [("GET", "/api/v1/credentials", "viewer-key")]
+
+
+def test_empty_success_body_is_none(client, server):
+    server.script["/api/v1/credentials/1"] = [(204, None)]
+    assert client.request("DELETE", "/api/v1/credentials/1", "admin") == (True, None, None)
+
+
+def test_error_status_reports_detail(client, server):
+    server.script["/api/v1/credentials"] = [(403, {"detail": "Insufficient permissions"})]
+    assert client.request("POST", "/api/v1/credentials", "viewer", {"supplier": "x"}) == (
+        False, None, "API Error (403): Insufficient permissions")
+    assert client.request("GET", "/missing", "admin") == (False, None, "API Error (404): Not found")
+
+
+def test_retries_idempotent_methods_on_retryable_status(client, server):
+    server.script["/api/v1/credentials"] = [(503, {"detail": "busy"}), (502, None), (200, [])]
+    assert client.request("GET", "/api/v1/credentials", "admin") == (True, [], None)
+    assert len(server.seen) == 3
+
+    server.script["/api/v1/credentials/1"] = [(504, None), (200, {"id": 1})]
+    assert client.request("PUT", "/api/v1/credentials/1", "admin", {"environment": "staging"})[0]
+    assert len(server.seen) == 5
+
+
+def test_does_not_retry_post_on_status(client, server):
+    server.script["/api/v1/credentials/1/rotate"] = [(503, {"detail": "busy"}), (200, {"id": 1})]
+    assert client.request("POST", "/api/v1/credentials/1/rotate", "admin") == (
+        False, None, "API Error (503): busy")
+    assert len(server.seen) == 1
+
+
+def test_gives_up_after_max_retries(server):
+    server.script["/api/v1/credentials"] = [(503, {"detail": "busy"})]
+    client = APIClient(f"http://127.0.0.1:{server.server_port}", KEYS, max_retries=2, backoff_factor=0)
+    try:
+        assert client.request("GET", "/api/v1/credentials", "admin") == (False, None, "API Error (503): busy")
+    finally:
+        client.close()
+    assert len(server.seen) == 3
+
+
+def test_rejects_bad_calls_without_sending(client, server):
+    assert client.request("GET", "/", "auditor") == (False, None, "No API key found for role: auditor")
+    assert client.request("PATCH", "/", "admin") == (False, None, "Unsupported HTTP method: PATCH")
+    assert server.seen == []
+
+
+def test_server_down():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    client = APIClient(f"http://127.0.0.1:{port}", KEYS, max_retries=1, backoff_factor=0)
+    try:
+        success, data, error = client.request("GET", "/api/v1/credentials", "admin")
+    finally:
+        client.close()
+    assert (success, data) == (False, None)
+    assert "not running" in error
+
+
+def test_request_many_keeps_input_order(client, server):
+    server.script["/api/v1/credentials"] = [(200, [])]
+    calls = [
+        ("GET", "/slow/200", "admin"),
+        ("GET", "/missing", "admin"),
+        ("GET", "/slow/0", "admin"),
+        ("GET", "/api/v1/credentials", "nobody"),
+        ("GET", "/api/v1/credentials", "viewer"),
+    ]
+    assert client.request_many(calls) == [
+        (True, {"path": "/slow/200"}, None),
+        (False, None, "API Error (404): Not found"),
+        (True, {"path": "/slow/0"}, None),
+        (False, None, "No API key found for role: nobody"),
+        (True, [], None),
+    ]
+    assert client.request_many([]) == []
+
+
+def test_iter_many_yields_as_calls_finish(client, server):
+    calls = [("GET", "/slow/300", "admin"), ("GET", "/slow/0", "admin"), ("GET", "/missing", "admin")]
+    results = list(client.iter_many(calls))
+    assert sorted(index for index, _ in results) == [0, 1, 2]
+    # The slow call finishes last and keeps its index
+    assert results[-1] == (0, (True, {"path": "/slow/300"}, None))
+    assert dict(results)[2] == (False, None, "API Error (404): Not found")
+
+
+def test_latency_stats_fold_ids(client, server):
+    server.script["/api/v1/credentials/1"] = [(200, {"id": 1})]
+    server.script["/api/v1/credentials/2"] = [(404, {"detail": "Credential not found"})]
+    client.request("GET", "/api/v1/credentials/1", "admin")
+    client.request("GET", "/api/v1/credentials/2", "admin")
+
+    [stats] = client.latency_stats()
+    assert stats["endpoint"] == "GET /api/v1/credentials/{id}"
+    assert (stats["calls"], stats["errors"]) == (2, 1)
+    assert 0 <= stats["p50_ms"] <= stats["p95_ms"] <= stats["max_ms"]
+
+
+def test_unknown_transport():
+    with pytest.raises(ValueError):
+        APIClient("http://api", KEYS, transport="carrier-pigeon")
+
+
+def test_inprocess_transport(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    monkeypatch.setattr(api.app.state, "embedded", True)
+    client = APIClient("http://api.inprocess", {"admin": "admin_key_123"}, transport="inprocess",
+                       asgi_app=api.app)
+    try:
+        results = client.request_many([("GET", "/api/v1/credentials", "admin"),
+                                       ("GET", "/api/v1/credentials/999999", "admin")])
+    finally:
+        client.close()
+    assert results[0][0] and results[0][1]["total"] == 10
+    assert results[1] == (False, None, "API Error (404): Credential not found")
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from audit_archive import AuditArchive, AuditArchiver
+
+
+def audit_row(row_id, cred_id, action, timestamp):
+    return {"id": row_id, "cred_id": cred_id, "action": action, "actor": "alice@nezasa.com",
+            "details": f"{action} credential {cred_id}", "timestamp": timestamp, "supplier": "Sabre"}
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return AuditArchive(str(tmp_path / "archive"))
+
+
+def test_index_entries_summarize_credentials_and_actions(archive):
+    archive.append_block("2024-01", [audit_row(1, 7, "create", "2024-01-02T00:00:00"),
+                                     audit_row(2, 3, "rotate", "2024-01-03T00:00:00"),
+                                     audit_row(3, 7, "rotate", "2024-01-04T00:00:00")])
+    entry, = archive.read_index("2024-01")
+    assert entry["cred_ids"] == [3, 7]
+    assert entry["actions"] == ["create", "rotate"]
+
+
+def test_filtered_query_reads_only_matching_blocks(archive, monkeypatch):
+    for block in range(10):
+        archive.append_block("2024-01", [audit_row(block * 10 + i, block, "view", f"2024-01-{block + 1:02d}T00:00:{i:02d}")
+                                         for i in range(10)])
+    archive.append_block("2024-02", [audit_row(200, 4, "rotate", "2024-02-01T00:00:00")])
+
+    reads = []
+    read_block = archive._read_block
+    monkeypatch.setattr(archive, "_read_block", lambda month, entry: reads.append(month) or read_block(month, entry))
+
+    rows = archive.query(cred_id=4)
+    assert {row["cred_id"] for row in rows} == {4}
+    assert len(rows) == 11
+    assert len(reads) == 2
+
+    reads.clear()
+    assert [row["id"] for row in archive.query(action="rotate")] == [200]
+    assert reads == ["2024-02"]
+
+    reads.clear()
+    assert archive.query(cred_id=99) == []
+    assert reads == []
+
+
+def test_blocks_without_summaries_are_still_read(archive, tmp_path):
+    archive.append_block("2024-01", [audit_row(1, 7, "create", "2024-01-02T00:00:00")])
+    path = archive._index_path("2024-01")
+    with open(path) as f:
+        entry = f.read().replace('"cred_ids": [7], ', "").replace('"actions": ["create"], ', "")
+    with open(path, "w") as f:
+        f.write(entry)
+    assert "cred_ids" not in archive.read_index("2024-01")[0]
+    assert [row["id"] for row in archive.query(cred_id=7)] == [1]
+
+
+def test_archived_rows_stay_searchable(storage, archive):
+    cred = storage.create_credential("Sabre", "production", "api_key", '{"api_key": "k"}',
+                                     "alice@nezasa.com", False, "Created credential for Sabre (production)")
+    old = (datetime.now() - timedelta(days=400)).isoformat()
+
+    def backdate(conn):
+        conn.cursor().execute("UPDATE audit_logs SET timestamp = ?", (old,))
+        conn.commit()
+
+    storage.write(backdate)
+    archiver = AuditArchiver(storage, archive, retention_days=90)
+    assert archiver.archive_batch() == 1
+    assert storage.get_audit_logs() == []
+
+    hits, _ = storage.search("audit", "sabre", 10, 0)
+    assert [(hit["id"], hit["cred_id"], hit["action"]) for hit in hits] == [(1, cred["id"], "create")]
+    assert hits[0]["timestamp"] == old
+    assert hits[0]["supplier"] == "Sabre"
@@ -0,0 +1,48 @@
+import pytest
+
+
+def log_at(storage, *timestamps, action="view", actor="alice@nezasa.com"):
+    def insert(conn):
+        cursor = conn.cursor()
+        for timestamp in timestamps:
+            cursor.execute("""
+                INSERT INTO audit_logs (cred_id, action, actor, details, timestamp)
+                VALUES (?, ?, ?, ?, ?)
+            """, (None, action, actor, "details", timestamp))
+        conn.commit()
+
+    storage.write(insert)
+
+
+@pytest.mark.parametrize("day, week", [
+    ("2020-12-31", "2020-W53"),
+    ("2021-01-03", "2020-W53"),
+    ("2021-01-04", "2021-W01"),
+    ("2024-12-29", "2024-W52"),
+    ("2024-12-30", "2025-W01"),
+    ("2026-01-01", "2026-W01"),
+])
+def test_week_buckets_are_iso_weeks_on_both_backends(storage, day, week):
+    log_at(storage, f"{day}T12:00:00")
+    series = storage.get_audit_stats(bucket="week")["series"]
+    assert [b["bucket"] for b in series] == [week]
+
+
+def test_week_bucket_spans_monday_to_sunday(storage):
+    log_at(storage, "2024-06-09T23:59:59", "2024-06-10T00:00:00", "2024-06-16T23:59:59", "2024-06-17T00:00:00")
+    series = storage.get_audit_stats(bucket="week")["series"]
+    assert [(b["bucket"], b["total"]) for b in series] == [("2024-W23", 1), ("2024-W24", 2), ("2024-W25", 1)]
+
+
+def test_stats_count_rollups_by_dimension_and_bucket(storage):
+    log_at(storage, "2024-01-05T10:00:00", "2024-01-06T10:00:00", action="view")
+    log_at(storage, "2024-02-01T10:00:00", action="rotate", actor="bob@nezasa.com")
+    stats = storage.get_audit_stats(bucket="month")
+    assert stats["total"] == 3
+    assert stats["by_action"] == {"view": 2, "rotate": 1}
+    assert stats["by_actor"] == {"alice@nezasa.com": 2, "bob@nezasa.com": 1}
+    assert stats["by_supplier"] == {"System": 3}
+    assert [(b["bucket"], b["by_action"]) for b in stats["series"]] == [
+        ("2024-01", {"view": 2}), ("2024-02", {"rotate": 1})]
+    assert storage.get_audit_stats(since="2024-02-01")["total"] == 1
+    assert storage.get_audit_stats(actor="bob@nezasa.com")["by_action"] == {"rotate": 1}
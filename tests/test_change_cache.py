@@ -0,0 +1,143 @@
+import threading
+import time
+
+from change_cache import ChangeAwareCache
+
+
+class Source:
+    """Change tokens and loaders that count their calls"""
+
+    def __init__(self):
+        self.tokens = {"credentials": 1, "audit_logs": 1}
+        self.token_reads = 0
+        self.loads = {}
+
+    def read_tokens(self):
+        self.token_reads += 1
+        return dict(self.tokens)
+
+    def loader(self, key):
+        def load():
+            self.loads[key] = self.loads.get(key, 0) + 1
+            return f"{key} v{self.loads[key]}"
+        return load
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_reuses_values_while_tokens_do_not_move():
+    source = Source()
+    cache = ChangeAwareCache(source.read_tokens, token_ttl=0)
+    for _ in range(3):
+        assert cache.get("creds", ("credentials",), source.loader("creds")) == "creds v1"
+    assert source.loads == {"creds": 1}
+    assert source.token_reads == 3
+
+
+def test_moved_token_serves_stale_once_and_reloads_in_background():
+    source = Source()
+    cache = ChangeAwareCache(source.read_tokens, token_ttl=0)
+    cache.get("creds", ("credentials",), source.loader("creds"))
+    cache.get("audit", ("audit_logs",), source.loader("audit"))
+
+    source.tokens["credentials"] = 2
+    assert cache.get("creds", ("credentials",), source.loader("creds")) == "creds v1"
+    wait_for(lambda: cache.get("creds", ("credentials",), source.loader("creds")) == "creds v2")
+    assert source.loads["creds"] == 2
+
+    # Keys on other tables are untouched
+    assert cache.get("audit", ("audit_logs",), source.loader("audit")) == "audit v1"
+    assert source.loads["audit"] == 1
+
+
+def test_one_background_reload_per_key():
+    source = Source()
+    cache = ChangeAwareCache(source.read_tokens, token_ttl=0)
+    release = threading.Event()
+    calls = []
+
+    def slow_load():
+        calls.append(1)
+        release.wait(5)
+        return "reloaded"
+
+    cache.get("creds", ("credentials",), lambda: "initial")
+    source.tokens["credentials"] = 2
+    for _ in range(5):
+        assert cache.get("creds", ("credentials",), slow_load) == "initial"
+    release.set()
+    wait_for(lambda: cache.get("creds", ("credentials",), slow_load) == "reloaded")
+    assert len(calls) == 1
+
+
+def test_tokens_are_read_at_most_once_per_ttl():
+    source = Source()
+    cache = ChangeAwareCache(source.read_tokens, token_ttl=60)
+    for key in ("a", "b", "c"):
+        cache.get(key, ("credentials",), source.loader(key))
+    assert source.token_reads == 1
+
+    # Within the TTL a moved token is not seen yet
+    source.tokens["credentials"] = 2
+    assert cache.get("a", ("credentials",), source.loader("a")) == "a v1"
+    assert source.token_reads == 1
+
+
+def test_invalidate_reloads_synchronously():
+    source = Source()
+    cache = ChangeAwareCache(source.read_tokens, token_ttl=60)
+    cache.get("creds", ("credentials",), source.loader("creds"))
+
+    source.tokens["credentials"] = 2
+    cache.invalidate()
+    assert cache.get("creds", ("credentials",), source.loader("creds")) == "creds v2"
+    assert source.token_reads == 2
+    # The reloaded value carries the new token: no extra reload afterwards
+    assert cache.get("creds", ("credentials",), source.loader("creds")) == "creds v2"
+
+
+def test_value_loaded_across_an_invalidate_is_not_kept():
+    source = Source()
+    cache = ChangeAwareCache(source.read_tokens, token_ttl=0)
+
+    def load_then_write():
+        value = source.loader("creds")()
+        cache.invalidate()
+        return value
+
+    assert cache.get("creds", ("credentials",), load_then_write) == "creds v1"
+    assert cache.get("creds", ("credentials",), source.loader("creds")) == "creds v2"
+
+
+def test_failed_reload_keeps_serving_the_old_value():
+    source = Source()
+    cache = ChangeAwareCache(source.read_tokens, token_ttl=0)
+    cache.get("creds", ("credentials",), lambda: "old")
+    attempts = []
+
+    def failing():
+        attempts.append(1)
+        raise RuntimeError("database is locked")
+
+    source.tokens["credentials"] = 2
+    assert cache.get("creds", ("credentials",), failing) == "old"
+    wait_for(lambda: attempts and "creds" not in cache._refreshing)
+    assert cache.get("creds", ("credentials",), lambda: "new") == "old"
+    wait_for(lambda: cache.get("creds", ("credentials",), lambda: "new") == "new")
+
+
+def test_least_recently_used_keys_are_evicted():
+    source = Source()
+    cache = ChangeAwareCache(source.read_tokens, token_ttl=60, max_entries=2)
+    cache.get("a", ("credentials",), source.loader("a"))
+    cache.get("b", ("credentials",), source.loader("b"))
+    cache.get("a", ("credentials",), source.loader("a"))
+    cache.get("c", ("credentials",), source.loader("c"))
+
+    assert cache.get("a", ("credentials",), source.loader("a")) == "a v1"
+    assert cache.get("b", ("credentials",), source.loader("b")) == "b v2"
@@ -0,0 +1,138 @@
+import json
+import os
+import sqlite3
+import threading
+
+import pytest
+
+import credential_crypto
+from credential_crypto import (
+    CRYPTOGRAPHY_AVAILABLE, PREFIX, CredentialCipher, DecryptingCursor, LocalKeyFileKMS, decrypt_many,
+    decrypt_rows, ensure_encrypted_data, new_keys_json,
+)
+
+pytestmark = pytest.mark.skipif(not CRYPTOGRAPHY_AVAILABLE, reason="needs cryptography")
+
+
+@pytest.fixture
+def kms(tmp_path):
+    return LocalKeyFileKMS(str(tmp_path / "keys.json"))
+
+
+def test_round_trip_and_fresh_nonces(kms):
+    cipher = CredentialCipher(kms)
+    first, second = cipher.encrypt("secret"), cipher.encrypt("secret")
+    assert first.startswith(PREFIX) and first != second
+    assert cipher.decrypt(first) == cipher.decrypt(second) == "secret"
+
+
+def test_plaintext_and_none_pass_through(kms):
+    cipher = CredentialCipher(kms)
+    assert cipher.decrypt_many([None, '{"api_key": "x"}']) == [None, '{"api_key": "x"}']
+    assert decrypt_many(['{"plain": true}']) == ['{"plain": true}']
+
+
+def test_data_key_is_cached_until_max_uses(kms):
+    cipher = CredentialCipher(kms, max_uses=3)
+    values = [cipher.encrypt(f"v{i}") for i in range(7)]
+    assert kms.calls == 3
+    assert len({value.rsplit(":", 1)[0] for value in values}) == 3
+
+    reader = CredentialCipher(kms)
+    kms.calls = 0
+    assert reader.decrypt_many(values) == [f"v{i}" for i in range(7)]
+    assert kms.calls == 3  # one unwrap per data key, not per value
+    reader.decrypt_many(values)
+    assert kms.calls == 3  # and cached afterwards
+
+
+def test_master_key_rotation_keeps_old_values_readable(kms, tmp_path):
+    cipher = CredentialCipher(kms)
+    old = cipher.encrypt("before")
+    kms.rotate_master_key()
+    cipher.rotate_data_key()
+    new = cipher.encrypt("after")
+    assert old.split(":")[2] != new.split(":")[2]
+
+    reopened = CredentialCipher(LocalKeyFileKMS(str(tmp_path / "keys.json")))
+    assert reopened.decrypt_many([old, new]) == ["before", "after"]
+
+
+def test_tampered_value_is_rejected(kms):
+    cipher = CredentialCipher(kms)
+    value = cipher.encrypt("secret")
+    tampered = value[:-4] + ("AAAA" if not value.endswith("AAAA") else "BBBB")
+    with pytest.raises(Exception):
+        cipher.decrypt(tampered)
+
+
+def test_row_helpers_decrypt_the_data_column():
+    from credential_crypto import encrypt_data
+
+    rows = [{"id": 1, "data": encrypt_data('{"a": 1}')}, {"id": 2, "data": '{"b": 2}'}]
+    assert [json.loads(row["data"]) for row in decrypt_rows(rows)] == [{"a": 1}, {"b": 2}]
+
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (id INTEGER, data TEXT)")
+    conn.executemany("INSERT INTO t VALUES (?, ?)", [(i, encrypt_data(f"v{i}")) for i in range(5)])
+    cursor = DecryptingCursor(conn.execute("SELECT id, data FROM t ORDER BY id"))
+    assert cursor.fetchmany(3) == [(0, "v0"), (1, "v1"), (2, "v2")]
+    assert cursor.fetchmany(3) == [(3, "v3"), (4, "v4")]
+    assert [d[0] for d in cursor.description] == ["id", "data"]
+
+
+# ---------- master keys ----------
+
+def test_processes_racing_to_create_the_key_file_agree(tmp_path):
+    path = str(tmp_path / "keys.json")
+    created, start = [], threading.Barrier(8)
+
+    def open_kms():
+        start.wait()
+        created.append(LocalKeyFileKMS(path))
+
+    threads = [threading.Thread(target=open_kms) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({kms._active for kms in created}) == 1
+    with open(path) as f:
+        assert json.load(f)["active"] == created[0]._active
+    assert os.stat(path).st_mode & 0o777 == 0o600
+
+
+def test_missing_key_file_is_not_created_unless_asked(tmp_path):
+    with pytest.raises(RuntimeError):
+        LocalKeyFileKMS(str(tmp_path / "keys.json"), create=False)
+    assert not (tmp_path / "keys.json").exists()
+
+
+def test_keys_from_the_environment_are_never_written(tmp_path):
+    keys = new_keys_json()
+    kms = LocalKeyFileKMS(str(tmp_path / "keys.json"), keys=keys)
+    value = CredentialCipher(kms).encrypt("secret")
+    assert not (tmp_path / "keys.json").exists()
+    assert CredentialCipher(LocalKeyFileKMS(str(tmp_path / "other.json"), keys=keys)).decrypt(value) == "secret"
+    with pytest.raises(RuntimeError):
+        kms.rotate_master_key()
+
+
+def test_startup_refuses_a_new_key_for_existing_encrypted_rows(tmp_path, monkeypatch):
+    value = CredentialCipher(LocalKeyFileKMS(str(tmp_path / "lost.json"))).encrypt('{"api_key": "x"}')
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE credentials (id INTEGER PRIMARY KEY, data TEXT)")
+    conn.execute("INSERT INTO credentials (data) VALUES (?)", (value,))
+
+    monkeypatch.setattr(credential_crypto, "ENCRYPTION_ACTIVE", True)
+    monkeypatch.setattr(credential_crypto, "KEY_FILE", str(tmp_path / "missing.json"))
+    monkeypatch.setattr(credential_crypto, "_cipher", None)
+    monkeypatch.delenv(credential_crypto.KEYS_ENV, raising=False)
+    with pytest.raises(RuntimeError, match="master key is missing"):
+        ensure_encrypted_data(conn)
+    assert not (tmp_path / "missing.json").exists()
+
+    # The original key file, restored, reads them again
+    monkeypatch.setattr(credential_crypto, "KEY_FILE", str(tmp_path / "lost.json"))
+    ensure_encrypted_data(conn)
+    assert decrypt_many([value]) == ['{"api_key": "x"}']
@@ -0,0 +1,115 @@
+import gzip
+import io
+import json
+import os
+import sqlite3
+
+import pytest
+
+from export_engine import PYARROW_AVAILABLE, export_to_file, read_nzb, write_export
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (id INTEGER, name TEXT, score REAL, blob BLOB)")
+    conn.executemany("INSERT INTO t VALUES (?, ?, ?, ?)",
+                     [(i, f"name {i}" if i % 3 else None, i / 2, None) for i in range(25)])
+    return conn
+
+
+def rows(conn):
+    return conn.execute("SELECT id, name, score FROM t ORDER BY id")
+
+
+def test_nzb_round_trip_across_batches(conn):
+    sink = io.BytesIO()
+    assert write_export(rows(conn), "nzb", sink, batch_size=10) == 25
+    sink.seek(0)
+    exported = list(read_nzb(sink))
+    assert exported[0] == {"id": 0, "name": None, "score": 0.0}
+    assert exported[-2] == {"id": 23, "name": "name 23", "score": 11.5}
+    assert len(exported) == 25
+
+
+def test_csv_gz_has_one_header_and_every_row(conn):
+    sink = io.BytesIO()
+    assert write_export(rows(conn), "csv.gz", sink, batch_size=10) == 25
+    lines = gzip.decompress(sink.getvalue()).decode().splitlines()
+    assert lines[0] == "id,name,score"
+    assert len(lines) == 26
+    assert lines[2] == "1,name 1,0.5"
+
+
+@pytest.mark.parametrize("fmt", ["csv.gz", "nzb"])
+def test_empty_result_still_describes_columns(conn, fmt):
+    sink = io.BytesIO()
+    assert write_export(conn.execute("SELECT id, name FROM t WHERE 0"), fmt, sink) == 0
+    if fmt == "csv.gz":
+        assert gzip.decompress(sink.getvalue()).decode().strip() == "id,name"
+    else:
+        sink.seek(0)
+        assert list(read_nzb(sink)) == []
+
+
+@pytest.mark.skipif(not PYARROW_AVAILABLE, reason="needs pyarrow")
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_arrow_formats_round_trip(conn, fmt):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path, count = export_to_file(rows(conn), fmt, batch_size=10)
+    if fmt == "parquet":
+        table = pq.read_table(path)
+        assert pq.ParquetFile(path).num_row_groups == 3
+    else:
+        with pa.memory_map(path) as source:
+            table = pa.ipc.open_file(source).read_all()
+    assert count == table.num_rows == 25
+    assert table.column("score").type == pa.float64()
+    assert table.column("name").to_pylist()[:2] == [None, "name 1"]
+
+
+def test_invalid_format_is_rejected_and_leaves_no_file(conn, tmp_path):
+    with pytest.raises(ValueError, match="Invalid export format"):
+        export_to_file(rows(conn), "xlsx", directory=str(tmp_path))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_truncated_nzb_is_detected(conn):
+    sink = io.BytesIO()
+    write_export(rows(conn), "nzb", sink)
+    with pytest.raises(ValueError):
+        list(read_nzb(io.BytesIO(sink.getvalue()[:-3])))
+
+
+# ---------- storage exports ----------
+
+def create(storage, supplier="Sabre"):
+    return storage.create_credential(supplier, "production", "api_key", json.dumps({"api_key": "sk_live_secret1234"}),
+                                     "alice@nezasa.com", False, f"Created credential for {supplier} (production)")
+
+
+def test_export_credentials_decrypts_only_with_data(storage):
+    create(storage, "Sabre")
+    path, rows = storage.export_credentials("nzb", include_data=True)
+    with open(path, "rb") as f:
+        exported = list(read_nzb(f))
+    os.remove(path)
+    assert rows == 1
+    assert json.loads(exported[0]["data"]) == {"api_key": "sk_live_secret1234"}
+
+    path, _ = storage.export_credentials("nzb", include_data=False)
+    with open(path, "rb") as f:
+        assert "data" not in next(read_nzb(f))
+    os.remove(path)
+
+
+def test_export_audit_logs_filters(storage):
+    cred = create(storage)
+    storage.update_credential(cred["id"], {"environment": "sandbox"}, actor="a", action="update", details="")
+    path, rows = storage.export_audit_logs("nzb", action="update")
+    with open(path, "rb") as f:
+        assert [row["action"] for row in read_nzb(f)] == ["update"]
+    os.remove(path)
+    assert rows == 1
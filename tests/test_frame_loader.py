@@ -0,0 +1,49 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from frame_loader import parse_datetimes, read_frame
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE c (id INTEGER, supplier TEXT, updated_at TEXT)")
+    conn.executemany("INSERT INTO c VALUES (?, ?, ?)", [
+        (1, "Sabre", "2024-01-02T03:04:05.123456"),
+        (2, "Amadeus", "2024-01-02T03:04:05"),
+        (3, "Sabre", "not a date"),
+        (4, "Stripe", None),
+    ])
+    return conn
+
+
+def test_read_frame_types_columns(conn):
+    frame = read_frame(conn, "SELECT * FROM c ORDER BY id", categories=["supplier"], datetimes=["updated_at"])
+    assert list(frame.columns) == ["id", "supplier", "updated_at"]
+    assert isinstance(frame["supplier"].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(frame["updated_at"])
+    assert frame["updated_at"][0] == pd.Timestamp("2024-01-02T03:04:05.123456")
+    assert frame["updated_at"][2:].isna().all()
+
+
+def test_read_frame_merges_categories_across_batches(conn):
+    frame = read_frame(conn, "SELECT * FROM c ORDER BY id", categories=["supplier"], batch_size=1)
+    assert isinstance(frame["supplier"].dtype, pd.CategoricalDtype)
+    assert set(frame["supplier"].cat.categories) == {"Sabre", "Amadeus", "Stripe"}
+    assert list(frame["supplier"]) == ["Sabre", "Amadeus", "Sabre", "Stripe"]
+    assert list(frame["id"]) == [1, 2, 3, 4]
+
+
+def test_read_frame_with_params_and_no_rows(conn):
+    frame = read_frame(conn, "SELECT * FROM c WHERE id > ?", (10,), categories=["supplier"], datetimes=["updated_at"])
+    assert frame.empty
+    assert list(frame.columns) == ["id", "supplier", "updated_at"]
+    assert pd.api.types.is_datetime64_any_dtype(frame["updated_at"])
+
+
+def test_parse_datetimes_mixed_precision():
+    parsed = parse_datetimes(pd.Series(["2024-05-06T07:08:09", "2024-05-06T07:08:09.5", None]))
+    assert parsed[1] - parsed[0] == pd.Timedelta(milliseconds=500)
+    assert pd.isna(parsed[2])
@@ -0,0 +1,159 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from idempotency import IdempotencyConflict, IdempotencyInProgress, IdempotencyStore, request_fingerprint
+
+FINGERPRINT = request_fingerprint("POST", "/credentials", {"supplier": "Sabre"})
+
+
+def counting(status_code=201, body=None, delay=0.0):
+    calls = []
+
+    async def operation():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return status_code, body or {"id": len(calls)}
+
+    return operation, calls
+
+
+def test_fingerprint_ignores_key_order_only():
+    assert request_fingerprint("POST", "/x", {"a": 1, "b": 2}) == request_fingerprint("POST", "/x", {"b": 2, "a": 1})
+    assert request_fingerprint("POST", "/x", {"a": 1}) != request_fingerprint("POST", "/y", {"a": 1})
+    assert request_fingerprint("POST", "/x", {"a": 1}) != request_fingerprint("PUT", "/x", {"a": 1})
+
+
+def test_retry_replays_the_stored_response(storage):
+    store = IdempotencyStore(storage)
+    operation, calls = counting()
+    assert asyncio.run(store.run("alice", "k1", FINGERPRINT, operation)) == (201, {"id": 1}, False)
+    assert asyncio.run(store.run("alice", "k1", FINGERPRINT, operation)) == (201, {"id": 1}, True)
+    assert len(calls) == 1
+    # Keys are scoped per user
+    assert asyncio.run(store.run("bob", "k1", FINGERPRINT, operation)) == (201, {"id": 2}, False)
+
+
+def test_same_key_for_another_request_conflicts(storage):
+    store = IdempotencyStore(storage)
+    operation, calls = counting()
+    asyncio.run(store.run("alice", "k1", FINGERPRINT, operation))
+    with pytest.raises(IdempotencyConflict):
+        asyncio.run(store.run("alice", "k1", request_fingerprint("POST", "/credentials", {}), operation))
+    assert len(calls) == 1
+
+
+def test_concurrent_requests_run_once(storage):
+    store = IdempotencyStore(storage)
+    operation, calls = counting(delay=0.1)
+
+    async def both():
+        return await asyncio.gather(*(store.run("alice", "k1", FINGERPRINT, operation) for _ in range(3)))
+
+    results = asyncio.run(both())
+    assert len(calls) == 1
+    assert sorted(replayed for _, _, replayed in results) == [False, True, True]
+    assert {(status, body["id"]) for status, body, _ in results} == {(201, 1)}
+
+
+def test_waiting_gives_up_after_the_wait_timeout(storage):
+    store = IdempotencyStore(storage, wait_timeout=0.05)
+    operation, _ = counting(delay=0.5)
+
+    async def both():
+        first = asyncio.ensure_future(store.run("alice", "k1", FINGERPRINT, operation))
+        await asyncio.sleep(0.01)
+        with pytest.raises(IdempotencyInProgress):
+            await store.run("alice", "k1", FINGERPRINT, operation)
+        await first
+
+    asyncio.run(both())
+
+
+def test_failed_request_releases_the_key(storage):
+    store = IdempotencyStore(storage)
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(store.run("alice", "k1", FINGERPRINT, fail))
+    operation, calls = counting()
+    assert asyncio.run(store.run("alice", "k1", FINGERPRINT, operation)) == (201, {"id": 1}, False)
+    assert len(calls) == 1
+
+
+def test_abandoned_lock_is_taken_over(storage):
+    store = IdempotencyStore(storage, lock_timeout=0.05)
+    now = datetime.now()
+    assert storage.claim_idempotency_key(
+        "alice", "k1", FINGERPRINT, now=now.isoformat(),
+        locked_until=(now + timedelta(seconds=0.05)).isoformat(),
+        expires_at=(now + timedelta(hours=1)).isoformat()) is None
+    operation, calls = counting()
+
+    async def retry():
+        await asyncio.sleep(0.1)
+        return await store.run("alice", "k1", FINGERPRINT, operation)
+
+    assert asyncio.run(retry()) == (201, {"id": 1}, False)
+    assert len(calls) == 1
+
+
+def test_late_completion_does_not_overwrite_a_takeover(storage):
+    # Separate stores stand for two processes: the retry polls instead of waiting on an event
+    slow, retry, replay = (IdempotencyStore(storage, lock_timeout=lock) for lock in (0.05, 5, 5))
+
+    def returning(body, delay):
+        async def operation():
+            await asyncio.sleep(delay)
+            return 201, body
+        return operation
+
+    async def scenario():
+        first = asyncio.ensure_future(slow.run("alice", "k1", FINGERPRINT, returning({"id": "first"}, 0.3)))
+        await asyncio.sleep(0.1)
+        second = asyncio.ensure_future(retry.run("alice", "k1", FINGERPRINT, returning({"id": "second"}, 0.5)))
+        assert (await first)[1] == {"id": "first"}
+        # The key is still the retry's in-progress claim, not the late first response
+        replayed = await replay.run("alice", "k1", FINGERPRINT, returning({"id": "third"}, 0))
+        return await second, replayed
+
+    second, replayed = asyncio.run(scenario())
+    assert second == (201, {"id": "second"}, False)
+    assert replayed == (201, {"id": "second"}, True)
+
+
+def test_late_failure_does_not_release_a_takeover(storage):
+    slow, retry, replay = (IdempotencyStore(storage, lock_timeout=lock) for lock in (0.05, 5, 5))
+    operation, calls = counting(delay=0.5)
+
+    async def fail_late():
+        await asyncio.sleep(0.3)
+        raise RuntimeError("boom")
+
+    async def scenario():
+        first = asyncio.ensure_future(slow.run("alice", "k1", FINGERPRINT, fail_late))
+        await asyncio.sleep(0.1)
+        second = asyncio.ensure_future(retry.run("alice", "k1", FINGERPRINT, operation))
+        with pytest.raises(RuntimeError):
+            await first
+        replayed = await replay.run("alice", "k1", FINGERPRINT, operation)
+        return await second, replayed
+
+    second, replayed = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert second == (201, {"id": 1}, False)
+    assert replayed == (201, {"id": 1}, True)
+
+
+def test_delete_expired_in_batches(storage):
+    store = IdempotencyStore(storage, ttl=-1, cleanup_batch=2)
+    operation, _ = counting()
+    for key in range(5):
+        asyncio.run(store.run("alice", f"k{key}", FINGERPRINT, operation))
+    kept = IdempotencyStore(storage)
+    asyncio.run(kept.run("alice", "kept", FINGERPRINT, operation))
+    assert store.delete_expired() == 5
+    assert asyncio.run(kept.run("alice", "kept", FINGERPRINT, operation))[2]
@@ -0,0 +1,101 @@
+import os
+
+import pytest
+
+import log_tail
+from log_tail import LogTail, read_last_lines
+
+
+def write(path, text, mode="a"):
+    with open(path, mode) as f:
+        f.write(text)
+
+
+def numbered(start, stop):
+    return "".join(f"line {i}\n" for i in range(start, stop))
+
+
+def test_read_last_lines_across_chunks(tmp_path):
+    path = tmp_path / "app.log"
+    write(path, numbered(0, 100) + "partial")
+
+    lines, offset = read_last_lines(str(path), 5, chunk_size=16)
+    assert lines == [f"line {i}\n" for i in range(95, 100)]
+    # The unfinished last line is left for the next read
+    assert offset == len(numbered(0, 100))
+
+
+def test_read_last_lines_short_file(tmp_path):
+    path = tmp_path / "app.log"
+    write(path, numbered(0, 3))
+    assert read_last_lines(str(path), 10, chunk_size=4) == (
+        [f"line {i}\n" for i in range(3)], len(numbered(0, 3)))
+
+    write(path, "", mode="w")
+    assert read_last_lines(str(path), 10) == ([], 0)
+
+
+def test_refresh_reads_only_appended_bytes(tmp_path, monkeypatch):
+    path = tmp_path / "app.log"
+    write(path, numbered(0, 20))
+    tail = LogTail(str(path), max_lines=5)
+    assert tail.refresh() == [f"line {i}\n" for i in range(15, 20)]
+
+    # Later refreshes must not re-scan the file from the end
+    def no_rescan(*args, **kwargs):
+        raise AssertionError("re-tailed instead of reading the appended bytes")
+
+    monkeypatch.setattr(log_tail, "read_last_lines", no_rescan)
+    assert tail.refresh() == [f"line {i}\n" for i in range(15, 20)]
+
+    write(path, numbered(20, 22) + "half")
+    assert tail.refresh() == [f"line {i}\n" for i in range(17, 22)]
+    assert tail.offset == len(numbered(0, 22))
+
+    write(path, " done\n")
+    assert tail.refresh()[-1] == "half done\n"
+    assert tail.offset == os.path.getsize(path)
+    assert tail.last_event == ""
+
+
+def test_rotation_restarts_from_the_new_file(tmp_path):
+    path = tmp_path / "app.log"
+    write(path, numbered(0, 10))
+    tail = LogTail(str(path), max_lines=3)
+    tail.refresh()
+
+    os.rename(path, tmp_path / "app.log.1")
+    write(path, "fresh 1\nfresh 2\n")
+    assert tail.refresh() == ["fresh 1\n", "fresh 2\n"]
+    assert tail.last_event == "rotated"
+
+    write(path, "fresh 3\n")
+    assert tail.refresh() == ["fresh 1\n", "fresh 2\n", "fresh 3\n"]
+
+
+def test_truncation_restarts_from_the_end(tmp_path):
+    path = tmp_path / "app.log"
+    write(path, numbered(0, 10))
+    tail = LogTail(str(path), max_lines=3)
+    tail.refresh()
+
+    write(path, "after truncate\n", mode="w")
+    assert tail.refresh() == ["after truncate\n"]
+    assert tail.last_event == "truncated"
+    assert tail.offset == os.path.getsize(path)
+
+
+def test_far_behind_skips_to_the_end(tmp_path):
+    path = tmp_path / "app.log"
+    write(path, "first\n")
+    tail = LogTail(str(path), max_lines=2, chunk_size=16)
+    tail.refresh()
+
+    write(path, numbered(0, 50))
+    assert tail.refresh() == ["line 48\n", "line 49\n"]
+    assert tail.offset == os.path.getsize(path)
+
+
+def test_missing_file_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        LogTail(str(tmp_path / "missing.log")).refresh()
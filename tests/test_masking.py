@@ -0,0 +1,36 @@
+import json
+import sqlite3
+
+import pytest
+
+from masking import ensure_masked_data_column, mask_credential_data, mask_secret, masked_json
+
+
+@pytest.mark.parametrize("value, masked", [
+    ("sk_live_secret1234", "*****1234"),
+    ("abcd", "*****"),
+    ("", "*****"),
+    (None, "*****"),
+])
+def test_mask_secret_keeps_last_four(value, masked):
+    assert mask_secret(value) == masked
+
+
+def test_mask_credential_data_by_auth_type():
+    assert mask_credential_data({"api_key": "key_12345678"}, "api_key") == {"api_key": "*****5678"}
+    assert mask_credential_data({"username": "svc", "password": "pa55word"}, "username_password") == {
+        "username": "svc", "password": "*****word"}
+    assert mask_credential_data({"token": "t"}, "oauth") == {}
+    assert json.loads(masked_json('{"api_key": "key_12345678"}', "api_key")) == {"api_key": "*****5678"}
+
+
+def test_backfill_masks_existing_rows():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE credentials (id INTEGER PRIMARY KEY, auth_type TEXT, data TEXT)")
+    conn.executemany("INSERT INTO credentials (auth_type, data) VALUES (?, ?)",
+                     [("api_key", json.dumps({"api_key": f"key_{i:08d}"})) for i in range(1200)])
+    ensure_masked_data_column(conn)
+    masked = [json.loads(row[0]) for row in conn.execute("SELECT masked_data FROM credentials ORDER BY id")]
+    assert masked[0] == {"api_key": "*****0000"}
+    assert masked[-1] == {"api_key": "*****1199"}
+    ensure_masked_data_column(conn)  # idempotent
@@ -0,0 +1,188 @@
+import asyncio
+import gzip
+
+import pytest
+
+import api
+from nezasa_client import AsyncClient, Client, NotFoundError
+
+ADMIN_KEY = "admin_key_123"
+BASE_URL = "http://api.test"
+
+
+class Flaky:
+    """
+    Wraps an ASGI app and records every request. The first `failures`
+    requests (of `method`, if given) still run, but their response is
+    replaced by `status`, as when a gateway loses the answer.
+    """
+
+    def __init__(self, app, failures: int = 0, status: int = 503, method: str = None, headers=()):
+        self.app = app
+        self.failures = failures
+        self.status = status
+        self.method = method
+        self.headers = list(headers)
+        self.requests = []
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        key = dict(scope["headers"]).get(b"idempotency-key")
+        self.requests.append((scope["method"], scope["path"], key))
+        if self.failures and self.method in (None, scope["method"]):
+            self.failures -= 1
+
+            async def drop(message):
+                pass
+
+            await self.app(scope, receive, drop)
+            await send({"type": "http.response.start", "status": self.status, "headers": self.headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await self.app(scope, receive, send)
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The API on a seeded SQLite database in tmp_path, without background workers"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    monkeypatch.setattr(api.app.state, "embedded", True)
+    return api.app
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Backoff delays the sync client asked for (without sleeping)"""
+    delays = []
+    monkeypatch.setattr("nezasa_client.client.time.sleep", delays.append)
+    return delays
+
+
+def test_retries_idempotent_calls_with_jittered_backoff(app, sleeps):
+    flaky = Flaky(app, failures=3)
+    with Client(ADMIN_KEY, BASE_URL, app=flaky, backoff=0.2) as client:
+        assert client.health().status
+    assert len(flaky.requests) == 4
+    assert len(sleeps) == 3
+    for attempt, delay in enumerate(sleeps):
+        assert 0 <= delay <= 0.2 * 2 ** attempt
+
+
+def test_gives_up_after_max_retries(app, sleeps):
+    flaky = Flaky(app, failures=10)
+    with Client(ADMIN_KEY, BASE_URL, app=flaky, max_retries=2) as client:
+        with pytest.raises(Exception) as error:
+            client.health()
+    assert error.value.status_code == 503
+    assert len(flaky.requests) == 3
+
+
+def test_honours_retry_after(app, sleeps):
+    flaky = Flaky(app, failures=1, status=429, headers=[(b"retry-after", b"1")])
+    with Client(ADMIN_KEY, BASE_URL, app=flaky) as client:
+        client.list_credentials()
+    assert sleeps == [1.0]
+
+
+def test_retried_post_reuses_its_idempotency_key(app, sleeps):
+    flaky = Flaky(app, failures=1, method="POST")
+    with Client(ADMIN_KEY, BASE_URL, app=flaky) as client:
+        rotated = client.rotate_credential(1)
+        client.rotate_credential(2)
+        rotations = client.get_audit_logs(credential_id=1, action="rotate")
+
+    keys = [key for method, _, key in flaky.requests if method == "POST"]
+    assert len(keys) == 3 and None not in keys
+    # The retry carried the first attempt's key; the next call got a new one
+    assert keys[0] == keys[1] != keys[2]
+    # The lost first response was replayed, not rotated again
+    assert len(rotations) == 1
+    assert rotated.id == 1
+
+
+def test_iterators_page_through_everything(app):
+    with Client(ADMIN_KEY, BASE_URL, app=app) as client:
+        all_logs = client.get_audit_logs(limit=1000)
+        assert [log.id for log in client.iter_audit_logs(page_size=3)] == [log.id for log in all_logs]
+
+        all_changes = client.get_changes(limit=5000).changes
+        assert [change.seq for change in client.iter_changes(page_size=2)] == [c.seq for c in all_changes]
+
+        hits = client.search("production", scope="credentials", limit=100).results
+        assert len(hits) > 1
+        paged = [hit.id for hit in client.iter_search("production", scope="credentials", page_size=1)]
+        assert paged == [hit.id for hit in hits]
+
+
+def test_batches_keep_input_order_and_collect_errors(app):
+    with Client(ADMIN_KEY, BASE_URL, app=app) as client:
+        result = client.rotate_credentials([2, 999999, 3], concurrency=3)
+    assert [item.input for item in result.items] == [2, 999999, 3]
+    assert [item.result.id for item in result.items if item.ok] == [2, 3]
+    assert len(result.failed) == 1 and isinstance(result.failed[0].error, NotFoundError)
+    assert not result.ok
+
+
+def test_response_cache_serves_repeats_until_a_write(app):
+    counting = Flaky(app)
+    with Client(ADMIN_KEY, BASE_URL, app=counting, cache_ttl=60) as client:
+        first = client.list_credentials()
+        assert client.list_credentials() == first
+        assert [path for method, path, _ in counting.requests if method == "GET"] == ["/api/v1/credentials"]
+
+        client.update_credential(first[0].id, environment="staging")
+        assert client.list_credentials() != first
+        assert len([r for r in counting.requests if r[0] == "GET"]) == 2
+
+
+def test_admin_and_export_wrappers(app, tmp_path):
+    with Client(ADMIN_KEY, BASE_URL, app=app) as client:
+        policy = client.set_rotation_policy("Sabre", "*", 30)
+        assert (policy.supplier, policy.environment, policy.max_age_days) == ("Sabre", "*", 30)
+        assert [p.supplier for p in client.list_rotation_policies()] == ["Sabre"]
+        client.delete_rotation_policy("Sabre", "*")
+        assert client.list_rotation_policies() == []
+        with pytest.raises(NotFoundError):
+            client.delete_rotation_policy("Sabre", "*")
+
+        assert client.get_rotation_scheduler().policies == 0
+        assert isinstance(client.get_supplier_adapters(), dict)
+
+        client.reset_query_stats()
+        client.list_credentials()
+        stats = client.get_query_stats(top=5)
+        assert stats.calls > 0 and len(stats.top) <= 5
+
+        export = client.export_audit_logs(str(tmp_path / "audit.csv.gz"), action="create")
+        with gzip.open(export.path, "rt") as f:
+            assert len(f.read().splitlines()) == export.rows + 1
+        assert export.rows == len(client.get_audit_logs(action="create", limit=1000))
+
+        credentials = client.export_credentials(str(tmp_path / "credentials.csv.gz"))
+        assert credentials.rows == len(client.list_credentials())
+
+
+def test_async_client(app, tmp_path):
+    flaky = Flaky(app, failures=1, method="POST")
+
+    async def run():
+        async with app.router.lifespan_context(app):
+            async with AsyncClient(ADMIN_KEY, BASE_URL, app=flaky, backoff=0) as client:
+                rotated = await client.rotate_credential(1)
+                rotations = [log async for log in client.iter_audit_logs(credential_id=1, action="rotate",
+                                                                          page_size=1)]
+                result = await client.rotate_credentials([2, 999999])
+                export = await client.export_credentials(str(tmp_path / "credentials.csv.gz"))
+                policy = await client.set_rotation_policy("*", "*", 90)
+                return rotated, rotations, result, export, policy
+
+    rotated, rotations, result, export, policy = asyncio.run(run())
+    keys = [key for method, _, key in flaky.requests if method == "POST"]
+    assert keys[0] == keys[1]
+    assert len(rotations) == 1
+    assert rotated.id == 1
+    assert [item.ok for item in result.items] == [True, False]
+    assert export.rows == 10
+    assert policy.max_age_days == 90
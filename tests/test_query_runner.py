@@ -0,0 +1,126 @@
+import sqlite3
+
+import pytest
+
+from query_runner import PostgresQueryRunner, QueryRejected, SQLiteQueryRunner, check_query
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "runner.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE numbers (n INTEGER PRIMARY KEY)")
+    conn.executemany("INSERT INTO numbers VALUES (?)", [(i,) for i in range(2000)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def run(runner, sql, timeout=10):
+    job = runner.start(sql)
+    assert job.wait(timeout)
+    return job
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT 1",
+    "  with t as (select 1) select * from t;  ",
+    "VALUES (1)",
+    "SELECT ';' AS semicolon -- trailing; comment",
+])
+def test_check_query_accepts_single_reads(sql):
+    assert not check_query(sql).endswith(";")
+
+
+@pytest.mark.parametrize("sql, message", [
+    ("", "Enter a query"),
+    ("-- only a comment", "Enter a query"),
+    ("SELECT 1; SELECT 2", "one statement"),
+    ("DELETE FROM numbers", "Only SELECT"),
+    ("PRAGMA writable_schema = 1", "Only SELECT"),
+])
+def test_check_query_rejects(sql, message):
+    with pytest.raises(QueryRejected, match=message):
+        check_query(sql)
+
+
+def test_sqlite_job_streams_rows_and_plan(db_path):
+    job = run(SQLiteQueryRunner(db_path), "SELECT n FROM numbers WHERE n < 3 ORDER BY n")
+    assert job.status == "done"
+    assert job.columns == ["n"]
+    assert job.rows == [(0,), (1,), (2,)]
+    assert not job.truncated
+    assert job.plan and "numbers" in job.plan[0]
+
+
+def test_sqlite_row_cap_truncates(db_path):
+    job = run(SQLiteQueryRunner(db_path, row_cap=100), "SELECT n FROM numbers")
+    assert job.status == "done"
+    assert len(job.rows) == 100
+    assert job.truncated
+
+
+def test_sqlite_step_limit_stops_runaway_queries(db_path):
+    job = run(SQLiteQueryRunner(db_path, step_limit=10_000),
+              "SELECT count(*) FROM numbers a, numbers b")
+    assert job.status == "step_limit"
+
+
+def test_sqlite_time_limit(db_path):
+    job = run(SQLiteQueryRunner(db_path, time_limit=0.05), "SELECT count(*) FROM numbers a, numbers b, numbers c")
+    assert job.status == "timeout"
+
+
+def test_sqlite_cancel(db_path):
+    job = SQLiteQueryRunner(db_path).start("SELECT count(*) FROM numbers a, numbers b, numbers c")
+    job.cancel()
+    assert job.wait(10)
+    assert job.status == "cancelled"
+
+
+def test_sqlite_connection_is_read_only(db_path):
+    # Gets past check_query as a WITH statement, but the connection refuses the write
+    job = run(SQLiteQueryRunner(db_path), "WITH x AS (SELECT 1) INSERT INTO numbers SELECT 5000 FROM x")
+    assert job.status == "error"
+    assert sqlite3.connect(db_path).execute("SELECT max(n) FROM numbers").fetchone()[0] == 1999
+
+
+def test_sqlite_errors_are_reported(db_path):
+    job = run(SQLiteQueryRunner(db_path), "SELECT missing FROM numbers")
+    assert job.status == "error"
+    assert "missing" in job.error
+
+
+@pytest.fixture
+def postgres_engine(postgres_server):
+    sqlalchemy = pytest.importorskip("sqlalchemy")
+    uri = postgres_server.get_uri().replace("postgresql://", "postgresql+psycopg2://", 1)
+    engine = sqlalchemy.create_engine(uri)
+    yield engine
+    engine.dispose()
+
+
+def test_postgres_job_streams_rows_with_cap(postgres_engine):
+    job = run(PostgresQueryRunner(postgres_engine, row_cap=50), "SELECT n FROM generate_series(1, 200) AS n")
+    assert job.status == "done"
+    assert job.columns == ["n"]
+    assert job.rows[:2] == [(1,), (2,)]
+    assert len(job.rows) == 50 and job.truncated
+    assert job.plan
+
+
+def test_postgres_transaction_is_read_only(postgres_engine):
+    from sqlalchemy import text
+
+    with postgres_engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS runner_numbers AS SELECT generate_series(1, 10) AS n"))
+    job = run(PostgresQueryRunner(postgres_engine),
+              "WITH gone AS (DELETE FROM runner_numbers RETURNING n) SELECT count(*) FROM gone")
+    assert job.status == "error"
+    with postgres_engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM runner_numbers")).scalar() == 10
+
+
+def test_postgres_time_limit(postgres_engine):
+    job = run(PostgresQueryRunner(postgres_engine, time_limit=0.2), "SELECT pg_sleep(5)")
+    assert job.status == "timeout"
@@ -0,0 +1,52 @@
+import sqlite3
+
+import pytest
+
+from query_stats import QueryStats, fingerprint, instrument_sqlite, query_stats, track_queries
+
+
+def test_fingerprint_normalizes_literals_and_in_lists():
+    assert fingerprint("SELECT * FROM t WHERE id = 42 AND name = 'x''y'") == "SELECT * FROM t WHERE id = ? AND name = ?"
+    assert fingerprint("DELETE FROM t WHERE id IN (?, ?,  ?)") == "DELETE FROM t WHERE id IN (?...)"
+    assert fingerprint("SELECT  1\n  FROM t") == fingerprint("SELECT 2 FROM t")
+
+
+def test_instrumented_connection_tallies_statements():
+    conn = instrument_sqlite(sqlite3.connect(":memory:"))
+    conn.execute("CREATE TABLE t (n INTEGER)")
+    conn.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(100)])
+    query_stats.reset()
+    with track_queries() as tally:
+        assert conn.execute("SELECT n FROM t WHERE n < 10").fetchall()[-1] == (9,)
+        assert conn.execute("SELECT n FROM t WHERE n < 20").fetchone() == (0,)
+        conn.finish_statements()
+    assert tally.count == 2
+    assert tally.rows == 11
+
+    top, = query_stats.top()
+    assert top["fingerprint"] == "SELECT n FROM t WHERE n < ?"
+    assert top["calls"] == 2 and top["rows"] == 11
+
+
+def test_slow_statements_are_logged_with_plan(monkeypatch):
+    import query_stats as module
+
+    monkeypatch.setattr(module, "SLOW_QUERY_MS", 0.0)
+    conn = instrument_sqlite(sqlite3.connect(":memory:"))
+    conn.execute("CREATE TABLE t (n INTEGER PRIMARY KEY)")
+    query_stats.reset()
+    conn.execute("SELECT * FROM t WHERE n = 1").fetchall()
+    slow = query_stats.recent_slow()
+    assert slow[0]["fingerprint"] == "SELECT * FROM t WHERE n = ?"
+    assert slow[0]["plan"] and "t" in slow[0]["plan"][0]
+
+
+def test_top_sorts_and_validates():
+    stats = QueryStats()
+    stats.add("SELECT 1", "sqlite", 0.5, 1, 0, True)
+    stats.add("SELECT x FROM y", "sqlite", 0.1, 0, 0, True)
+    stats.add("SELECT x FROM y", "sqlite", 0.1, 0, 0, True)
+    assert [s["calls"] for s in stats.top(sort="calls")] == [2, 1]
+    assert stats.top(1)[0]["fingerprint"] == "SELECT ?"
+    with pytest.raises(ValueError):
+        stats.top(sort="nope")
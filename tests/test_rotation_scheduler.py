@@ -0,0 +1,177 @@
+import asyncio
+import json
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from rotation_scheduler import ANY, ROTATION_ACTOR, RotationScheduler, due_age, jitter_fraction, resolve_policy
+
+
+def policy(supplier, environment, days):
+    return {"supplier": supplier, "environment": environment, "max_age_days": days}
+
+
+def create_aged(storage, supplier, environment, days_old, api_key="old"):
+    cred = storage.create_credential(supplier, environment, "api_key", json.dumps({"api_key": api_key}),
+                                     "alice@nezasa.com", False, "Created")
+    stamp = (datetime.now() - timedelta(days=days_old)).isoformat()
+
+    def backdate(conn):
+        conn.cursor().execute("UPDATE credentials SET updated_at = ? WHERE id = ?", (stamp, cred["id"]))
+        conn.commit()
+
+    storage.write(backdate)
+    return storage.get_credential(cred["id"])
+
+
+def new_key(credential, data):
+    return {"api_key": f"rotated-{credential['id']}"}
+
+
+def test_most_specific_policy_wins():
+    policies = {(p["supplier"], p["environment"]): p for p in [
+        policy(ANY, ANY, 365), policy(ANY, "production", 180), policy("Sabre", ANY, 90),
+        policy("Sabre", "production", 30)]}
+    assert resolve_policy(policies, "Sabre", "production")["max_age_days"] == 30
+    assert resolve_policy(policies, "Sabre", "sandbox")["max_age_days"] == 90
+    assert resolve_policy(policies, "Stripe", "production")["max_age_days"] == 180
+    assert resolve_policy(policies, "Stripe", "sandbox")["max_age_days"] == 365
+    assert resolve_policy({}, "Stripe", "sandbox") is None
+
+
+def test_jitter_spreads_due_ages_within_the_last_fraction():
+    fractions = [jitter_fraction(cred_id) for cred_id in range(1, 1001)]
+    assert all(0 <= f < 1 for f in fractions)
+    assert sum(f < 0.5 for f in fractions) == pytest.approx(500, abs=50)
+    assert timedelta(days=90) <= due_age(7, 100, jitter=0.1) <= timedelta(days=100)
+    assert due_age(7, 100, jitter=0.0) == timedelta(days=100)
+
+
+def test_find_due_applies_policies_oldest_first(storage):
+    storage.set_rotation_policy("Sabre", ANY, 30, actor="admin")
+    young = create_aged(storage, "Sabre", "production", 10)
+    late = create_aged(storage, "Sabre", "production", 40)
+    due = create_aged(storage, "Sabre", "sandbox", 29.99)
+    unmanaged = create_aged(storage, "Stripe", "production", 400)
+
+    scheduler = RotationScheduler(storage, new_key, jitter=0.1)
+    found, overdue, policies = scheduler.find_due()
+    found_ids = [row["id"] for row in found]
+    assert late["id"] in found_ids and young["id"] not in found_ids and unmanaged["id"] not in found_ids
+    assert found_ids[0] == late["id"]
+    assert (due["id"] in found_ids) == (timedelta(days=29.99) >= due_age(due["id"], 30, 0.1))
+    assert overdue == 1 and policies == 1
+
+
+def test_find_due_pages_through_candidates(storage, monkeypatch):
+    import rotation_scheduler
+
+    monkeypatch.setattr(rotation_scheduler, "SCAN_PAGE_SIZE", 2)
+    storage.set_rotation_policy(ANY, ANY, 10, actor="admin")
+    for days in (20, 30, 40, 50, 60):
+        create_aged(storage, "Sabre", "production", days)
+    found, overdue, _ = RotationScheduler(storage, new_key).find_due()
+    assert len(found) == overdue == 5
+    assert [row["age"] for row in found] == sorted((row["age"] for row in found), reverse=True)
+
+
+def test_run_once_rotates_and_audits(storage):
+    storage.set_rotation_policy(ANY, ANY, 30, actor="admin")
+    old = create_aged(storage, "Sabre", "production", 60)
+    fresh = create_aged(storage, "Sabre", "production", 1, api_key="fresh")
+
+    scheduler = RotationScheduler(storage, new_key, rate_per_minute=6000, batch_size=10)
+    assert scheduler.run_once() == 1
+    assert json.loads(storage.get_credential(old["id"])["data"]) == {"api_key": f"rotated-{old['id']}"}
+    assert json.loads(storage.get_credential(fresh["id"])["data"]) == {"api_key": "fresh"}
+    log = storage.get_audit_logs(cred_id=old["id"], action="rotate")[0]
+    assert log["actor"] == ROTATION_ACTOR
+    gauges = scheduler.gauges()
+    assert gauges["due"] == gauges["overdue"] == 0
+    assert gauges["rotated_total"] == 1
+    assert scheduler.find_due()[0] == []
+
+
+def test_rotate_one_skips_credentials_changed_since_the_scan(storage):
+    storage.set_rotation_policy(ANY, ANY, 30, actor="admin")
+    create_aged(storage, "Sabre", "production", 60)
+    scheduler = RotationScheduler(storage, new_key)
+    candidate, = scheduler.find_due()[0]
+    storage.update_credential(candidate["id"], {"data": json.dumps({"api_key": "manual"})},
+                              actor="bob@nezasa.com", action="rotate", details="Manual rotation")
+    assert not scheduler.rotate_one(candidate)
+    assert json.loads(storage.get_credential(candidate["id"])["data"]) == {"api_key": "manual"}
+
+
+def test_rotate_one_does_not_overwrite_a_rotation_made_while_it_ran(storage):
+    storage.set_rotation_policy(ANY, ANY, 30, actor="admin")
+    create_aged(storage, "Sabre", "production", 60)
+
+    def rotate_data(credential, data):
+        # Someone rotates by hand while the supplier call is in flight
+        storage.update_credential(credential["id"], {"data": json.dumps({"api_key": "manual"})},
+                                  actor="bob@nezasa.com", action="rotate", details="Manual rotation")
+        return {"api_key": "scheduled"}
+
+    scheduler = RotationScheduler(storage, rotate_data)
+    candidate, = scheduler.find_due()[0]
+    assert not scheduler.rotate_one(candidate)
+    assert json.loads(storage.get_credential(candidate["id"])["data"]) == {"api_key": "manual"}
+    assert [log["actor"] for log in storage.get_audit_logs(cred_id=candidate["id"], action="rotate")] == [
+        "bob@nezasa.com"]
+
+
+def test_shutdown_lets_rotations_waiting_on_the_event_loop_finish(storage):
+    storage.set_rotation_policy(ANY, ANY, 30, actor="admin")
+    cred = create_aged(storage, "Sabre", "production", 60)
+
+    async def shutdown_during_rotation():
+        loop = asyncio.get_running_loop()
+        calling = threading.Event()
+
+        async def supplier_call():
+            await asyncio.sleep(0.2)
+            return {"api_key": "from-supplier"}
+
+        def rotate_data(credential, data):
+            calling.set()
+            return asyncio.run_coroutine_threadsafe(supplier_call(), loop).result()
+
+        scheduler = RotationScheduler(storage, rotate_data, rate_per_minute=6000)
+        scheduler.start()
+        assert await loop.run_in_executor(None, calling.wait, 5)
+        # As api.py's shutdown: signal, then wait without blocking the loop
+        scheduler.stop()
+        while scheduler.is_alive():
+            await asyncio.sleep(0.05)
+        return scheduler
+
+    scheduler = asyncio.run(shutdown_during_rotation())
+    assert not scheduler.gauges()["running"]
+    assert json.loads(storage.get_credential(cred["id"])["data"]) == {"api_key": "from-supplier"}
+
+
+def test_failed_rotations_are_counted_and_stay_due(storage):
+    storage.set_rotation_policy(ANY, ANY, 30, actor="admin")
+    create_aged(storage, "Sabre", "production", 60)
+
+    def fail(credential, data):
+        raise RuntimeError("supplier down")
+
+    scheduler = RotationScheduler(storage, fail, rate_per_minute=6000)
+    assert scheduler.run_once() == 0
+    assert scheduler.gauges()["failed_total"] == 1
+    assert scheduler.gauges()["due"] == 1
+    assert len(scheduler.find_due()[0]) == 1
+
+
+def test_rate_limit_bounds_rotations_per_scan(storage):
+    storage.set_rotation_policy(ANY, ANY, 30, actor="admin")
+    for _ in range(5):
+        create_aged(storage, "Sabre", "production", 60)
+    # 60/minute with a 2s scan interval allows two rotations, one per 1s batch
+    scheduler = RotationScheduler(storage, new_key, scan_interval=2, rate_per_minute=60, batch_size=1)
+    scheduler._stop.wait = lambda timeout: False  # no real pauses between batches
+    assert scheduler.run_once() == 2
+    assert scheduler.gauges()["due"] == 3
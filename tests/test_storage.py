@@ -0,0 +1,189 @@
+import json
+import re
+
+import pytest
+
+from credential_crypto import ENCRYPTION_ACTIVE, PREFIX
+from storage import SAMPLE_CREDENTIALS
+
+
+def create(storage, supplier="Sabre", environment="production", auth_type="api_key",
+           data=None, created_by="alice@nezasa.com"):
+    data = json.dumps(data or {"api_key": "sk_live_secret1234"})
+    return storage.create_credential(supplier, environment, auth_type, data, created_by, False,
+                                     f"Created credential for {supplier} ({environment})")
+
+
+def raw_column(storage, cred_id, column):
+    with storage.reading() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {column} FROM credentials WHERE id = ?", (cred_id,))
+        return cursor.fetchone()[0]
+
+
+# ---------- credentials ----------
+
+def test_create_and_get_credential(storage):
+    cred = create(storage)
+    assert cred["supplier"] == "Sabre"
+    assert json.loads(cred["data"]) == {"api_key": "sk_live_secret1234"}
+
+    row = storage.get_credential(cred["id"])
+    assert json.loads(row["data"]) == {"api_key": "sk_live_secret1234"}
+    assert row["created_at"] == row["updated_at"] == cred["created_at"]
+    assert json.loads(storage.get_credential(cred["id"], masked=True)["data"]) == {"api_key": "*****1234"}
+    assert storage.get_credential(cred["id"] + 1) is None
+
+
+@pytest.mark.skipif(not ENCRYPTION_ACTIVE, reason="credential encryption is off")
+def test_data_is_encrypted_at_rest(storage):
+    cred = create(storage)
+    stored = raw_column(storage, cred["id"], "data")
+    assert stored.startswith(PREFIX)
+    assert "sk_live_secret1234" not in stored
+
+
+def test_list_credentials_filters(storage):
+    create(storage, "Sabre", "production")
+    create(storage, "Sabre", "sandbox")
+    create(storage, "Amadeus", "production")
+    assert len(storage.list_credentials()) == 3
+    assert {row["environment"] for row in storage.list_credentials(supplier="Sabre")} == {"production", "sandbox"}
+    assert [row["supplier"] for row in storage.list_credentials(supplier="Sabre", environment="sandbox")] == ["Sabre"]
+    masked = storage.list_credentials(masked=True)
+    assert all(json.loads(row["data"]) == {"api_key": "*****1234"} for row in masked)
+
+
+def test_update_credential_remasks_and_audits(storage):
+    cred = create(storage)
+    updated = storage.update_credential(
+        cred["id"], {"auth_type": "username_password", "data": json.dumps({"username": "u", "password": "hunter22"})},
+        actor="bob@nezasa.com", action="update", details="Changed auth type"
+    )
+    assert updated["auth_type"] == "username_password"
+    assert json.loads(updated["data"])["password"] == "hunter22"
+    assert updated["updated_at"] > cred["updated_at"]
+    assert json.loads(raw_column(storage, cred["id"], "masked_data")) == {"username": "u", "password": "*****er22"}
+
+    storage.update_credential(cred["id"], {"environment": "sandbox"}, actor="bob@nezasa.com",
+                              action="update", details="Moved to sandbox")
+    assert json.loads(storage.get_credential(cred["id"])["data"])["password"] == "hunter22"
+    assert [log["action"] for log in storage.get_audit_logs(cred_id=cred["id"])] == ["update", "update", "create"]
+
+
+def test_update_credential_rejects_unknown_columns_and_missing_ids(storage):
+    cred = create(storage)
+    with pytest.raises(ValueError):
+        storage.update_credential(cred["id"], {"created_by": "mallory"}, actor="a", action="update", details="")
+    assert storage.update_credential(cred["id"] + 1, {"environment": "x"}, actor="a",
+                                     action="update", details="") is None
+    assert storage.update_credential(cred["id"] + 1, {"data": "{}"}, actor="a", action="update", details="") is None
+
+
+def test_update_credential_only_if_unchanged(storage):
+    cred = create(storage)
+    storage.update_credential(cred["id"], {"data": json.dumps({"api_key": "manual"})}, actor="bob@nezasa.com",
+                              action="rotate", details="Manual rotation")
+    assert storage.update_credential(cred["id"], {"data": json.dumps({"api_key": "stale"})}, actor="a",
+                                     action="rotate", details="", expected_updated_at=cred["updated_at"]) is None
+    row = storage.get_credential(cred["id"])
+    assert json.loads(row["data"]) == {"api_key": "manual"}
+    assert len(storage.get_audit_logs(cred_id=cred["id"])) == 2
+
+    updated = storage.update_credential(cred["id"], {"data": json.dumps({"api_key": "fresh"})}, actor="a",
+                                        action="rotate", details="", expected_updated_at=row["updated_at"])
+    assert json.loads(updated["data"]) == {"api_key": "fresh"}
+
+
+def test_delete_credential_keeps_audit_trail(storage):
+    cred = create(storage)
+    assert storage.delete_credential(cred["id"], actor="alice@nezasa.com", details="Deleted")
+    assert storage.get_credential(cred["id"]) is None
+    assert [log["action"] for log in storage.get_audit_logs(cred_id=cred["id"])] == ["delete", "create"]
+    assert not storage.delete_credential(cred["id"], actor="alice@nezasa.com", details="Deleted again")
+    assert len(storage.get_audit_logs(cred_id=cred["id"])) == 2
+
+
+def test_seed_sample_data_only_fills_an_empty_database(storage):
+    assert storage.seed_sample_data() == len(SAMPLE_CREDENTIALS)
+    assert storage.seed_sample_data() == 0
+    assert len(storage.list_credentials()) == len(SAMPLE_CREDENTIALS)
+    history = sum(len(cred["history"]) for cred in SAMPLE_CREDENTIALS)
+    assert len(storage.get_audit_logs(limit=1000)) == len(SAMPLE_CREDENTIALS) + history
+
+
+# ---------- audit ----------
+
+def test_audit_logs_filters_and_order(storage):
+    first = create(storage, "Sabre")
+    second = create(storage, "Amadeus")
+    storage.update_credential(first["id"], {"environment": "sandbox"}, actor="bob@nezasa.com",
+                              action="update", details="Moved")
+    logs = storage.get_audit_logs()
+    assert [log["timestamp"] for log in logs] == sorted((log["timestamp"] for log in logs), reverse=True)
+    assert [log["cred_id"] for log in storage.get_audit_logs(action="create")] == [second["id"], first["id"]]
+    assert len(storage.get_audit_logs(limit=1)) == 1
+    assert storage.get_audit_logs(since=logs[0]["timestamp"]) == logs[:1]
+    assert storage.get_audit_logs(until=logs[-1]["timestamp"]) == []
+
+
+# ---------- search ----------
+
+def test_search_credentials_and_audit(storage):
+    sabre = create(storage, "Sabre", "production")
+    create(storage, "Amadeus", "sandbox")
+    hits, has_more = storage.search("credentials", "sab", 10, 0)
+    assert [hit["id"] for hit in hits] == [sabre["id"]]
+    assert not has_more
+
+    hits, _ = storage.search("audit", "amadeus sandbox", 10, 0)
+    assert [(hit["action"], hit["supplier"], hit["environment"]) for hit in hits] == [
+        ("create", "Amadeus", "sandbox")]
+    assert "[" in hits[0]["snippet"]
+
+    hits, has_more = storage.search("audit", "created", 1, 0)
+    assert len(hits) == 1 and has_more
+    assert storage.search("audit", "!!!", 10, 0) == ([], False)
+
+
+def test_search_never_indexes_secrets(storage):
+    create(storage, data={"api_key": "needle_secret_value"})
+    assert storage.search("credentials", "needle_secret_value", 10, 0) == ([], False)
+    assert storage.search("audit", "needle_secret_value", 10, 0) == ([], False)
+
+
+# ---------- change feed ----------
+
+def test_changes_are_compacted_per_credential(storage):
+    first = create(storage, "Sabre")
+    second = create(storage, "Amadeus")
+    changes, has_more, seq = storage.get_changes(0, 10)
+    assert [change["cred_id"] for change in changes] == [first["id"], second["id"]]
+    assert not has_more and seq == changes[-1]["seq"]
+
+    storage.update_credential(first["id"], {"environment": "sandbox"}, actor="a", action="update", details="")
+    storage.delete_credential(second["id"], actor="a", details="")
+    changes, _, latest = storage.get_changes(seq, 10)
+    assert [(change["cred_id"], change["op"]) for change in changes] == [(first["id"], "upsert"),
+                                                                         (second["id"], "delete")]
+    assert changes[0]["credential"]["environment"] == "sandbox"
+    assert json.loads(changes[0]["credential"]["data"]) == {"api_key": "sk_live_secret1234"}
+    assert changes[1]["credential"] is None
+    # Tombstones are stamped in the same isoformat as updated_at, so they order correctly
+    assert re.fullmatch(r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{6}", changes[1]["changed_at"])
+    assert changes[1]["changed_at"] >= changes[0]["changed_at"][:23]
+    assert latest == seq + 2
+
+    # Compacted: a full sync sees each credential once, at its latest change
+    changes, _, _ = storage.get_changes(0, 10)
+    assert [change["cred_id"] for change in changes] == [first["id"], second["id"]]
+
+
+def test_changes_page_and_mask(storage):
+    for supplier in ("Sabre", "Amadeus", "Stripe"):
+        create(storage, supplier)
+    page, has_more, _ = storage.get_changes(0, 2, masked=True)
+    assert len(page) == 2 and has_more
+    assert json.loads(page[0]["credential"]["data"]) == {"api_key": "*****1234"}
+    rest, has_more, _ = storage.get_changes(page[-1]["seq"], 2)
+    assert len(rest) == 1 and not has_more
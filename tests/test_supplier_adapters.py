@@ -0,0 +1,212 @@
+import asyncio
+
+import pytest
+
+from supplier_adapters import (
+    CircuitBreaker, CircuitOpenError, RotationError, SupplierAdapter, SupplierLimits, SupplierRotator,
+)
+
+CREDENTIAL = {"id": 1, "supplier": "Sabre", "environment": "production", "auth_type": "api_key"}
+
+
+class ScriptedAdapter(SupplierAdapter):
+    """Each call pops the next outcome: a dict is returned, an exception raised, an Event awaited"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+        self.keys = set()
+
+    async def rotate(self, credential, data, idempotency_key):
+        self.calls += 1
+        self.keys.add(idempotency_key)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, asyncio.Event):
+            await outcome.wait()
+            return {"api_key": "late"}
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def rotator_with(adapter, **limits):
+    limits = dict(dict(concurrency=1, timeout=1.0, retries=0, backoff=0.0, breaker_threshold=2,
+                       breaker_reset=60.0), **limits)
+    rotator = SupplierRotator(adapter)
+    rotator.register("Sabre", adapter, SupplierLimits(**limits))
+    return rotator
+
+
+def down():
+    return RotationError("Sabre", "HTTP 503", retryable=True)
+
+
+def half_open(breaker):
+    breaker.opened_at -= breaker.reset
+
+
+# ---------- CircuitBreaker ----------
+
+def test_breaker_opens_after_threshold_consecutive_failures():
+    breaker = CircuitBreaker(threshold=3, reset=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.opens == 1
+    assert not breaker.allow()
+
+
+def test_breaker_success_resets_failure_count():
+    breaker = CircuitBreaker(threshold=2, reset=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_breaker_allows_one_trial_when_half_open():
+    breaker = CircuitBreaker(threshold=1, reset=60)
+    breaker.record_failure()
+    half_open(breaker)
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_breaker_trial_success_closes():
+    breaker = CircuitBreaker(threshold=1, reset=60)
+    breaker.record_failure()
+    half_open(breaker)
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_breaker_trial_failure_reopens():
+    breaker = CircuitBreaker(threshold=5, reset=60)
+    for _ in range(5):
+        breaker.record_failure()
+    half_open(breaker)
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.opens == 2
+
+
+def test_breaker_ended_trial_lets_next_call_try():
+    breaker = CircuitBreaker(threshold=1, reset=60)
+    breaker.record_failure()
+    half_open(breaker)
+    breaker.allow()
+    breaker.end_trial()
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+
+
+# ---------- SupplierRotator ----------
+
+def test_rotate_retries_with_the_same_idempotency_key():
+    adapter = ScriptedAdapter(down(), down(), {"api_key": "new"})
+    rotator = rotator_with(adapter, retries=3, breaker_threshold=5)
+    assert asyncio.run(rotator.rotate(CREDENTIAL, {})) == {"api_key": "new"}
+    assert adapter.calls == 3
+    assert len(adapter.keys) == 1
+    assert rotator.status()["Sabre"]["retries"] == 2
+
+
+def test_rotate_does_not_retry_rejected_requests():
+    adapter = ScriptedAdapter(RotationError("Sabre", "HTTP 400"))
+    rotator = rotator_with(adapter, retries=3)
+    with pytest.raises(RotationError):
+        asyncio.run(rotator.rotate(CREDENTIAL, {}))
+    assert adapter.calls == 1
+
+
+def test_open_breaker_skips_supplier():
+    adapter = ScriptedAdapter(down(), down())
+    rotator = rotator_with(adapter)
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(RotationError):
+                await rotator.rotate(CREDENTIAL, {})
+        with pytest.raises(CircuitOpenError):
+            await rotator.rotate(CREDENTIAL, {})
+
+    asyncio.run(scenario())
+    assert adapter.calls == 2
+    assert rotator.status()["Sabre"]["breaker"] == "open"
+
+
+def test_throttling_does_not_trip_breaker():
+    throttled = [RotationError("Sabre", "HTTP 429", retryable=True, throttled=True) for _ in range(3)]
+    rotator = rotator_with(ScriptedAdapter(*throttled))
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(RotationError):
+                await rotator.rotate(CREDENTIAL, {})
+
+    asyncio.run(scenario())
+    assert rotator.status()["Sabre"]["breaker"] == "closed"
+
+
+@pytest.mark.parametrize("answer", [
+    RotationError("Sabre", "HTTP 400"),
+    RotationError("Sabre", "HTTP 429", retryable=True, throttled=True),
+])
+def test_trial_answered_with_error_closes_breaker(answer):
+    rotator = rotator_with(ScriptedAdapter(answer, {"api_key": "new"}), breaker_threshold=1)
+    breaker = rotator._breaker("Sabre")
+    breaker.record_failure()
+    half_open(breaker)
+
+    async def scenario():
+        with pytest.raises(RotationError):
+            await rotator.rotate(CREDENTIAL, {})
+        return await rotator.rotate(CREDENTIAL, {})
+
+    assert asyncio.run(scenario()) == {"api_key": "new"}
+    assert breaker.state == "closed"
+
+
+def test_trial_failure_reopens_breaker():
+    rotator = rotator_with(ScriptedAdapter(down()), breaker_threshold=1)
+    breaker = rotator._breaker("Sabre")
+    breaker.record_failure()
+    half_open(breaker)
+    with pytest.raises(RotationError):
+        asyncio.run(rotator.rotate(CREDENTIAL, {}))
+    assert breaker.state == "open"
+    assert breaker.opens == 2
+
+
+def test_cancelled_trial_ends_trial():
+    hang = asyncio.Event()
+    rotator = rotator_with(ScriptedAdapter(hang, {"api_key": "new"}), breaker_threshold=1, timeout=10.0)
+    breaker = rotator._breaker("Sabre")
+    breaker.record_failure()
+    half_open(breaker)
+
+    async def scenario():
+        trial = asyncio.ensure_future(rotator.rotate(CREDENTIAL, {}))
+        await asyncio.sleep(0.01)
+        with pytest.raises(CircuitOpenError):
+            await rotator.rotate(CREDENTIAL, {})
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        return await rotator.rotate(CREDENTIAL, {})
+
+    assert asyncio.run(scenario()) == {"api_key": "new"}
+    assert breaker.state == "closed"
+
+
+def test_timeout_counts_as_failure():
+    rotator = rotator_with(ScriptedAdapter(asyncio.Event()), breaker_threshold=1, timeout=0.01)
+    with pytest.raises(RotationError, match="timed out"):
+        asyncio.run(rotator.rotate(CREDENTIAL, {}))
+    assert rotator.status()["Sabre"]["breaker"] == "open"
@@ -0,0 +1,57 @@
+import requests
+from fastapi import FastAPI
+from fastapi.responses import FileResponse
+
+from nezasa_client.transports import ASGIAdapter
+
+
+def make_app(file_path: str = None):
+    app = FastAPI()
+    app.state.events = []
+
+    @app.on_event("startup")
+    async def startup():
+        app.state.events.append("startup")
+
+    @app.on_event("shutdown")
+    async def shutdown():
+        app.state.events.append("shutdown")
+
+    @app.post("/echo/{item}")
+    async def echo(item: int, body: dict, q: str = ""):
+        return {"item": item, "body": body, "q": q}
+
+    @app.get("/file")
+    def file():
+        return FileResponse(file_path)
+
+    return app
+
+
+def test_asgi_adapter_runs_lifespan_and_requests():
+    app = make_app()
+    adapter = ASGIAdapter(app)
+    session = requests.Session()
+    session.mount("http://api.inprocess/", adapter)
+    assert app.state.events == ["startup"]
+
+    response = session.post("http://api.inprocess/echo/7?q=x", json={"a": 1})
+    assert response.status_code == 200
+    assert response.json() == {"item": 7, "body": {"a": 1}, "q": "x"}
+    assert session.post("http://api.inprocess/echo/seven", json={}).status_code == 422
+    assert session.get("http://api.inprocess/missing").status_code == 404
+
+    adapter.close()
+    assert app.state.events == ["startup", "shutdown"]
+
+
+def test_asgi_adapter_streams_file_responses(tmp_path):
+    path = tmp_path / "export.bin"
+    path.write_bytes(bytes(range(256)) * 1024)
+    adapter = ASGIAdapter(make_app(str(path)))
+    session = requests.Session()
+    session.mount("http://api.inprocess/", adapter)
+
+    response = session.get("http://api.inprocess/file", stream=True)
+    assert b"".join(response.iter_content(4096)) == path.read_bytes()
+    adapter.close()
@@ -8,6 +8,8 @@ import os
 import time
 import sys
 
+from log_tail import read_last_lines
+
 LOG_FILE = "api_requests.log"
 COLORS = {
     'reset': '\033[0m',
@@ -104,17 +106,17 @@ def watch_existing_logs():
     """Display existing logs"""
     if os.path.exists(LOG_FILE):
         try:
-            with open(LOG_FILE, 'r') as f:
-                lines = f.readlines()
-                if lines:
-                    print(colorize("📋 Existing logs:", 'yellow'))
-                    print("-" * 80)
-                    for line in lines[-20:]:  # Show last 20 lines
-                        print(format_log_line(line.strip()))
-                    print("-" * 80 + "\n")
-                    print(colorize("🔄 Watching for new requests...\n", 'green'))
-                else:
-                    print(colorize("📭 No logs yet. Waiting for API requests...\n", 'yellow'))
+            # Seek backward from the end instead of reading the whole file
+            lines, _ = read_last_lines(LOG_FILE, 20)
+            if lines:
+                print(colorize("📋 Existing logs:", 'yellow'))
+                print("-" * 80)
+                for line in lines:  # Show last 20 lines
+                    print(format_log_line(line.strip()))
+                print("-" * 80 + "\n")
+                print(colorize("🔄 Watching for new requests...\n", 'green'))
+            else:
+                print(colorize("📭 No logs yet. Waiting for API requests...\n", 'yellow'))
         except Exception as e:
             print(colorize(f"⚠️  Error reading log file: {e}", 'red'))
     else: